@@ -4,6 +4,7 @@ import logging
 import httpx
 
 from eduid.common.clients.gnap_client.base import GNAPBearerTokenMixin, GNAPClientAuthData
+from eduid.common.clients.gnap_client.token_cache import GNAPTokenCache, token_cache
 from eduid.common.models.gnap_models import GrantResponse
 
 __author__ = "lundberg"
@@ -12,7 +13,7 @@ logger = logging.getLogger(__name__)
 
 
 class AsyncGNAPClient(httpx.AsyncClient, GNAPBearerTokenMixin):
-    def __init__(self, auth_data: GNAPClientAuthData, **kwargs):
+    def __init__(self, auth_data: GNAPClientAuthData, token_cache: GNAPTokenCache = token_cache, **kwargs):
         if "event_hooks" not in kwargs:
             kwargs["event_hooks"] = {"response": [self.raise_on_4xx_5xx], "request": [self._add_authz_header]}
 
@@ -20,6 +21,7 @@ class AsyncGNAPClient(httpx.AsyncClient, GNAPBearerTokenMixin):
 
         self.verify = kwargs.get("verify", True)
         self._auth_data = auth_data
+        self._token_cache = token_cache
 
     @staticmethod
     async def raise_on_4xx_5xx(response: httpx.Response) -> None:
@@ -41,8 +43,9 @@ class AsyncGNAPClient(httpx.AsyncClient, GNAPBearerTokenMixin):
             return GrantResponse.parse_raw(resp.text)
 
     async def _add_authz_header(self, request: httpx.Request) -> None:
-        if not self._has_bearer_token():
-            grant_response = await self._request_bearer_token()
-            self._set_bearer_token(grant_response=grant_response)
-
-        request.headers["Authorization"] = f"Bearer {self._bearer_token}"
+        bearer_token = await self._token_cache.get_token_async(
+            key=self.token_cache_key,
+            request_token=self._request_bearer_token,
+            default_expires_in=self._auth_data.default_access_token_expires_in,
+        )
+        request.headers["Authorization"] = f"Bearer {bearer_token}"
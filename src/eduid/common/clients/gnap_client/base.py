@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
+import json
 import logging
 from abc import ABC
-from datetime import datetime, timedelta
-from typing import Any, Coroutine, List, Optional, Union
+from datetime import timedelta
+from typing import Any, Coroutine, List, Tuple, Union
 
 from httpx import Request
 from jwcrypto.jwk import JWK
@@ -47,13 +48,17 @@ class GNAPClientAuthData(BaseModel):
 
 class GNAPBearerTokenMixin(ABC):
     _auth_data: GNAPClientAuthData
-    _bearer_token: Optional[str] = None
-    _bearer_token_expires_at: datetime = utc_now()
 
     @property
     def transaction_uri(self) -> str:
         return urlappend(self._auth_data.authn_server_url, "transaction")
 
+    @property
+    def token_cache_key(self) -> Tuple[str, str, str]:
+        """Clients asking the same auth server for the same access can share bearer tokens"""
+        access = [item if isinstance(item, str) else item.json(exclude_none=True) for item in self._auth_data.access]
+        return self.transaction_uri, self._auth_data.key_name, json.dumps(access)
+
     def _create_grant_request_jws(self) -> str:
         req = GrantRequest(
             client=Client(key=self._auth_data.key_name),
@@ -75,19 +80,6 @@ class GNAPBearerTokenMixin(ABC):
         )
         return _jws.serialize(compact=True)
 
-    def _set_bearer_token(self, grant_response: GrantResponse) -> None:
-        logger.debug(f"gnap response: {grant_response}")
-        if grant_response.access_token is None:
-            raise GNAPClientException("No access token returned")
-        self._bearer_token = grant_response.access_token.value
-        expires_in = self._auth_data.default_access_token_expires_in
-        if grant_response.access_token.expires_in is not None:
-            expires_in = timedelta(seconds=grant_response.access_token.expires_in)
-        self._bearer_token_expires_at = utc_now() + expires_in
-
-    def _has_bearer_token(self) -> bool:
-        return self._bearer_token is not None and self._bearer_token_expires_at > utc_now()
-
     def _request_bearer_token(self) -> Union[GrantResponse, Coroutine[Any, Any, GrantResponse]]:
         raise NotImplementedError()
 
@@ -4,6 +4,7 @@ from typing import Optional
 import respx
 from httpx import Response
 
+from eduid.common.clients.gnap_client.token_cache import token_cache
 from eduid.common.models.gnap_models import AccessTokenResponse, GrantResponse
 
 __author__ = "lundberg"
@@ -18,4 +19,7 @@ class MockedSyncAuthAPIMixin:
         grant_response = GrantResponse(access_token=AccessTokenResponse(value=access_token_value))
         transaction_route.return_value = Response(200, text=grant_response.json(exclude_none=True))
         self.mocked_auth_api.start()
+        # don't use bearer tokens cached by earlier tests
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)  # type: ignore
         self.addCleanup(self.mocked_auth_api.stop)  # type: ignore
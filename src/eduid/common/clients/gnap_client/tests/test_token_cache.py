@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+from jwcrypto.jwk import JWK
+
+from eduid.common.clients.gnap_client.async_client import AsyncGNAPClient
+from eduid.common.clients.gnap_client.base import GNAPClientAuthData
+from eduid.common.clients.gnap_client.sync_client import GNAPClient
+from eduid.common.clients.gnap_client.token_cache import GNAPTokenCache
+from eduid.common.misc.timeutil import utc_now
+
+__author__ = "lundberg"
+
+
+class Clock:
+    """A clock that only moves when told to"""
+
+    def __init__(self) -> None:
+        self.now = utc_now()
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, delta: timedelta) -> None:
+        self.now += delta
+
+
+class StubAuthServer(ThreadingHTTPServer):
+    """
+    Auth server handing out numbered bearer tokens, and a resource that requires one of them.
+
+    Grant requests are held until grant_gate is set.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, expires_in: int):
+        super().__init__(("127.0.0.1", 0), StubAuthHandler)
+        self.expires_in = expires_in
+        self.grant_requested = threading.Event()
+        self.grant_gate = threading.Event()
+        self.grant_gate.set()
+        self.grants = 0
+        self.issued: List[str] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class StubAuthHandler(BaseHTTPRequestHandler):
+    server: StubAuthServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status: int, body: bytes = b"") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path != "/transaction":
+            return self._respond(404)
+        self.server.grant_requested.set()
+        if not self.server.grant_gate.wait(timeout=10):
+            return self._respond(503)
+        with self.server.lock:
+            self.server.grants += 1
+            token = f"token-{self.server.grants}"
+            self.server.issued.append(token)
+        body = {"access_token": {"value": token, "expires_in": self.server.expires_in}}
+        return self._respond(200, json.dumps(body).encode())
+
+    def do_GET(self):
+        if self.headers.get("Authorization", "").removeprefix("Bearer ") not in self.server.issued:
+            return self._respond(401)
+        return self._respond(200, b"{}")
+
+
+class TokenCacheTests(unittest.TestCase):
+    callers = 20
+
+    def setUp(self) -> None:
+        self.server = StubAuthServer(expires_in=60)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.auth_data = GNAPClientAuthData(
+            authn_server_url=self.server.url,
+            key_name="test_key",
+            client_jwk=JWK.generate(kty="EC", crv="P-256", kid="test_kid"),
+            access=["test_access"],
+        )
+        self.clock = Clock()
+        # refresh when half the token lifetime (30 seconds) remains
+        self.token_cache = GNAPTokenCache(refresh_ahead=0.5, clock=self.clock)
+
+    def _sync_call(self) -> int:
+        with GNAPClient(auth_data=self.auth_data, token_cache=self.token_cache) as client:
+            return client.get(f"{self.server.url}/resource").status_code
+
+    def _sync_calls(self) -> List[int]:
+        with ThreadPoolExecutor(max_workers=self.callers) as executor:
+            return list(executor.map(lambda _: self._sync_call(), range(self.callers)))
+
+    def _async_calls(self) -> List[int]:
+        async def _call() -> int:
+            async with AsyncGNAPClient(auth_data=self.auth_data, token_cache=self.token_cache) as client:
+                response = await client.get(f"{self.server.url}/resource")
+                return response.status_code
+
+        async def _calls() -> List[int]:
+            return list(await asyncio.gather(*[_call() for _ in range(self.callers)]))
+
+        return asyncio.run(_calls())
+
+    def _gated(self, calls: Callable[[], List[int]]) -> List[int]:
+        """Hold the grant request until it has been made, so that the other callers pile up waiting for it"""
+        self.server.grant_requested.clear()
+        self.server.grant_gate.clear()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(calls)
+            self.assertTrue(self.server.grant_requested.wait(timeout=10))
+            self.server.grant_gate.set()
+            return future.result()
+
+    def test_one_grant_per_token_lifetime_threads(self):
+        self.assertEqual(self._gated(self._sync_calls), [200] * self.callers)
+        self.assertEqual(self.server.grants, 1)
+        self.assertEqual(self._sync_calls(), [200] * self.callers)
+        self.assertEqual(self.server.grants, 1)
+
+    def test_one_grant_per_token_lifetime_tasks(self):
+        self.assertEqual(self._gated(self._async_calls), [200] * self.callers)
+        self.assertEqual(self.server.grants, 1)
+        # a new event loop uses the same tokens
+        self.assertEqual(self._async_calls(), [200] * self.callers)
+        self.assertEqual(self.server.grants, 1)
+
+    def test_threads_and_tasks_share_tokens(self):
+        self._sync_calls()
+        self._async_calls()
+        self.assertEqual(self.server.grants, 1)
+
+    def test_refresh_ahead(self):
+        self._sync_calls()
+        self.clock.advance(timedelta(seconds=31))
+        self.server.grant_requested.clear()
+        self.server.grant_gate.clear()
+        with ThreadPoolExecutor(max_workers=self.callers) as executor:
+            futures = [executor.submit(self._sync_call) for _ in range(self.callers)]
+            self.assertTrue(self.server.grant_requested.wait(timeout=10))
+            # one caller refreshes the token while the others keep using the current one, without waiting
+            refreshing = set(futures)
+            for future in as_completed(futures, timeout=10):
+                self.assertEqual(future.result(), 200)
+                refreshing.remove(future)
+                if len(refreshing) == 1:
+                    break
+            # tasks don't wait for the refresh in progress either
+            self.assertEqual(self._async_calls(), [200] * self.callers)
+            self.assertEqual(self.server.grants, 1)
+            self.server.grant_gate.set()
+            self.assertEqual(refreshing.pop().result(timeout=10), 200)
+        self.assertEqual(self.server.grants, 2)
+        self.assertEqual(self._async_calls(), [200] * self.callers)
+        self.assertEqual(self.server.grants, 2)
+
+    def test_refresh_ahead_tasks(self):
+        self._async_calls()
+        self.clock.advance(timedelta(seconds=31))
+        self.assertEqual(self._gated(self._async_calls), [200] * self.callers)
+        self.assertEqual(self.server.grants, 2)
+        self.assertEqual(self._sync_calls(), [200] * self.callers)
+        self.assertEqual(self.server.grants, 2)
+
+    def test_expired(self):
+        self._async_calls()
+        self.clock.advance(timedelta(seconds=61))
+        self.assertEqual(self._gated(self._async_calls), [200] * self.callers)
+        self.assertEqual(self.server.grants, 2)
+
+    def test_separate_keys(self):
+        self._sync_calls()
+        self.auth_data.access = ["other_access"]
+        self._sync_calls()
+        self.assertEqual(self.server.grants, 2)
+        self.assertEqual(len(self.token_cache._tokens), 2)
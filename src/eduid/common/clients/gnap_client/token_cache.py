@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, MutableMapping, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+
+from eduid.common.clients.gnap_client.base import GNAPClientException
+from eduid.common.misc.timeutil import utc_now
+from eduid.common.models.gnap_models import GrantResponse
+
+__author__ = "lundberg"
+
+logger = logging.getLogger(__name__)
+
+# (transaction uri, client key name, access request)
+TokenCacheKey = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class CachedToken:
+    value: str
+    expires_at: datetime
+    refresh_at: datetime
+
+    def is_valid(self, now: datetime) -> bool:
+        return now < self.expires_at
+
+    def needs_refresh(self, now: datetime) -> bool:
+        return now >= self.refresh_at
+
+
+class GNAPTokenCache:
+    """
+    Process-wide cache of GNAP bearer tokens, shared by all GNAP clients asking the same auth server for the
+    same access.
+
+    Only one grant request per key is made at a time (single-flight). Callers that need a token while it is
+    being requested wait for that request, in a thread (sync clients) or a task (async clients).
+
+    Tokens are refreshed ahead of expiry: when refresh_ahead of the token lifetime remains, the next caller
+    requests a new token while the other callers keep using the current one. If that request fails, the
+    current token is used until it expires. Only one refresh per key is made at a time, whether the callers
+    are threads or tasks in any event loop.
+
+    Tasks waiting for a token to be requested wait on an asyncio lock, and those can only be used in one
+    event loop. When there is no valid token, tasks in different event loops (e.g. in different threads)
+    do not wait for each other and each event loop makes its own grant request.
+
+    :param refresh_ahead: The fraction of the token lifetime before expiry to start refreshing the token
+    :param clock: Function returning the current time
+    """
+
+    def __init__(self, refresh_ahead: float = 0.2, clock: Callable[[], datetime] = utc_now):
+        self.refresh_ahead = refresh_ahead
+        self._clock = clock
+        self._tokens: Dict[TokenCacheKey, CachedToken] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[TokenCacheKey, threading.Lock] = {}
+        self._refreshing: Set[TokenCacheKey] = set()
+        # asyncio locks can only be used in the event loop they were first used in
+        self._async_locks: MutableMapping[
+            asyncio.AbstractEventLoop, Dict[TokenCacheKey, asyncio.Lock]
+        ] = WeakKeyDictionary()
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {len(self._tokens)} tokens>"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+    def _get_cached(self, key: TokenCacheKey) -> Optional[CachedToken]:
+        with self._lock:
+            return self._tokens.get(key)
+
+    def _get_key_lock(self, key: TokenCacheKey) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _get_async_key_lock(self, key: TokenCacheKey) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            locks = self._async_locks.setdefault(loop, {})
+            if key not in locks:
+                locks[key] = asyncio.Lock()
+            return locks[key]
+
+    def _start_refresh(self, key: TokenCacheKey) -> bool:
+        """Returns False if someone else is already refreshing the token"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key: TokenCacheKey) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _store(self, key: TokenCacheKey, grant_response: GrantResponse, default_expires_in: timedelta) -> CachedToken:
+        logger.debug(f"gnap response: {grant_response}")
+        if grant_response.access_token is None:
+            raise GNAPClientException("No access token returned")
+        expires_in = default_expires_in
+        if grant_response.access_token.expires_in is not None:
+            expires_in = timedelta(seconds=grant_response.access_token.expires_in)
+        now = self._clock()
+        token = CachedToken(
+            value=grant_response.access_token.value,
+            expires_at=now + expires_in,
+            refresh_at=now + expires_in * (1 - self.refresh_ahead),
+        )
+        with self._lock:
+            self._tokens[key] = token
+        logger.debug(f"Cached bearer token from {key[0]}, expires at {token.expires_at}")
+        return token
+
+    def get_token(
+        self,
+        key: TokenCacheKey,
+        request_token: Callable[[], GrantResponse],
+        default_expires_in: timedelta,
+    ) -> str:
+        """
+        Get a bearer token, requesting a new one with request_token() if needed.
+        """
+        token = self._get_cached(key)
+        now = self._clock()
+        if token is not None and token.is_valid(now):
+            if not token.needs_refresh(now):
+                return token.value
+            # Refresh ahead, unless someone else already is
+            if not self._start_refresh(key):
+                return token.value
+            try:
+                refreshed = self._get_cached(key)
+                if refreshed is not None and not refreshed.needs_refresh(self._clock()):
+                    # refreshed by someone else since we looked
+                    return refreshed.value
+                return self._store(key, request_token(), default_expires_in).value
+            except Exception:
+                logger.exception(f"Failed refreshing bearer token from {key[0]}, using the current one")
+                return token.value
+            finally:
+                self._end_refresh(key)
+
+        with self._get_key_lock(key):
+            # Another caller might have gotten a token while we waited for the lock
+            token = self._get_cached(key)
+            if token is not None and token.is_valid(self._clock()):
+                return token.value
+            return self._store(key, request_token(), default_expires_in).value
+
+    async def get_token_async(
+        self,
+        key: TokenCacheKey,
+        request_token: Callable[[], Awaitable[GrantResponse]],
+        default_expires_in: timedelta,
+    ) -> str:
+        """
+        Get a bearer token, requesting a new one with request_token() if needed.
+        """
+        token = self._get_cached(key)
+        now = self._clock()
+        if token is not None and token.is_valid(now):
+            if not token.needs_refresh(now):
+                return token.value
+            # Refresh ahead, unless someone else already is
+            if not self._start_refresh(key):
+                return token.value
+            try:
+                refreshed = self._get_cached(key)
+                if refreshed is not None and not refreshed.needs_refresh(self._clock()):
+                    # refreshed by someone else since we looked
+                    return refreshed.value
+                return self._store(key, await request_token(), default_expires_in).value
+            except Exception:
+                logger.exception(f"Failed refreshing bearer token from {key[0]}, using the current one")
+                return token.value
+            finally:
+                self._end_refresh(key)
+
+        async with self._get_async_key_lock(key):
+            # Another task might have gotten a token while we waited for the lock
+            token = self._get_cached(key)
+            if token is not None and token.is_valid(self._clock()):
+                return token.value
+            return self._store(key, await request_token(), default_expires_in).value
+
+
+token_cache = GNAPTokenCache()
@@ -322,6 +322,27 @@ class MsgConfigMixin(CeleryConfigMixin):
     eduid_site_name: str = "eduID"
 
 
+class EkopostConfigMixin(BaseModel):
+    """Config used for sending letters with Ekopost"""
+
+    letter_wait_time_hours: int = 336  # 2 weeks
+
+    ekopost_api_uri: str = "https://api.ekopost.se"
+    ekopost_api_verify_ssl: bool = True
+    ekopost_api_user: str = ""
+    ekopost_api_pw: str = ""
+    # Print in color (CMYK) or set to false for black and white.
+    ekopost_api_color: bool = False
+    # Send with 'priority' to deliver within one working day after printing, or send with 'economy' to deliver
+    # within four working days after printing.
+    ekopost_api_postage: str = "priority"
+    # Use 'simplex' to print on one page or 'duplex' to print on both front and back.
+    ekopost_api_plex: str = "simplex"
+    # Setting ekopost_debug_pdf to a path means that the other ekopost settings will be ignored and that the pdf
+    # only will be written to to the supplied path, not sent to the letter service.
+    ekopost_debug_pdf_path: Optional[str] = None
+
+
 class TouConfigMixin(BaseModel):
     tou_version: str = "2016-v1"
 
@@ -385,5 +406,7 @@ class EduIDBaseAppConfig(RootConfig, LoggingConfigMixin, StatsConfigMixin, Redis
     # requested URL ex. ^/test$.
     no_authn_urls: list[str] = Field(default=["^/status/healthy$", "^/status/sanity-check$"])
     status_cache_seconds: int = 10
+    # Seconds to wait for the health check, the dependencies are checked concurrently
+    health_check_timeout: float = 5.0
     # All AuthnBaseApps need this to redirect not-logged-in requests to the authn service
     token_service_url: str
@@ -31,6 +31,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 
+from datetime import timedelta
+from typing import Optional
+
 from pydantic import Field
 
 from eduid.common.config.base import WorkerConfig
@@ -80,3 +83,10 @@ class MobConfig(WorkerConfig):
     teleadress_client_user: str = ""
     teleadress_client_url: str = "http://api.teleadress.se/WSDL/nnapiwebservice.wsdl"
     teleadress_client_port: str = "NNAPIWebServiceSoap"
+    teleadress_client_timeout: int = 90
+    # Cache the WSDL (and the schemas it imports) here instead of in the system temp directory
+    teleadress_wsdl_cache_dir: Optional[str] = None
+    teleadress_wsdl_cache_days: int = 7
+    # Write the transaction audit log in batches of this many entries, or every flush interval
+    transaction_audit_batch_size: int = 1
+    transaction_audit_flush_interval: timedelta = timedelta(seconds=5)
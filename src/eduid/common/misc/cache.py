@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class _CacheEntry(Generic[V]):
+    value: V
+    expires_at: float
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class ExpiringCache(Generic[K, V]):
+    """
+    Bounded in-memory LRU cache where every entry expires after a time to live.
+
+    The cache is safe to use from multiple threads. When the cache is full, the least recently used entry is evicted.
+
+    :param max_size: The maximum number of entries to keep
+    :param ttl: Default time to live in seconds for entries
+    :param clock: Monotonic clock to use, mostly useful in tests
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._data: OrderedDict[K, _CacheEntry[V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if entry.expires_at <= self._clock():
+                del self._data[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Get an entry without making it the most recently used one, or counting it in the stats"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                return None
+            return entry.value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Add or replace an entry.
+
+        :param ttl: Time to live in seconds for this entry, capped at the default ttl of the cache
+        """
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+        if ttl <= 0:
+            return None
+        with self._lock:
+            self._data[key] = _CacheEntry(value=value, expires_at=self._clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        return entry.value
+
+    def keys(self) -> List[K]:
+        """The keys of all entries that have not expired, least recently used first"""
+        self.expire()
+        with self._lock:
+            return list(self._data.keys())
+
+    def expire(self) -> int:
+        """
+        Remove all expired entries.
+
+        :return: Number of removed entries
+        """
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry.expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            self.stats.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Generic, Hashable, Mapping, MutableMapping, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+@dataclass
+class TaskResult(Generic[T]):
+    value: Optional[T] = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    elapsed: float = 0.0  # seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+class FanOut:
+    """
+    Run independent blocking calls (typically database queries) concurrently, in a bounded thread pool.
+
+    The pool is shared by all callers, and created when first used. If a timeout is given, calls that have not
+    finished within it are reported as timed out. They can't be interrupted (and keep holding a worker thread),
+    but their results are ignored. Calls that can time out on their own (e.g. database queries run with a
+    pymongo.timeout) should rather do so, and be run without a timeout here.
+
+    :param name: Name used for the worker threads
+    :param max_workers: The maximum number of calls running at the same time
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {self.name} (max_workers={self.max_workers})>"
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def run(self, calls: Mapping[K, Callable[[], T]], timeout: Optional[float] = None) -> Dict[K, TaskResult[T]]:
+        """
+        Run all the calls concurrently, and wait for them to finish.
+
+        :param calls: The calls to make, by key
+        :param timeout: Seconds to wait for all the calls, counted from when they were submitted (so including
+                        the time calls spend queued waiting for a worker thread). None to wait until all are done.
+        :return: The result of each call, by key
+        """
+        start = time.monotonic()
+        futures: Dict[K, Future] = {key: self.executor.submit(_timed, call) for key, call in calls.items()}
+        res: Dict[K, TaskResult[T]] = {}
+        for key, future in futures.items():
+            try:
+                if timeout is None:
+                    res[key] = future.result()
+                    continue
+                res[key] = future.result(timeout=max(0.0, start + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                # don't start the call if it is still queued
+                future.cancel()
+                logger.warning(f"{self}: call {key!r} timed out after {timeout} seconds")
+                res[key] = TaskResult(timed_out=True, elapsed=time.monotonic() - start)
+        return res
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def _timed(call: Callable[[], T]) -> TaskResult[T]:
+    start = time.monotonic()
+    try:
+        return TaskResult(value=call(), elapsed=time.monotonic() - start)
+    except Exception as e:
+        logger.exception(f"Call {call} failed")
+        return TaskResult(error=e, elapsed=time.monotonic() - start)
+
+
+class AsyncThreadPool:
+    """
+    Run blocking calls (typically pymongo) from coroutines in a bounded thread pool, so that they don't block the
+    event loop while waiting for I/O.
+
+    Calls can be made in a named group, e.g. per endpoint, and the number of concurrent calls in a group can be
+    limited. Calls over the limit wait (without holding a thread) until another call in the group has finished.
+
+    :param name: Name used for the worker threads
+    :param max_workers: The maximum number of calls running at the same time, in all groups
+    :param limits: The maximum number of concurrent calls per group
+    """
+
+    def __init__(self, name: str, max_workers: int, limits: Optional[Mapping[str, int]] = None):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.name = name
+        self.max_workers = max_workers
+        self.limits: Mapping[str, int] = limits or {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # asyncio semaphores can only be used in the event loop they were first used in
+        self._semaphores: MutableMapping[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]] = WeakKeyDictionary()
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {self.name} (max_workers={self.max_workers})>"
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def _get_semaphore(self, group: str) -> Optional[asyncio.Semaphore]:
+        if group not in self.limits:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._semaphores.setdefault(loop, {})
+            if group not in semaphores:
+                semaphores[group] = asyncio.Semaphore(self.limits[group])
+            return semaphores[group]
+
+    async def run(self, func: Callable[..., T], *args: Any, group: Optional[str] = None, **kwargs: Any) -> T:
+        """
+        Call func(*args, **kwargs) in the thread pool, and wait for the result.
+
+        :param func: The blocking function to call
+        :param group: Group to count the call in, for concurrency limits
+        """
+        loop = asyncio.get_running_loop()
+        call = partial(func, *args, **kwargs)
+        semaphore = self._get_semaphore(group) if group is not None else None
+        if semaphore is None:
+            return await loop.run_in_executor(self.executor, call)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, call)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,137 @@
+"""
+Process wide registry of shared database connections.
+
+Database clients (pymongo/motor MongoClient, neo4j Driver) each have their own connection pool and
+monitoring threads. Creating one client per database class instance gives a process with many data owners,
+or many database classes, a lot of pools, sockets and threads to the same servers. The registry hands out
+a shared client per (URI, options) instead, and closes it when the last user has released it.
+
+Clients must not be shared between processes, so the registries are emptied in the child after os.fork()
+(Celery and gunicorn prefork workers). The child gets new clients the next time one is acquired.
+"""
+import logging
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Mapping, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ConnectionKey = Tuple[Hashable, ...]
+
+
+@dataclass
+class _Entry(Generic[T]):
+    connection: T
+    refcount: int
+
+
+class ConnectionRegistry(Generic[T]):
+    """
+    Ref-counted registry of shared connections.
+
+    :param name: Name of the registry, used in logging
+    :param close: Function used to close a connection when it is no longer used
+    """
+
+    def __init__(self, name: str, close: Callable[[T], None]):
+        self.name = name
+        self._close = close
+        self._entries: Dict[ConnectionKey, _Entry[T]] = {}
+        self._lock = threading.Lock()
+        _registries.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {self.name} ({len(self)} connections)>"
+
+    def acquire(self, key: ConnectionKey, factory: Callable[[], T]) -> T:
+        """
+        Get the shared connection for key, creating it using factory if there is none.
+
+        Every call to acquire must be matched by a call to release when the connection is no longer used.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(connection=factory(), refcount=0)
+                self._entries[key] = entry
+                logger.debug(f"{self} created a new connection")
+            entry.refcount += 1
+            return entry.connection
+
+    def release(self, key: ConnectionKey) -> None:
+        """Release a connection, closing it if it is not used by anyone else"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount -= 1
+            if entry.refcount > 0:
+                return
+            del self._entries[key]
+        self._close(entry.connection)
+        logger.debug(f"{self} closed a connection")
+
+    def refcount(self, key: ConnectionKey) -> int:
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        return entry.refcount
+
+    def _reset_after_fork(self) -> None:
+        """
+        Forget all connections without closing them.
+
+        The connections (and their threads and sockets) belong to the parent process, so closing them
+        here would be wrong. The lock is replaced too, since it might have been held by another thread
+        in the parent when the process was forked.
+        """
+        self._lock = threading.Lock()
+        self._entries = {}
+
+
+_registries: "weakref.WeakSet[ConnectionRegistry[Any]]" = weakref.WeakSet()
+
+
+def _reset_registries_after_fork() -> None:
+    for registry in list(_registries):
+        registry._reset_after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_registries_after_fork)
+
+
+def make_connection_key(*args: Any, options: Optional[Mapping[str, Any]] = None) -> ConnectionKey:
+    """
+    Make a hashable registry key from a connection URI (and whatever else identifies the connection) and options.
+
+    Values that are not hashable, such as dicts, lists and neo4j auth objects, are converted to tuples.
+    """
+    res = tuple(_freeze(x) for x in args)
+    if options:
+        res += (_freeze(dict(options)),)
+    return res
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, Mapping):
+        return tuple(sorted(((str(k), _freeze(v)) for k, v in value.items()), key=lambda x: x[0]))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        _values = [_freeze(x) for x in value]
+        if isinstance(value, (set, frozenset)):
+            _values = sorted(_values, key=repr)
+        return tuple(_values)
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "__dict__"):
+        # e.g. neo4j.Auth, that is compared by identity but should be compared by value here
+        return (f"{type(value).__module__}.{type(value).__qualname__}", _freeze(vars(value)))
+    return repr(value)
@@ -0,0 +1,94 @@
+import unittest
+
+from eduid.common.misc.cache import ExpiringCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ExpiringCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache: ExpiringCache[str, int] = ExpiringCache(max_size=3, ttl=10, clock=self.clock)
+
+    def test_get_set(self):
+        assert self.cache.get("a") is None
+        self.cache.set("a", 1)
+        assert self.cache.get("a") == 1
+        assert "a" in self.cache
+        assert self.cache.stats.hits == 2
+        assert self.cache.stats.misses == 1
+
+    def test_expiry(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=2)
+        self.clock.now += 3
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == 1
+        self.clock.now += 7
+        assert self.cache.get("a") is None
+        assert len(self.cache) == 0
+
+    def test_ttl_capped_at_default(self):
+        self.cache.set("a", 1, ttl=100)
+        self.clock.now += 11
+        assert self.cache.get("a") is None
+
+    def test_non_positive_ttl_not_cached(self):
+        self.cache.set("a", 1, ttl=0)
+        self.cache.set("b", 1, ttl=-5)
+        assert len(self.cache) == 0
+
+    def test_lru_eviction(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.set("c", 3)
+        # touch a to make b the least recently used entry
+        assert self.cache.get("a") == 1
+        self.cache.set("d", 4)
+        assert len(self.cache) == 3
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == 1
+        assert self.cache.stats.evictions == 1
+
+    def test_peek(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.set("c", 3)
+        # peeking at a doesn't make b the least recently used entry
+        assert self.cache.peek("a") == 1
+        assert self.cache.peek("x") is None
+        assert self.cache.keys() == ["a", "b", "c"]
+        assert self.cache.stats.hits == 0
+        assert self.cache.stats.misses == 0
+        self.clock.now += 11
+        assert self.cache.peek("a") is None
+
+    def test_expire(self):
+        self.cache.set("a", 1, ttl=1)
+        self.cache.set("b", 2)
+        self.clock.now += 2
+        assert self.cache.expire() == 1
+        assert len(self.cache) == 1
+
+    def test_pop_and_clear(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        assert self.cache.pop("a") == 1
+        assert self.cache.pop("a") is None
+        self.cache.clear()
+        assert len(self.cache) == 0
+
+    def test_keys(self):
+        self.cache.set("a", 1, ttl=1)
+        self.cache.set("b", 2)
+        self.cache.set("c", 3)
+        assert self.cache.get("b") == 2
+        assert self.cache.keys() == ["a", "c", "b"]
+        self.clock.now += 2
+        assert self.cache.keys() == ["c", "b"]
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from eduid.common.misc.concurrency import AsyncThreadPool, FanOut
+
+
+class TestFanOut(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fan_out = FanOut(name="test", max_workers=4)
+
+    def tearDown(self) -> None:
+        self.fan_out.shutdown()
+
+    def test_results(self):
+        res = self.fan_out.run({"a": lambda: 1, "b": lambda: 2}, timeout=1)
+        self.assertEqual({"a", "b"}, set(res.keys()))
+        self.assertTrue(res["a"].ok)
+        self.assertEqual(1, res["a"].value)
+        self.assertEqual(2, res["b"].value)
+
+    def test_concurrent(self):
+        # all four calls must be running at the same time to get past the barrier
+        barrier = threading.Barrier(4, timeout=1)
+        start = time.monotonic()
+        res = self.fan_out.run({i: barrier.wait for i in range(4)}, timeout=2)
+        self.assertTrue(all(x.ok for x in res.values()))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_error(self):
+        def _fail() -> None:
+            raise RuntimeError("database down")
+
+        res = self.fan_out.run({"ok": lambda: "yes", "fail": _fail}, timeout=1)
+        self.assertTrue(res["ok"].ok)
+        self.assertFalse(res["fail"].ok)
+        self.assertIsInstance(res["fail"].error, RuntimeError)
+        self.assertFalse(res["fail"].timed_out)
+
+    def test_timeout(self):
+        release = threading.Event()
+        try:
+            start = time.monotonic()
+            res = self.fan_out.run({"slow": lambda: release.wait(5), "fast": lambda: True}, timeout=0.2)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertTrue(res["slow"].timed_out)
+            self.assertFalse(res["slow"].ok)
+            self.assertIsNone(res["slow"].value)
+            self.assertTrue(res["fast"].ok)
+        finally:
+            release.set()
+
+    def test_no_timeout(self):
+        # more calls than workers, all of them are waited for
+        res = self.fan_out.run({i: lambda: time.sleep(0.05) or True for i in range(8)})
+        self.assertTrue(all(x.ok and x.value for x in res.values()))
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError):
+            FanOut(name="test", max_workers=0)
+
+
+class TestAsyncThreadPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.pool = AsyncThreadPool(name="test", max_workers=4, limits={"limited": 1})
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+
+    def _blocking(self, delay: float) -> float:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(delay)
+        with self.lock:
+            self.running -= 1
+        return delay
+
+    async def test_result(self):
+        self.assertEqual(await self.pool.run(self._blocking, delay=0), 0)
+
+    async def test_error(self):
+        def _fail():
+            raise ValueError("test")
+
+        with self.assertRaises(ValueError):
+            await self.pool.run(_fail)
+
+    async def test_event_loop_not_blocked(self):
+        # the event loop keeps running while the calls block
+        ticks = 0
+
+        async def _tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(_tick())
+        await asyncio.gather(*[self.pool.run(self._blocking, 0.2) for _ in range(4)])
+        ticker.cancel()
+        self.assertGreater(ticks, 10)
+        self.assertEqual(self.max_running, 4)
+
+    async def test_max_workers(self):
+        await asyncio.gather(*[self.pool.run(self._blocking, 0.05) for _ in range(8)])
+        self.assertEqual(self.max_running, 4)
+
+    async def test_group_limit(self):
+        start = time.monotonic()
+        await asyncio.gather(*[self.pool.run(self._blocking, 0.05, group="limited") for _ in range(4)])
+        self.assertEqual(self.max_running, 1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    async def test_unlimited_group(self):
+        await asyncio.gather(*[self.pool.run(self._blocking, 0.1, group="other") for _ in range(4)])
+        self.assertEqual(self.max_running, 4)
@@ -0,0 +1,74 @@
+import unittest
+from typing import List
+
+from eduid.common.misc.connections import ConnectionRegistry, _reset_registries_after_fork, make_connection_key
+
+
+class _Connection:
+    def __init__(self, uri: str):
+        self.uri = uri
+        self.closed = False
+
+
+class _Auth:
+    def __init__(self, user: str, password: str):
+        self.user = user
+        self.password = password
+
+
+class TestConnectionRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.closed: List[_Connection] = []
+        self.registry: ConnectionRegistry[_Connection] = ConnectionRegistry("test", close=self.closed.append)
+
+    def test_shared(self):
+        key = make_connection_key("mongodb://localhost", options={"tz_aware": True})
+        conn1 = self.registry.acquire(key, lambda: _Connection("mongodb://localhost"))
+        conn2 = self.registry.acquire(key, lambda: _Connection("mongodb://localhost"))
+        self.assertIs(conn1, conn2)
+        self.assertEqual(1, len(self.registry))
+        self.assertEqual(2, self.registry.refcount(key))
+
+        other = self.registry.acquire(make_connection_key("mongodb://other"), lambda: _Connection("mongodb://other"))
+        self.assertIsNot(conn1, other)
+        self.assertEqual(2, len(self.registry))
+
+    def test_refcounted_close(self):
+        key = make_connection_key("mongodb://localhost")
+        conn = self.registry.acquire(key, lambda: _Connection("mongodb://localhost"))
+        self.registry.acquire(key, lambda: _Connection("mongodb://localhost"))
+        self.registry.release(key)
+        self.assertEqual([], self.closed)
+        self.registry.release(key)
+        self.assertEqual([conn], self.closed)
+        self.assertEqual(0, len(self.registry))
+        # releasing an unknown key is a no-op
+        self.registry.release(key)
+        self.assertEqual([conn], self.closed)
+        # a new connection is created the next time
+        self.assertIsNot(conn, self.registry.acquire(key, lambda: _Connection("mongodb://localhost")))
+
+    def test_reset_after_fork(self):
+        key = make_connection_key("mongodb://localhost")
+        conn = self.registry.acquire(key, lambda: _Connection("mongodb://localhost"))
+        _reset_registries_after_fork()
+        self.assertEqual(0, len(self.registry))
+        # the parents connection is not closed, just forgotten
+        self.assertEqual([], self.closed)
+        self.assertIsNot(conn, self.registry.acquire(key, lambda: _Connection("mongodb://localhost")))
+
+    def test_make_connection_key(self):
+        key1 = make_connection_key(
+            "bolt://localhost:7687", options={"auth": _Auth("neo4j", "secret"), "encrypted": False, "x": [1, {2}]}
+        )
+        key2 = make_connection_key(
+            "bolt://localhost:7687", options={"x": [1, {2}], "encrypted": False, "auth": _Auth("neo4j", "secret")}
+        )
+        self.assertEqual(key1, key2)
+        hash(key1)
+        key3 = make_connection_key(
+            "bolt://localhost:7687", options={"auth": _Auth("neo4j", "other"), "encrypted": False}
+        )
+        self.assertNotEqual(key1, key3)
+        self.assertNotEqual(make_connection_key("a", options={"b": 1}), make_connection_key("a", options={"b": 2}))
+        self.assertEqual(make_connection_key("a"), make_connection_key("a", options={}))
@@ -256,6 +256,7 @@ class SearchRequest(EduidBaseModel):
     start_index: int = Field(default=1, alias="startIndex", ge=1)  # Greater or equal to 1
     count: int = Field(default=100, ge=1)  # Greater or equal to 1
     attributes: Optional[List[str]] = None
+    excluded_attributes: Optional[List[str]] = Field(default=None, alias="excludedAttributes")
 
 
 class ListResponse(EduidBaseModel):
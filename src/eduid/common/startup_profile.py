@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Profile the startup of eduID Flask apps.
+
+    python -m eduid.common.startup_profile security
+    python -m eduid.common.startup_profile --json all > before.json
+
+For every app, reports
+
+  - the time spent importing the app, per top level package (from `python -X importtime`),
+  - the time spent loading the configuration, and
+  - the time spent creating the app, per component (DBs, relays etc.) the app creates in its __init__.
+
+Every app is profiled in a new Python process, with the configuration the app would normally be started with
+(EDUID_CONFIG_YAML etc.).
+"""
+
+import argparse
+import importlib
+import json
+import re
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+__author__ = "lundberg"
+
+WEBAPP_PATH = Path(__file__).parent.parent / "webapp"
+
+# `import time:     12345 |      67890 |   some.module`
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+@dataclass
+class StartupProfile:
+    app: str
+    # seconds
+    import_total: float = 0.0
+    imports: Dict[str, float] = field(default_factory=dict)
+    read_config: float = 0.0
+    load_config: float = 0.0
+    init_total: float = 0.0
+    components: Dict[str, float] = field(default_factory=dict)
+
+
+def available_apps() -> List[str]:
+    return sorted(path.parent.name for path in WEBAPP_PATH.glob("*/app.py") if path.parent.name != "common")
+
+
+def get_init_function(module: ModuleType) -> Callable[..., Any]:
+    """Find the `*init*app` function of an app module, e.g. security_init_app or init_idp_app"""
+    for name, value in vars(module).items():
+        if "init" in name and name.endswith("_app") and getattr(value, "__module__", None) == module.__name__:
+            return value
+    raise ValueError(f"No init function found in {module.__name__}")
+
+
+def parse_importtime(output: str) -> Dict[str, float]:
+    """
+    Sum the self time of every imported module per top level package, from the output of `python -X importtime`.
+
+    :return: Seconds per top level package
+    """
+    res: Dict[str, float] = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        package = match.group(4).split(".")[0]
+        res[package] = res.get(package, 0.0) + int(match.group(1)) / 1_000_000
+    return res
+
+
+def profile_imports(module_name: str) -> Dict[str, float]:
+    """Import module_name in a new process, and return the import time per top level package"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+class ComponentTimer:
+    """
+    Time the components an app creates in __init__.
+
+    The time since the previous attribute assignment on an instance of cls is attributed to the attribute being
+    assigned, so `self.private_userdb = SecurityUserDB(...)` is counted as the time it took to create the
+    SecurityUserDB (plus whatever else was done since the previous assignment).
+    """
+
+    def __init__(self, cls: type):
+        self.cls = cls
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+        self._saved: Optional[Callable[..., None]] = None
+
+    def mark(self) -> None:
+        """Start timing the next component now"""
+        self._last = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._last
+
+    def __enter__(self) -> "ComponentTimer":
+        self._saved = self.cls.__dict__.get("__setattr__")
+        setattr_ = self.cls.__setattr__
+        timer = self
+
+        def _timed_setattr(obj: Any, name: str, value: Any) -> None:
+            timer.timings[name] = timer.timings.get(name, 0.0) + timer.elapsed()
+            setattr_(obj, name, value)
+            timer.mark()
+
+        type.__setattr__(self.cls, "__setattr__", _timed_setattr)
+        self.mark()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self._saved is not None:
+            type.__setattr__(self.cls, "__setattr__", self._saved)
+        else:
+            type.__delattr__(self.cls, "__setattr__")
+
+
+def profile_app(app: str) -> StartupProfile:
+    """Import and create an app in this process, and time it"""
+    from eduid.common.config.parsers.yaml_parser import YamlConfigParser
+    from eduid.webapp.common.api.app import EduIDBaseApp
+
+    res = StartupProfile(app=app)
+    module_name = f"eduid.webapp.{app}.app"
+    res.imports = profile_imports(module_name)
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    res.import_total = time.perf_counter() - start
+
+    init_app = get_init_function(module)
+    read_configuration = YamlConfigParser.read_configuration
+    load_config = module.load_config  # type: ignore[attr-defined]
+
+    def _timed_read_configuration(*args: Any, **kwargs: Any) -> Any:
+        _start = time.perf_counter()
+        try:
+            return read_configuration(*args, **kwargs)
+        finally:
+            res.read_config += time.perf_counter() - _start
+
+    with ComponentTimer(EduIDBaseApp) as timer:
+
+        def _timed_load_config(*args: Any, **kwargs: Any) -> Any:
+            _start = time.perf_counter()
+            try:
+                return load_config(*args, **kwargs)
+            finally:
+                res.load_config += time.perf_counter() - _start
+                timer.mark()
+
+        YamlConfigParser.read_configuration = _timed_read_configuration  # type: ignore[assignment]
+        module.load_config = _timed_load_config  # type: ignore[attr-defined]
+        try:
+            start = time.perf_counter()
+            init_app()
+            res.init_total = time.perf_counter() - start
+            timer.timings[f"(after __init__, in {init_app.__name__})"] = timer.elapsed()
+        finally:
+            YamlConfigParser.read_configuration = read_configuration  # type: ignore[assignment]
+            module.load_config = load_config  # type: ignore[attr-defined]
+    res.components = timer.timings
+    return res
+
+
+def _format_times(title: str, times: Dict[str, float], limit: int, min_time: float = 0.001) -> List[str]:
+    lines = [f"  {title}:"]
+    shown = [(name, t) for name, t in sorted(times.items(), key=lambda x: x[1], reverse=True) if t >= min_time]
+    for name, t in shown[:limit]:
+        lines.append(f"    {t * 1000:9.1f} ms  {name}")
+    rest = sum(times.values()) - sum(t for _, t in shown[:limit])
+    if rest >= min_time:
+        lines.append(f"    {rest * 1000:9.1f} ms  (other)")
+    return lines
+
+
+def format_profile(profile: StartupProfile, limit: int = 15) -> str:
+    lines = [
+        f"{profile.app}: {(profile.import_total + profile.init_total) * 1000:.1f} ms",
+        f"  import: {profile.import_total * 1000:.1f} ms",
+        f"  load config: {profile.load_config * 1000:.1f} ms (reading, decrypting and interpolating: "
+        f"{profile.read_config * 1000:.1f} ms)",
+        f"  init (including load config): {profile.init_total * 1000:.1f} ms",
+    ]
+    lines += _format_times("import time per package (in a new process)", profile.imports, limit)
+    lines += _format_times("init time per component", profile.components, limit)
+    return "\n".join(lines)
+
+
+def main(args: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile the startup of eduID Flask apps")
+    parser.add_argument(
+        "apps", metavar="APP", nargs="+", help=f"app to profile, or all ({', '.join(available_apps())})"
+    )
+    parser.add_argument("--json", dest="json", action="store_true", default=False, help="Output JSON")
+    parser.add_argument("--limit", dest="limit", type=int, default=15, help="Number of packages/components to show")
+    parser.add_argument("--in-process", dest="in_process", action="store_true", default=False, help=argparse.SUPPRESS)
+    parsed = parser.parse_args(args)
+
+    apps: List[str] = parsed.apps
+    if apps == ["all"]:
+        apps = available_apps()
+
+    if parsed.in_process:
+        print(json.dumps(asdict(profile_app(apps[0]))))
+        return 0
+
+    profiles = []
+    for app in apps:
+        # profile every app in a new process, so that it doesn't get modules imported by the previous ones for free
+        proc = subprocess.run(
+            [sys.executable, "-m", "eduid.common.startup_profile", "--in-process", app],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode:
+            sys.stderr.write(f"Failed profiling {app}:\n{proc.stderr}\n")
+            continue
+        profiles.append(StartupProfile(**json.loads(proc.stdout.splitlines()[-1])))
+
+    if parsed.json:
+        print(json.dumps([asdict(profile) for profile in profiles], indent=2))
+    else:
+        print("\n\n".join(format_profile(profile, limit=parsed.limit) for profile in profiles))
+    return 0 if len(profiles) == len(apps) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
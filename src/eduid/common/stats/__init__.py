@@ -9,15 +9,56 @@ Example usage in some view:
 
     request.stats.count('verify_code_completed')
 
+    with current_app.stats.timer('vccs.authenticate'):
+        ...
+
+    @current_app.stats.timer('am.sync')
+    def sync_user(...):
+        ...
+
+In tests, TestStats records everything in memory so that it can be asserted on.
 """
 
 __author__ = "ft"
 
+import atexit
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from contextlib import ContextDecorator
+from typing import Any, Dict, List, Optional
 
 from eduid.common.config.base import StatsConfigMixin
 
 
+class Timer(ContextDecorator):
+    """
+    Context manager and decorator reporting the time spent inside it, in milliseconds, to a stats backend.
+    """
+
+    def __init__(self, stats: "AppStats", name: str):
+        self.stats = stats
+        self.name = name
+        self.elapsed_ms: Optional[float] = None
+        self._start: Optional[float] = None
+
+    def _recreate_cm(self) -> "Timer":
+        # A new timer for every call to a decorated function, so that concurrent calls don't share the start time
+        return Timer(self.stats, self.name)
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        assert self._start is not None
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self.stats.timing(self.name, self.elapsed_ms)
+        return False
+
+
 class AppStats(ABC):
     @abstractmethod
     def count(self, name: str, value: int = 1) -> None:
@@ -26,6 +67,22 @@ class AppStats(ABC):
     def gauge(self, name: str, value: int, rate=1, delta=False):
         pass
 
+    def timing(self, name: str, value: float) -> None:
+        """Report a duration, in milliseconds"""
+        pass
+
+    def histogram(self, name: str, value: float) -> None:
+        """Report a value to get its distribution (percentiles, mean etc.) over time"""
+        pass
+
+    def timer(self, name: str) -> Timer:
+        """Time a block of code, or every call to a function if used as a decorator"""
+        return Timer(self, name)
+
+    def flush(self) -> None:
+        """Send any buffered stats"""
+        pass
+
 
 class NoOpStats(AppStats):
     """
@@ -51,21 +108,142 @@ class NoOpStats(AppStats):
                 name = "{!s}.{!s}".format(self.prefix, name)
             self.logger.info(f"No-op stats gauge: {name} {value}")
 
+    def timing(self, name: str, value: float) -> None:
+        if self.logger:
+            if self.prefix:
+                name = "{!s}.{!s}".format(self.prefix, name)
+            self.logger.info(f"No-op stats timing: {name} {value}")
+
+    def histogram(self, name: str, value: float) -> None:
+        if self.logger:
+            if self.prefix:
+                name = "{!s}.{!s}".format(self.prefix, name)
+            self.logger.info(f"No-op stats histogram: {name} {value}")
+
 
 class Statsd(AppStats):
-    def __init__(self, host, port, prefix=None):
+    """
+    Send stats to a statsd server.
+
+    Stats are buffered, and sent packed into as few UDP datagrams as possible when flush() is called, when
+    max_buffered stats have been buffered or when the oldest buffered stat is older than flush_interval seconds.
+
+    A background thread, started when the first stat is buffered (in every process, since threads don't survive
+    fork), sends buffered stats every flush_interval seconds even if no more stats are added. Buffered stats are
+    also sent when the process exits.
+    """
+
+    def __init__(self, host, port, prefix=None, max_buffered: int = 50, flush_interval: float = 1.0):
         import statsd
 
         self.client = statsd.StatsClient(host, port, prefix=prefix)
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self._pipeline = self.client.pipeline()
+        self._buffered = 0
+        self._first_buffered_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        atexit.register(self.flush)
 
     def count(self, name: str, value: int = 1) -> None:
-        self.client.incr(f"{name}.average", count=value)
-        # You need to set up a storage aggregation that uses sum instead of the default average
-        # for .count
-        self.client.incr(f"{name}.count", count=value)
+        with self._lock:
+            self._pipeline.incr(f"{name}.average", count=value)
+            # You need to set up a storage aggregation that uses sum instead of the default average
+            # for .count
+            self._pipeline.incr(f"{name}.count", count=value)
+            self._buffered_locked(2)
 
     def gauge(self, name: str, value: int, rate=1, delta=False):
-        self.client.gauge(f"{name}.gauge", value=value, rate=rate, delta=delta)
+        with self._lock:
+            self._pipeline.gauge(f"{name}.gauge", value=value, rate=rate, delta=delta)
+            self._buffered_locked(1)
+
+    def timing(self, name: str, value: float) -> None:
+        with self._lock:
+            self._pipeline.timing(f"{name}.timing", value)
+            self._buffered_locked(1)
+
+    def histogram(self, name: str, value: float) -> None:
+        # statsd timers are aggregated into percentiles, mean, upper etc. which is what a histogram is used for
+        with self._lock:
+            self._pipeline.timing(f"{name}.histogram", value)
+            self._buffered_locked(1)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Stop the background thread, and send any buffered stats"""
+        self._stop.set()
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            self._flusher.join()
+        self._flusher = None
+        atexit.unregister(self.flush)
+        self.flush()
+
+    def _start_flusher_locked(self) -> None:
+        if self._stop.is_set() or (self._flusher is not None and self._flusher_pid == os.getpid()):
+            return None
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._run_flusher, name="statsd-flush", daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _buffered_locked(self, num: int) -> None:
+        self._start_flusher_locked()
+        now = time.monotonic()
+        if not self._buffered:
+            self._first_buffered_at = now
+        self._buffered += num
+        if self._buffered >= self.max_buffered or now - self._first_buffered_at >= self.flush_interval:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffered:
+            return None
+        self._buffered = 0
+        self._pipeline.send()
+
+
+class TestStats(AppStats):
+    """
+    Stats backend keeping everything in memory, for use in tests.
+    """
+
+    __test__ = False  # not a test class, even if the name says so
+
+    def __init__(self) -> None:
+        self.counts: Counter[str] = Counter()
+        self.gauges: Dict[str, int] = {}
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.histograms: Dict[str, List[float]] = defaultdict(list)
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counts[name] += value
+
+    def gauge(self, name: str, value: int, rate=1, delta=False):
+        if delta:
+            value += self.gauges.get(name, 0)
+        self.gauges[name] = value
+
+    def timing(self, name: str, value: float) -> None:
+        self.timings[name].append(value)
+
+    def histogram(self, name: str, value: float) -> None:
+        self.histograms[name].append(value)
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.gauges.clear()
+        self.timings.clear()
+        self.histograms.clear()
 
 
 def init_app_stats(config: StatsConfigMixin) -> AppStats:
@@ -0,0 +1,122 @@
+import socket
+import threading
+import time
+import unittest
+
+from eduid.common.stats import NoOpStats, Statsd, TestStats
+
+
+class TestTimer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stats = TestStats()
+
+    def test_context_manager(self):
+        with self.stats.timer("block") as timer:
+            time.sleep(0.01)
+        assert timer.elapsed_ms is not None
+        self.assertGreaterEqual(timer.elapsed_ms, 10)
+        self.assertEqual(self.stats.timings["block"], [timer.elapsed_ms])
+
+    def test_decorator(self):
+        @self.stats.timer("func")
+        def func(x: int) -> int:
+            time.sleep(0.01)
+            return x * 2
+
+        threads = [threading.Thread(target=func, args=(i,)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(func(2), 4)
+        self.assertEqual(len(self.stats.timings["func"]), 6)
+        # concurrent calls must not share the start time
+        self.assertTrue(all(10 <= x < 1000 for x in self.stats.timings["func"]))
+
+    def test_exception(self):
+        with self.assertRaises(ValueError):
+            with self.stats.timer("fail"):
+                raise ValueError("fail")
+        self.assertEqual(len(self.stats.timings["fail"]), 1)
+
+
+class TestTestStats(unittest.TestCase):
+    def test_record(self):
+        stats = TestStats()
+        stats.count("login")
+        stats.count("login", 2)
+        stats.gauge("queue_length", 5)
+        stats.gauge("queue_length", -2, delta=True)
+        stats.histogram("members", 100)
+        stats.timing("sync", 1.5)
+        self.assertEqual(stats.counts["login"], 3)
+        self.assertEqual(stats.gauges["queue_length"], 3)
+        self.assertEqual(stats.histograms["members"], [100])
+        self.assertEqual(stats.timings["sync"], [1.5])
+        stats.clear()
+        self.assertEqual(stats.counts["login"], 0)
+
+    def test_no_op(self):
+        stats = NoOpStats()
+        with stats.timer("nothing"):
+            stats.histogram("nothing", 1)
+        stats.flush()
+
+
+class TestStatsd(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.settimeout(1)
+        self.port = self.server.getsockname()[1]
+
+    def tearDown(self) -> None:
+        self.server.close()
+
+    def _receive(self) -> str:
+        return self.server.recv(65535).decode()
+
+    def test_batched(self):
+        stats = Statsd(host="127.0.0.1", port=self.port, prefix="test", flush_interval=60)
+        stats.count("login")
+        stats.gauge("queue_length", 5)
+        stats.timing("sync", 12)
+        stats.histogram("members", 100)
+        stats.flush()
+        self.assertEqual(
+            self._receive().split("\n"),
+            [
+                "test.login.average:1|c",
+                "test.login.count:1|c",
+                "test.queue_length.gauge:5|g",
+                "test.sync.timing:12.000000|ms",
+                "test.members.histogram:100.000000|ms",
+            ],
+        )
+        # nothing more was sent
+        self.server.settimeout(0.1)
+        with self.assertRaises(socket.timeout):
+            self._receive()
+
+    def test_flush_when_full(self):
+        stats = Statsd(host="127.0.0.1", port=self.port, prefix="test", max_buffered=3, flush_interval=60)
+        stats.timing("a", 1)
+        stats.timing("b", 1)
+        stats.timing("c", 1)
+        self.assertEqual(len(self._receive().split("\n")), 3)
+
+    def test_flush_interval(self):
+        stats = Statsd(host="127.0.0.1", port=self.port, prefix="test", flush_interval=0.1)
+        self.addCleanup(stats.close)
+        # sent by the background thread, without any more stats being added
+        stats.timing("a", 1)
+        self.assertEqual(self._receive(), "test.a.timing:1.000000|ms")
+        stats.timing("b", 1)
+        self.assertEqual(self._receive(), "test.b.timing:1.000000|ms")
+
+    def test_close(self):
+        stats = Statsd(host="127.0.0.1", port=self.port, prefix="test", flush_interval=60)
+        stats.timing("a", 1)
+        stats.close()
+        self.assertEqual(self._receive(), "test.a.timing:1.000000|ms")
+        assert stats._flusher is None
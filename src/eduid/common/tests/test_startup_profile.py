@@ -0,0 +1,62 @@
+import time
+import unittest
+from types import ModuleType
+
+from eduid.common.startup_profile import ComponentTimer, available_apps, get_init_function, parse_importtime
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       1500 |       jinja2.utils
+import time:      2500 |       4000 |     jinja2
+import time:      1000 |       1000 |     eduid.common
+import time:       500 |       5620 |   eduid.webapp.letter_proofing.app
+"""
+
+
+class Component:
+    def __init__(self, delay: float):
+        time.sleep(delay)
+
+
+class App:
+    def __init__(self):
+        self.conf = {}
+        self.db = Component(delay=0.05)
+        self.relay = Component(delay=0)
+
+
+class SubApp(App):
+    pass
+
+
+class StartupProfileTests(unittest.TestCase):
+    def test_parse_importtime(self):
+        res = parse_importtime(IMPORTTIME_OUTPUT)
+        self.assertEqual(res, {"_io": 0.00012, "jinja2": 0.004, "eduid": 0.0015})
+
+    def test_component_timer(self):
+        with ComponentTimer(App) as timer:
+            SubApp()
+        self.assertEqual(set(timer.timings), {"conf", "db", "relay"})
+        self.assertGreaterEqual(timer.timings["db"], 0.05)
+        self.assertLess(timer.timings["relay"], 0.05)
+        # the class is restored
+        self.assertNotIn("__setattr__", App.__dict__)
+        app = App()
+        self.assertEqual(app.conf, {})
+
+    def test_get_init_function(self):
+        def test_init_app():
+            pass
+
+        module = ModuleType("eduid.webapp.test.app")
+        test_init_app.__module__ = module.__name__
+        module.load_config = lambda: None  # type: ignore[attr-defined]
+        module.test_init_app = test_init_app  # type: ignore[attr-defined]
+        self.assertIs(get_init_function(module), test_init_app)
+
+    def test_available_apps(self):
+        apps = available_apps()
+        self.assertIn("idp", apps)
+        self.assertIn("signup", apps)
+        self.assertNotIn("common", apps)
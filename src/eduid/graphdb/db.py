@@ -7,8 +7,12 @@ from urllib.parse import urlparse
 
 from neo4j import Driver, GraphDatabase, basic_auth
 
+from eduid.common.misc.connections import ConnectionKey, ConnectionRegistry, make_connection_key
+
 __author__ = "lundberg"
 
+neo4j_drivers: ConnectionRegistry[Driver] = ConnectionRegistry("neo4j", close=lambda driver: driver.close())
+
 
 class Neo4jDB(object):
     """Simple wrapper to allow us to define the api"""
@@ -35,7 +39,10 @@ class Neo4jDB(object):
         if "auth" not in config and (self._username and parse_result.password):
             config["auth"] = basic_auth(self._username, parse_result.password)
 
-        self._driver = GraphDatabase.driver(self._db_uri, **config)
+        # Share the driver (and with it the connection pool) with all other instances in this process
+        # using the same URI and config
+        self._registry_key: Optional[ConnectionKey] = make_connection_key(self._db_uri, options=config)
+        self._driver = neo4j_drivers.acquire(self._registry_key, lambda: GraphDatabase.driver(self._db_uri, **config))
 
     def __repr__(self) -> str:
         return f'<eduID {self.__class__.__name__}: {getattr(self, "_username", None)}@{getattr(self, "_db_uri", None)}>'
@@ -67,7 +74,10 @@ class Neo4jDB(object):
         return self._driver
 
     def close(self):
-        self.driver.close()
+        """Release the shared driver. It is closed when no other instance in this process uses it."""
+        if self._registry_key is not None:
+            neo4j_drivers.release(self._registry_key)
+            self._registry_key = None
 
 
 class BaseGraphDB(ABC):
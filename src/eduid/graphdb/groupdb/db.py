@@ -2,10 +2,10 @@
 import enum
 import logging
 from dataclasses import replace
-from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple, Union
 
 from bson import ObjectId
-from neo4j import READ_ACCESS, WRITE_ACCESS, Record, Transaction
+from neo4j import READ_ACCESS, WRITE_ACCESS, Record, Result, Session, Transaction
 from neo4j.exceptions import ClientError, ConstraintError
 from neo4j.graph import Graph, Node
 
@@ -33,10 +33,123 @@ class Role(enum.Enum):
     OWNER = "OWNS"
 
 
+# Group properties that groups can be looked up by, in get_groups_by_property
+GROUP_SEARCH_PROPERTIES = ("identifier", "display_name")
+
+QueryHook = Callable[[str, Mapping[str, Any]], None]
+
+
+# Statements that differ by role, label or property are generated once, for all combinations, when this
+# module is loaded. The statement texts are then the same for every call, so that the query plans are
+# cached by neo4j instead of being re-planned every time. Never interpolate values into the statements,
+# use parameters.
+
+
+def _groups_for_role_statement(label: Label, role: Role) -> str:
+    if label is Label.GROUP:
+        entity_match = "(e:Group {scope: $scope, identifier: $identifier})"
+    else:
+        entity_match = "(e:User {identifier: $identifier})"
+
+    if role is Role.OWNER:
+        # Return all members only to an owner
+        member_match = f"OPTIONAL MATCH (g)<-[r:{Role.MEMBER.value}]-(m)"
+        member = "m"
+    else:
+        # Return only matched entity as member
+        member_match = f"OPTIONAL MATCH (g)<-[r:{Role.MEMBER.value}]-(e)"
+        member = "e"
+
+    return f"""
+        MATCH {entity_match}-[:{role.value}]->(g: Group {{scope: $scope}})
+        WITH e, g
+        OPTIONAL MATCH (g)<-[r:{Role.OWNER.value}]-(o)
+        WITH e, g, collect({{display_name: r.display_name, created_ts: r.created_ts,
+            modified_ts: r.modified_ts, identifier: o.identifier, scope: o.scope}}) as owners
+        {member_match}
+        RETURN g as group, owners, collect({{display_name: r.display_name, created_ts: r.created_ts,
+            modified_ts: r.modified_ts, identifier: {member}.identifier, scope: {member}.scope}}) as members
+        """
+
+
+def _users_and_groups_by_role_statement(role: Role) -> str:
+    return f"""
+        MATCH (g: Group {{scope: $scope, identifier: $identifier}})<-[r:{role.value}]-(m)
+        RETURN r.display_name as display_name, r.created_ts as created_ts, r.modified_ts as modified_ts,
+               m.identifier as identifier, m.scope as scope, m.version as version, labels(m) as labels
+        """
+
+
+def _remove_relations_statement(role: Role, label: Label) -> str:
+    member_match = "{identifier: identifier}"
+    if label is Label.GROUP:
+        member_match = "{scope: $scope, identifier: identifier}"
+    return f"""
+        MATCH (g:Group {{scope: $scope, identifier: $group_identifier}})
+        UNWIND $identifiers AS identifier
+        MATCH (g)<-[r:{role.value}]-(:{label.value} {member_match})
+        DELETE r
+        """
+
+
+def _add_or_update_relations_statement(role: Role, label: Label) -> str:
+    if label is Label.GROUP:
+        merge_member = """MERGE (m:Group {scope: $scope, identifier: member.identifier})
+            ON CREATE SET
+                m.created_ts = timestamp(),
+                m.version = member.version,
+                m.display_name = member.display_name"""
+    else:
+        merge_member = "MERGE (m:User {identifier: member.identifier})"
+    return f"""
+        MATCH (g:Group {{scope: $scope, identifier: $group_identifier}})
+        UNWIND $members AS member
+        {merge_member}
+        MERGE (m)-[r:{role.value}]->(g)
+            ON CREATE SET r.created_ts = timestamp()
+            ON MATCH SET r.modified_ts = timestamp()
+        SET r.display_name = member.display_name
+        RETURN r.display_name as display_name, r.created_ts as created_ts, r.modified_ts as modified_ts,
+               m.identifier as identifier, m.scope as scope
+        """
+
+
+def _groups_by_property_statement(key: str) -> str:
+    return f"""
+        MATCH (g: Group {{scope: $scope}})
+        WHERE g.{key} = $value
+        RETURN g as group SKIP $skip LIMIT $limit
+        """
+
+
+GROUPS_FOR_ROLE_STATEMENTS: Mapping[Tuple[Label, Role], str] = {
+    (label, role): _groups_for_role_statement(label, role) for label in Label for role in Role
+}
+USERS_AND_GROUPS_BY_ROLE_STATEMENTS: Mapping[Role, str] = {
+    role: _users_and_groups_by_role_statement(role) for role in Role
+}
+REMOVE_RELATIONS_STATEMENTS: Mapping[Tuple[Role, Label], str] = {
+    (role, label): _remove_relations_statement(role, label) for role in Role for label in Label
+}
+ADD_OR_UPDATE_RELATIONS_STATEMENTS: Mapping[Tuple[Role, Label], str] = {
+    (role, label): _add_or_update_relations_statement(role, label) for role in Role for label in Label
+}
+GROUPS_BY_PROPERTY_STATEMENTS: Mapping[str, str] = {
+    key: _groups_by_property_statement(key) for key in GROUP_SEARCH_PROPERTIES
+}
+
+
 class GroupDB(BaseGraphDB):
     def __init__(self, db_uri: str, scope: str, config: Optional[Dict[str, Any]] = None):
         super().__init__(db_uri=db_uri, config=config)
         self._scope = scope
+        # Called with the statement and parameters before every statement is run, used for instrumentation in tests
+        self.query_hook: Optional[QueryHook] = None
+
+    def _run(self, runner: Union[Session, Transaction], query: str, **parameters: Any) -> Result:
+        if self.query_hook is not None:
+            self.query_hook(query, parameters)
+        return runner.run(query, **parameters)
 
     def db_setup(self):
         with self.db.driver.session(default_access_mode=WRITE_ACCESS) as session:
@@ -56,7 +169,7 @@ class GroupDB(BaseGraphDB):
             ]
             for statment in statements:
                 try:
-                    session.run(statment)
+                    self._run(session, statment)
                 except ClientError as e:
                     assert e.message is not None  # please mypy
                     if "An equivalent constraint already exists" not in e.message:
@@ -83,7 +196,8 @@ class GroupDB(BaseGraphDB):
         else:
             version = str(group.version)
         new_version = str(ObjectId())
-        res = tx.run(
+        res = self._run(
+            tx,
             q,
             scope=self.scope,
             identifier=group.identifier,
@@ -94,120 +208,102 @@ class GroupDB(BaseGraphDB):
         assert res is not None  # please mypy
         return self._load_group(res.data()["group"])
 
-    def _add_or_update_users_and_groups(
-        self, tx: Transaction, group: Group
-    ) -> Tuple[Set[Union[User, Group]], Set[Union[User, Group]]]:
-        members: Set[Union[User, Group]] = set()
-        owners: Set[Union[User, Group]] = set()
-
-        for user_member in group.member_users:
-            res = self._add_user_to_group(tx, group=group, member=user_member, role=Role.MEMBER)
-            members.add(User.from_mapping(res.data()))
-        for group_member in group.member_groups:
-            res = self._add_group_to_group(tx, group=group, member=group_member, role=Role.MEMBER)
-            members.add(self._load_group(res.data()))
-        for user_owner in group.owner_users:
-            res = self._add_user_to_group(tx, group=group, member=user_owner, role=Role.OWNER)
-            owners.add(User.from_mapping(res.data()))
-        for group_owner in group.owner_groups:
-            res = self._add_group_to_group(tx, group=group, member=group_owner, role=Role.OWNER)
-            owners.add(self._load_group(res.data()))
-        return members, owners
-
-    def _remove_missing_users_and_groups(self, tx: Transaction, group: Group, role: Role) -> None:
-        """Remove the relationship between group and member if the member no longer is in the groups member list"""
-        q = f"""
-            MATCH (Group {{scope: $scope, identifier: $identifier}})<-[r:{role.value}]-(m)
-            RETURN m.scope as scope, m.identifier as identifier, labels(m) as labels
+    def _get_stored_relations(self, tx: Transaction, group: Group) -> Dict[Tuple[Role, Label], Dict[str, Record]]:
+        """Load the members and owners of the group as they are currently stored, per role and label"""
+        q = """
+            MATCH (:Group {scope: $scope, identifier: $identifier})<-[r]-(m)
+            RETURN type(r) as role, labels(m) as labels, r.display_name as display_name, r.created_ts as created_ts,
+                   r.modified_ts as modified_ts, m.identifier as identifier, m.scope as scope
             """
-        members_in_db = tx.run(q, scope=self.scope, identifier=group.identifier)
-        for record in members_in_db:
-            remove = False
-            if role is Role.MEMBER and group.has_member(record["identifier"]) is False:
-                remove = True
-            elif role is Role.OWNER and group.has_owner(record["identifier"]) is False:
-                remove = True
-            if remove:
-                if Label.GROUP.value in record["labels"]:
-                    self._remove_group_from_group(tx, group=group, group_identifier=record["identifier"], role=role)
-                elif Label.USER.value in record["labels"]:
-                    self._remove_user_from_group(tx, group=group, user_identifier=record["identifier"], role=role)
+        res: Dict[Tuple[Role, Label], Dict[str, Record]] = {}
+        for record in self._run(tx, q, scope=self.scope, identifier=group.identifier):
+            try:
+                role = Role(record["role"])
+            except ValueError:
+                continue
+            if Label.GROUP.value in record["labels"]:
+                label = Label.GROUP
+            elif Label.USER.value in record["labels"]:
+                label = Label.USER
+            else:
+                continue
+            res.setdefault((role, label), {})[record["identifier"]] = record
+        return res
 
-    def _remove_group_from_group(self, tx: Transaction, group: Group, group_identifier: str, role: Role):
-        q = f"""
-            MATCH (:Group {{scope: $scope, identifier: $identifier}})<-[r:{role.value}]-(:Group
-                    {{scope: $scope, identifier: $group_identifier}})
-            DELETE r
-            """
-        tx.run(
-            q,
+    @staticmethod
+    def _get_wanted_relations(group: Group) -> Dict[Tuple[Role, Label], Dict[str, Union[User, Group]]]:
+        """The members and owners of the group, as they should be stored, per role and label"""
+        return {
+            (Role.MEMBER, Label.USER): {x.identifier: x for x in group.member_users},
+            (Role.MEMBER, Label.GROUP): {x.identifier: x for x in group.member_groups},
+            (Role.OWNER, Label.USER): {x.identifier: x for x in group.owner_users},
+            (Role.OWNER, Label.GROUP): {x.identifier: x for x in group.owner_groups},
+        }
+
+    def _remove_users_and_groups(
+        self, tx: Transaction, group: Group, role: Role, label: Label, identifiers: Sequence[str]
+    ) -> None:
+        """Remove the relationships between the group and a number of members (or owners) of the same kind"""
+        self._run(
+            tx,
+            REMOVE_RELATIONS_STATEMENTS[(role, label)],
             scope=self.scope,
-            identifier=group.identifier,
-            group_identifier=group_identifier,
+            group_identifier=group.identifier,
+            identifiers=list(identifiers),
         )
 
-    def _remove_user_from_group(self, tx: Transaction, group: Group, user_identifier: str, role: Role):
-        q = f"""
-            MATCH (:Group {{scope: $scope, identifier: $identifier}})<-[r:{role.value}]-(:User
-                    {{identifier: $user_identifier}})
-            DELETE r
-            """
-        tx.run(q, scope=self.scope, identifier=group.identifier, user_identifier=user_identifier)
-
-    def _add_group_to_group(self, tx, group: Group, member: Group, role: Role) -> Record:
-        q = f"""
-            MATCH (g:Group {{scope: $scope, identifier: $group_identifier}})
-            MERGE (m:Group {{scope: $scope, identifier: $identifier}})
-                ON CREATE SET
-                    m.created_ts = timestamp(),
-                    m.version = $version,
-                    m.display_name = $display_name
-            MERGE (m)-[r:{role.value}]->(g)
-                ON CREATE SET r.created_ts = timestamp()
-                ON MATCH SET r.modified_ts = timestamp()
-            SET r.display_name = $display_name
-            RETURN r.display_name as display_name, r.created_ts as created_ts, r.modified_ts as modified_ts,
-                   m.identifier as identifier, m.scope as scope
-            """
-        # Need a version if the group is created
-        version = str(ObjectId())
-        return tx.run(
-            q,
+    def _add_or_update_users_and_groups(
+        self, tx: Transaction, group: Group, role: Role, label: Label, nodes: Sequence[Union[User, Group]]
+    ) -> List[Union[User, Group]]:
+        """Add or update the relationships between the group and a number of members (or owners) of the same kind"""
+        # Need a version if a member group is created
+        members = [
+            {"identifier": node.identifier, "display_name": node.display_name, "version": str(ObjectId())}
+            for node in nodes
+        ]
+        res = self._run(
+            tx,
+            ADD_OR_UPDATE_RELATIONS_STATEMENTS[(role, label)],
             scope=self.scope,
             group_identifier=group.identifier,
-            identifier=member.identifier,
-            version=version,
-            display_name=member.display_name,
-        ).single()
+            members=members,
+        )
+        return [self._load_relation(label, record.data()) for record in res]
 
-    def _add_user_to_group(self, tx, group: Group, member: User, role: Role) -> Record:
-        q = f"""
-            MATCH (g:Group {{scope: $scope, identifier: $group_identifier}})
-            MERGE (m:User {{identifier: $identifier}})
-            MERGE (m)-[r:{role.value}]->(g)
-                ON CREATE SET r.created_ts = timestamp()
-                ON MATCH SET r.modified_ts = timestamp()
-            SET r.display_name = $display_name
-            RETURN r.display_name as display_name, r.created_ts as created_ts, r.modified_ts as modified_ts,
-                   m.identifier as identifier
-            """
-        return tx.run(
-            q,
-            scope=self.scope,
-            group_identifier=group.identifier,
-            identifier=member.identifier,
-            display_name=member.display_name,
-        ).single()
+    def _save_users_and_groups(
+        self, tx: Transaction, group: Group, stored: Dict[Tuple[Role, Label], Dict[str, Record]]
+    ) -> Tuple[Set[Union[User, Group]], Set[Union[User, Group]]]:
+        """
+        Make the stored members and owners match the ones in the group, using one statement per role and label.
+
+        Relationships that have not changed are not touched.
+        """
+        members: Set[Union[User, Group]] = set()
+        owners: Set[Union[User, Group]] = set()
+
+        for (role, label), wanted in self._get_wanted_relations(group).items():
+            current = stored.get((role, label), {})
+            saved = members if role is Role.MEMBER else owners
+            remove = [identifier for identifier in current if identifier not in wanted]
+            if remove:
+                self._remove_users_and_groups(tx, group, role=role, label=label, identifiers=remove)
+            add_or_update = []
+            for identifier, node in wanted.items():
+                record = current.get(identifier)
+                if record is not None and record["display_name"] == node.display_name:
+                    # unchanged
+                    saved.add(self._load_relation(label, record.data()))
+                else:
+                    add_or_update.append(node)
+            if add_or_update:
+                saved.update(self._add_or_update_users_and_groups(tx, group, role, label, add_or_update))
+        return members, owners
 
     def get_users_and_groups_by_role(self, identifier: str, role: Role) -> List[Union[User, Group]]:
         res: List[Union[User, Group]] = []
-        q = f"""
-            MATCH (g: Group {{scope: $scope, identifier: $identifier}})<-[r:{role.value}]-(m)
-            RETURN r.display_name as display_name, r.created_ts as created_ts, r.modified_ts as modified_ts,
-                   m.identifier as identifier, m.scope as scope, m.version as version, labels(m) as labels
-            """
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            for record in session.run(q, scope=self.scope, identifier=identifier):
+            q = USERS_AND_GROUPS_BY_ROLE_STATEMENTS[role]
+            for record in self._run(session, q, scope=self.scope, identifier=identifier):
                 labels = record.get("labels", [])
                 if "User" in labels:
                     res.append(User.from_mapping(record.data()))
@@ -222,7 +318,7 @@ class GroupDB(BaseGraphDB):
             RETURN *
             """
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            group_graph: Graph = session.run(q, scope=self.scope, identifier=identifier).graph()
+            group_graph: Graph = self._run(session, q, scope=self.scope, identifier=identifier).graph()
 
         if not group_graph.nodes and not group_graph.relationships:
             # group did not exist
@@ -261,23 +357,79 @@ class GroupDB(BaseGraphDB):
                     group.members.add(User.from_mapping(data))
         return group
 
+    def get_groups_by_identifiers(self, identifiers: Sequence[str]) -> List[Group]:
+        """
+        Load many groups, including their members and owners, using a single query.
+
+        Groups that do not exist are left out of the result, the rest are returned in the requested order.
+        """
+        if not identifiers:
+            return []
+        q = """
+            UNWIND $identifiers AS identifier
+            MATCH (g: Group {scope: $scope, identifier: identifier})
+            OPTIONAL MATCH (g)<-[r]-(m)
+            RETURN g as group, collect({role: type(r), labels: labels(m), display_name: r.display_name,
+                created_ts: r.created_ts, modified_ts: r.modified_ts, identifier: m.identifier, scope: m.scope,
+                version: m.version}) as relations
+            """
+        groups: Dict[str, Group] = {}
+        # remove duplicates but keep the order
+        _identifiers = list(dict.fromkeys(identifiers))
+        with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
+            for record in self._run(session, q, scope=self.scope, identifiers=_identifiers):
+                group = self._load_group(record["group"])
+                for data in record["relations"]:
+                    if data.get("identifier") is None:
+                        # the group has no owners or members
+                        continue
+                    if Label.GROUP.value in data["labels"]:
+                        node: Union[User, Group] = self._load_group(data)
+                    else:
+                        node = self._load_user(data)
+                    if data["role"] == Role.OWNER.value:
+                        group.owners.add(node)
+                    elif data["role"] == Role.MEMBER.value:
+                        group.members.add(node)
+                groups[group.identifier] = group
+        return [groups[identifier] for identifier in _identifiers if identifier in groups]
+
+    def get_groups_for_user_identifiers(self, identifiers: Sequence[str]) -> Dict[str, List[Group]]:
+        """
+        Find the groups that many users are members of, using a single query.
+
+        Only the groups themselves are loaded, not their members or owners.
+
+        :return: Groups per user identifier
+        """
+        res: Dict[str, List[Group]] = {identifier: [] for identifier in identifiers}
+        if not identifiers:
+            return res
+        q = f"""
+            UNWIND $identifiers AS identifier
+            MATCH (:User {{identifier: identifier}})-[:{Role.MEMBER.value}]->(g: Group {{scope: $scope}})
+            RETURN identifier, g as group
+            """
+        with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
+            for record in self._run(session, q, scope=self.scope, identifiers=list(res.keys())):
+                res[record["identifier"]].append(self._load_group(record["group"]))
+        return res
+
     def remove_group(self, identifier: str) -> None:
         q = """
             MATCH (g: Group {scope: $scope, identifier: $identifier})
             DETACH DELETE g
             """
         with self.db.driver.session(default_access_mode=WRITE_ACCESS) as session:
-            session.run(q, scope=self.scope, identifier=identifier)
+            self._run(session, q, scope=self.scope, identifier=identifier)
 
     def get_groups_by_property(self, key: str, value: str, skip=0, limit=100):
         res: List[Group] = []
-        q = f"""
-            MATCH (g: Group {{scope: $scope}})
-            WHERE g.{key} = $value
-            RETURN g as group SKIP $skip LIMIT $limit
-            """
+        q = GROUPS_BY_PROPERTY_STATEMENTS.get(key)
+        if q is None:
+            raise EduIDGroupDBError(f"Can't get groups by property {key}")
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            for record in session.run(q, scope=self.scope, value=value, skip=skip, limit=limit):
+            for record in self._run(session, q, scope=self.scope, value=value, skip=skip, limit=limit):
                 res.append(self._load_group(record.data()["group"]))
         return res
 
@@ -288,46 +440,17 @@ class GroupDB(BaseGraphDB):
             RETURN g as group SKIP $skip LIMIT $limit
             """
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            for record in session.run(q, scope=self.scope, skip=skip, limit=limit):
+            for record in self._run(session, q, scope=self.scope, skip=skip, limit=limit):
                 res.append(self._load_group(record.data()["group"]))
         return res
 
     def _get_groups_for_role(self, label: Label, identifier: str, role: Role):
         res: List[Group] = []
-        if label == Label.GROUP:
-            entity_match = "(e:Group {scope: $scope, identifier: $identifier})"
-        elif label == Label.USER:
-            entity_match = "(e:User {identifier: $identifier})"
-        else:
+        q = GROUPS_FOR_ROLE_STATEMENTS.get((label, role))
+        if q is None:
             raise NotImplementedError(f"Label {label.value} not implemented")
-
-        if role is role.OWNER:
-            # Return all members only to an owner
-            ret_statement = f"""
-                            OPTIONAL MATCH (g)<-[r:{Role.MEMBER.value}]-(m)
-                            RETURN g as group, owners, collect({{display_name: r.display_name, created_ts: r.created_ts,
-                                modified_ts: r.modified_ts, identifier: m.identifier, scope: m.scope}}) as members
-                            """
-        else:
-            # Return only matched entity as member
-            ret_statement = f"""
-                            OPTIONAL MATCH (g)<-[r:{Role.MEMBER.value}]-(e)
-                            RETURN g as group, owners, collect({{display_name: r.display_name, created_ts: r.created_ts,
-                                modified_ts: r.modified_ts, identifier: e.identifier, scope: e.scope}}) as members
-                            """
-
-        q = f"""
-            MATCH {entity_match}-[:{role.value}]->(g: Group {{scope: $scope}})
-            WITH e, g
-            OPTIONAL MATCH (g)<-[r:{Role.OWNER.value}]-(o)
-            WITH e, g, collect({{display_name: r.display_name, created_ts: r.created_ts,
-                modified_ts: r.modified_ts, identifier: o.identifier, scope: o.scope}}) as owners
-            {ret_statement}
-            """
-        logger.debug("Crafted _get_groups_for_role query:")
-        logger.debug(q)
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            for record in session.run(q, identifier=identifier, scope=self.scope):
+            for record in self._run(session, q, identifier=identifier, scope=self.scope):
                 group = self._load_group(record.data()["group"])
                 owners = set([self._load_node(owner) for owner in record.data()["owners"] if owner.get("identifier")])
                 group = replace(group, owners=owners)
@@ -356,7 +479,7 @@ class GroupDB(BaseGraphDB):
             RETURN count(*) as exists LIMIT 1
             """
         with self.db.driver.session(default_access_mode=READ_ACCESS) as session:
-            ret = session.run(q, scope=self.scope, identifier=identifier).single()["exists"]
+            ret = self._run(session, q, scope=self.scope, identifier=identifier).single()["exists"]
         return bool(ret)
 
     def save(self, group: Group) -> Group:
@@ -365,10 +488,9 @@ class GroupDB(BaseGraphDB):
         with self.db.driver.session(default_access_mode=WRITE_ACCESS) as session:
             try:
                 tx = session.begin_transaction()
-                self._remove_missing_users_and_groups(tx, group, Role.OWNER)
-                self._remove_missing_users_and_groups(tx, group, Role.MEMBER)
+                stored = self._get_stored_relations(tx, group)
                 saved_group = self._create_or_update_group(tx, group)
-                saved_members, saved_owners = self._add_or_update_users_and_groups(tx, group)
+                saved_members, saved_owners = self._save_users_and_groups(tx, group, stored)
                 tx.commit()
             except ConstraintError as e:
                 logger.error(e)
@@ -385,6 +507,11 @@ class GroupDB(BaseGraphDB):
         saved_group = replace(saved_group, members=saved_members, owners=saved_owners)
         return saved_group
 
+    def _load_relation(self, label: Label, data: Dict[str, Any]) -> Union[User, Group]:
+        if label is Label.GROUP:
+            return self._load_group(data)
+        return self._load_user(data)
+
     def _load_node(self, data: Union[Dict, Node]) -> Union[User, Group]:
         if data.get("scope"):
             return self._load_group(data=data)
@@ -4,8 +4,9 @@ from __future__ import annotations
 import logging
 import random
 import unittest
+from collections import Counter
 from os import environ
-from typing import Optional, Sequence, Type, cast
+from typing import Any, Mapping, Optional, Sequence, Type, cast
 
 from neo4j.exceptions import ServiceUnavailable
 
@@ -124,6 +125,36 @@ class Neo4jTemporaryInstance(EduidTemporaryInstance):
         return cast(Neo4jTemporaryInstance, super().get_instance(max_retry_seconds=max_retry_seconds))
 
 
+class QueryRecorder:
+    """
+    Records the statements run by a GroupDB, to check that the statement texts are reused.
+
+    neo4j caches query plans by statement text, so only statement texts that are reused can use a cached plan.
+    This only counts the statement texts on the client side, it doesn't know if neo4j actually used a cached
+    plan. Usage:
+
+        recorder = QueryRecorder()
+        group_db.query_hook = recorder
+    """
+
+    def __init__(self) -> None:
+        self.statements: Counter[str] = Counter()
+
+    def __call__(self, query: str, parameters: Mapping[str, Any]) -> None:
+        self.statements[query] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.statements.values())
+
+    @property
+    def repeated_statement_ratio(self) -> float:
+        """The ratio of statements that was run with a statement text that had been run before"""
+        if not self.total:
+            return 0.0
+        return (self.total - len(self.statements)) / self.total
+
+
 class Neo4jTestCase(unittest.TestCase):
     """
     Base test case that sets up a temporary Neo4j instance
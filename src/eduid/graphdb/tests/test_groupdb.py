@@ -1,14 +1,15 @@
 # -*- coding: utf-8 -*-
 from dataclasses import replace
 from typing import Dict, Union
+from unittest import mock
 
 from bson import ObjectId
-from neo4j import basic_auth
+from neo4j import Session, Transaction, basic_auth
 
-from eduid.graphdb.exceptions import VersionMismatch
+from eduid.graphdb.exceptions import EduIDGroupDBError, VersionMismatch
 from eduid.graphdb.groupdb import Group, GroupDB, User
 from eduid.graphdb.groupdb.db import Role
-from eduid.graphdb.testing import Neo4jTestCase
+from eduid.graphdb.testing import Neo4jTestCase, QueryRecorder
 
 __author__ = "lundberg"
 
@@ -377,3 +378,117 @@ class TestGroupDB(Neo4jTestCase):
         get_group = self.group_db.get_group(identifier=group.identifier)
         assert get_group.has_member(member_group1.identifier) is False
         assert get_group.has_member(member_user1.identifier) is True
+
+    def test_get_groups_by_identifiers(self):
+        group1 = Group.from_mapping(self.group1)
+        group2 = Group.from_mapping(self.group2)
+        member_user = User.from_mapping(self.user1)
+        owner = User.from_mapping(self.user2)
+        group1.members.update([member_user, group2])
+        group1.owners.add(owner)
+        self.group_db.save(group2)
+        self.group_db.save(group1)
+
+        with mock.patch.object(Session, "run", autospec=True, side_effect=Session.run) as mock_run:
+            groups = self.group_db.get_groups_by_identifiers(["test2", "missing", "test1", "test2"])
+        # all the groups, with members and owners, are loaded using a single query
+        assert 1 == mock_run.call_count
+        assert ["test2", "test1"] == [x.identifier for x in groups]
+        self._assert_group(group2, groups[0])
+        assert 0 == len(groups[0].members)
+        assert 0 == len(groups[0].owners)
+        self._assert_group(group1, groups[1])
+        assert 2 == len(groups[1].members)
+        assert groups[1].has_member(member_user.identifier) is True
+        assert groups[1].has_member(group2.identifier) is True
+        assert 1 == len(groups[1].owners)
+        self._assert_user(owner, groups[1].owners.pop())
+
+        assert [] == self.group_db.get_groups_by_identifiers([])
+
+    def test_get_groups_for_user_identifiers(self):
+        group1 = Group.from_mapping(self.group1)
+        group2 = Group.from_mapping(self.group2)
+        user1 = User.from_mapping(self.user1)
+        user2 = User.from_mapping(self.user2)
+        group1.members.update([user1, user2])
+        group2.members.add(user1)
+        group2.owners.add(user2)
+        self.group_db.save(group1)
+        self.group_db.save(group2)
+
+        with mock.patch.object(Session, "run", autospec=True, side_effect=Session.run) as mock_run:
+            res = self.group_db.get_groups_for_user_identifiers([user1.identifier, user2.identifier, "missing"])
+        assert 1 == mock_run.call_count
+        assert ["test1", "test2"] == sorted([x.identifier for x in res[user1.identifier]])
+        assert ["test1"] == [x.identifier for x in res[user2.identifier]]
+        assert [] == res["missing"]
+
+    def test_save_many_members(self):
+        group = Group.from_mapping(self.group1)
+        users = [User(identifier=f"user{i}", display_name=f"User {i}") for i in range(1000)]
+        member_groups = [Group(identifier=f"member{i}", display_name=f"Member Group {i}") for i in range(10)]
+        group.members.update(users)
+        group.members.update(member_groups)
+        group.owners.add(User.from_mapping(self.user1))
+
+        with mock.patch.object(Transaction, "run", autospec=True, side_effect=Transaction.run) as mock_run:
+            post_save_group = self.group_db.save(group)
+        # read stored relations, save group, one statement each for member users, member groups and owner users
+        assert 5 == mock_run.call_count
+        assert 1010 == len(post_save_group.members)
+        assert 1 == len(post_save_group.owners)
+        assert 1010 == len(self.group_db.get_users_and_groups_by_role(group.identifier, Role.MEMBER))
+
+        # saving again without any changes does not touch the relationships
+        group = replace(group, version=post_save_group.version)
+        with mock.patch.object(Transaction, "run", autospec=True, side_effect=Transaction.run) as mock_run:
+            post_save_group = self.group_db.save(group)
+        assert 2 == mock_run.call_count
+        assert 1010 == len(post_save_group.members)
+        assert all(member.modified_ts is None for member in post_save_group.members)
+
+        # remove some members and rename one
+        group.members.difference_update(users[:500])
+        group.members.remove(users[500])
+        group.members.add(replace(users[500], display_name="Renamed User"))
+        group = replace(group, version=post_save_group.version)
+        with mock.patch.object(Transaction, "run", autospec=True, side_effect=Transaction.run) as mock_run:
+            post_save_group = self.group_db.save(group)
+        # read stored relations, save group, remove members, update the renamed member
+        assert 4 == mock_run.call_count
+        assert 510 == len(post_save_group.members)
+
+        get_group = self.group_db.get_group(identifier=group.identifier)
+        assert get_group is not None
+        assert 510 == len(get_group.members)
+        assert get_group.has_member(users[0].identifier) is False
+        renamed = [member for member in get_group.members if member.identifier == users[500].identifier]
+        assert "Renamed User" == renamed[0].display_name
+        assert renamed[0].modified_ts is not None
+        assert 1 == len(get_group.owners)
+
+    def test_statement_catalogue(self):
+        recorder = QueryRecorder()
+        self.group_db.query_hook = recorder
+        for i in range(10):
+            group = Group(identifier=f"group{i}", display_name=f"Group {i}")
+            group.members.add(User(identifier=f"user{i}", display_name=f"User {i}"))
+            group.owners.add(User.from_mapping(self.user1))
+            self.group_db.save(group)
+            self.group_db.get_groups_for_user_identifer(f"user{i}")
+            self.group_db.get_groups_owned_by_user_identifier(self.user1["identifier"])
+            self.group_db.get_users_and_groups_by_role(group.identifier, Role.MEMBER)
+            self.group_db.get_groups_by_property(key="display_name", value=group.display_name)
+        # the same statement texts are used for every group and user
+        assert 8 == len(recorder.statements)
+        assert 71 == recorder.total
+        assert recorder.repeated_statement_ratio > 0.85
+        for statement in recorder.statements:
+            assert "user0" not in statement
+            assert "group0" not in statement
+
+    def test_get_groups_by_unknown_property(self):
+        self.group_db.save(Group.from_mapping(self.group1))
+        with self.assertRaises(EduIDGroupDBError):
+            self.group_db.get_groups_by_property(key="display_name = g.display_name OR 1", value="x")
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 from typing import Sequence
 
-from eduid.common.config.base import EduidEnvironment, LoggingConfigMixin, LoggingFilters, RootConfig
+from eduid.common.config.base import (
+    EduidEnvironment,
+    EkopostConfigMixin,
+    LoggingConfigMixin,
+    LoggingFilters,
+    RootConfig,
+    StatsConfigMixin,
+)
 
 __author__ = "lundberg"
 
 
-class QueueWorkerConfig(RootConfig, LoggingConfigMixin):
+class QueueWorkerConfig(RootConfig, LoggingConfigMixin, StatsConfigMixin, EkopostConfigMixin):
     """
     Configuration for eduid-queue workers
     """
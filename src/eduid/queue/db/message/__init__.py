@@ -29,6 +29,6 @@
 #
 
 from eduid.queue.db.message.db import MessageDB
-from eduid.queue.db.message.payload import EduidInviteEmail, EduidSignupEmail
+from eduid.queue.db.message.payload import EduidInviteEmail, EduidLetterProofingLetter, EduidSignupEmail
 
 __author__ = "lundberg"
@@ -30,7 +30,7 @@
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Mapping
+from typing import Any, Dict, Mapping
 
 from eduid.queue.db import Payload
 
@@ -106,3 +106,23 @@ class OldEduidSignupEmail(EmailPayload):
     site_name: str
     site_url: str
     version: int = 1
+
+
+@dataclass
+class EduidLetterProofingLetter(Payload):
+    """A letter with a verification code, to be rendered and sent by the letter worker"""
+
+    eppn: str
+    address: Dict[str, Any]  # FullPostalAddress.dict(by_alias=True)
+    verification_code: str
+    verification_created_ts: datetime
+    primary_mail_address: str
+    letter_wait_time_hours: int
+    language: str
+    reference: str
+    version: int = 1
+
+    @classmethod
+    def from_dict(cls, data: Mapping):
+        data = dict(data)  # Do not change caller data
+        return cls(**data)
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import timedelta
+from os import environ
+from unittest.mock import patch
+
+from eduid.common.config.parsers import load_config
+from eduid.queue.config import QueueWorkerConfig
+from eduid.queue.db import QueueItem
+from eduid.queue.db.message import EduidLetterProofingLetter
+from eduid.queue.testing import QueueAsyncioTest
+from eduid.queue.workers.letter import LetterQueueWorker
+from eduid.userdb.proofing import LetterProofingState, LetterProofingStateDB, NinProofingElement
+from eduid.userdb.proofing.element import SentLetterElement
+from eduid.userdb.util import utc_now
+from eduid.webapp.letter_proofing.ekopost import EkopostException
+
+__author__ = "lundberg"
+
+logger = logging.getLogger(__name__)
+
+
+class TestLetterWorker(QueueAsyncioTest):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        environ["WORKER_NAME"] = "Test Letter Worker 1"
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.pdf_file = tempfile.NamedTemporaryFile(suffix=".pdf")
+        self.test_config = {
+            "testing": True,
+            "mongo_uri": self.mongo_uri,
+            "mongo_collection": self.mongo_collection,
+            "periodic_interval": 1,
+            "periodic_min_retry_wait_in_seconds": 1,
+            "max_retries": 1,
+            "ekopost_debug_pdf_path": self.pdf_file.name,
+        }
+
+        if "EDUID_CONFIG_YAML" not in os.environ:
+            os.environ["EDUID_CONFIG_YAML"] = "YAML_CONFIG_NOT_USED"
+
+        self.config = load_config(typ=QueueWorkerConfig, app_name="test", ns="queue", test_config=self.test_config)
+        self.db.register_handler(EduidLetterProofingLetter)
+        self.proofing_statedb = LetterProofingStateDB(self.mongo_uri)
+        self.address = {
+            "Name": {"GivenNameMarking": "20", "GivenName": "Testaren Test", "Surname": "Testsson"},
+            "OfficialAddress": {"Address2": "ÖRGATAN 79 LGH 10", "PostalCode": "12345", "City": "LANDET"},
+        }
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        self.proofing_statedb._drop_whole_collection()
+        self.pdf_file.close()
+
+    async def asyncSetUp(self) -> None:
+        await super().asyncSetUp()
+        await asyncio.sleep(0.5)  # wait for db
+        self.worker = LetterQueueWorker(config=self.config)
+        self.tasks = [asyncio.create_task(self.worker.run())]
+        await asyncio.sleep(0.5)  # wait for worker to initialize
+
+    def _queue_letter(self, eppn: str = "hubba-bubba") -> QueueItem:
+        nin = NinProofingElement(
+            number="200001023456", created_by="test", is_verified=False, verification_code="abc123"
+        )
+        state = LetterProofingState(
+            eppn=eppn,
+            nin=nin,
+            proofing_letter=SentLetterElement(queued_ts=utc_now()),
+            id=None,
+            modified_ts=None,
+        )
+        self.proofing_statedb.save(state)
+        payload = EduidLetterProofingLetter(
+            eppn=eppn,
+            address=self.address,
+            verification_code="abc123",
+            verification_created_ts=utc_now(),
+            primary_mail_address="test@example.com",
+            letter_wait_time_hours=336,
+            language="en",
+            reference="test",
+        )
+        expires_at = utc_now() + timedelta(minutes=5)
+        discard_at = expires_at + timedelta(minutes=5)
+        queue_item = self.create_queue_item(expires_at, discard_at, payload)
+        self.db.save(queue_item)
+        return queue_item
+
+    async def test_letter_sent(self):
+        queue_item = self._queue_letter()
+        await self._assert_item_gets_processed(queue_item)
+        state = self.proofing_statedb.get_state_by_eppn("hubba-bubba")
+        assert state is not None
+        self.assertTrue(state.proofing_letter.is_sent)
+        self.assertIsNotNone(state.proofing_letter.sent_ts)
+        self.assertEqual(state.proofing_letter.transaction_id, "debug mode transaction id")
+        with open(self.pdf_file.name, "rb") as fd:
+            self.assertTrue(fd.read().startswith(b"%PDF"))
+
+    async def test_state_removed_when_giving_up(self):
+        self.worker.config.ekopost_debug_pdf_path = None
+        with patch.object(self.worker.ekopost, "send", side_effect=EkopostException("test")) as mock_send:
+            queue_item = self._queue_letter()
+            # retried once, then the state is removed so that the user can request a new letter
+            await self._assert_item_gets_processed(queue_item)
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertIsNone(self.proofing_statedb.get_state_by_eppn("hubba-bubba"))
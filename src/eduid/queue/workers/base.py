@@ -14,6 +14,7 @@ from typing import Sequence, Set, Type
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from eduid.common.logging import init_logging
+from eduid.common.stats import init_app_stats
 from eduid.queue.config import QueueWorkerConfig
 from eduid.queue.db import QueueItem
 from eduid.queue.db.change_event import ChangeEvent, OperationType
@@ -41,6 +42,7 @@ class QueueWorker(ABC):
         self.db: AsyncQueueDB
 
         init_logging(config=config)
+        self.stats = init_app_stats(config)
         logger.info(f"Starting {self.config.app_name}: {self.worker_name}...")
 
     @staticmethod
@@ -114,9 +116,12 @@ class QueueWorker(ABC):
         queue_item = await self.db.grab_item(document_id, worker_name=self.worker_name)
         if queue_item:
             try:
-                await self.handle_new_item(queue_item)
+                with self.stats.timer(f"queue.{queue_item.payload_type}.handle"):
+                    await self.handle_new_item(queue_item)
             except Exception as e:
+                self.stats.count(f"queue.{queue_item.payload_type}.failed")
                 logger.exception(f"QueueItem processing failed with: {repr(e)}")
+            self.stats.flush()
 
     async def handle_change(self, change: ChangeEvent):
         """
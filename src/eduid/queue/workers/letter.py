@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from typing import Any, Mapping, Optional, Sequence, Type, cast
+
+from requests.exceptions import ConnectionError
+
+from eduid.common.config.parsers import load_config
+from eduid.common.misc.timeutil import utc_now
+from eduid.common.rpc.msg_relay import FullPostalAddress
+from eduid.queue.config import QueueWorkerConfig
+from eduid.queue.db import QueueItem
+from eduid.queue.db.message import EduidLetterProofingLetter
+from eduid.queue.db.payload import Payload
+from eduid.queue.db.queue_item import Status
+from eduid.queue.workers.base import QueueWorker
+from eduid.userdb.proofing import LetterProofingState, LetterProofingStateDB
+from eduid.webapp.letter_proofing.ekopost import Ekopost, EkopostException
+from eduid.webapp.letter_proofing.pdf import AddressFormatException, LetterRenderer
+
+logger = logging.getLogger(__name__)
+
+__author__ = "lundberg"
+
+
+class LetterQueueWorker(QueueWorker):
+    """
+    Render letter proofing letters as PDF documents and send them with Ekopost.
+
+    The letter proofing app puts the letters on the queue (if letter_queue is set in its config) instead of
+    rendering and sending them in the request, and the frontend polls the proofing state until the letter
+    has been sent.
+    """
+
+    def __init__(self, config: QueueWorkerConfig):
+        # Register which queue items this worker should try to grab
+        payloads: Sequence[Type[Payload]] = [EduidLetterProofingLetter]
+        super().__init__(config=config, handle_payloads=payloads)
+
+        self.ekopost = Ekopost(config)
+        # Keep the parsed templates, translations and logo between letters
+        self.renderer = LetterRenderer()
+        self._proofing_statedb: Optional[LetterProofingStateDB] = None
+
+    @property
+    def proofing_statedb(self) -> LetterProofingStateDB:
+        if self._proofing_statedb is None:
+            self._proofing_statedb = LetterProofingStateDB(self.config.mongo_uri)
+        return self._proofing_statedb
+
+    async def handle_new_item(self, queue_item: QueueItem) -> None:
+        status = None
+        if queue_item.payload_type == EduidLetterProofingLetter.get_type():
+            # Rendering the PDF and talking to Ekopost is blocking, don't stop the event loop while doing it
+            status = await asyncio.to_thread(
+                self.send_letter,
+                cast(
+                    EduidLetterProofingLetter,
+                    queue_item.payload,
+                ),
+            )
+            logger.debug(f"send_letter returned status: {status}")
+
+        if status and status.retry:
+            if queue_item.retries < self.config.max_retries:
+                logger.info(f"Retrying queue item: {queue_item.item_id}")
+                logger.debug(queue_item)
+                await self.retry_item(queue_item)
+                return
+            logger.error(f"Giving up on queue item: {queue_item.item_id}")
+            await asyncio.to_thread(self.remove_unsent_state, cast(EduidLetterProofingLetter, queue_item.payload))
+
+        await self.item_successfully_handled(queue_item)
+
+    async def handle_expired_item(self, queue_item: QueueItem) -> None:
+        logger.warning(f"Found expired item: {queue_item}")
+        if queue_item.payload_type == EduidLetterProofingLetter.get_type():
+            # Let the user request a new letter
+            await asyncio.to_thread(self.remove_unsent_state, cast(EduidLetterProofingLetter, queue_item.payload))
+        await self.item_successfully_handled(queue_item)
+
+    def _get_state(self, data: EduidLetterProofingLetter) -> Optional[LetterProofingState]:
+        state = self.proofing_statedb.get_state_by_eppn(data.eppn)
+        if state is None or state.nin.verification_code != data.verification_code:
+            # The user has verified the code, or the state has been removed and maybe replaced with a new one
+            logger.info(f"No proofing state for {data.eppn} matching the queued letter (reference {data.reference})")
+            return None
+        return state
+
+    def remove_unsent_state(self, data: EduidLetterProofingLetter) -> None:
+        state = self._get_state(data)
+        if state is not None and not state.proofing_letter.is_sent:
+            self.proofing_statedb.remove_state(state)
+            logger.info(f"Removed {state}")
+
+    def send_letter(self, data: EduidLetterProofingLetter) -> Status:
+        """
+        Render the letter and send it, and record that the letter was sent in the users proofing state.
+
+        Runs in a thread, everything in here is blocking.
+        """
+        state = self._get_state(data)
+        if state is None:
+            return Status(success=False, retry=False, message="No matching proofing state")
+        if state.proofing_letter.is_sent:
+            return Status(success=True, message="Letter already sent")
+
+        try:
+            with self.stats.timer("letter.render"):
+                pdf_letter = self.renderer.create_pdf(
+                    recipient=FullPostalAddress(**data.address),
+                    verification_code=data.verification_code,
+                    created_timestamp=data.verification_created_ts,
+                    primary_mail_address=data.primary_mail_address,
+                    letter_wait_time_hours=data.letter_wait_time_hours,
+                    language=data.language,
+                )
+        except AddressFormatException:
+            logger.exception("Failed formatting address")
+            self.stats.count("address_format_error")
+            self.proofing_statedb.remove_state(state)
+            return Status(success=False, retry=False, message="Failed formatting address")
+
+        if self.config.ekopost_debug_pdf_path is not None:
+            # Write PDF to file instead of actually sending it if ekopost_debug_pdf_path is set
+            with open(self.config.ekopost_debug_pdf_path, "wb") as fd:
+                fd.write(pdf_letter.getvalue())
+            campaign_id = "debug mode transaction id"
+        else:
+            try:
+                with self.stats.timer("letter.ekopost"):
+                    campaign_id = self.ekopost.send(data.eppn, pdf_letter)
+            except EkopostException as e:
+                logger.exception("Ekopost returned an error")
+                self.stats.count("ekopost_error")
+                return Status(success=False, retry=True, message=str(e))
+            except ConnectionError as e:
+                logger.error(f"Error connecting to Ekopost: {e}")
+                return Status(success=False, retry=True, message=str(e))
+
+        # Save the users updated proofing state
+        state.proofing_letter.transaction_id = campaign_id
+        state.proofing_letter.is_sent = True
+        state.proofing_letter.sent_ts = utc_now()
+        self.proofing_statedb.save(state)
+        self.stats.count("letter_sent")
+        logger.info(f"Letter for {data.eppn} sent (reference {data.reference})")
+        return Status(success=True, message=campaign_id)
+
+
+def init_letter_worker(
+    name: str = "letter_worker", test_config: Optional[Mapping[str, Any]] = None
+) -> LetterQueueWorker:
+    config = load_config(typ=QueueWorkerConfig, app_name=name, ns="queue", test_config=test_config)
+    return LetterQueueWorker(config=config)
+
+
+def start_worker():
+    worker = init_letter_worker()
+    exit(asyncio.run(worker.run()))
+
+
+if __name__ == "__main__":
+    start_worker()
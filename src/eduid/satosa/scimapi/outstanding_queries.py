@@ -0,0 +1,155 @@
+"""
+Stores for the AuthnRequests sent by the StepUp micro-SP that have not been answered yet.
+
+Step-ups that the user abandons are never answered, so the stores have to forget requests after a while.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Mapping
+
+from eduid.common.misc.cache import ExpiringCache
+from eduid.userdb.db import BaseDB
+from eduid.userdb.util import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class OutstandingQueries(MutableMapping, ABC):
+    """
+    Outstanding queries, keyed by AuthnRequest id.
+
+    This is the mapping pysaml2 expects as `outstanding` when parsing a response.
+    """
+
+    def __init__(self) -> None:
+        self.added = 0
+        self.consumed = 0
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, int]:
+        """Metrics about the store, for logging"""
+        raise NotImplementedError()
+
+
+class MemoryOutstandingQueries(OutstandingQueries):
+    """
+    In-memory store, for a single SATOSA process.
+
+    :param max_size: The maximum number of outstanding queries. When full, the oldest query is forgotten.
+    :param ttl: Time to live for outstanding queries
+    """
+
+    def __init__(self, max_size: int, ttl: timedelta):
+        super().__init__()
+        self._cache: ExpiringCache[str, str] = ExpiringCache(max_size=max_size, ttl=ttl.total_seconds())
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {len(self)}/{self._cache.max_size} queries>"
+
+    def __getitem__(self, key: str) -> str:
+        value = self._cache.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+        self.added += 1
+
+    def __delitem__(self, key: str) -> None:
+        if self._cache.pop(key) is None:
+            raise KeyError(key)
+        self.consumed += 1
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._cache.keys())
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._cache),
+            "added": self.added,
+            "consumed": self.consumed,
+            "evicted": self._cache.stats.evictions,
+            "expired": self._cache.stats.expirations,
+        }
+
+
+class MongoOutstandingQueries(OutstandingQueries, BaseDB):
+    """
+    Store in a MongoDB collection, shared by all SATOSA processes. Expired queries are removed by a TTL index.
+
+    :param ttl: Time to live for outstanding queries
+    """
+
+    def __init__(
+        self,
+        db_uri: str,
+        ttl: timedelta,
+        db_name: str = "eduid_satosa",
+        collection: str = "stepup_outstanding_queries",
+    ):
+        OutstandingQueries.__init__(self)
+        BaseDB.__init__(self, db_uri, db_name, collection=collection)
+        self._ttl = ttl
+
+        indexes = {
+            "auto-discard": {"key": [("expires_at", 1)], "expireAfterSeconds": 0},
+        }
+        self.setup_indexes(indexes)
+
+    def _valid_spec(self) -> Dict[str, Any]:
+        # The TTL monitor only runs every minute, so expired documents can still be there
+        return {"expires_at": {"$gt": utc_now()}}
+
+    def __getitem__(self, key: str) -> str:
+        doc = self._coll.find_one({"_id": key, **self._valid_spec()})
+        if doc is None:
+            raise KeyError(key)
+        return doc["value"]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        doc = {"_id": key, "value": value, "expires_at": utc_now() + self._ttl}
+        self._coll.replace_one({"_id": key}, doc, upsert=True)
+        self.added += 1
+
+    def __delitem__(self, key: str) -> None:
+        result = self._coll.delete_one({"_id": key})
+        if not result.deleted_count:
+            raise KeyError(key)
+        self.consumed += 1
+
+    def __iter__(self) -> Iterator[str]:
+        return (doc["_id"] for doc in self._coll.find(self._valid_spec(), {"_id": True}))
+
+    def __len__(self) -> int:
+        return self._coll.count_documents(self._valid_spec())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"added": self.added, "consumed": self.consumed}
+
+
+def init_outstanding_queries(config: Mapping[str, Any]) -> OutstandingQueries:
+    """
+    Create an outstanding queries store from the StepUp `outstanding_queries` configuration.
+
+    Example configuration:
+
+      outstanding_queries:
+        store: mongo  # or memory (default)
+        mongo_uri: mongodb://localhost
+        ttl: 600  # seconds
+        max_size: 10000  # memory store only
+    """
+    store = config.get("store", "memory")
+    ttl = timedelta(seconds=config.get("ttl", 600))
+    if store == "memory":
+        return MemoryOutstandingQueries(max_size=config.get("max_size", 10000), ttl=ttl)
+    if store == "mongo":
+        return MongoOutstandingQueries(db_uri=config["mongo_uri"], ttl=ttl)
+    raise ValueError(f"Unknown outstanding queries store: {store}")
@@ -1,16 +1,23 @@
 import logging
 import pprint
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Mapping, Optional, Set
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
 
 import satosa.context
 import satosa.internal
-from saml2.mdstore import MetaData
+from saml2.mdstore import MetaData, MetaDataMDX
 from satosa.attribute_mapping import AttributeMapper
 from satosa.micro_services.base import ResponseMicroService
 from satosa.routing import STATE_KEY as ROUTER_STATE_KEY
 
+from eduid.common.misc.cache import ExpiringCache
+from eduid.common.models.scim_base import SCIMResourceType
+from eduid.userdb.scimapi import ScimApiEventDB
 from eduid.userdb.scimapi.userdb import ScimApiUser, ScimApiUserDB, ScimEduidUserDB
+from eduid.userdb.util import utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +29,63 @@ class Config(object):
     mfa_stepup_issuer_to_entity_id: Mapping[str, str]
     virt_idp_to_data_owner: Mapping[str, str]
     scope_to_data_owner: Mapping[str, str] = field(default_factory=dict)
+    # Cache SCIM users found by external_id for this many seconds, 0 to disable the cache
+    user_cache_ttl: int = 0
+    user_cache_size: int = 10000
+    # How often (in seconds) to look for changed users in the SCIM event collections, to remove them from the cache
+    user_cache_event_poll_interval: int = 5
+
+
+class ScopeIndex:
+    """
+    Index of the scopes (shibmd:Scope) for all IdPs in the metadata store.
+
+    The index is built from all the loaded metadata at once, and is replaced (not updated) when the metadata
+    is reloaded. Metadata fetched per entity (MDQ) is not indexed.
+
+    :param metadata: The metadata sources of the metadata store
+    :param check_interval: How often (in seconds) to check if metadata was loaded again in place
+    """
+
+    def __init__(self, metadata: Mapping[str, Any], check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._metadata = metadata
+        self._signature = _metadata_signature(metadata)
+        self._next_check = time.monotonic() + check_interval
+        self.scopes: Dict[str, FrozenSet[str]] = {}
+        for _md_name, _metadata in metadata.items():
+            if not isinstance(_metadata, MetaData) or isinstance(_metadata, MetaDataMDX):
+                continue
+            for entity_id, entity in _metadata.items():
+                idpsso = entity.get("idpsso_descriptor")
+                if not idpsso:
+                    continue
+                self.scopes[entity_id] = self.scopes.get(entity_id, frozenset()) | _extract_saml_scope(idpsso)
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {len(self.scopes)} IdPs>"
+
+    def is_current(self, metadata: Mapping[str, Any]) -> bool:
+        """Check if the index was built from this metadata"""
+        if metadata is not self._metadata:
+            # MetadataStore.reload() replaces the metadata dict
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return True
+        if _metadata_signature(metadata) != self._signature:
+            return False
+        self._next_check = now + self.check_interval
+        return True
+
+
+def _metadata_signature(metadata: Mapping[str, Any]) -> Tuple[Any, ...]:
+    # Loading metadata again replaces the MetaData object, and a reload in place changes the number of entities more
+    # often than not
+    return tuple(
+        (_md_name, id(_metadata), len(_metadata) if isinstance(_metadata, MetaData) else 0)
+        for _md_name, _metadata in metadata.items()
+    )
 
 
 class ScimAttributes(ResponseMicroService):
@@ -36,6 +100,14 @@ class ScimAttributes(ResponseMicroService):
         self.eduid_userdb = ScimEduidUserDB(db_uri=self.config.mongo_uri)
         logger.info(f"Connected to eduid db: {self.eduid_userdb}")
         self._userdbs: Dict[str, ScimApiUserDB] = {}
+        self._eventdbs: Dict[str, ScimApiEventDB] = {}
+        self._scope_index: Optional[ScopeIndex] = None
+        self._scope_index_lock = threading.Lock()
+        self._user_cache: Optional[ExpiringCache[Tuple[str, str], ScimApiUser]] = None
+        if self.config.user_cache_ttl > 0:
+            self._user_cache = ExpiringCache(max_size=self.config.user_cache_size, ttl=self.config.user_cache_ttl)
+        # data owner -> (monotonic time of the last poll, timestamp to look for events after)
+        self._user_cache_polled: Dict[str, Tuple[float, datetime]] = {}
         self.converter = AttributeMapper(internal_attributes)
         # Get the internal attribute name for the eduPersonPrincipalName that will be
         # used to find users in the SCIM database
@@ -55,6 +127,12 @@ class ScimAttributes(ResponseMicroService):
             )
         return self._userdbs[data_owner]
 
+    def get_eventdb_for_data_owner(self, data_owner: str) -> ScimApiEventDB:
+        if data_owner not in self._eventdbs:
+            _owner = data_owner.replace(".", "_")  # replace dots with underscores
+            self._eventdbs[data_owner] = ScimApiEventDB(db_uri=self.config.mongo_uri, collection=f"{_owner}__events")
+        return self._eventdbs[data_owner]
+
     def process(
         self,
         context: satosa.context.Context,
@@ -101,19 +179,25 @@ class ScimAttributes(ResponseMicroService):
         return super().process(context, data)
 
     def _get_scopes_for_idp(self, context: satosa.context.Context, entity_id: str) -> Set[str]:
-        res = set()
         logger.debug(f"Looking for metadata scope for entityId {entity_id}")
-        for _md_name, _metadata in context.internal_data[context.KEY_METADATA_STORE].metadata.items():
-            if not isinstance(_metadata, MetaData):
-                logger.debug(f"Element {_metadata} was not MetaData")
-                continue
-            if entity_id not in _metadata:
-                logger.debug(f"entityId {entity_id} not present in this metadata ({_md_name})")
-                continue
-            idpsso = _metadata[entity_id].get("idpsso_descriptor", {})
+        metadata = context.internal_data[context.KEY_METADATA_STORE].metadata
+        scopes = self._get_scope_index(metadata).scopes.get(entity_id)
+        if scopes is None:
+            # Not in the index, e.g. metadata fetched using MDQ
+            return _lookup_scopes_for_idp(metadata, entity_id)
+        return set(scopes)
 
-            res.update(_extract_saml_scope(idpsso))
-        return res
+    def _get_scope_index(self, metadata: Mapping[str, Any]) -> ScopeIndex:
+        index = self._scope_index
+        if index is None or not index.is_current(metadata):
+            with self._scope_index_lock:
+                index = self._scope_index
+                if index is None or not index.is_current(metadata):
+                    index = ScopeIndex(metadata)
+                    logger.info(f"Built metadata scope index: {index}")
+                    # replace the whole index, requests being processed keep using the one they already got
+                    self._scope_index = index
+        return index
 
     def _get_user(
         self, data: satosa.internal.InternalData, scopes: Set[str], frontend_name: str
@@ -145,21 +229,78 @@ class ScimAttributes(ResponseMicroService):
 
         logger.info(f"entityId {data.auth_info.issuer}, scope(s) {scopes}, data_owner {data_owner}")
 
-        userdb = self.get_userdb_for_data_owner(data_owner)
-
         _ext_ids = data.attributes.get(self.ext_id_attr, [])
         if len(_ext_ids) != 1:
             logger.warning(f"Got more or less than one externalId using attribute {self.ext_id_attr}: {_ext_ids}")
             return None
 
         ext_id = _ext_ids[0]
-        user = userdb.get_user_by_external_id(ext_id)
+        user = self._get_user_by_external_id(data_owner, ext_id)
         if user:
             logger.info(f"Found SCIM user {user.scim_id} using {self.ext_id_attr} {ext_id} (data owner: {data_owner})")
         else:
             logger.info(f"No user found using {self.ext_id_attr} {ext_id}")
         return user
 
+    def _get_user_by_external_id(self, data_owner: str, ext_id: str) -> Optional[ScimApiUser]:
+        if self._user_cache is None:
+            return self.get_userdb_for_data_owner(data_owner).get_user_by_external_id(ext_id)
+
+        self._invalidate_changed_users(data_owner)
+        user = self._user_cache.get((data_owner, ext_id))
+        if user is None:
+            user = self.get_userdb_for_data_owner(data_owner).get_user_by_external_id(ext_id)
+            if user is not None:
+                self._user_cache.set((data_owner, ext_id), user)
+        return user
+
+    def _invalidate_changed_users(self, data_owner: str) -> None:
+        """Remove users that the SCIM API has created or updated since the last poll from the user cache"""
+        assert self._user_cache is not None  # please mypy
+        now = time.monotonic()
+        polled_at, since = self._user_cache_polled.get(data_owner, (0.0, utc_now()))
+        if now - polled_at < self.config.user_cache_event_poll_interval:
+            return None
+        # Overlap the polls a bit, so that events saved during the previous poll are not missed
+        next_since = utc_now() - timedelta(seconds=self.config.user_cache_event_poll_interval)
+        try:
+            events = self.get_eventdb_for_data_owner(data_owner).get_events_since(
+                resource_type=SCIMResourceType.USER, since=since
+            )
+        except Exception:
+            logger.exception(f"Failed looking for SCIM user events for data owner {data_owner}")
+            self._user_cache.clear()
+            return None
+        self._user_cache_polled[data_owner] = (now, next_since)
+        if not events:
+            return None
+        changed = {event.resource.scim_id for event in events}
+        for event in events:
+            if event.resource.external_id is not None:
+                self._user_cache.pop((data_owner, event.resource.external_id))
+        # external_id might have been changed too
+        for key in self._user_cache.keys():
+            _owner, _ext_id = key
+            _user = self._user_cache.peek(key) if _owner == data_owner else None
+            if _user is not None and _user.scim_id in changed:
+                self._user_cache.pop(key)
+        logger.debug(f"Removed {len(changed)} changed SCIM users for data owner {data_owner} from the cache")
+
+
+def _lookup_scopes_for_idp(metadata: Mapping[str, Any], entity_id: str) -> Set[str]:
+    res = set()
+    for _md_name, _metadata in metadata.items():
+        if not isinstance(_metadata, MetaData):
+            logger.debug(f"Element {_metadata} was not MetaData")
+            continue
+        if entity_id not in _metadata:
+            logger.debug(f"entityId {entity_id} not present in this metadata ({_md_name})")
+            continue
+        idpsso = _metadata[entity_id].get("idpsso_descriptor", {})
+
+        res.update(_extract_saml_scope(idpsso))
+    return res
+
 
 def _extract_saml_scope(idpsso: List[Mapping[str, Any]]) -> Set[str]:
     """
@@ -19,6 +19,9 @@ from satosa.micro_services.base import RequestMicroService, ResponseMicroService
 from satosa.response import Response
 from satosa.saml_util import make_saml_response
 
+from eduid.common.misc.cache import ExpiringCache
+from eduid.satosa.scimapi.outstanding_queries import init_outstanding_queries
+
 logger = logging.getLogger(__name__)
 KEY_REQ_AUTHNCLASSREF = "requester-authn-class-ref"
 
@@ -48,6 +51,8 @@ class StepUp(ResponseMicroService):
     Configuration option:
     - mfa: a mapping between SP entity-ids and LoA settings
     - sp_config: the SP configuration passed to pysaml2
+    - outstanding_queries: where to keep the sent AuthnRequests until they are answered (optional)
+    - binding_cache_ttl: seconds to remember the binding picked for a StepUp service (optional)
 
     Example configuration:
 
@@ -68,6 +73,15 @@ class StepUp(ResponseMicroService):
             accepted:
               - urn:oasis:names:tc:SAML:2.0:ac:classes:mfa
 
+        # unanswered AuthnRequests are forgotten after ttl seconds. the memory store is per process and keeps
+        # at most max_size requests, use the mongo store to share them between SATOSA processes.
+        outstanding_queries:
+          store: memory
+          ttl: 600
+          max_size: 10000
+
+        binding_cache_ttl: 3600
+
         sp_config:
           organization:
             display_name: StepUp Microservice
@@ -136,6 +150,7 @@ class StepUp(ResponseMicroService):
         )
         sign_alg_is_a_string = type(config.get("sign_alg", "")) is str
         digest_alg_is_a_string = type(config.get("digest_alg", "")) is str
+        outstanding_queries_is_a_mapping = isinstance(config.get("outstanding_queries", {}), Mapping)
 
         validators = {
             "mfa_is_a_mapping": mfa_is_a_mapping,
@@ -147,6 +162,7 @@ class StepUp(ResponseMicroService):
             "mfa_loa_required_is_included_in_accepted": mfa_loa_required_is_included_in_accepted,
             "sign_alg_is_a_string": sign_alg_is_a_string,
             "digest_alg_is_a_string": digest_alg_is_a_string,
+            "outstanding_queries_is_a_mapping": outstanding_queries_is_a_mapping,
         }
         if not all(validators.values()):
             error_context = {
@@ -167,7 +183,11 @@ class StepUp(ResponseMicroService):
         self.sp = Saml2Client(config=sp_conf)
         self.converter = AttributeMapper(internal_attributes)
         self.encryption_keys = []
-        self.outstanding_queries = {}
+        self.outstanding_queries = init_outstanding_queries(config.get("outstanding_queries", {}))
+        # The binding and destination to use only change if the StepUp service metadata changes
+        self._binding_cache: ExpiringCache[str, Tuple[str, str]] = ExpiringCache(
+            max_size=100, ttl=config.get("binding_cache_ttl", 3600)
+        )
         self.attribute_profile = "saml"
 
         logger.info("StepUp Authentication is active")
@@ -252,11 +272,7 @@ class StepUp(ResponseMicroService):
         )
 
         try:
-            binding, destination = self.sp.pick_binding(
-                service="single_sign_on_service",
-                descr_type="idpsso",
-                entity_id=stepup_provider,
-            )
+            binding, destination = self._pick_binding(stepup_provider)
         except Exception as e:
             error_context = {
                 "message": "Failed to pick binding for the AuthnRequest",
@@ -291,16 +307,33 @@ class StepUp(ResponseMicroService):
                     "req_id": req_id,
                 }
                 raise SATOSAAuthenticationError(context.state, error_context)
-            self.outstanding_queries[req_id] = ht_args
+            # only the request id matters, keep the value small
+            self.outstanding_queries[req_id] = relay_state
 
         context.state[self.name] = {
             **context.state.get(self.name, {}),
             "relay_state": relay_state,
             "internal_data": data.to_dict(),
         }
-        logger.info("Sending StepUp Authentication")
+        logger.info(
+            {
+                "msg": "Sending StepUp Authentication",
+                "outstanding_queries": self.outstanding_queries.get_stats(),
+            }
+        )
         return make_saml_response(binding, ht_args)
 
+    def _pick_binding(self, entity_id: str) -> Tuple[str, str]:
+        picked = self._binding_cache.get(entity_id)
+        if picked is None:
+            picked = self.sp.pick_binding(
+                service="single_sign_on_service",
+                descr_type="idpsso",
+                entity_id=entity_id,
+            )
+            self._binding_cache.set(entity_id, picked)
+        return picked
+
     def _handle_authn_response(self, context, binding):
         internal_data_dict = context.state.get(self.name, {}).get("internal_data")
         data = InternalData.from_dict(internal_data_dict)
@@ -340,13 +373,16 @@ class StepUp(ResponseMicroService):
 
         if self.sp.config.getattr("allow_unsolicited", "sp") is False:
             req_id = authn_response.in_response_to
-            if req_id not in self.outstanding_queries:
+            try:
+                # removing the request (and not just checking for it) makes sure a response is only used once,
+                # even with a store shared by several processes
+                del self.outstanding_queries[req_id]
+            except KeyError:
                 error_context = {
                     "msg": "no outstanding request with such id",
                     "req_id": req_id,
                 }
                 raise SATOSAAuthenticationError(context.state, error_context)
-            self.outstanding_queries.pop(req_id)
 
         stepup_issuer = authn_response.response.issuer.text
         is_stepup_provider = stepup_issuer == stepup_provider
@@ -0,0 +1,66 @@
+import time
+import tracemalloc
+import unittest
+from datetime import timedelta
+
+from eduid.satosa.scimapi.outstanding_queries import MemoryOutstandingQueries, init_outstanding_queries
+
+
+class MemoryOutstandingQueriesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queries = MemoryOutstandingQueries(max_size=3, ttl=timedelta(seconds=600))
+
+    def test_mapping(self):
+        self.queries["id-1"] = "relay-state-1"
+        self.assertIn("id-1", self.queries)
+        self.assertNotIn("id-2", self.queries)
+        self.assertEqual(self.queries["id-1"], "relay-state-1")
+        self.assertEqual(list(self.queries), ["id-1"])
+        del self.queries["id-1"]
+        with self.assertRaises(KeyError):
+            del self.queries["id-1"]
+        self.assertEqual(self.queries.get_stats()["added"], 1)
+        self.assertEqual(self.queries.get_stats()["consumed"], 1)
+
+    def test_evicted_when_full(self):
+        for i in range(5):
+            self.queries[f"id-{i}"] = "relay-state"
+        self.assertEqual(len(self.queries), 3)
+        self.assertNotIn("id-0", self.queries)
+        self.assertIn("id-4", self.queries)
+        self.assertEqual(self.queries.get_stats()["evicted"], 2)
+
+    def test_expired(self):
+        queries = MemoryOutstandingQueries(max_size=3, ttl=timedelta(seconds=0.1))
+        queries["id-1"] = "relay-state"
+        time.sleep(0.2)
+        self.assertNotIn("id-1", queries)
+        with self.assertRaises(KeyError):
+            queries["id-1"]
+
+    def test_init_from_config(self):
+        queries = init_outstanding_queries({"ttl": 60, "max_size": 10})
+        assert isinstance(queries, MemoryOutstandingQueries)
+        with self.assertRaises(ValueError):
+            init_outstanding_queries({"store": "redis"})
+
+    def test_abandoned_step_ups_soak(self):
+        # a million step-ups that are never answered must not make the store grow beyond max_size
+        max_size = 10000
+        queries = MemoryOutstandingQueries(max_size=max_size, ttl=timedelta(minutes=10))
+        for i in range(1_000_000):
+            queries[f"id-{i}"] = f"relay-state-{i}"
+        self.assertEqual(len(queries), max_size)
+        self.assertEqual(queries.get_stats()["evicted"], 1_000_000 - max_size)
+
+        # and memory use stays flat as more step-ups are abandoned
+        samples = []
+        tracemalloc.start()
+        try:
+            for batch in range(5):
+                for i in range(max_size):
+                    queries[f"id-{batch}-{i}"] = f"relay-state-{i}"
+                samples.append(tracemalloc.get_traced_memory()[0])
+        finally:
+            tracemalloc.stop()
+        self.assertLess(max(samples) - min(samples), 256 * 1024)
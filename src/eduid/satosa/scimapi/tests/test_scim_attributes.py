@@ -0,0 +1,188 @@
+import time
+import unittest
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from unittest.mock import ANY, MagicMock, patch
+
+from bson import ObjectId
+from saml2.mdstore import InMemoryMetaData
+
+from eduid.common.models.scim_base import SCIMResourceType
+from eduid.satosa.scimapi.scim_attributes import ScimAttributes, ScopeIndex, _lookup_scopes_for_idp
+from eduid.userdb.scimapi import EventLevel, ScimApiEvent, ScimApiEventResource, ScimApiUser
+from eduid.userdb.util import utc_now
+
+
+def _idp(scope: str) -> Dict[str, Any]:
+    return {
+        "idpsso_descriptor": [
+            {
+                "__class__": "urn:oasis:names:tc:SAML:2.0:metadata&IDPSSODescriptor",
+                "extensions": {
+                    "__class__": "urn:oasis:names:tc:SAML:2.0:metadata&Extensions",
+                    "extension_elements": [
+                        {"__class__": "urn:mace:shibboleth:metadata:1.0&Scope", "text": scope, "regexp": "false"},
+                        {"__class__": "urn:oasis:names:tc:SAML:metadata:ui&UIInfo"},
+                    ],
+                },
+            }
+        ]
+    }
+
+
+def _synthetic_metadata(sources: int, idps_per_source: int) -> Dict[str, InMemoryMetaData]:
+    metadata = {}
+    for source in range(sources):
+        _md = InMemoryMetaData(attrc=None)
+        for i in range(idps_per_source):
+            _md[f"https://idp{source}-{i}.example.org/idp"] = _idp(f"idp{source}-{i}.example.org")
+        # an SP, without scopes
+        _md[f"https://sp{source}.example.org/sp"] = {"spsso_descriptor": [{}]}
+        metadata[f"source{source}"] = _md
+    return metadata
+
+
+class ScopeIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.metadata = _synthetic_metadata(sources=3, idps_per_source=1000)
+
+    def test_index(self):
+        index = ScopeIndex(self.metadata)
+        self.assertEqual(len(index.scopes), 3000)
+        self.assertEqual(index.scopes["https://idp1-42.example.org/idp"], {"idp1-42.example.org"})
+        self.assertNotIn("https://sp0.example.org/sp", index.scopes)
+        for entity_id in ["https://idp0-0.example.org/idp", "https://idp2-999.example.org/idp"]:
+            self.assertEqual(index.scopes[entity_id], _lookup_scopes_for_idp(self.metadata, entity_id))
+
+    def test_scopes_from_all_sources(self):
+        self.metadata["source1"]["https://idp0-0.example.org/idp"] = _idp("other.example.org")
+        index = ScopeIndex(self.metadata)
+        self.assertEqual(index.scopes["https://idp0-0.example.org/idp"], {"idp0-0.example.org", "other.example.org"})
+
+    def test_is_current(self):
+        index = ScopeIndex(self.metadata, check_interval=0)
+        self.assertTrue(index.is_current(self.metadata))
+        # MetadataStore.reload() replaces the metadata dict
+        self.assertFalse(index.is_current(dict(self.metadata)))
+        # metadata loaded again in place
+        self.metadata["source0"]["https://new-idp.example.org/idp"] = _idp("new.example.org")
+        self.assertFalse(index.is_current(self.metadata))
+
+    def test_check_interval(self):
+        index = ScopeIndex(self.metadata, check_interval=60)
+        self.metadata["source0"]["https://new-idp.example.org/idp"] = _idp("new.example.org")
+        # only checked every check_interval seconds
+        self.assertTrue(index.is_current(self.metadata))
+        self.assertFalse(index.is_current(dict(self.metadata)))
+
+    def test_lookup_benchmark(self):
+        entity_ids = [f"https://idp{source}-{i}.example.org/idp" for source in range(3) for i in range(1000)]
+
+        start = time.monotonic()
+        for entity_id in entity_ids:
+            _lookup_scopes_for_idp(self.metadata, entity_id)
+        walk = time.monotonic() - start
+
+        start = time.monotonic()
+        index = ScopeIndex(self.metadata)
+        build = time.monotonic() - start
+        start = time.monotonic()
+        for entity_id in entity_ids:
+            assert index.is_current(self.metadata)
+            set(index.scopes[entity_id])
+        indexed = time.monotonic() - start
+
+        # building the index costs about as much as walking the metadata once per IdP, but is only done once
+        # per metadata load
+        self.assertLess(build, 1)
+        self.assertLess(indexed * 2, walk)
+
+
+def _user_event(user: ScimApiUser, external_id: Optional[str]) -> ScimApiEvent:
+    return ScimApiEvent(
+        resource=ScimApiEventResource(
+            resource_type=SCIMResourceType.USER,
+            scim_id=user.scim_id,
+            external_id=external_id,
+            version=ObjectId(),
+            last_modified=utc_now(),
+        ),
+        level=EventLevel.INFO,
+        source="eduID SCIM API",
+        data={},
+        expires_at=utc_now() + timedelta(days=1),
+        timestamp=utc_now(),
+    )
+
+
+class UserCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        config = {
+            "mongo_uri": "mongodb://localhost",
+            "idp_to_data_owner": {},
+            "mfa_stepup_issuer_to_entity_id": {},
+            "virt_idp_to_data_owner": {},
+            "user_cache_ttl": 60,
+            # look for changed users on every lookup
+            "user_cache_event_poll_interval": 0,
+        }
+        internal_attributes = {"attributes": {"eppn": {"saml": ["eduPersonPrincipalName"]}}}
+        with patch("eduid.satosa.scimapi.scim_attributes.ScimEduidUserDB"):
+            self.plugin = ScimAttributes(config, internal_attributes, name="scim_attributes", base_url="https://test")
+        self.data_owner = "example.org"
+        self.user = ScimApiUser(external_id="user@example.org")
+        self.userdb = MagicMock()
+        self.userdb.get_user_by_external_id.return_value = self.user
+        self.eventdb = MagicMock()
+        self.eventdb.get_events_since.return_value = []
+        self.plugin._userdbs[self.data_owner] = self.userdb
+        self.plugin._eventdbs[self.data_owner] = self.eventdb
+
+    def _get_user(self, ext_id: str = "user@example.org") -> Optional[ScimApiUser]:
+        return self.plugin._get_user_by_external_id(self.data_owner, ext_id)
+
+    def test_cache_hit(self):
+        self.assertEqual(self._get_user(), self.user)
+        self.assertEqual(self._get_user(), self.user)
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 1)
+        assert self.plugin._user_cache is not None  # please mypy
+        self.assertEqual(self.plugin._user_cache.stats.hits, 1)
+        self.eventdb.get_events_since.assert_called_with(resource_type=SCIMResourceType.USER, since=ANY)
+
+    def test_evicted_on_user_event(self):
+        self._get_user()
+        self.eventdb.get_events_since.return_value = [_user_event(self.user, external_id="user@example.org")]
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 2)
+
+    def test_evicted_on_external_id_change(self):
+        self._get_user()
+        # the event has the new external_id, the cached user is found by scim_id
+        self.eventdb.get_events_since.return_value = [_user_event(self.user, external_id="new@example.org")]
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 2)
+
+    def test_other_data_owner_not_evicted(self):
+        self._get_user()
+        other_userdb = MagicMock()
+        other_userdb.get_user_by_external_id.return_value = ScimApiUser(external_id="user@example.org")
+        other_eventdb = MagicMock()
+        other_eventdb.get_events_since.return_value = [_user_event(self.user, external_id=None)]
+        self.plugin._userdbs["example.com"] = other_userdb
+        self.plugin._eventdbs["example.com"] = other_eventdb
+        self.plugin._get_user_by_external_id("example.com", "user@example.org")
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 1)
+
+    def test_cleared_when_events_can_not_be_read(self):
+        self._get_user()
+        self.eventdb.get_events_since.side_effect = RuntimeError("event collection unavailable")
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 2)
+        # the next lookup doesn't trust the cache either, until the events can be read again
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 3)
+        self.eventdb.get_events_since.side_effect = None
+        self._get_user()
+        self._get_user()
+        self.assertEqual(self.userdb.get_user_by_external_id.call_count, 3)
@@ -13,6 +13,7 @@ from eduid.scimapi.exceptions import (
     unexpected_error_handler,
     validation_exception_handler,
 )
+from eduid.scimapi.graph_outbox import GraphOutboxReconciler
 from eduid.scimapi.middleware import AuthenticationMiddleware, ScimMiddleware
 from eduid.scimapi.routers.events import events_router
 from eduid.scimapi.routers.groups import groups_router
@@ -52,5 +53,14 @@ def init_api(name: str = "scimapi", test_config: Optional[Dict] = None) -> ScimA
     app.add_exception_handler(HTTPErrorDetail, http_error_detail_handler)
     app.add_exception_handler(Exception, unexpected_error_handler)
 
+    if app.config.graph_outbox:
+        reconciler = GraphOutboxReconciler(
+            groupdbs=app.context.groupdbs,
+            interval=app.config.graph_outbox_interval,
+            batch_size=app.config.graph_outbox_batch_size,
+        )
+        app.router.add_event_handler("startup", reconciler.start)
+        app.router.add_event_handler("shutdown", reconciler.stop)
+
     app.context.logger.info("app running...")
     return app
@@ -0,0 +1,173 @@
+"""
+Support for the attributes and excludedAttributes parameters (RFC 7644, section 3.9), that lets a client choose
+which attributes to get back in a response.
+
+The selection is used both to limit what is loaded from the database (as a mongodb projection), and to prune
+the resources in the response.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from eduid.common.models.scim_base import SCIMSchema
+from eduid.scimapi.exceptions import BadRequest
+
+# Attributes with returned=always, RFC 7643 section 7
+ALWAYS_RETURNED = frozenset(["id", "schemas"])
+
+AttributePath = Tuple[str, ...]
+
+# The mongodb fields needed to produce each of the attributes in a user response
+USER_ATTRIBUTE_FIELDS: Mapping[AttributePath, Sequence[str]] = {
+    ("id",): ["scim_id"],
+    ("externalid",): ["external_id"],
+    ("name",): ["name"],
+    ("emails",): ["emails"],
+    ("phonenumbers",): ["phone_numbers"],
+    ("preferredlanguage",): ["preferred_language"],
+    ("groups",): [],
+    ("meta",): ["created", "last_modified", "version"],
+    (SCIMSchema.NUTID_USER_V1.value.lower(), "profiles"): ["profiles"],
+    (SCIMSchema.NUTID_USER_V1.value.lower(), "linked_accounts"): ["linked_accounts"],
+}
+
+# Fields that are always loaded, regardless of the selected attributes
+USER_REQUIRED_FIELDS = ["_id", "scim_id", "version"]
+
+_SEGMENT_RE = re.compile(r"^[A-Za-z$][\w\-$]*$")
+
+
+@dataclass(frozen=True)
+class AttributeSelection:
+    core_schema: SCIMSchema
+    attributes: Tuple[AttributePath, ...] = ()
+    excluded_attributes: Tuple[AttributePath, ...] = ()
+
+    @classmethod
+    def from_request(
+        cls,
+        core_schema: SCIMSchema,
+        attributes: Optional[Sequence[str]] = None,
+        excluded_attributes: Optional[Sequence[str]] = None,
+    ) -> Optional["AttributeSelection"]:
+        """
+        Create an attribute selection from the parameters in a request.
+
+        :return: None if the client did not ask for a specific set of attributes
+        """
+        if attributes and excluded_attributes:
+            raise BadRequest(scim_type="invalidSyntax", detail="Can't use both attributes and excludedAttributes")
+        if attributes:
+            return cls(core_schema=core_schema, attributes=tuple(_parse_path(core_schema, x) for x in attributes))
+        if excluded_attributes:
+            _excluded = [_parse_path(core_schema, x) for x in excluded_attributes]
+            # Attributes that are always returned can't be excluded
+            _excluded = [x for x in _excluded if not (len(x) == 1 and x[0] in ALWAYS_RETURNED)]
+            return cls(core_schema=core_schema, excluded_attributes=tuple(_excluded))
+        return None
+
+    def is_requested(self, *path: str) -> bool:
+        """Check if any part of an attribute will be returned, e.g. is_requested("groups")"""
+        _path = tuple(x.lower() for x in path)
+        if self.attributes:
+            if len(_path) == 1 and _path[0] in ALWAYS_RETURNED:
+                return True
+            return any(_overlaps(x, _path) for x in self.attributes)
+        return not any(_path[: len(x)] == x for x in self.excluded_attributes)
+
+    def mongo_projection(
+        self, attribute_fields: Mapping[AttributePath, Sequence[str]], required_fields: Sequence[str]
+    ) -> Optional[Dict[str, bool]]:
+        """
+        Translate the selection to a mongodb projection.
+
+        :param attribute_fields: The database fields needed to produce each attribute in the resource
+        :param required_fields: The database fields that are always needed
+        :return: A projection, or None if all fields are needed
+        """
+        if self.attributes:
+            fields = set(required_fields)
+            for attr, _fields in attribute_fields.items():
+                if self.is_requested(*attr):
+                    fields.update(_fields)
+            return {x: True for x in sorted(fields)}
+        excluded = set()
+        for attr, _fields in attribute_fields.items():
+            if not self.is_requested(*attr):
+                excluded.update(_fields)
+        excluded -= set(required_fields)
+        if not excluded:
+            return None
+        return {x: False for x in sorted(excluded)}
+
+    def apply(self, resource: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Prune a resource (in the serialised form that is sent to the client) according to the selection.
+        """
+        if self.attributes:
+            paths = list(self.attributes) + [(x,) for x in ALWAYS_RETURNED]
+            res = _select(resource, paths)
+        else:
+            res = _exclude(resource, list(self.excluded_attributes))
+        if isinstance(res.get("schemas"), list):
+            # only list the extension schemas that are still present in the resource
+            res["schemas"] = [x for x in res["schemas"] if x == self.core_schema.value or x in res]
+        return res
+
+
+def _parse_path(core_schema: SCIMSchema, name: str) -> AttributePath:
+    _name = name.strip()
+    schema = None
+    if _name.lower() in [x.value.lower() for x in SCIMSchema]:
+        # a whole extension, e.g. https://scim.eduid.se/schema/nutid/user/v1
+        schema, attr = _name, ""
+    elif ":" in _name:
+        schema, attr = _name.rsplit(":", 1)
+    else:
+        attr = _name
+    segments = attr.split(".") if attr else []
+    prefix: AttributePath = ()
+    if schema is not None and schema.lower() != core_schema.value.lower():
+        prefix = (schema.lower(),)
+    elif not segments:
+        raise BadRequest(scim_type="invalidValue", detail=f"Invalid attribute {name}")
+    for segment in segments:
+        if not _SEGMENT_RE.match(segment):
+            raise BadRequest(scim_type="invalidValue", detail=f"Invalid attribute {name}")
+    return prefix + tuple(x.lower() for x in segments)
+
+
+def _overlaps(a: AttributePath, b: AttributePath) -> bool:
+    """True if one of the paths is a prefix of the other"""
+    length = min(len(a), len(b))
+    return a[:length] == b[:length]
+
+
+def _select(value: Any, paths: List[AttributePath]) -> Any:
+    if any(not x for x in paths):
+        # the whole value was selected
+        return value
+    if isinstance(value, list):
+        return [_select(x, paths) for x in value]
+    if isinstance(value, dict):
+        res = {}
+        for key, sub_value in value.items():
+            sub_paths = [x[1:] for x in paths if x[0] == key.lower()]
+            if sub_paths:
+                res[key] = _select(sub_value, sub_paths)
+        return res
+    return value
+
+
+def _exclude(value: Any, paths: List[AttributePath]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(x, paths) for x in value]
+    if isinstance(value, dict):
+        res = {}
+        for key, sub_value in value.items():
+            sub_paths = [x[1:] for x in paths if x[0] == key.lower()]
+            if any(not x for x in sub_paths):
+                continue
+            res[key] = _exclude(sub_value, sub_paths) if sub_paths else sub_value
+        return res
+    return value
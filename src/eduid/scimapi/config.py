@@ -46,8 +46,18 @@ class ScimApiConfig(RootConfig, LoggingConfigMixin, AWSMixin):
     mongo_uri: str = ""
     neo4j_uri: str = ""
     neo4j_config: Dict = Field(default_factory=dict)
+    # Save group changes to the graph database in the background (see AsyncScimApiGroupDB)
+    graph_outbox: bool = False
+    graph_outbox_interval: float = 1.0  # seconds between checks for pending graph database changes
+    graph_outbox_batch_size: int = 100
+    # Wait at most this many seconds for pending graph database changes before graph database queries,
+    # None to accept eventual consistency
+    graph_outbox_read_timeout: Optional[float] = None
     authorization_mandatory: bool = True
     authorization_token_expire: int = 5 * 60
+    # Cache verified bearer tokens for at most this many seconds (never longer than the token is valid), 0 to disable
+    bearer_token_cache_ttl: int = 60
+    bearer_token_cache_size: int = 1000
     keystore_path: Path
     signing_key_id: str
     login_enabled: bool = False
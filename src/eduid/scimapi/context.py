@@ -1,6 +1,6 @@
 import logging
 import logging.config
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 from uuid import UUID
 
 from eduid.common.models.scim_base import SCIMResourceType
@@ -11,9 +11,9 @@ from eduid.scimapi.context_request import ContextRequest
 from eduid.scimapi.log import init_logging
 from eduid.scimapi.notifications import NotificationRelay
 from eduid.scimapi.utils import load_jwks, make_etag
-from eduid.userdb.scimapi import ScimApiEventDB, ScimApiGroup, ScimApiGroupDB
-from eduid.userdb.scimapi.invitedb import ScimApiInvite, ScimApiInviteDB
-from eduid.userdb.scimapi.userdb import ScimApiUser, ScimApiUserDB
+from eduid.userdb.scimapi import AsyncScimApiEventDB, AsyncScimApiGroupDB, ScimApiGroup
+from eduid.userdb.scimapi.invitedb import AsyncScimApiInviteDB, ScimApiInvite
+from eduid.userdb.scimapi.userdb import AsyncScimApiUserDB, ScimApiUser
 from eduid.userdb.signup.invitedb import SignupInviteDB
 
 
@@ -28,29 +28,33 @@ class Context(object):
         self.logger.info("Logging initialized")
 
         # Setup databases
-        self._userdbs = {}
-        self._groupdbs = {}
-        self._invitedbs = {}
-        self._eventdbs = {}
+        self._userdbs: Dict[DataOwnerName, AsyncScimApiUserDB] = {}
+        self._groupdbs: Dict[DataOwnerName, AsyncScimApiGroupDB] = {}
+        self._invitedbs: Dict[DataOwnerName, AsyncScimApiInviteDB] = {}
+        self._eventdbs: Dict[DataOwnerName, AsyncScimApiEventDB] = {}
         for data_owner_id, data_owner in self.config.data_owners.items():
             db_name = data_owner_id.replace(".", "_")  # replace dots with underscores
             if data_owner.db_name is not None:
                 # If data_owner.db_name is set for this data owner use that instead of the default db_name
                 db_name = data_owner.db_name
 
-            self._userdbs[data_owner_id] = ScimApiUserDB(db_uri=self.config.mongo_uri, collection=f"{db_name}__users")
-            self._groupdbs[data_owner_id] = ScimApiGroupDB(
+            self._userdbs[data_owner_id] = AsyncScimApiUserDB(
+                db_uri=self.config.mongo_uri, collection=f"{db_name}__users"
+            )
+            self._groupdbs[data_owner_id] = AsyncScimApiGroupDB(
                 neo4j_uri=self.config.neo4j_uri,
                 neo4j_config=self.config.neo4j_config,
                 scope=data_owner_id,
                 mongo_uri=self.config.mongo_uri,
                 mongo_dbname="eduid_scimapi",
                 mongo_collection=f"{db_name}__groups",
+                graph_outbox=self.config.graph_outbox,
+                graph_outbox_read_timeout=self.config.graph_outbox_read_timeout,
             )
-            self._invitedbs[data_owner_id] = ScimApiInviteDB(
+            self._invitedbs[data_owner_id] = AsyncScimApiInviteDB(
                 db_uri=self.config.mongo_uri, collection=f"{db_name}__invites"
             )
-            self._eventdbs[data_owner_id] = ScimApiEventDB(
+            self._eventdbs[data_owner_id] = AsyncScimApiEventDB(
                 db_uri=self.config.mongo_uri, collection=f"{db_name}__events"
             )
         self.signup_invitedb = SignupInviteDB(db_uri=self.config.mongo_uri)
@@ -60,8 +64,33 @@ class Context(object):
         self.notification_relay = NotificationRelay(self.config)
 
         # Setup keystore
+        self._jwks_mtime = self._keystore_mtime()
         self.jwks = load_jwks(config)
 
+    def _keystore_mtime(self) -> Optional[float]:
+        try:
+            return self.config.keystore_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload_jwks(self) -> None:
+        """Reload the keystore. Bearer tokens verified using the previous key set will have to be verified again."""
+        self._jwks_mtime = self._keystore_mtime()
+        self.jwks = load_jwks(self.config)
+        self.logger.info("Keystore reloaded")
+
+    def reload_jwks_if_changed(self) -> bool:
+        """
+        Reload the keystore if the file has been changed since it was loaded, e.g. when a signing key has been added.
+
+        :return: True if the keystore was reloaded
+        """
+        mtime = self._keystore_mtime()
+        if mtime is None or mtime == self._jwks_mtime:
+            return False
+        self.reload_jwks()
+        return True
+
     @property
     def base_url(self) -> str:
         base_url = f"{self.config.protocol}://{self.config.server_name}"
@@ -69,16 +98,20 @@ class Context(object):
             return urlappend(base_url, self.config.application_root)
         return base_url
 
-    def get_userdb(self, data_owner: DataOwnerName) -> Optional[ScimApiUserDB]:
+    def get_userdb(self, data_owner: DataOwnerName) -> Optional[AsyncScimApiUserDB]:
         return self._userdbs.get(data_owner)
 
-    def get_groupdb(self, data_owner: DataOwnerName) -> Optional[ScimApiGroupDB]:
+    def get_groupdb(self, data_owner: DataOwnerName) -> Optional[AsyncScimApiGroupDB]:
         return self._groupdbs.get(data_owner)
 
-    def get_invitedb(self, data_owner: DataOwnerName) -> Optional[ScimApiInviteDB]:
+    @property
+    def groupdbs(self) -> List[AsyncScimApiGroupDB]:
+        return list(self._groupdbs.values())
+
+    def get_invitedb(self, data_owner: DataOwnerName) -> Optional[AsyncScimApiInviteDB]:
         return self._invitedbs.get(data_owner)
 
-    def get_eventdb(self, data_owner: DataOwnerName) -> Optional[ScimApiEventDB]:
+    def get_eventdb(self, data_owner: DataOwnerName) -> Optional[AsyncScimApiEventDB]:
         return self._eventdbs.get(data_owner)
 
     def url_for(self, *args) -> str:
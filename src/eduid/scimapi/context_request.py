@@ -8,18 +8,18 @@ from fastapi import Request, Response
 from fastapi.routing import APIRoute
 
 from eduid.scimapi.config import DataOwnerName
-from eduid.userdb.scimapi import ScimApiEventDB, ScimApiGroupDB
-from eduid.userdb.scimapi.invitedb import ScimApiInviteDB
-from eduid.userdb.scimapi.userdb import ScimApiUserDB
+from eduid.userdb.scimapi import AsyncScimApiEventDB, AsyncScimApiGroupDB
+from eduid.userdb.scimapi.invitedb import AsyncScimApiInviteDB
+from eduid.userdb.scimapi.userdb import AsyncScimApiUserDB
 
 
 @dataclass
 class Context:
     data_owner: Optional[DataOwnerName] = None
-    userdb: Optional[ScimApiUserDB] = None
-    groupdb: Optional[ScimApiGroupDB] = None
-    invitedb: Optional[ScimApiInviteDB] = None
-    eventdb: Optional[ScimApiEventDB] = None
+    userdb: Optional[AsyncScimApiUserDB] = None
+    groupdb: Optional[AsyncScimApiGroupDB] = None
+    invitedb: Optional[AsyncScimApiInviteDB] = None
+    eventdb: Optional[AsyncScimApiEventDB] = None
 
     def to_dict(self):
         return asdict(self)
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Optional, Sequence
+
+from eduid.userdb.scimapi import AsyncScimApiGroupDB
+
+logger = logging.getLogger(__name__)
+
+
+class GraphOutboxReconciler:
+    """
+    Background task applying pending group changes to the graph database, see AsyncScimApiGroupDB.
+
+    Pending changes are stored in the group documents in mongodb, so nothing is lost if the process is
+    restarted before they have been applied. Reconcilers in several API processes (and the read barrier, see
+    AsyncScimApiGroupDB.wait_for_graph_outbox) can run at the same time, a lease on every group keeps them
+    from applying the changes of a group concurrently.
+    """
+
+    def __init__(self, groupdbs: Sequence[AsyncScimApiGroupDB], interval: float = 1.0, batch_size: int = 100):
+        self.groupdbs = groupdbs
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Apply a batch of pending changes for every group database. Returns the number of applied changes."""
+        count = 0
+        for groupdb in self.groupdbs:
+            count += await groupdb.reconcile_graph_outbox(limit=self.batch_size)
+        return count
+
+    async def run(self) -> None:
+        while True:
+            try:
+                count = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed applying pending graph database changes")
+                count = 0
+            if count < self.batch_size:
+                # only sleep when there is no backlog
+                await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            logger.info(f"Starting graph outbox reconciler for {len(self.groupdbs)} group databases")
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Stopped graph outbox reconciler")
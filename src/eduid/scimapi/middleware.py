@@ -1,11 +1,14 @@
+import hashlib
 import json
 import logging
 import re
+import time
 from copy import copy
-from typing import List, Optional, Set
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from fastapi import Request, Response
-from jwcrypto import jwt
+from jwcrypto import jwk, jwt
 from jwcrypto.common import JWException
 from pydantic import BaseModel, Field, StrictInt, ValidationError, validator
 from starlette.datastructures import URL
@@ -13,6 +16,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import PlainTextResponse
 from starlette.types import Message
 
+from eduid.common.misc.cache import ExpiringCache
 from eduid.common.utils import removeprefix
 from eduid.scimapi.config import DataOwnerName, ScimApiConfig, ScopeName
 from eduid.scimapi.context import Context
@@ -136,6 +140,15 @@ class AuthnBearerToken(BaseModel):
         return _scopes
 
 
+@dataclass(frozen=True)
+class VerifiedBearerToken:
+    """A bearer token that has passed signature verification and claims validation"""
+
+    token: AuthnBearerToken
+    data_owner: DataOwnerName
+    jwks: jwk.JWKSet  # the key set used to verify the token
+
+
 # Hack to be able to get request body both now and later
 # https://github.com/encode/starlette/issues/495#issuecomment-513138055
 async def set_body(request: Request, body: bytes):
@@ -199,6 +212,12 @@ class AuthenticationMiddleware(BaseMiddleware):
         super().__init__(app, context)
         self.no_authn_urls = self.context.config.no_authn_urls
         self.context.logger.debug("No auth allow urls: {}".format(self.no_authn_urls))
+        self.token_cache: Optional[ExpiringCache[str, VerifiedBearerToken]] = None
+        if self.context.config.bearer_token_cache_ttl > 0 and self.context.config.bearer_token_cache_size > 0:
+            self.token_cache = ExpiringCache(
+                max_size=self.context.config.bearer_token_cache_size,
+                ttl=self.context.config.bearer_token_cache_ttl,
+            )
 
     def _is_no_auth_path(self, url: URL) -> bool:
         path = url.path
@@ -211,6 +230,53 @@ class AuthenticationMiddleware(BaseMiddleware):
                 return True
         return False
 
+    @staticmethod
+    def _token_cache_key(bearer_token: str) -> str:
+        return hashlib.sha256(bearer_token.encode("utf-8")).hexdigest()
+
+    def _get_cached_token(self, bearer_token: str) -> Optional[VerifiedBearerToken]:
+        if self.token_cache is None:
+            return None
+        key = self._token_cache_key(bearer_token)
+        verified = self.token_cache.get(key)
+        if verified is None:
+            return None
+        if verified.jwks is not self.context.jwks:
+            # The key set has been reloaded since the token was verified
+            self.context.logger.debug("Key set changed, discarding cached bearer token")
+            self.token_cache.pop(key)
+            return None
+        return verified
+
+    def _verify_signature(self, bearer_token: str) -> Tuple[Dict[str, Any], jwk.JWKSet]:
+        """
+        Verify the bearer token signature, and return the claims and the key set used to verify it.
+
+        If the token can't be verified, the keystore is reloaded (if it has changed) and the token verified again,
+        since the token might be signed with a key that has been added to the keystore after it was loaded.
+        """
+        _jwks = self.context.jwks
+        try:
+            _jwt = jwt.JWT()
+            _jwt.deserialize(bearer_token, _jwks)
+            return json.loads(_jwt.claims), _jwks
+        except JWException:
+            if not self.context.reload_jwks_if_changed():
+                raise
+        _jwks = self.context.jwks
+        _jwt = jwt.JWT()
+        _jwt.deserialize(bearer_token, _jwks)
+        return json.loads(_jwt.claims), _jwks
+
+    def _cache_token(self, bearer_token: str, verified: VerifiedBearerToken, claims: Dict[str, Any]) -> None:
+        if self.token_cache is None:
+            return None
+        ttl: Optional[float] = None
+        if isinstance(claims.get("exp"), (int, float)):
+            # Never cache a token past its expiry time
+            ttl = claims["exp"] - time.time()
+        self.token_cache.set(self._token_cache_key(bearer_token), verified, ttl=ttl)
+
     async def dispatch(self, req: Request, call_next) -> Response:
         req = self.make_context_request(req)
 
@@ -233,39 +299,45 @@ class AuthenticationMiddleware(BaseMiddleware):
             return await http_error_detail_handler(req=req, exc=Unauthorized(detail="No authentication header found"))
 
         _token = auth[len("Bearer ") :]
-        _jwt = jwt.JWT()
-        try:
-            _jwt.deserialize(_token, req.app.context.jwks)
-            claims = json.loads(_jwt.claims)
-        except (JWException, KeyError, ValueError) as e:
-            self.context.logger.info(f"Bearer token error: {e}")
-            return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
-
-        if "scim_config" in claims:
-            self.context.logger.warning(f"JWT has scim_config: {claims}")
-            return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
-
-        try:
-            self.context.logger.debug(f"Parsing claims: {claims}")
-            token = AuthnBearerToken(scim_config=self.context.config, **claims)
-            self.context.logger.debug(f"Bearer token: {token}")
-        except ValidationError:
-            self.context.logger.exception("Authorization Bearer Token error")
-            return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
-
-        try:
-            data_owner = token.get_data_owner(self.context.logger)
-        except RequestedAccessDenied as exc:
-            self.context.logger.error(f"Access denied: {exc}")
-            return await http_error_detail_handler(
-                req=req, exc=Unauthorized(detail="Data owner requested in access token denied")
-            )
-        self.context.logger.info(f"Bearer token {token}, data owner: {data_owner}")
-
-        if not data_owner or data_owner not in self.context.config.data_owners:
-            self.context.logger.error(f"Data owner {repr(data_owner)} not configured")
-            return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Unknown data_owner"))
-
+        verified = self._get_cached_token(_token)
+        if verified is not None:
+            self.context.logger.debug(f"Using cached bearer token {verified.token}")
+        else:
+            try:
+                claims, _jwks = self._verify_signature(_token)
+            except (JWException, KeyError, ValueError) as e:
+                self.context.logger.info(f"Bearer token error: {e}")
+                return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
+
+            if "scim_config" in claims:
+                self.context.logger.warning(f"JWT has scim_config: {claims}")
+                return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
+
+            try:
+                self.context.logger.debug(f"Parsing claims: {claims}")
+                token = AuthnBearerToken(scim_config=self.context.config, **claims)
+                self.context.logger.debug(f"Bearer token: {token}")
+            except ValidationError:
+                self.context.logger.exception("Authorization Bearer Token error")
+                return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Bearer token error"))
+
+            try:
+                data_owner = token.get_data_owner(self.context.logger)
+            except RequestedAccessDenied as exc:
+                self.context.logger.error(f"Access denied: {exc}")
+                return await http_error_detail_handler(
+                    req=req, exc=Unauthorized(detail="Data owner requested in access token denied")
+                )
+            self.context.logger.info(f"Bearer token {token}, data owner: {data_owner}")
+
+            if not data_owner or data_owner not in self.context.config.data_owners:
+                self.context.logger.error(f"Data owner {repr(data_owner)} not configured")
+                return await http_error_detail_handler(req=req, exc=Unauthorized(detail="Unknown data_owner"))
+
+            verified = VerifiedBearerToken(token=token, data_owner=data_owner, jwks=_jwks)
+            self._cache_token(_token, verified, claims)
+
+        data_owner = verified.data_owner
         req.context.data_owner = data_owner
         req.context.userdb = self.context.get_userdb(data_owner)
         req.context.groupdb = self.context.get_groupdb(data_owner)
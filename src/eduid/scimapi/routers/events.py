@@ -3,6 +3,7 @@ from datetime import timedelta
 from typing import Optional
 
 from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
 
 from eduid.common.models.scim_base import SCIMResourceType
 from eduid.scimapi.api_router import APIRouter
@@ -32,7 +33,7 @@ async def on_get(req: ContextRequest, resp: Response, scim_id: Optional[str] = N
     if scim_id is None:
         raise BadRequest(detail="Not implemented")
     req.app.context.logger.info(f"Fetching event {scim_id}")
-    db_event = req.context.eventdb.get_event_by_scim_id(scim_id)
+    db_event = await req.context.eventdb.get_event_by_scim_id(scim_id)
     if not db_event:
         raise NotFound(detail="Event not found")
     return db_event_to_response(req, resp, db_event)
@@ -83,7 +84,7 @@ async def on_post(req: ContextRequest, resp: Response, create_request: EventCrea
         if create_request.nutid_event_v1.timestamp < earliest_allowed:
             raise BadRequest(detail="timestamp is too old")
 
-    referenced = get_scim_referenced(req, create_request.nutid_event_v1.resource)
+    referenced = await get_scim_referenced(req, create_request.nutid_event_v1.resource)
     if not referenced:
         raise BadRequest(detail="referenced object not found")
 
@@ -106,15 +107,18 @@ async def on_post(req: ContextRequest, resp: Response, create_request: EventCrea
         expires_at=_expires_at,
         timestamp=_timestamp,
     )
-    req.context.eventdb.save(event)
+    await req.context.eventdb.save(event)
 
     # Send notification
     message = req.app.context.notification_relay.format_message(
         version=1, data={"location": req.app.context.resource_url(SCIMResourceType.EVENT, event.scim_id)}
     )
 
-    req.app.context.notification_relay.notify(
-        data_owner=req.context.data_owner, message=message, context=req.app.context
+    await run_in_threadpool(
+        req.app.context.notification_relay.notify,
+        data_owner=req.context.data_owner,
+        message=message,
+        context=req.app.context,
     )
 
     return db_event_to_response(req, resp, event)
@@ -8,11 +8,8 @@ from eduid.scimapi.models.group import GroupCreateRequest, GroupResponse, GroupU
 from eduid.scimapi.routers.utils.events import add_api_event
 from eduid.scimapi.routers.utils.groups import (
     db_group_to_response,
-    filter_display_name,
-    filter_extensions_data,
-    filter_lastmodified,
 )
-from eduid.scimapi.search import parse_search_filter
+from eduid.scimapi.search import GROUP_FILTER_COMPILER, parse_filter
 from eduid.userdb.scimapi import EventLevel, EventStatus
 
 groups_router = APIRouter(
@@ -28,7 +25,7 @@ groups_router = APIRouter(
 
 @groups_router.get("/", response_model=ListResponse)
 async def on_get_all(req: ContextRequest) -> ListResponse:
-    db_groups = req.context.groupdb.get_groups()
+    db_groups = await req.context.groupdb.get_groups()
     resources = []
     for db_group in db_groups:
         resources.append({"id": str(db_group.scim_id), "displayName": db_group.graph.display_name})
@@ -68,7 +65,7 @@ async def on_get_one(req: ContextRequest, resp: Response, scim_id: str) -> Group
     """
     req.app.context.logger.info(f"Fetching group {scim_id}")
 
-    db_group = req.context.groupdb.get_group_by_scim_id(scim_id)
+    db_group = await req.context.groupdb.get_group_by_scim_id(scim_id)
     req.app.context.logger.debug(f"Found group: {db_group}")
     if not db_group:
         raise NotFound(detail="Group not found")
@@ -136,7 +133,7 @@ async def on_put(
         raise BadRequest(detail="Id mismatch")
 
     req.app.context.logger.info(f"Fetching group {scim_id}")
-    db_group = req.context.groupdb.get_group_by_scim_id(str(update_request.id))
+    db_group = await req.context.groupdb.get_group_by_scim_id(str(update_request.id))
     req.app.context.logger.debug(f"Found group: {db_group}")
     if not db_group:
         raise NotFound(detail="Group not found")
@@ -149,22 +146,22 @@ async def on_put(
     req.app.context.logger.info(f"Checking if group and user members exists")
     for member in update_request.members:
         if member.is_group:
-            if not req.context.groupdb.group_exists(str(member.value)):
+            if not await req.context.groupdb.group_exists(str(member.value)):
                 req.app.context.logger.error(f"Group {member.value} not found")
                 raise BadRequest(detail=f"Group {member.value} not found")
         if member.is_user:
-            if not req.context.userdb.user_exists(scim_id=str(member.value)):
+            if not await req.context.userdb.user_exists(scim_id=str(member.value)):
                 req.app.context.logger.error(f"User {member.value} not found")
                 raise BadRequest(detail=f"User {member.value} not found")
 
-    updated_group, changed = req.context.groupdb.update_group(update_request=update_request, db_group=db_group)
+    updated_group, changed = await req.context.groupdb.update_group(update_request=update_request, db_group=db_group)
     # Load the group from the database to ensure results are consistent with subsequent GETs.
     # For example, timestamps have higher resolution in updated_group than after a load.
-    db_group = req.context.groupdb.get_group_by_scim_id(str(updated_group.scim_id))
+    db_group = await req.context.groupdb.get_group_by_scim_id(str(updated_group.scim_id))
     assert db_group  # please mypy
 
     if changed:
-        add_api_event(
+        await add_api_event(
             context=req.app.context,
             data_owner=req.context.data_owner,
             db_obj=db_group,
@@ -210,13 +207,13 @@ async def on_post(req: ContextRequest, resp: Response, create_request: GroupCrea
     """
     req.app.context.logger.info("Creating group")
     req.app.context.logger.debug(create_request)
-    created_group = req.context.groupdb.create_group(create_request=create_request)
+    created_group = await req.context.groupdb.create_group(create_request=create_request)
     # Load the group from the database to ensure results are consistent with subsequent GETs.
     # For example, timestamps have higher resolution in created_group than after a load.
-    db_group = req.context.groupdb.get_group_by_scim_id(str(created_group.scim_id))
+    db_group = await req.context.groupdb.get_group_by_scim_id(str(created_group.scim_id))
     assert db_group  # please mypy
 
-    add_api_event(
+    await add_api_event(
         context=req.app.context,
         data_owner=req.context.data_owner,
         db_obj=db_group,
@@ -238,7 +235,7 @@ async def on_post(req: ContextRequest, resp: Response, create_request: GroupCrea
 )
 async def on_delete(req: ContextRequest, scim_id: str) -> None:
     req.app.context.logger.info(f"Deleting group {scim_id}")
-    db_group = req.context.groupdb.get_group_by_scim_id(scim_id=scim_id)
+    db_group = await req.context.groupdb.get_group_by_scim_id(scim_id=scim_id)
     req.app.context.logger.debug(f"Found group: {db_group}")
     if not db_group:
         raise NotFound(detail="Group not found")
@@ -247,9 +244,9 @@ async def on_delete(req: ContextRequest, scim_id: str) -> None:
     if not req.app.context.check_version(req, db_group):
         raise BadRequest(detail="Version mismatch")
 
-    res = req.context.groupdb.remove_group(db_group)
+    res = await req.context.groupdb.remove_group(db_group)
 
-    add_api_event(
+    await add_api_event(
         context=req.app.context,
         data_owner=req.context.data_owner,
         db_obj=db_group,
@@ -290,16 +287,10 @@ async def search(req: ContextRequest, query: SearchRequest) -> ListResponse:
     }
     """
     req.app.context.logger.info("Searching for group(s)")
-    _filter = parse_search_filter(query.filter)
-
-    if _filter.attr == "displayname":
-        groups, total_count = filter_display_name(req, _filter, skip=query.start_index - 1, limit=query.count)
-    elif _filter.attr == "meta.lastmodified":
-        groups, total_count = filter_lastmodified(req, _filter, skip=query.start_index - 1, limit=query.count)
-    elif _filter.attr.startswith("extensions.data."):
-        groups, total_count = filter_extensions_data(req, _filter, skip=query.start_index - 1, limit=query.count)
-    else:
-        raise BadRequest(scim_type="invalidFilter", detail=f"Can't filter on attribute {_filter.attr}")
+    spec = GROUP_FILTER_COMPILER.compile(parse_filter(query.filter))
+    req.app.context.logger.debug(f"Compiled group search filter: {spec}")
+    # SCIM start_index 1 equals item 0
+    groups, total_count = await req.context.groupdb.search_groups(spec, skip=query.start_index - 1, limit=query.count)
 
     resources = []
     for this in groups:
@@ -3,6 +3,7 @@ from dataclasses import replace
 from typing import Optional
 
 from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
 
 from eduid.common.models.scim_base import ListResponse, SCIMResourceType, SearchRequest
 from eduid.common.models.scim_invite import InviteCreateRequest, InviteResponse, InviteUpdateRequest
@@ -14,12 +15,11 @@ from eduid.scimapi.routers.utils.invites import (
     create_signup_invite,
     create_signup_ref,
     db_invite_to_response,
-    filter_lastmodified,
     invites_to_resources_dicts,
     save_invite,
     send_invite_mail,
 )
-from eduid.scimapi.search import parse_search_filter
+from eduid.scimapi.search import INVITE_FILTER_COMPILER, parse_filter
 from eduid.userdb.scimapi import EventLevel, EventStatus, ScimApiEmail, ScimApiName, ScimApiPhoneNumber, ScimApiProfile
 from eduid.userdb.scimapi.invitedb import ScimApiInvite
 
@@ -41,11 +41,11 @@ async def on_get(req: ContextRequest, resp: Response, scim_id: Optional[str] = N
     if scim_id is None:
         raise BadRequest(detail="Not implemented")
     req.app.context.logger.info(f"Fetching invite {scim_id}")
-    db_invite = req.context.invitedb.get_invite_by_scim_id(scim_id)
+    db_invite = await req.context.invitedb.get_invite_by_scim_id(scim_id)
     if not db_invite:
         raise NotFound(detail="Invite not found")
     ref = create_signup_ref(req, db_invite)
-    signup_invite = req.app.context.signup_invitedb.get_invite_by_reference(ref)
+    signup_invite = await run_in_threadpool(req.app.context.signup_invitedb.get_invite_by_reference, ref)
     if signup_invite is None:
         raise NotFound(detail="Invite reference not found")
     return db_invite_to_response(req, resp, db_invite, signup_invite)
@@ -61,11 +61,11 @@ async def on_put(
         raise BadRequest(detail="Id mismatch")
 
     req.app.context.logger.info(f"Updating invite {scim_id}")
-    db_invite = req.context.invitedb.get_invite_by_scim_id(scim_id)
+    db_invite = await req.context.invitedb.get_invite_by_scim_id(scim_id)
     if not db_invite:
         raise NotFound(detail="Invite not found")
     ref = create_signup_ref(req, db_invite)
-    signup_invite = req.app.context.signup_invitedb.get_invite_by_reference(ref)
+    signup_invite = await run_in_threadpool(req.app.context.signup_invitedb.get_invite_by_reference, ref)
     if signup_invite is None:
         raise NotFound(detail="Invite reference not found")
 
@@ -150,8 +150,8 @@ async def on_put(
     #             db_invite.profiles[profile_name] = db_profile
 
     if invite_changed or profiles_changed:
-        save_invite(req, db_invite=db_invite, signup_invite=signup_invite)
-        add_api_event(
+        await save_invite(req, db_invite=db_invite, signup_invite=signup_invite)
+        await add_api_event(
             context=req.app.context,
             data_owner=req.context.data_owner,
             db_obj=db_invite,
@@ -228,11 +228,11 @@ async def on_post(req: ContextRequest, resp: Response, create_request: InviteCre
         profiles=profiles,
     )
     signup_invite = create_signup_invite(req, create_request, db_invite)
-    save_invite(req, db_invite=db_invite, signup_invite=signup_invite)
+    await save_invite(req, db_invite=db_invite, signup_invite=signup_invite)
     if signup_invite.send_email:
-        send_invite_mail(req, signup_invite)
+        await send_invite_mail(req, signup_invite)
 
-    add_api_event(
+    await add_api_event(
         context=req.app.context,
         data_owner=req.context.data_owner,
         db_obj=db_invite,
@@ -249,7 +249,7 @@ async def on_post(req: ContextRequest, resp: Response, create_request: InviteCre
 @invites_router.delete("/{scim_id}", status_code=204, responses={204: {"description": "No Content"}})
 async def on_delete(req: ContextRequest, scim_id: str) -> None:
     req.app.context.logger.info(f"Deleting invite {scim_id}")
-    db_invite = req.context.invitedb.get_invite_by_scim_id(scim_id=scim_id)
+    db_invite = await req.context.invitedb.get_invite_by_scim_id(scim_id=scim_id)
     req.app.context.logger.debug(f"Found invite: {db_invite}")
 
     if not db_invite:
@@ -261,14 +261,14 @@ async def on_delete(req: ContextRequest, scim_id: str) -> None:
 
     # Remove signup invite
     ref = create_signup_ref(req, db_invite)
-    signup_invite = req.app.context.signup_invitedb.get_invite_by_reference(ref)
+    signup_invite = await run_in_threadpool(req.app.context.signup_invitedb.get_invite_by_reference, ref)
     if signup_invite:
-        req.app.context.signup_invitedb.remove_document(signup_invite.invite_id)
+        await run_in_threadpool(req.app.context.signup_invitedb.remove_document, signup_invite.invite_id)
 
     # Remove scim invite
-    res = req.context.invitedb.remove(db_invite)
+    res = await req.context.invitedb.remove(db_invite)
 
-    add_api_event(
+    await add_api_event(
         context=req.app.context,
         data_owner=req.context.data_owner,
         db_obj=db_invite,
@@ -316,12 +316,11 @@ async def search(req: ContextRequest, query: SearchRequest) -> ListResponse:
     req.app.context.logger.info(f"Searching for invite(s)")
     req.app.context.logger.debug(f"Parsed invite search query: {query}")
 
-    filter = parse_search_filter(query.filter)
-
-    if filter.attr == "meta.lastmodified":
-        # SCIM start_index 1 equals item 0
-        users, total_count = filter_lastmodified(req, filter, skip=query.start_index - 1, limit=query.count)
-    else:
-        raise BadRequest(scim_type="invalidFilter", detail=f"Can't filter on attribute {filter.attr}")
+    spec = INVITE_FILTER_COMPILER.compile(parse_filter(query.filter))
+    req.app.context.logger.debug(f"Compiled invite search filter: {spec}")
+    # SCIM start_index 1 equals item 0
+    invites, total_count = await req.context.invitedb.search_invites(
+        spec, skip=query.start_index - 1, limit=query.count
+    )
 
-    return ListResponse(resources=invites_to_resources_dicts(query, users), total_results=total_count)
+    return ListResponse(resources=invites_to_resources_dicts(query, invites), total_results=total_count)
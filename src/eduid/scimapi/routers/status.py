@@ -25,7 +25,7 @@ async def healthy(req: ContextRequest, resp: Response) -> Mapping:
             "status": f"STATUS_FAIL_{req.app.context.name}_",
             "hostname": environ.get("HOSTNAME", "UNKNOWN"),
         }
-        if not check_mongo(req, default_data_owner):
+        if not await check_mongo(req, default_data_owner):
             res["reason"] = "mongodb check failed"
             req.app.context.logger.warning("mongodb check failed")
         elif not check_neo4j(req, default_data_owner):
@@ -1,24 +1,25 @@
 import pprint
 from dataclasses import replace
-from typing import Optional
+from typing import Optional, Union
 
-from fastapi import Response
+from fastapi import Query, Response
+from fastapi.responses import JSONResponse
 
 from eduid.common.models.scim_base import ListResponse, SCIMResourceType, SCIMSchema, SearchRequest
 from eduid.common.models.scim_user import UserCreateRequest, UserResponse, UserUpdateRequest
 from eduid.scimapi.api_router import APIRouter
+from eduid.scimapi.attributes import USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS, AttributeSelection
 from eduid.scimapi.context_request import ContextRequest, ContextRequestRoute
 from eduid.scimapi.exceptions import BadRequest, ErrorDetail, NotFound
 from eduid.scimapi.routers.utils.events import add_api_event
 from eduid.scimapi.routers.utils.users import (
     acceptable_linked_accounts,
     db_user_to_response,
-    filter_externalid,
-    filter_lastmodified,
     save_user,
+    user_response_to_dict,
     users_to_resources_dicts,
 )
-from eduid.scimapi.search import parse_search_filter
+from eduid.scimapi.search import USER_FILTER_COMPILER, parse_filter
 from eduid.userdb.scimapi import (
     EventLevel,
     EventStatus,
@@ -41,15 +42,40 @@ users_router = APIRouter(
 
 
 @users_router.get("/{scim_id}", response_model=UserResponse, response_model_exclude_none=True)
-async def on_get(req: ContextRequest, resp: Response, scim_id: Optional[str] = None) -> UserResponse:
+async def on_get(
+    req: ContextRequest,
+    resp: Response,
+    scim_id: Optional[str] = None,
+    attributes: Optional[str] = None,
+    excluded_attributes: Optional[str] = Query(default=None, alias="excludedAttributes"),
+) -> Union[UserResponse, JSONResponse]:
+    """
+    GET /Users/{scim_id}?attributes=name.givenName,emails
+    Host: scim.eduid.se
+    Accept: application/scim+json
+
+    The attributes and excludedAttributes parameters are comma separated lists of attribute names (RFC 7644 3.9).
+    """
     if scim_id is None:
         raise BadRequest(detail="Not implemented")
     req.app.context.logger.info(f"Fetching user {scim_id}")
-    db_user = req.context.userdb.get_user_by_scim_id(scim_id)
+    selection = AttributeSelection.from_request(
+        SCIMSchema.CORE_20_USER,
+        attributes=attributes.split(",") if attributes else None,
+        excluded_attributes=excluded_attributes.split(",") if excluded_attributes else None,
+    )
+    fields = None
+    if selection is not None:
+        fields = selection.mongo_projection(USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS)
+    db_user = await req.context.userdb.get_user_by_scim_id(scim_id, fields=fields)
     if not db_user:
         raise NotFound(detail="User not found")
 
-    return db_user_to_response(req=req, resp=resp, db_user=db_user)
+    user = await db_user_to_response(req=req, resp=resp, db_user=db_user, attributes=selection)
+    if selection is None:
+        return user
+    # Return the pruned resource as is, so that it doesn't get filled in with defaults by the response model
+    return JSONResponse(content=user_response_to_dict(user, selection), headers=dict(resp.headers))
 
 
 @users_router.put("/{scim_id}", response_model=UserResponse, response_model_exclude_none=True)
@@ -61,7 +87,7 @@ async def on_put(req: ContextRequest, resp: Response, update_request: UserUpdate
         req.app.context.logger.debug(f"{scim_id} != {update_request.id}")
         raise BadRequest(detail="Id mismatch")
 
-    db_user = req.context.userdb.get_user_by_scim_id(scim_id)
+    db_user = await req.context.userdb.get_user_by_scim_id(scim_id)
     if not db_user:
         raise NotFound(detail="User not found")
 
@@ -141,8 +167,8 @@ async def on_put(req: ContextRequest, resp: Response, update_request: UserUpdate
 
     req.app.context.logger.debug(f"Core changed: {core_changed}, nutid_changed: {nutid_changed}")
     if core_changed or nutid_changed:
-        save_user(req, db_user)
-        add_api_event(
+        await save_user(req, db_user)
+        await add_api_event(
             context=req.app.context,
             data_owner=req.context.data_owner,
             db_obj=db_user,
@@ -154,7 +180,7 @@ async def on_put(req: ContextRequest, resp: Response, update_request: UserUpdate
     else:
         req.app.context.logger.info(f"No changes detected")
 
-    return db_user_to_response(req=req, resp=resp, db_user=db_user)
+    return await db_user_to_response(req=req, resp=resp, db_user=db_user)
 
 
 @users_router.post("/", response_model=UserResponse, response_model_exclude_none=True)
@@ -235,8 +261,8 @@ async def on_post(req: ContextRequest, resp: Response, create_request: UserCreat
         linked_accounts=linked_accounts,
     )
 
-    save_user(req, db_user)
-    add_api_event(
+    await save_user(req, db_user)
+    await add_api_event(
         context=req.app.context,
         data_owner=req.context.data_owner,
         db_obj=db_user,
@@ -246,7 +272,7 @@ async def on_post(req: ContextRequest, resp: Response, create_request: UserCreat
         message="User was created",
     )
 
-    user = db_user_to_response(req=req, resp=resp, db_user=db_user)
+    user = await db_user_to_response(req=req, resp=resp, db_user=db_user)
     resp.status_code = 201
     return user
 
@@ -260,7 +286,7 @@ async def search(req: ContextRequest, query: SearchRequest) -> ListResponse:
 
     {
       "schemas": ["urn:ietf:params:scim:api:messages:2.0:SearchRequest"],
-      "attributes": ["givenName", "familyName"],
+      "attributes": ["name.givenName", "name.familyName"],
       "filter": "id eq \"takaj-jorar\"",
       "startIndex": 1,
       "count": 1
@@ -279,8 +305,12 @@ async def search(req: ContextRequest, query: SearchRequest) -> ListResponse:
       "startIndex": 1,
       "Resources": [
         {
-          "givenName": "Kim",
-          "familyName": "Svensson"
+          "id": "takaj-jorar",
+          "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+          "name": {
+            "givenName": "Kim",
+            "familyName": "Svensson"
+          }
         }
       ]
     }
@@ -288,15 +318,18 @@ async def search(req: ContextRequest, query: SearchRequest) -> ListResponse:
     req.app.context.logger.info(f"Searching for users(s)")
     req.app.context.logger.debug(f"Parsed user search query: {query}")
 
-    filter = parse_search_filter(query.filter)
-
-    if filter.attr == "externalid":
-        users = filter_externalid(req, filter)
-        total_count = len(users)
-    elif filter.attr == "meta.lastmodified":
-        # SCIM start_index 1 equals item 0
-        users, total_count = filter_lastmodified(req, filter, skip=query.start_index - 1, limit=query.count)
-    else:
-        raise BadRequest(scim_type="invalidFilter", detail=f"Can't filter on attribute {filter.attr}")
+    spec = USER_FILTER_COMPILER.compile(parse_filter(query.filter))
+    req.app.context.logger.debug(f"Compiled user search filter: {spec}")
+    selection = AttributeSelection.from_request(
+        SCIMSchema.CORE_20_USER, attributes=query.attributes, excluded_attributes=query.excluded_attributes
+    )
+    fields = None
+    if selection is not None:
+        fields = selection.mongo_projection(USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS)
+    # SCIM start_index 1 equals item 0
+    users, total_count = await req.context.userdb.search_users(
+        spec, skip=query.start_index - 1, limit=query.count, fields=fields
+    )
 
-    return ListResponse(resources=users_to_resources_dicts(query, users), total_results=total_count)
+    resources = await users_to_resources_dicts(req, users, attributes=selection)
+    return ListResponse(resources=resources, total_results=total_count)
@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING, Optional
 from uuid import uuid4
 
 from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
 
 from eduid.common.models.scim_base import Meta, SCIMResourceType, SCIMSchema, WeakVersion
 from eduid.common.utils import urlappend
@@ -60,19 +61,19 @@ def db_event_to_response(req: ContextRequest, resp: Response, db_event: ScimApiE
     return event_response
 
 
-def get_scim_referenced(req: ContextRequest, resource: NutidEventResource) -> Optional[ScimApiResourceBase]:
+async def get_scim_referenced(req: ContextRequest, resource: NutidEventResource) -> Optional[ScimApiResourceBase]:
     if resource.resource_type == SCIMResourceType.USER:
-        return req.context.userdb.get_user_by_scim_id(str(resource.scim_id))
+        return await req.context.userdb.get_user_by_scim_id(str(resource.scim_id))
     elif resource.resource_type == SCIMResourceType.GROUP:
-        return req.context.groupdb.get_group_by_scim_id(str(resource.scim_id))
+        return await req.context.groupdb.get_group_by_scim_id(str(resource.scim_id))
     elif resource.resource_type == SCIMResourceType.INVITE:
-        return req.context.invitedb.get_invite_by_scim_id(str(resource.scim_id))
+        return await req.context.invitedb.get_invite_by_scim_id(str(resource.scim_id))
     elif resource.resource_type == SCIMResourceType.EVENT:
         raise BadRequest(detail=f"Events can not refer to other events")
     raise BadRequest(detail=f"Events for resource {resource.resource_type.value} not implemented")
 
 
-def add_api_event(
+async def add_api_event(
     data_owner: DataOwnerName,
     context: "Context",
     db_obj: ScimApiResourceBase,
@@ -101,11 +102,11 @@ def add_api_event(
     )
     event_db = context.get_eventdb(data_owner=data_owner)
     assert event_db  # please mypy
-    event_db.save(_event)
+    await event_db.save(_event)
 
     # Send notification
     event_location = urlappend(context.base_url, f"Events/{_event.scim_id}")
     message = context.notification_relay.format_message(version=1, data={"location": event_location})
-    context.notification_relay.notify(data_owner=data_owner, message=message, context=context)
+    await run_in_threadpool(context.notification_relay.notify, data_owner=data_owner, message=message, context=context)
 
     return None
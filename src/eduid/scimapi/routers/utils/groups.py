@@ -1,17 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import re
-from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import List
 from uuid import UUID
 
 from fastapi import Request, Response
 
 from eduid.common.models.scim_base import Meta, SCIMResourceType, SCIMSchema
 from eduid.scimapi.context_request import ContextRequest
-from eduid.scimapi.exceptions import BadRequest
 from eduid.scimapi.models.group import GroupMember, GroupResponse, NutidGroupExtensionV1
-from eduid.scimapi.search import SearchFilter
 from eduid.scimapi.utils import make_etag
 from eduid.userdb.scimapi import ScimApiGroup
 
@@ -62,59 +58,3 @@ def db_group_to_response(req: ContextRequest, resp: Response, db_group: ScimApiG
     #    del dumped_group[SCIMSchema.NUTID_GROUP_V1.value]
     req.app.context.logger.debug(f"Extra debug: Response:\n{group.json(exclude_none=True, indent=2)}")
     return group
-
-
-def filter_display_name(
-    req: ContextRequest,
-    filter: SearchFilter,
-    skip: Optional[int] = None,
-    limit: Optional[int] = None,
-) -> Tuple[List[ScimApiGroup], int]:
-    if filter.op != "eq":
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-    if not isinstance(filter.val, str):
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid displayName")
-
-    req.app.context.logger.debug(f"Searching for group with display name {repr(filter.val)}")
-    groups, count = req.context.groupdb.get_groups_by_property(
-        key="display_name", value=filter.val, skip=skip, limit=limit
-    )
-
-    if not groups:
-        return [], 0
-
-    return groups, count
-
-
-def filter_lastmodified(
-    req: ContextRequest, filter: SearchFilter, skip: Optional[int] = None, limit: Optional[int] = None
-) -> Tuple[List[ScimApiGroup], int]:
-    if filter.op not in ["gt", "ge"]:
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-    if not isinstance(filter.val, str):
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
-    try:
-        _parsed = datetime.fromisoformat(filter.val)
-    except:
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
-    return req.context.groupdb.get_groups_by_last_modified(operator=filter.op, value=_parsed, skip=skip, limit=limit)
-
-
-def filter_extensions_data(
-    req: ContextRequest,
-    filter: SearchFilter,
-    skip: Optional[int] = None,
-    limit: Optional[int] = None,
-) -> Tuple[List[ScimApiGroup], int]:
-    if filter.op != "eq":
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-
-    match = re.match(r"^extensions\.data\.([a-z_]+)$", filter.attr)
-    if not match:
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported extension search key")
-
-    req.app.context.logger.debug(f"Searching for groups with {filter.attr} {filter.op} {repr(filter.val)}")
-    groups, count = req.context.groupdb.get_groups_by_property(
-        key=filter.attr, value=filter.val, skip=skip, limit=limit
-    )
-    return groups, count
@@ -2,9 +2,10 @@
 from dataclasses import asdict
 from datetime import datetime, timedelta
 from os import environ
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Sequence
 
 from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pymongo.errors import DuplicateKeyError
 
 from eduid.common.models.scim_base import Email, Meta, Name, PhoneNumber, SCIMResourceType, SCIMSchema, SearchRequest
@@ -14,7 +15,6 @@ from eduid.queue.db import QueueItem, SenderInfo
 from eduid.queue.db.message import EduidInviteEmail
 from eduid.scimapi.context_request import ContextRequest
 from eduid.scimapi.exceptions import BadRequest
-from eduid.scimapi.search import SearchFilter
 from eduid.scimapi.utils import get_short_hash, get_unique_hash, make_etag
 from eduid.userdb.scimapi.invitedb import ScimApiInvite
 from eduid.userdb.signup import Invite as SignupInvite
@@ -115,7 +115,7 @@ def create_signup_ref(req: ContextRequest, db_invite: ScimApiInvite):
     return SCIMReference(data_owner=req.context.data_owner, scim_id=db_invite.scim_id)
 
 
-def send_invite_mail(req: ContextRequest, signup_invite: SignupInvite):
+async def send_invite_mail(req: ContextRequest, signup_invite: SignupInvite):
     try:
         email = [email.email for email in signup_invite.mail_addresses if email.primary][0]
     except IndexError:
@@ -144,7 +144,7 @@ def send_invite_mail(req: ContextRequest, signup_invite: SignupInvite):
         payload_type=payload.get_type(),
         payload=payload,
     )
-    req.app.context.messagedb.save(message)
+    await run_in_threadpool(req.app.context.messagedb.save, message)
     req.app.context.logger.info(f"Saved invite email to address {email} in message queue")
     return True
 
@@ -155,9 +155,9 @@ def invites_to_resources_dicts(query: SearchRequest, invites: Sequence[ScimApiIn
     return [{"id": str(invite.scim_id)} for invite in invites]
 
 
-def save_invite(req: ContextRequest, db_invite: ScimApiInvite, signup_invite: SignupInvite) -> None:
+async def save_invite(req: ContextRequest, db_invite: ScimApiInvite, signup_invite: SignupInvite) -> None:
     try:
-        req.context.invitedb.save(db_invite)
+        await req.context.invitedb.save(db_invite)
     except DuplicateKeyError as e:
         assert e.details is not None  # please mypy
         if "external-id" in e.details["errmsg"]:
@@ -165,21 +165,9 @@ def save_invite(req: ContextRequest, db_invite: ScimApiInvite, signup_invite: Si
         raise BadRequest(detail="Duplicated key error")
 
     try:
-        req.app.context.signup_invitedb.save(signup_invite)
+        await run_in_threadpool(req.app.context.signup_invitedb.save, signup_invite)
     except DuplicateKeyError as e:
         assert e.details is not None  # please mypy
         if "invite_code" in e.details["errmsg"]:
             raise BadRequest(detail="invite_code must be unique")
         raise BadRequest(detail="Duplicated key error")
-
-
-def filter_lastmodified(
-    req: ContextRequest, filter: SearchFilter, skip: Optional[int] = None, limit: Optional[int] = None
-) -> Tuple[List[ScimApiInvite], int]:
-    if filter.op not in ["gt", "ge"]:
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-    if not isinstance(filter.val, str):
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
-    return req.context.invitedb.get_invites_by_last_modified(
-        operator=filter.op, value=datetime.fromisoformat(filter.val), skip=skip, limit=limit
-    )
@@ -93,12 +93,12 @@ def set_cached_response(req: ContextRequest, resp: Response, key: str, data: Map
         req.app.context.logger.debug(f"Cached response for {key} until {expires}")
 
 
-def check_mongo(req: ContextRequest, default_data_owner: str):
+async def check_mongo(req: ContextRequest, default_data_owner: str):
     user_db = req.app.context.get_userdb(default_data_owner)
     group_db = req.app.context.get_groupdb(default_data_owner)
     try:
-        user_db.is_healthy()
-        group_db.is_healthy()
+        await user_db.is_healthy()
+        await group_db.is_healthy()
         reset_failure_info(req, "_check_mongo")
         return True
     except Exception as exc:
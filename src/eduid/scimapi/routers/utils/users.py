@@ -1,30 +1,63 @@
+import json
 from dataclasses import asdict
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
 
 from fastapi import Response
 from pymongo.errors import DuplicateKeyError
 
-from eduid.common.models.scim_base import Email, Meta, Name, PhoneNumber, SCIMResourceType, SCIMSchema, SearchRequest
+from eduid.common.models.scim_base import Email, Meta, Name, PhoneNumber, SCIMResourceType, SCIMSchema
 from eduid.common.models.scim_user import Group, LinkedAccount, NutidUserExtensionV1, Profile, UserResponse
+from eduid.graphdb.groupdb import Group as GraphGroup
+from eduid.scimapi.attributes import AttributeSelection
 from eduid.scimapi.context_request import ContextRequest
 from eduid.scimapi.exceptions import BadRequest
-from eduid.scimapi.search import SearchFilter
 from eduid.scimapi.utils import make_etag
 from eduid.userdb.scimapi.userdb import ScimApiUser
 
 
-def get_user_groups(req: ContextRequest, db_user: ScimApiUser) -> List[Group]:
-    """Return the groups for a user formatted as SCIM search sub-resources"""
-    user_groups = req.context.groupdb.get_groups_for_user_identifer(db_user.scim_id)
+def _graph_groups_to_response(req: ContextRequest, user_groups: Sequence[GraphGroup]) -> List[Group]:
     groups = []
     for group in user_groups:
-        ref = req.app.context.url_for("Groups", group.scim_id)
-        groups.append(Group(value=group.scim_id, ref=ref, display=group.display_name))
+        ref = req.app.context.url_for("Groups", group.identifier)
+        groups.append(Group(value=UUID(group.identifier), ref=ref, display=group.display_name))
     return groups
 
 
-def db_user_to_response(req: ContextRequest, resp: Response, db_user: ScimApiUser) -> UserResponse:
+async def get_user_groups(req: ContextRequest, db_user: ScimApiUser) -> List[Group]:
+    """Return the groups for a user formatted as SCIM search sub-resources"""
+    user_groups = await req.context.groupdb.get_groups_for_user_identifiers([db_user.scim_id])
+    return _graph_groups_to_response(req, user_groups.get(db_user.scim_id, []))
+
+
+async def get_users_groups(req: ContextRequest, users: Sequence[ScimApiUser]) -> Dict[UUID, List[Group]]:
+    """Return the groups for many users formatted as SCIM search sub-resources, using a single graph query"""
+    user_groups = await req.context.groupdb.get_groups_for_user_identifiers([x.scim_id for x in users])
+    return {x.scim_id: _graph_groups_to_response(req, user_groups.get(x.scim_id, [])) for x in users}
+
+
+async def db_user_to_response(
+    req: ContextRequest, resp: Response, db_user: ScimApiUser, attributes: Optional[AttributeSelection] = None
+) -> UserResponse:
+    """
+    :param attributes: The attributes the client asked for. Group memberships are only looked up if requested.
+    """
+    user = await make_user_response(req=req, db_user=db_user, attributes=attributes)
+    resp.headers["Location"] = user.meta.location
+    resp.headers["ETag"] = make_etag(db_user.version)
+    req.app.context.logger.debug(f"Extra debug: Response:\n{user.json(exclude_none=True, indent=2)}")
+    return user
+
+
+async def make_user_response(
+    req: ContextRequest,
+    db_user: ScimApiUser,
+    attributes: Optional[AttributeSelection] = None,
+    groups: Optional[List[Group]] = None,
+) -> UserResponse:
+    """
+    :param groups: The users groups, if they have already been looked up
+    """
     location = req.app.context.url_for("Users", db_user.scim_id)
     meta = Meta(
         location=location,
@@ -48,28 +81,28 @@ def db_user_to_response(req: ContextRequest, resp: Response, db_user: ScimApiUse
         ]
         nutid_user_v1 = NutidUserExtensionV1(profiles=_profiles, linked_accounts=_linked_accounts)
 
-    user = UserResponse(
+    if groups is None:
+        groups = []
+        if attributes is None or attributes.is_requested("groups"):
+            groups = await get_user_groups(req=req, db_user=db_user)
+
+    return UserResponse(
         id=db_user.scim_id,
         external_id=db_user.external_id,
         name=Name(**asdict(db_user.name)),
         emails=[Email(**asdict(email)) for email in db_user.emails],
         phone_numbers=[PhoneNumber(**asdict(number)) for number in db_user.phone_numbers],
         preferred_language=db_user.preferred_language,
-        groups=get_user_groups(req=req, db_user=db_user),
+        groups=groups,
         meta=meta,
         schemas=schemas,  # extra list() needed to work with _both_ mypy and marshmallow
         nutid_user_v1=nutid_user_v1,
     )
 
-    resp.headers["Location"] = location
-    resp.headers["ETag"] = make_etag(db_user.version)
-    req.app.context.logger.debug(f"Extra debug: Response:\n{user.json(exclude_none=True, indent=2)}")
-    return user
-
 
-def save_user(req: ContextRequest, db_user: ScimApiUser) -> None:
+async def save_user(req: ContextRequest, db_user: ScimApiUser) -> None:
     try:
-        req.context.userdb.save(db_user)
+        await req.context.userdb.save(db_user)
     except DuplicateKeyError as e:
         assert e.details is not None  # please mypy
         if "external-id" in e.details["errmsg"]:
@@ -95,33 +128,25 @@ def acceptable_linked_accounts(value: List[LinkedAccount]):
     return True
 
 
-def users_to_resources_dicts(query: SearchRequest, users: Sequence[ScimApiUser]) -> List[Dict[str, Any]]:
-    _attributes = query.attributes
-    # TODO: include the requested attributes, not just id
-    return [{"id": str(user.scim_id)} for user in users]
-
-
-def filter_externalid(req: ContextRequest, filter: SearchFilter) -> List[ScimApiUser]:
-    if filter.op != "eq":
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-    if not isinstance(filter.val, str):
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid externalId")
-
-    user = req.context.userdb.get_user_by_external_id(filter.val)
-
-    if not user:
-        return []
-
-    return [user]
-
-
-def filter_lastmodified(
-    req: ContextRequest, filter: SearchFilter, skip: Optional[int] = None, limit: Optional[int] = None
-) -> Tuple[List[ScimApiUser], int]:
-    if filter.op not in ["gt", "ge"]:
-        raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
-    if not isinstance(filter.val, str):
-        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
-    return req.context.userdb.get_users_by_last_modified(
-        operator=filter.op, value=datetime.fromisoformat(filter.val), skip=skip, limit=limit
-    )
+def user_response_to_dict(user: UserResponse, attributes: Optional[AttributeSelection] = None) -> Dict[str, Any]:
+    """Serialise a user response, with only the attributes the client asked for"""
+    res = json.loads(user.json(exclude_none=True, by_alias=True))
+    if attributes is not None:
+        res = attributes.apply(res)
+    return res
+
+
+async def users_to_resources_dicts(
+    req: ContextRequest, users: Sequence[ScimApiUser], attributes: Optional[AttributeSelection] = None
+) -> List[Dict[str, Any]]:
+    groups: Dict[UUID, List[Group]] = {}
+    if attributes is None or attributes.is_requested("groups"):
+        # look up the group memberships for all the users at once
+        groups = await get_users_groups(req=req, users=users)
+    res = []
+    for db_user in users:
+        user = await make_user_response(
+            req=req, db_user=db_user, attributes=attributes, groups=groups.get(db_user.scim_id, [])
+        )
+        res.append(user_response_to_dict(user, attributes))
+    return res
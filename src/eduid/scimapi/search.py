@@ -1,44 +1,442 @@
+"""
+Parser for SCIM search filters (RFC 7644, section 3.4.2.2), and compilation of parsed filters into mongodb queries.
+
+Only attributes that are backed by an index in the database can be searched on, to make sure that a search
+request can't make the database scan a whole collection. Every resource type has its own whitelist of searchable
+attributes, see USER_FILTER_COMPILER, GROUP_FILTER_COMPILER and INVITE_FILTER_COMPILER below.
+
+The operators ne, co and ew and the not operator can't be served using an index (co and ew compile to unanchored
+regular expressions), so they are only allowed together ("and") with an expression that can.
+"""
+import json
 import logging
 import re
 from dataclasses import dataclass
-from typing import Union
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
 
+from eduid.common.models.scim_base import SCIMSchema
 from eduid.scimapi.exceptions import BadRequest
 
 logger = logging.getLogger(__name__)
 
+MAX_FILTER_LENGTH = 1024
+MAX_FILTER_DEPTH = 10
+MAX_FILTER_EXPRESSIONS = 32
+
+FilterValue = Union[str, int, float, bool, None]
+
+COMPARISON_OPERATORS = frozenset(["eq", "ne", "co", "sw", "ew", "gt", "ge", "lt", "le"])
+STRING_OPERATORS = frozenset(["eq", "ne", "co", "sw", "ew", "pr"])
+ORDERING_OPERATORS = frozenset(["eq", "ne", "gt", "ge", "lt", "le", "pr"])
+ALL_OPERATORS = COMPARISON_OPERATORS | {"pr"}
+# Operators that compile to queries that can use an index
+INDEXED_OPERATORS = frozenset(["eq", "sw", "gt", "ge", "lt", "le", "pr"])
+
 
-@dataclass
-class SearchFilter(object):
+@dataclass(frozen=True)
+class AttributePath:
     attr: str
+    schema: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self.schema:
+            return f"{self.schema}:{self.attr}"
+        return self.attr
+
+
+@dataclass(frozen=True)
+class AttributeExpression:
+    path: AttributePath
     op: str
-    val: Union[str, int]
+    value: FilterValue = None
+
+    def __str__(self) -> str:
+        if self.op == "pr":
+            return f"{self.path} pr"
+        return f"{self.path} {self.op} {_format_value(self.value)}"
+
+
+@dataclass(frozen=True)
+class LogicalExpression:
+    op: str  # "and" or "or"
+    operands: Tuple["Filter", ...]
+
+    def __str__(self) -> str:
+        _operands = []
+        for operand in self.operands:
+            if isinstance(operand, LogicalExpression):
+                _operands.append(f"({operand})")
+            else:
+                _operands.append(str(operand))
+        return f" {self.op} ".join(_operands)
+
+
+@dataclass(frozen=True)
+class NotExpression:
+    operand: "Filter"
+
+    def __str__(self) -> str:
+        return f"not ({self.operand})"
+
+
+Filter = Union[AttributeExpression, LogicalExpression, NotExpression]
+
+
+def _format_value(value: FilterValue) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return repr(value)
+
+
+class _Token(NamedTuple):
+    kind: str
+    text: str
+    pos: int
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<lparen>\()
+    |(?P<rparen>\))
+    |(?P<bracket>[\[\]])
+    |(?P<string>"(?:[^"\\]|\\.)*")
+    |(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?(?=[\s()]|$))
+    |(?P<word>[^\s()\[\]"]+)
+    """,
+    re.VERBOSE,
+)
+
+_ATTR_NAME_RE = re.compile(r"^[A-Za-z][\w\-$]*(?:\.[A-Za-z0-9_$][\w\-$]*)*$")
+
+
+def _tokenize(filter: str) -> List[_Token]:
+    tokens: List[_Token] = []
+    pos = 0
+    while pos < len(filter):
+        match = _TOKEN_RE.match(filter, pos)
+        if not match or match.lastgroup is None:
+            logger.debug(f"Unrecognised character at position {pos} in filter: {filter}")
+            raise BadRequest(scim_type="invalidFilter", detail="Unrecognised filter")
+        if match.lastgroup == "bracket":
+            raise BadRequest(scim_type="invalidFilter", detail="Complex attribute filters are not supported")
+        if match.lastgroup != "space":
+            tokens.append(_Token(kind=match.lastgroup, text=match.group(), pos=pos))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser for the filter grammar in RFC 7644, section 3.4.2.2:
+
+        filter     = or-expr
+        or-expr    = and-expr *("or" and-expr)
+        and-expr   = not-expr *("and" not-expr)
+        not-expr   = "not" "(" filter ")" / "(" filter ")" / attrExp
+        attrExp    = attrPath "pr" / attrPath compareOp compValue
+    """
+
+    def __init__(self, filter: str):
+        self.filter = filter
+        self.tokens = _tokenize(filter)
+        self.pos = 0
+        self.depth = 0
+        self.expressions = 0
+
+    def _error(self, detail: str = "Unrecognised filter") -> BadRequest:
+        logger.debug(f"{detail}: {self.filter}")
+        return BadRequest(scim_type="invalidFilter", detail=detail)
+
+    def _peek(self) -> Optional[_Token]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def _next(self) -> _Token:
+        token = self._peek()
+        if token is None:
+            raise self._error()
+        self.pos += 1
+        return token
+
+    def _peek_keyword(self, keyword: str) -> bool:
+        token = self._peek()
+        return token is not None and token.kind == "word" and token.text.lower() == keyword
 
+    def parse(self) -> Filter:
+        if not self.tokens:
+            raise self._error()
+        res = self._or_expr()
+        if self._peek() is not None:
+            raise self._error()
+        return res
 
-def parse_search_filter(filter: str) -> SearchFilter:
-    # Bandaid for GitHub CodeQL: Polynomial regular expression used on uncontrolled data
-    # TODO: Maybe use a proper parser instead of regex, maybe https://pypi.org/project/scim2-filter-parser/
-    if len(filter) > 1024:
+    def _or_expr(self) -> Filter:
+        operands = [self._and_expr()]
+        while self._peek_keyword("or"):
+            self.pos += 1
+            operands.append(self._and_expr())
+        if len(operands) == 1:
+            return operands[0]
+        return LogicalExpression(op="or", operands=tuple(operands))
+
+    def _and_expr(self) -> Filter:
+        operands = [self._not_expr()]
+        while self._peek_keyword("and"):
+            self.pos += 1
+            operands.append(self._not_expr())
+        if len(operands) == 1:
+            return operands[0]
+        return LogicalExpression(op="and", operands=tuple(operands))
+
+    def _not_expr(self) -> Filter:
+        token = self._peek()
+        next_token = self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
+        if self._peek_keyword("not") and next_token is not None and next_token.kind == "lparen":
+            self.pos += 1
+            return NotExpression(operand=self._group())
+        if token is not None and token.kind == "lparen":
+            return self._group()
+        return self._attr_expr()
+
+    def _group(self) -> Filter:
+        self._next()  # the opening parenthesis
+        self.depth += 1
+        if self.depth > MAX_FILTER_DEPTH:
+            raise self._error("Filter too complex")
+        res = self._or_expr()
+        if self._next().kind != "rparen":
+            raise self._error()
+        self.depth -= 1
+        return res
+
+    def _attr_expr(self) -> AttributeExpression:
+        self.expressions += 1
+        if self.expressions > MAX_FILTER_EXPRESSIONS:
+            raise self._error("Filter too complex")
+        path = self._attr_path(self._next())
+        op_token = self._next()
+        op = op_token.text.lower()
+        if op_token.kind != "word" or op not in ALL_OPERATORS:
+            raise self._error("Unsupported operator")
+        if op == "pr":
+            return AttributeExpression(path=path, op=op)
+        return AttributeExpression(path=path, op=op, value=self._value(self._next()))
+
+    def _attr_path(self, token: _Token) -> AttributePath:
+        if token.kind != "word":
+            raise self._error()
+        schema = None
+        attr = token.text
+        if ":" in attr:
+            # The attribute name is prefixed with the schema URI, e.g. "urn:...:core:2.0:User:userName"
+            schema, attr = attr.rsplit(":", 1)
+        if not _ATTR_NAME_RE.match(attr):
+            raise self._error("Unrecognised attribute in filter")
+        return AttributePath(attr=attr, schema=schema)
+
+    def _value(self, token: _Token) -> FilterValue:
+        if token.kind == "string":
+            try:
+                value = json.loads(token.text)
+            except ValueError:
+                raise self._error("Unrecognised string value in filter")
+            if not isinstance(value, str) or not value.isprintable():
+                raise self._error("Unrecognised string value in filter")
+            return value
+        if token.kind == "number":
+            if re.fullmatch(r"-?\d+", token.text):
+                return int(token.text)
+            return float(token.text)
+        if token.kind == "word":
+            literals: Dict[str, FilterValue] = {"true": True, "false": False, "null": None}
+            if token.text.lower() in literals:
+                return literals[token.text.lower()]
+        raise self._error("Unrecognised type of value in filter")
+
+
+def parse_filter(filter: str) -> Filter:
+    """
+    Parse a SCIM search filter.
+
+    :raise BadRequest: If the filter can't be parsed
+    """
+    if len(filter) > MAX_FILTER_LENGTH:
         raise BadRequest(scim_type="invalidFilter", detail="Filter too long")
-    match = re.match("(.+?) (..) (.+)", filter)
-    if not match:
-        logger.debug(f"Unrecognised filter: {filter}")
-        raise BadRequest(scim_type="invalidFilter", detail="Unrecognised filter")
-
-    val: Union[str, int]
-    attr, op, val = match.groups()
-
-    if len(val) and val[0] == '"' and val[-1] == '"':
-        val = val[1:-1]
-        if not val.isprintable():
-            logger.debug(f"Unrecognised string value in filter: {repr(val)}")
-            raise BadRequest(scim_type="invalidFilter", detail="Unrecognised string value in filter")
-    elif val.isdecimal():
-        val = int(val)
-    else:
-        logger.debug(f"Unrecognised type of value (not string or integer) in filter: {val}")
-        raise BadRequest(
-            scim_type="invalidFilter", detail="Unrecognised type of value (not string or integer) in filter"
-        )
-
-    return SearchFilter(attr=attr.lower(), op=op.lower(), val=val)
+    return _Parser(filter).parse()
+
+
+@dataclass(frozen=True)
+class SearchableAttribute:
+    """
+    An attribute that can be used in search filters.
+
+    The database field has to be backed by an index, see the *_INDEXES declarations in eduid.userdb.scimapi.
+    """
+
+    name: str  # the SCIM attribute name
+    field: str  # the field in the database document
+    value_type: Type = str  # str, datetime or object (any JSON scalar)
+    ops: FrozenSet[str] = STRING_OPERATORS
+    schema: Optional[SCIMSchema] = None  # None for attributes in the core schema of the resource
+    # The attribute matches any key in a sub document, e.g. extensions.data.some_key
+    sub_keys: bool = False
+
+
+class FilterCompiler:
+    """
+    Compile parsed search filters into mongodb queries, allowing only the whitelisted attributes.
+    """
+
+    def __init__(self, core_schema: SCIMSchema, attributes: Sequence[SearchableAttribute]):
+        self.core_schema = core_schema
+        self.attributes = {(_schema_key(x.schema), x.name.lower()): x for x in attributes}
+        self.sub_key_attributes = [x for x in attributes if x.sub_keys]
+
+    def compile(self, filter: Filter) -> Dict[str, Any]:
+        """
+        :raise BadRequest: If the filter uses an attribute, operator or value that can't be searched on, or
+                           if the query would not be able to use an index
+        """
+        res = self._compile(filter)
+        if not _uses_index(filter):
+            logger.debug(f"Filter can't be served using an index: {filter}")
+            raise BadRequest(scim_type="invalidFilter", detail="Filter needs an indexed expression")
+        return res
+
+    def _compile(self, filter: Filter) -> Dict[str, Any]:
+        if isinstance(filter, LogicalExpression):
+            return {f"${filter.op}": [self._compile(x) for x in filter.operands]}
+        if isinstance(filter, NotExpression):
+            return {"$nor": [self._compile(filter.operand)]}
+        return self._compile_attribute_expression(filter)
+
+    def _lookup(self, path: AttributePath) -> Tuple[SearchableAttribute, str]:
+        schema = path.schema
+        if schema is not None and schema.lower() == self.core_schema.value.lower():
+            schema = None
+        name = path.attr.lower()
+        attr = self.attributes.get((_schema_key(schema), name))
+        if attr is not None and not attr.sub_keys:
+            return attr, attr.field
+        for attr in self.sub_key_attributes:
+            if _schema_key(attr.schema) != _schema_key(schema) or not name.startswith(f"{attr.name.lower()}."):
+                continue
+            sub_key = path.attr[len(attr.name) + 1 :]
+            if not re.match(r"^[A-Za-z0-9_]+$", sub_key):
+                raise BadRequest(scim_type="invalidFilter", detail="Unsupported extension search key")
+            return attr, f"{attr.field}.{sub_key}"
+        raise BadRequest(scim_type="invalidFilter", detail=f"Can't filter on attribute {path}")
+
+    def _compile_attribute_expression(self, filter: AttributeExpression) -> Dict[str, Any]:
+        attr, field = self._lookup(filter.path)
+        if filter.op not in attr.ops:
+            raise BadRequest(scim_type="invalidFilter", detail="Unsupported operator")
+        if filter.op == "pr":
+            return {field: {"$exists": True, "$nin": [None, ""]}}
+
+        value: Any = filter.value
+        if attr.value_type is datetime:
+            value = _parse_datetime(value)
+        elif attr.value_type is str and not isinstance(value, str):
+            raise BadRequest(scim_type="invalidFilter", detail=f"Invalid {attr.name}")
+
+        if filter.op in ["co", "sw", "ew"]:
+            if not isinstance(value, str):
+                raise BadRequest(scim_type="invalidFilter", detail=f"Invalid {attr.name}")
+            pattern = re.escape(value)
+            if filter.op == "sw":
+                pattern = f"^{pattern}"
+            elif filter.op == "ew":
+                pattern = f"{pattern}$"
+            return {field: {"$regex": pattern}}
+        if filter.op == "eq":
+            return {field: value}
+        mongo_operator = {"ne": "$ne", "gt": "$gt", "ge": "$gte", "lt": "$lt", "le": "$lte"}[filter.op]
+        return {field: {mongo_operator: value}}
+
+
+def _uses_index(filter: Filter) -> bool:
+    """
+    Check if a (compiled) filter can be served using an index. Every branch of an "or" needs an indexed
+    expression, while one indexed expression is enough to narrow down the documents matching an "and".
+    """
+    if isinstance(filter, LogicalExpression):
+        if filter.op == "and":
+            return any(_uses_index(x) for x in filter.operands)
+        return all(_uses_index(x) for x in filter.operands)
+    if isinstance(filter, NotExpression):
+        return False
+    return filter.op in INDEXED_OPERATORS
+
+
+def _schema_key(schema: Optional[str]) -> Optional[str]:
+    if schema is None:
+        return None
+    return str(getattr(schema, "value", schema)).lower()
+
+
+def _parse_datetime(value: FilterValue) -> datetime:
+    if not isinstance(value, str):
+        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
+    if value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(scim_type="invalidFilter", detail="Invalid datetime")
+
+
+_ID = SearchableAttribute(name="id", field="scim_id", ops=frozenset(["eq", "ne"]))
+_EXTERNAL_ID = SearchableAttribute(name="externalId", field="external_id")
+_LAST_MODIFIED = SearchableAttribute(
+    name="meta.lastModified", field="last_modified", value_type=datetime, ops=ORDERING_OPERATORS
+)
+
+USER_FILTER_COMPILER = FilterCompiler(
+    core_schema=SCIMSchema.CORE_20_USER,
+    attributes=[
+        _ID,
+        _EXTERNAL_ID,
+        _LAST_MODIFIED,
+        SearchableAttribute(name="name.familyName", field="name.family_name"),
+        SearchableAttribute(name="name.givenName", field="name.given_name"),
+        SearchableAttribute(name="emails.value", field="emails.value"),
+        SearchableAttribute(name="phoneNumbers.value", field="phone_numbers.value"),
+        SearchableAttribute(
+            name="linkedAccounts.value", field="linked_accounts.value", schema=SCIMSchema.NUTID_USER_V1
+        ),
+    ],
+)
+
+GROUP_FILTER_COMPILER = FilterCompiler(
+    core_schema=SCIMSchema.CORE_20_GROUP,
+    attributes=[
+        _ID,
+        _EXTERNAL_ID,
+        _LAST_MODIFIED,
+        SearchableAttribute(name="displayName", field="display_name"),
+        SearchableAttribute(
+            name="extensions.data", field="extensions.data", value_type=object, ops=ALL_OPERATORS, sub_keys=True
+        ),
+        SearchableAttribute(
+            name="data",
+            field="extensions.data",
+            value_type=object,
+            ops=ALL_OPERATORS,
+            schema=SCIMSchema.NUTID_GROUP_V1,
+            sub_keys=True,
+        ),
+    ],
+)
+
+INVITE_FILTER_COMPILER = FilterCompiler(
+    core_schema=SCIMSchema.NUTID_INVITE_CORE_V1,
+    attributes=[_ID, _EXTERNAL_ID, _LAST_MODIFIED],
+)
@@ -19,9 +19,16 @@ from eduid.queue.db.message import MessageDB
 from eduid.scimapi.app import init_api
 from eduid.scimapi.config import DataOwnerName, ScimApiConfig
 from eduid.scimapi.context import Context
-from eduid.userdb.scimapi import ScimApiEvent, ScimApiGroup, ScimApiLinkedAccount, ScimApiName
-from eduid.userdb.scimapi.invitedb import ScimApiInvite
-from eduid.userdb.scimapi.userdb import ScimApiProfile, ScimApiUser
+from eduid.userdb.scimapi import (
+    ScimApiEvent,
+    ScimApiEventDB,
+    ScimApiGroup,
+    ScimApiGroupDB,
+    ScimApiLinkedAccount,
+    ScimApiName,
+)
+from eduid.userdb.scimapi.invitedb import ScimApiInvite, ScimApiInviteDB
+from eduid.userdb.scimapi.userdb import ScimApiProfile, ScimApiUser, ScimApiUserDB
 from eduid.userdb.signup import SignupInviteDB
 from eduid.userdb.testing import MongoTemporaryInstance
 
@@ -108,11 +115,21 @@ class ScimApiTestCase(MongoNeoTestCase):
 
         # TODO: more tests for scoped groups when that is implemented
         self.data_owner = DataOwnerName("eduid.se")
-        self.userdb = self.context.get_userdb(self.data_owner)
-        self.invitedb = self.context.get_invitedb(self.data_owner)
+        # The API uses the async databases in self.context, the tests use synchronous ones for the same collections
+        db_name = self.test_config["data_owners"][self.data_owner]["db_name"]
+        self.userdb = ScimApiUserDB(db_uri=config.mongo_uri, collection=f"{db_name}__users")
+        self.groupdb = ScimApiGroupDB(
+            neo4j_uri=config.neo4j_uri,
+            neo4j_config=config.neo4j_config,
+            scope=self.data_owner,
+            mongo_uri=config.mongo_uri,
+            mongo_dbname="eduid_scimapi",
+            mongo_collection=f"{db_name}__groups",
+        )
+        self.invitedb = ScimApiInviteDB(db_uri=config.mongo_uri, collection=f"{db_name}__invites")
         self.signup_invitedb = SignupInviteDB(db_uri=config.mongo_uri)
         self.messagedb = MessageDB(db_uri=config.mongo_uri)
-        self.eventdb = self.context.get_eventdb(self.data_owner)
+        self.eventdb = ScimApiEventDB(db_uri=config.mongo_uri, collection=f"{db_name}__events")
 
         self.api = init_api(name="test_api", test_config=self.test_config)
         self.client = TestClient(self.api)
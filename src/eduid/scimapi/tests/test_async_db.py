@@ -0,0 +1,324 @@
+import asyncio
+import time
+from dataclasses import replace
+from datetime import timedelta
+from typing import Optional
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+from bson import ObjectId
+from neo4j.exceptions import ServiceUnavailable
+from pymongo.errors import DuplicateKeyError
+
+from eduid.common.models.scim_base import SCIMResourceType
+from eduid.graphdb.groupdb import Group as GraphGroup
+from eduid.graphdb.groupdb import User as GraphUser
+from eduid.scimapi.graph_outbox import GraphOutboxReconciler
+from eduid.scimapi.testing import ScimApiTestCase
+from eduid.userdb.scimapi import (
+    AsyncScimApiGroupDB,
+    EventLevel,
+    ScimApiEvent,
+    ScimApiEventResource,
+    ScimApiGroup,
+    ScimApiUser,
+)
+from eduid.userdb.scimapi.groupdb import GRAPH_OUTBOX_FIELD
+from eduid.userdb.scimapi.invitedb import ScimApiInvite
+from eduid.userdb.util import utc_now
+
+
+class TestAsyncScimApiDBs(ScimApiTestCase, IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.async_userdb = self.context.get_userdb(self.data_owner)
+        self.async_invitedb = self.context.get_invitedb(self.data_owner)
+        self.async_eventdb = self.context.get_eventdb(self.data_owner)
+        assert self.async_userdb and self.async_invitedb and self.async_eventdb  # please mypy
+
+    async def test_user_save_and_load(self):
+        user = ScimApiUser(external_id="test-id-1@example.org")
+        assert await self.async_userdb.save(user)
+        loaded = await self.async_userdb.get_user_by_scim_id(str(user.scim_id))
+        assert loaded is not None
+        self.assertEqual(user.version, loaded.version)
+        self.assertEqual(user.external_id, loaded.external_id)
+        loaded = await self.async_userdb.get_user_by_external_id("test-id-1@example.org")
+        assert loaded is not None
+        self.assertEqual(user.scim_id, loaded.scim_id)
+        # The synchronous database should see the same data
+        sync_loaded = self.userdb.get_user_by_scim_id(str(user.scim_id))
+        assert sync_loaded is not None
+        self.assertEqual(user.version, sync_loaded.version)
+
+    async def test_user_out_of_sync(self):
+        user = ScimApiUser()
+        await self.async_userdb.save(user)
+        stale = await self.async_userdb.get_user_by_scim_id(str(user.scim_id))
+        assert stale is not None
+        await self.async_userdb.save(user)
+        with self.assertRaises(RuntimeError):
+            await self.async_userdb.save(stale)
+
+    async def test_user_unique_external_id(self):
+        await self.async_userdb.save(ScimApiUser(external_id="duplicate@example.org"))
+        with self.assertRaises(DuplicateKeyError):
+            await self.async_userdb.save(ScimApiUser(external_id="duplicate@example.org"))
+
+    async def test_user_exists_and_remove(self):
+        user = ScimApiUser()
+        self.assertFalse(await self.async_userdb.user_exists(str(user.scim_id)))
+        await self.async_userdb.save(user)
+        self.assertTrue(await self.async_userdb.user_exists(str(user.scim_id)))
+        self.assertTrue(await self.async_userdb.remove(user))
+        self.assertFalse(await self.async_userdb.user_exists(str(user.scim_id)))
+
+    async def test_users_by_last_modified(self):
+        for i in range(5):
+            await self.async_userdb.save(ScimApiUser(external_id=f"user-{i}@example.org"))
+        since = utc_now() - timedelta(hours=1)
+        users, count = await self.async_userdb.get_users_by_last_modified(operator="ge", value=since, limit=3)
+        self.assertEqual(3, len(users))
+        self.assertEqual(5, count)
+        users, count = await self.async_userdb.get_users_by_last_modified(operator="ge", value=since, limit=3, skip=3)
+        self.assertEqual(2, len(users))
+        self.assertEqual(5, count)
+
+    async def test_concurrent_user_lookups(self):
+        users = [ScimApiUser(external_id=f"user-{i}@example.org") for i in range(10)]
+        for user in users:
+            await self.async_userdb.save(user)
+        # 64 concurrent lookups should all be served without blocking each other
+        lookups = [self.async_userdb.get_user_by_scim_id(str(users[i % 10].scim_id)) for i in range(64)]
+        results = await asyncio.gather(*lookups)
+        for i, loaded in enumerate(results):
+            assert loaded is not None
+            self.assertEqual(users[i % 10].scim_id, loaded.scim_id)
+
+    async def test_invite_save_and_load(self):
+        invite = ScimApiInvite(external_id="invite@example.org")
+        await self.async_invitedb.save(invite)
+        loaded = await self.async_invitedb.get_invite_by_scim_id(str(invite.scim_id))
+        assert loaded is not None
+        self.assertEqual(invite.version, loaded.version)
+        self.assertTrue(await self.async_invitedb.invite_exists(str(invite.scim_id)))
+
+    async def test_event_save_and_load(self):
+        user = ScimApiUser()
+        await self.async_userdb.save(user)
+        event = ScimApiEvent(
+            resource=ScimApiEventResource(
+                resource_type=SCIMResourceType.USER,
+                scim_id=user.scim_id,
+                external_id=user.external_id,
+                version=user.version,
+                last_modified=user.last_modified,
+            ),
+            level=EventLevel.INFO,
+            source="eduID SCIM API",
+            data={"test": True},
+            expires_at=utc_now() + timedelta(days=1),
+            timestamp=utc_now(),
+        )
+        await self.async_eventdb.save(event)
+        loaded = await self.async_eventdb.get_event_by_scim_id(str(event.scim_id))
+        assert loaded is not None
+        self.assertEqual(event.data, loaded.data)
+        events = await self.async_eventdb.get_events_by_resource(SCIMResourceType.USER, scim_id=user.scim_id)
+        self.assertEqual([event.scim_id], [x.scim_id for x in events])
+        self.assertEqual([], await self.async_eventdb.get_events_by_resource(SCIMResourceType.USER, scim_id=uuid4()))
+
+
+class TestGraphOutbox(ScimApiTestCase, IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.outbox_groupdb = self._make_outbox_groupdb()
+
+    def _make_outbox_groupdb(self, read_timeout: Optional[float] = None) -> AsyncScimApiGroupDB:
+        db_name = self.test_config["data_owners"][self.data_owner]["db_name"]
+        return AsyncScimApiGroupDB(
+            neo4j_uri=self.context.config.neo4j_uri,
+            neo4j_config=self.context.config.neo4j_config,
+            scope=self.data_owner,
+            mongo_uri=self.context.config.mongo_uri,
+            mongo_dbname="eduid_scimapi",
+            mongo_collection=f"{db_name}__groups",
+            graph_outbox=True,
+            graph_outbox_read_timeout=read_timeout,
+        )
+
+    def _make_group(self, display_name: str = "Test Group") -> ScimApiGroup:
+        group = ScimApiGroup(display_name=display_name)
+        group.graph = GraphGroup(identifier=str(group.scim_id), display_name=display_name)
+        group.add_member(GraphUser(identifier=str(uuid4()), display_name="Member"))
+        group.add_owner(GraphUser(identifier=str(uuid4()), display_name="Owner"))
+        return group
+
+    async def test_save_is_applied_later(self):
+        group = self._make_group()
+        assert await self.outbox_groupdb.save(group)
+        # nothing written to the graph database yet
+        self.assertFalse(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+        # but the pending graph state is returned when reading the group
+        loaded = await self.outbox_groupdb.get_group_by_scim_id(str(group.scim_id))
+        assert loaded is not None
+        self.assertEqual({x.identifier for x in group.members}, {x.identifier for x in loaded.members})
+        self.assertEqual([group.scim_id], [x.scim_id for x in await self.outbox_groupdb.get_groups()])
+
+        self.assertEqual(1, await self.outbox_groupdb.reconcile_graph_outbox())
+        graph = self.groupdb.graphdb.get_group(str(group.scim_id))
+        assert graph is not None
+        self.assertEqual({x.identifier for x in group.members}, {x.identifier for x in graph.members})
+        self.assertEqual({x.identifier for x in group.owners}, {x.identifier for x in graph.owners})
+        self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        # the outbox is cleared without changing the version of the group
+        sync_loaded = self.groupdb.get_group_by_scim_id(str(group.scim_id))
+        assert sync_loaded is not None
+        self.assertEqual(group.version, sync_loaded.version)
+
+    async def test_crash_before_apply(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        # the process "crashes" before the change is applied to the graph database, and a new one is started
+        del self.outbox_groupdb
+        restarted = self._make_outbox_groupdb()
+        self.assertEqual(1, await restarted.reconcile_graph_outbox())
+        self.assertTrue(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+
+    async def test_graph_database_failure(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        with patch.object(self.outbox_groupdb.graphdb, "save", side_effect=ServiceUnavailable("neo4j is down")):
+            self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        self.assertFalse(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+        # the change is retried once the graph database is back
+        self.assertEqual(1, await self.outbox_groupdb.reconcile_graph_outbox())
+        self.assertTrue(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+
+    async def test_saved_again_while_applying(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        graph_save = self.outbox_groupdb.graphdb.save
+
+        def _save_and_update(graph: GraphGroup) -> GraphGroup:
+            # simulate the group being saved again by another process while the mutation is applied
+            self.groupdb._coll.update_one(
+                {"scim_id": str(group.scim_id)}, {"$set": {f"{GRAPH_OUTBOX_FIELD}.mutation_id": ObjectId()}}
+            )
+            return graph_save(graph)
+
+        with patch.object(self.outbox_groupdb.graphdb, "save", side_effect=_save_and_update):
+            self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        # the newer mutation is still pending
+        self.assertEqual(1, await self.outbox_groupdb.reconcile_graph_outbox())
+        self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+
+    async def test_removed_while_applying(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        graph_save = self.outbox_groupdb.graphdb.save
+
+        def _remove_and_save(graph: GraphGroup) -> GraphGroup:
+            # simulate the group being removed by another process while the mutation is applied
+            self.groupdb._coll.delete_one({"scim_id": str(group.scim_id)})
+            return graph_save(graph)
+
+        with patch.object(self.outbox_groupdb.graphdb, "save", side_effect=_remove_and_save):
+            self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        self.assertFalse(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+
+    async def test_concurrent_reconcilers(self):
+        """An old mutation being applied by one reconciler doesn't overwrite a newer one applied by another"""
+        group = self._make_group("Version A")
+        await self.outbox_groupdb.save(group)
+        other = self._make_outbox_groupdb()
+        loop = asyncio.get_running_loop()
+        graph_save = self.outbox_groupdb.graphdb.save
+        other_applied = []
+
+        def _save_and_reconcile(graph: GraphGroup) -> GraphGroup:
+            # while this reconciler applies version A, the group is saved again (version B), and another
+            # reconciler (e.g. the read barrier) tries to apply version B
+            group.graph = replace(group.graph, display_name="Version B")
+            asyncio.run_coroutine_threadsafe(self.outbox_groupdb.save(group), loop).result()
+            other_applied.append(asyncio.run_coroutine_threadsafe(other.reconcile_graph_outbox(), loop).result())
+            return graph_save(graph)
+
+        with patch.object(self.outbox_groupdb.graphdb, "save", side_effect=_save_and_reconcile):
+            self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        # the other reconciler skipped the group, since this one held the lease
+        self.assertEqual([0], other_applied)
+        # version B is still pending, and is applied by the next reconciler
+        self.assertEqual(1, await other.reconcile_graph_outbox())
+        graph = self.groupdb.graphdb.get_group(str(group.scim_id))
+        assert graph is not None
+        self.assertEqual("Version B", graph.display_name)
+        self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+
+    async def test_expired_lease(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        # another reconciler holds the lease
+        other = self._make_outbox_groupdb()
+        other.graph_outbox_lease_time = timedelta(seconds=0.2)
+        assert await other._acquire_graph_lease(group.group_id, ObjectId())
+        self.assertEqual(0, await self.outbox_groupdb.reconcile_graph_outbox())
+        # but it died without releasing it, so the group is applied when the lease has expired
+        await asyncio.sleep(0.3)
+        self.assertEqual(1, await self.outbox_groupdb.reconcile_graph_outbox())
+        self.assertTrue(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+
+    async def test_wait_for_outbox(self):
+        outbox_groupdb = self._make_outbox_groupdb(read_timeout=5)
+        group = self._make_group()
+        await outbox_groupdb.save(group)
+        member = list(group.members)[0]
+        # graph database queries wait for pending changes to be applied
+        groups = await outbox_groupdb.get_groups_for_user_identifer(UUID(member.identifier))
+        self.assertEqual([group.scim_id], [x.scim_id for x in groups])
+
+    async def test_eventual_consistency(self):
+        group = self._make_group()
+        await self.outbox_groupdb.save(group)
+        member = list(group.members)[0]
+        self.assertEqual([], await self.outbox_groupdb.get_groups_for_user_identifer(UUID(member.identifier)))
+        self.assertTrue(await self.outbox_groupdb.wait_for_graph_outbox(timeout=5))
+        groups = await self.outbox_groupdb.get_groups_for_user_identifer(UUID(member.identifier))
+        self.assertEqual([group.scim_id], [x.scim_id for x in groups])
+
+    async def test_reconciler(self):
+        reconciler = GraphOutboxReconciler(groupdbs=[self.outbox_groupdb], interval=0.01)
+        groups = [self._make_group(f"Group {i}") for i in range(3)]
+        for group in groups:
+            await self.outbox_groupdb.save(group)
+        await reconciler.start()
+        try:
+            for _ in range(100):
+                if all(self.groupdb.graphdb.group_exists(str(x.scim_id)) for x in groups):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await reconciler.stop()
+        for group in groups:
+            self.assertTrue(self.groupdb.graphdb.group_exists(str(group.scim_id)))
+
+    async def test_save_latency(self):
+        """Compare the time a save takes with a slow graph database, with and without the outbox"""
+        direct_groupdb = self.context.get_groupdb(self.data_owner)
+        assert direct_groupdb is not None
+        for groupdb in [direct_groupdb, self.outbox_groupdb]:
+            graph_save = groupdb.graphdb.save
+
+            def _slow_save(graph: GraphGroup, _save=graph_save) -> GraphGroup:
+                time.sleep(0.5)
+                return _save(graph)
+
+            with patch.object(groupdb.graphdb, "save", side_effect=_slow_save):
+                start = time.monotonic()
+                await groupdb.save(self._make_group())
+                elapsed = time.monotonic() - start
+            if groupdb.graph_outbox:
+                self.assertLess(elapsed, 0.5)
+            else:
+                self.assertGreaterEqual(elapsed, 0.5)
@@ -0,0 +1,96 @@
+import unittest
+
+from eduid.common.models.scim_base import SCIMSchema
+from eduid.scimapi.attributes import USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS, AttributeSelection
+from eduid.scimapi.exceptions import BadRequest
+
+NUTID_USER_V1 = SCIMSchema.NUTID_USER_V1.value
+
+
+class TestAttributeSelection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.resource = {
+            "id": "9784e1bf-231b-4eb8-b315-52eb46dd7c4b",
+            "externalId": "hubba-bubba@eduid.se",
+            "schemas": [SCIMSchema.CORE_20_USER.value, NUTID_USER_V1],
+            "name": {"familyName": "Testsson", "givenName": "Test"},
+            "emails": [{"primary": True, "type": "home", "value": "test@example.com"}],
+            "groups": [],
+            "meta": {"resourceType": "User", "version": 'W/"5e5e6829f86abf66d341d4a2"'},
+            NUTID_USER_V1: {"profiles": {"student": {"attributes": {"displayName": "Test"}}}, "linked_accounts": []},
+        }
+
+    def _selection(self, attributes=None, excluded_attributes=None) -> AttributeSelection:
+        selection = AttributeSelection.from_request(
+            SCIMSchema.CORE_20_USER, attributes=attributes, excluded_attributes=excluded_attributes
+        )
+        assert selection is not None
+        return selection
+
+    def test_no_selection(self):
+        self.assertIsNone(AttributeSelection.from_request(SCIMSchema.CORE_20_USER))
+        self.assertIsNone(AttributeSelection.from_request(SCIMSchema.CORE_20_USER, attributes=[]))
+
+    def test_attributes(self):
+        selection = self._selection(attributes=["name.givenName", "EMAILS.value"])
+        self.assertEqual(
+            selection.apply(self.resource),
+            {
+                "id": "9784e1bf-231b-4eb8-b315-52eb46dd7c4b",
+                "schemas": [SCIMSchema.CORE_20_USER.value],
+                "name": {"givenName": "Test"},
+                "emails": [{"value": "test@example.com"}],
+            },
+        )
+        self.assertTrue(selection.is_requested("name"))
+        self.assertTrue(selection.is_requested("id"))
+        self.assertFalse(selection.is_requested("groups"))
+
+    def test_attributes_with_schema(self):
+        selection = self._selection(
+            attributes=[f"{SCIMSchema.CORE_20_USER.value}:externalId", f"{NUTID_USER_V1}:profiles"]
+        )
+        self.assertEqual(
+            selection.apply(self.resource),
+            {
+                "id": "9784e1bf-231b-4eb8-b315-52eb46dd7c4b",
+                "externalId": "hubba-bubba@eduid.se",
+                "schemas": [SCIMSchema.CORE_20_USER.value, NUTID_USER_V1],
+                NUTID_USER_V1: {"profiles": {"student": {"attributes": {"displayName": "Test"}}}},
+            },
+        )
+        whole_extension = self._selection(attributes=[NUTID_USER_V1])
+        self.assertEqual(self.resource[NUTID_USER_V1], whole_extension.apply(self.resource)[NUTID_USER_V1])
+
+    def test_excluded_attributes(self):
+        selection = self._selection(excluded_attributes=["groups", "id", "name.familyName", NUTID_USER_V1])
+        expected = dict(self.resource)
+        del expected["groups"]
+        del expected[NUTID_USER_V1]
+        expected["name"] = {"givenName": "Test"}
+        expected["schemas"] = [SCIMSchema.CORE_20_USER.value]
+        self.assertEqual(selection.apply(self.resource), expected)
+        self.assertFalse(selection.is_requested("groups"))
+        self.assertTrue(selection.is_requested("name"))
+        self.assertTrue(selection.is_requested("id"))
+
+    def test_invalid(self):
+        with self.assertRaises(BadRequest):
+            self._selection(attributes=["name"], excluded_attributes=["groups"])
+        for name in ["", "name..givenName", "name.given name", f"{SCIMSchema.CORE_20_USER.value}:"]:
+            with self.assertRaises(BadRequest, msg=f"{name!r} should not be accepted"):
+                self._selection(attributes=[name])
+
+    def test_mongo_projection(self):
+        selection = self._selection(attributes=["name.givenName", f"{NUTID_USER_V1}:profiles"])
+        self.assertEqual(
+            selection.mongo_projection(USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS),
+            {"_id": True, "name": True, "profiles": True, "scim_id": True, "version": True},
+        )
+        selection = self._selection(excluded_attributes=["meta", "groups", "emails"])
+        self.assertEqual(
+            selection.mongo_projection(USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS),
+            {"created": False, "emails": False, "last_modified": False},
+        )
+        selection = self._selection(excluded_attributes=["groups"])
+        self.assertIsNone(selection.mongo_projection(USER_ATTRIBUTE_FIELDS, USER_REQUIRED_FIELDS))
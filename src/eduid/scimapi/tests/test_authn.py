@@ -1,6 +1,10 @@
+import json
 import os
+import shutil
+import tempfile
+import time
 from dataclasses import asdict
-from pathlib import PurePath
+from pathlib import Path, PurePath
 from typing import Any, Dict, Mapping, Optional
 from uuid import uuid4
 
@@ -8,12 +12,19 @@ import loguru
 import pytest
 from httpx import Response
 from jwcrypto import jwt
+from jwcrypto.jwk import JWK
 
 from eduid.common.config.parsers import load_config
 from eduid.common.models.scim_base import SCIMSchema
-from eduid.scimapi.config import DataOwner, ScimApiConfig
-from eduid.scimapi.middleware import AuthnBearerToken, RequestedAccessDenied, SudoAccess
-from eduid.scimapi.testing import BaseDBTestCase
+from eduid.scimapi.config import DataOwner, DataOwnerName, ScimApiConfig
+from eduid.scimapi.middleware import (
+    AuthenticationMiddleware,
+    AuthnBearerToken,
+    RequestedAccessDenied,
+    SudoAccess,
+    VerifiedBearerToken,
+)
+from eduid.scimapi.testing import BaseDBTestCase, ScimApiTestCase
 from eduid.scimapi.tests.test_scimuser import ScimApiTestUserResourceBase
 from eduid.userdb.scimapi import ScimApiProfile
 from eduid.userdb.scimapi.userdb import ScimApiUser
@@ -330,3 +341,87 @@ class TestAuthnUserResource(ScimApiTestUserResourceBase):
             SCIMSchema.NUTID_USER_V1.value: {"profiles": {"test": asdict(self.test_profile)}, "linked_accounts": []},
         }
         self._assertUserUpdateSuccess(_req, response, db_user)
+
+    def test_get_user_cached_token(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+
+        claims = {"scopes": ["eduid.se"], "version": 1, "exp": int(time.time()) + 300}
+        token = self._make_bearer_token(claims=claims)
+
+        for _ in range(3):
+            response = self._get_user_from_api(user=db_user, bearer_token=token)
+            self._assertResponse(response, 200)
+
+        # a reloaded key set invalidates the cached token, but the token is still valid
+        self.api.context.reload_jwks()
+        response = self._get_user_from_api(user=db_user, bearer_token=token)
+        self._assertResponse(response, 200)
+
+    def test_get_user_new_signing_key(self):
+        """A token signed with a key added to the keystore after it was loaded is verified after reloading it"""
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        keystore_path = Path(tmpdir.name) / "jwks.json"
+        shutil.copy(self.api.context.config.keystore_path, keystore_path)
+        self.api.context.config.keystore_path = keystore_path
+        self.api.context.reload_jwks()
+
+        new_key = JWK.generate(kty="EC", crv="P-256", kid="testing-scimapi-new")
+        token = jwt.JWT(header={"alg": "ES256"}, claims={"scopes": ["eduid.se"], "version": 1})
+        token.make_signed_token(new_key)
+
+        # the key is not in the keystore, and reading it again doesn't help
+        jwks = self.api.context.jwks
+        response = self._get_user_from_api(user=db_user, bearer_token=token.serialize())
+        self._assertScimError(response.json(), status=401, detail="Bearer token error")
+        assert self.api.context.jwks is jwks
+
+        keystore = json.loads(keystore_path.read_text())
+        keystore["keys"].append(json.loads(new_key.export_public()))
+        keystore_path.write_text(json.dumps(keystore))
+        # make sure the modification time changes, regardless of the file system timestamp resolution
+        mtime = keystore_path.stat().st_mtime + 1
+        os.utime(keystore_path, (mtime, mtime))
+
+        response = self._get_user_from_api(user=db_user, bearer_token=token.serialize())
+        self._assertResponse(response, 200)
+        assert self.api.context.jwks is not jwks
+
+
+class TestBearerTokenCache(ScimApiTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.middleware = AuthenticationMiddleware(app=self.api, context=self.context)
+        self.token = AuthnBearerToken(scim_config=self.context.config, version=1, scopes={"eduid.se"})
+
+    def _verified(self) -> VerifiedBearerToken:
+        return VerifiedBearerToken(token=self.token, data_owner=DataOwnerName("eduid.se"), jwks=self.context.jwks)
+
+    def test_cache_hit(self):
+        verified = self._verified()
+        self.middleware._cache_token("bearer-token", verified, claims={"exp": time.time() + 300})
+        assert self.middleware._get_cached_token("bearer-token") is verified
+        assert self.middleware._get_cached_token("other-bearer-token") is None
+
+    def test_cache_key_is_digest(self):
+        self.middleware._cache_token("bearer-token", self._verified(), claims={})
+        assert self.middleware.token_cache is not None
+        assert "bearer-token" not in self.middleware.token_cache
+        assert self.middleware._token_cache_key("bearer-token") in self.middleware.token_cache
+
+    def test_expired_token_not_cached(self):
+        self.middleware._cache_token("bearer-token", self._verified(), claims={"exp": time.time() - 1})
+        assert self.middleware._get_cached_token("bearer-token") is None
+
+    def test_key_rotation(self):
+        self.middleware._cache_token("bearer-token", self._verified(), claims={"exp": time.time() + 300})
+        self.context.reload_jwks()
+        assert self.middleware._get_cached_token("bearer-token") is None
+
+    def test_cache_disabled(self):
+        self.context.config.bearer_token_cache_ttl = 0
+        middleware = AuthenticationMiddleware(app=self.api, context=self.context)
+        assert middleware.token_cache is None
+        middleware._cache_token("bearer-token", self._verified(), claims={})
+        assert middleware._get_cached_token("bearer-token") is None
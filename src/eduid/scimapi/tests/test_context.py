@@ -1,7 +1,9 @@
 from eduid.common.config.parsers import load_config
-from eduid.scimapi.config import ScimApiConfig
+from eduid.graphdb.db import neo4j_drivers
+from eduid.scimapi.config import DataOwnerName, ScimApiConfig
 from eduid.scimapi.context import Context
 from eduid.scimapi.testing import ScimApiTestCase
+from eduid.userdb.db import mongo_clients
 
 
 class TestContext(ScimApiTestCase):
@@ -9,3 +11,18 @@ class TestContext(ScimApiTestCase):
         config = load_config(typ=ScimApiConfig, app_name="scimapi", ns="api", test_config=self.test_config)
         ctx = Context(config=config)
         self.assertEqual(ctx.base_url, "http://localhost:8000")
+
+    def test_shared_connections(self):
+        data_owners = [DataOwnerName(f"data-owner-{i}.example.org") for i in range(50)]
+        self.test_config["data_owners"] = {x: {"db_name": x.replace(".", "_")} for x in data_owners}
+        config = load_config(typ=ScimApiConfig, app_name="scimapi", ns="api", test_config=self.test_config)
+        num_mongo_clients = len(mongo_clients)
+        num_neo4j_drivers = len(neo4j_drivers)
+        ctx = Context(config=config)
+        # all the databases, for all the data owners, use the clients already created for the test case
+        self.assertEqual(num_mongo_clients, len(mongo_clients))
+        self.assertEqual(num_neo4j_drivers, len(neo4j_drivers))
+        userdbs = [ctx.get_userdb(x) for x in data_owners]
+        self.assertEqual(1, len({id(x._db.get_connection()) for x in userdbs if x}))
+        groupdbs = [ctx.get_groupdb(x) for x in data_owners]
+        self.assertEqual(1, len({id(x.graphdb.db.driver) for x in groupdbs if x}))
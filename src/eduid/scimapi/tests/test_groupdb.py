@@ -2,10 +2,7 @@ import logging
 from typing import Optional
 from uuid import UUID, uuid4
 
-from eduid.common.config.parsers import load_config
 from eduid.graphdb.groupdb import Group as GraphGroup
-from eduid.scimapi.config import DataOwnerName, ScimApiConfig
-from eduid.scimapi.context import Context
 from eduid.scimapi.testing import ScimApiTestCase
 from eduid.userdb.scimapi import GroupExtensions, ScimApiGroup
 
@@ -15,10 +12,6 @@ logger = logging.getLogger(__name__)
 class TestGroupDB(ScimApiTestCase):
     def setUp(self) -> None:
         super().setUp()
-        self.test_config = self._get_config()
-        config = load_config(typ=ScimApiConfig, app_name="scimapi", ns="api", test_config=self.test_config)
-        self.context = Context(config=config)
-        self.groupdb = self.context.get_groupdb(DataOwnerName("eduid.se"))
 
         for i in range(9):
             self.add_group(uuid4(), f"Test Group-{i}")
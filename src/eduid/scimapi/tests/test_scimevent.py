@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Any, Dict, Mapping, Optional
 from uuid import UUID, uuid4
 
@@ -10,7 +10,8 @@ from eduid.common.testing_base import normalised_data
 from eduid.scimapi.models.event import EventResponse, NutidEventExtensionV1
 from eduid.scimapi.testing import ScimApiTestCase
 from eduid.scimapi.utils import make_etag
-from eduid.userdb.scimapi import EventLevel, ScimApiEvent
+from eduid.userdb.scimapi import EventLevel, ScimApiEvent, ScimApiEventResource
+from eduid.userdb.util import utc_now
 
 
 @dataclass
@@ -153,3 +154,33 @@ class TestEventResource(ScimApiTestCase):
             },
         }
         assert fetched.response.json() == expected
+
+    def test_get_events_since(self):
+        user = self.add_user(identifier=str(uuid4()), external_id="test@example.org")
+        now = utc_now()
+
+        def _save_event(resource_type: SCIMResourceType, timestamp: datetime) -> ScimApiEvent:
+            event = ScimApiEvent(
+                resource=ScimApiEventResource(
+                    resource_type=resource_type,
+                    scim_id=user.scim_id,
+                    external_id=user.external_id,
+                    version=user.version,
+                    last_modified=user.last_modified,
+                ),
+                level=EventLevel.INFO,
+                source="eduID SCIM API",
+                data={},
+                expires_at=now + timedelta(days=1),
+                timestamp=timestamp,
+            )
+            self.eventdb.save(event)
+            return event
+
+        _save_event(SCIMResourceType.USER, timestamp=now - timedelta(minutes=10))
+        recent = _save_event(SCIMResourceType.USER, timestamp=now)
+        _save_event(SCIMResourceType.GROUP, timestamp=now)
+
+        events = self.eventdb.get_events_since(SCIMResourceType.USER, since=now - timedelta(minutes=5))
+        assert [event.scim_id for event in events] == [recent.scim_id]
+        assert self.eventdb.get_events_since(SCIMResourceType.USER, since=now) == []
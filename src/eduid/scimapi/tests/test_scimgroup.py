@@ -5,15 +5,16 @@ __author__ = "lundberg"
 import logging
 from datetime import datetime
 from typing import Any, List, Mapping, Optional, Set, Union
+from unittest.mock import patch
 from uuid import UUID, uuid4
 
 from bson import ObjectId
+from neo4j import Session
 
 from eduid.common.models.scim_base import Meta, SCIMResourceType, SCIMSchema, WeakVersion
 from eduid.common.testing_base import normalised_data
 from eduid.graphdb.groupdb import Group as GraphGroup
 from eduid.graphdb.groupdb import User as GraphUser
-from eduid.scimapi.config import DataOwnerName
 from eduid.scimapi.models.group import GroupMember, GroupResponse
 from eduid.scimapi.testing import ScimApiTestCase
 from eduid.scimapi.tests.test_scimbase import TestScimBase
@@ -52,10 +53,6 @@ class TestSCIMGroup(TestScimBase):
 
 
 class TestGroupResource(ScimApiTestCase):
-    def setUp(self) -> None:
-        super().setUp()
-        self.groupdb = self.context.get_groupdb(DataOwnerName("eduid.se"))
-
     def tearDown(self):
         super().tearDown()
         self.groupdb._drop_whole_collection()
@@ -201,6 +198,25 @@ class TestGroupResource_GET(TestGroupResource):
             f"Response totalResults does not match number of groups in the database: {expected_num_resources}",
         )
 
+    def test_get_groups_batched(self):
+        user = self.add_user(identifier=str(uuid4()), external_id="test-id-1")
+        groups = [self.add_group(uuid4(), f"Test Group {i}") for i in range(3)]
+        for group in groups[:2]:
+            self.add_member(group, user, "Test User")
+        with patch.object(Session, "run", autospec=True, side_effect=Session.run) as mock_run:
+            db_groups = self.groupdb.get_groups()
+            # one query to load all the groups, with members and owners, from the graph database
+            self.assertEqual(1, mock_run.call_count)
+        self.assertEqual(sorted([x.scim_id for x in groups]), sorted([x.scim_id for x in db_groups]))
+        for db_group in db_groups:
+            self.assertEqual(db_group.scim_id in [x.scim_id for x in groups[:2]], db_group.has_member(user.scim_id))
+
+        db_groups = self.groupdb.get_groups_by_scim_ids([str(groups[2].scim_id), str(uuid4())])
+        self.assertEqual([groups[2].scim_id], [x.scim_id for x in db_groups])
+
+        member_groups = self.groupdb.get_groups_for_user_identifer(user.scim_id)
+        self.assertEqual(sorted([x.scim_id for x in groups[:2]]), sorted([x.scim_id for x in member_groups]))
+
     def test_get_group(self):
         db_group = self.add_group(uuid4(), "Test Group 1")
         response = self.client.get(url=f"/Groups/{db_group.scim_id}", headers=self.headers)
@@ -581,6 +597,21 @@ class TestGroupSearchResource(TestGroupResource):
 
         self._perform_search(filter="extensions.data.some_key eq 20072009", expected_group=group)
 
+    def test_search_group_combined_filter(self):
+        ext1 = GroupExtensions(data={"some_key": 20072009})
+        group = self.add_group(uuid4(), "Test Group 1", extensions=ext1)
+        ext2 = GroupExtensions(data={"some_key": 123})
+        self.add_group(uuid4(), "Test Group 2", extensions=ext2)
+        self.add_group(uuid4(), "Other Group")
+
+        self._perform_search(
+            filter=f'displayName sw "Test" and {SCIMSchema.NUTID_GROUP_V1.value}:data.some_key gt 1000',
+            expected_group=group,
+        )
+        self._perform_search(
+            filter='displayName eq "Other Group" or extensions.data.some_key pr', expected_num_resources=3
+        )
+
     def test_search_group_last_modified(self):
         group1 = self.add_group(uuid4(), "Test Group 1")
         group2 = self.add_group(uuid4(), "Test Group 2")
@@ -280,6 +280,35 @@ class TestUserResource(ScimApiTestUserResourceBase):
         }
         self._assertUserUpdateSuccess(_req, response, db_user)
 
+    def test_get_user_attributes(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        response = self.client.get(
+            url=f"/Users/{db_user.scim_id}?attributes=externalId,{SCIMSchema.NUTID_USER_V1.value}:profiles",
+            headers=self.headers,
+        )
+        self._assertResponse(response)
+        self.assertEqual(
+            {
+                "id": str(db_user.scim_id),
+                "externalId": "test-id-1",
+                "schemas": [SCIMSchema.CORE_20_USER.value, SCIMSchema.NUTID_USER_V1.value],
+                SCIMSchema.NUTID_USER_V1.value: {"profiles": {"test": asdict(self.test_profile)}},
+            },
+            response.json(),
+        )
+        self.assertEqual(make_etag(db_user.version), response.headers["ETag"])
+
+    def test_get_user_excluded_attributes(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        response = self.client.get(
+            url=f"/Users/{db_user.scim_id}?excludedAttributes=groups,meta,id", headers=self.headers
+        )
+        self._assertResponse(response)
+        self.assertEqual(str(db_user.scim_id), response.json()["id"])
+        self.assertEqual("test-id-1", response.json()["externalId"])
+        self.assertNotIn("groups", response.json())
+        self.assertNotIn("meta", response.json())
+
     def test_create_users_with_no_external_id(self):
         self.add_user(identifier=str(uuid4()), profiles={"test": self.test_profile})
         self.add_user(identifier=str(uuid4()), profiles={"test": self.test_profile})
@@ -557,6 +586,66 @@ class TestUserResource(ScimApiTestUserResourceBase):
             expected_total_results=9,
         )
 
+    def test_search_user_combined_filter(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        self.add_user(identifier=str(uuid4()), external_id="test-id-2", profiles={"test": self.test_profile})
+        self.add_user(identifier=str(uuid4()), external_id="other-id-3", profiles={"test": self.test_profile})
+        self._perform_search(
+            filter='externalId sw "test-" and not (externalId eq "test-id-2")',
+            expected_user=db_user,
+        )
+        self._perform_search(
+            filter='(externalId eq "test-id-1" or externalId eq "other-id-3") and id pr',
+            expected_num_resources=2,
+        )
+
+    def test_search_user_attributes(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        req = {
+            "schemas": [SCIMSchema.API_MESSAGES_20_SEARCH_REQUEST.value],
+            "filter": 'externalId eq "test-id-1"',
+            "attributes": ["externalId", "meta.version"],
+        }
+        response = self.client.post(url="/Users/.search", json=req, headers=self.headers)
+        self._assertResponse(response)
+        self.assertEqual(
+            [
+                {
+                    "id": str(db_user.scim_id),
+                    "externalId": "test-id-1",
+                    "meta": {"version": make_etag(db_user.version)},
+                    "schemas": [SCIMSchema.CORE_20_USER.value],
+                }
+            ],
+            response.json()["Resources"],
+        )
+
+    def test_search_user_full_resources(self):
+        db_user = self.add_user(identifier=str(uuid4()), external_id="test-id-1", profiles={"test": self.test_profile})
+        req = {
+            "schemas": [SCIMSchema.API_MESSAGES_20_SEARCH_REQUEST.value],
+            "filter": 'externalId eq "test-id-1"',
+        }
+        response = self.client.post(url="/Users/.search", json=req, headers=self.headers)
+        self._assertResponse(response)
+        resource = response.json()["Resources"][0]
+        self.assertEqual(str(db_user.scim_id), resource["id"])
+        self.assertEqual(
+            {"profiles": {"test": asdict(self.test_profile)}, "linked_accounts": []},
+            resource[SCIMSchema.NUTID_USER_V1.value],
+        )
+        self.assertEqual([], resource["groups"])
+
+    def test_search_user_unindexed_attribute(self):
+        req = {
+            "schemas": [SCIMSchema.API_MESSAGES_20_SEARCH_REQUEST.value],
+            "filter": 'externalId eq "test-id-1" or preferredLanguage eq "sv"',
+        }
+        response = self.client.post(url="/Users/.search", json=req, headers=self.headers)
+        self._assertScimError(
+            response.json(), scim_type="invalidFilter", detail="Can't filter on attribute preferredLanguage"
+        )
+
     def test_create_and_update_user_with_linked_accounts(self):
         """Test that creating a user and then updating it without changes only results in one event"""
         account = LinkedAccount(issuer="eduid.se", value="test@dev.eduid.se")
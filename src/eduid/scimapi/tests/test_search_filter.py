@@ -1,42 +1,275 @@
+import random
+import string
 import unittest
-from datetime import datetime
+from datetime import datetime, timezone
 
+from eduid.common.models.scim_base import SCIMSchema
 from eduid.scimapi.exceptions import BadRequest
-from eduid.scimapi.search import parse_search_filter
+from eduid.scimapi.search import (
+    COMPARISON_OPERATORS,
+    GROUP_FILTER_COMPILER,
+    USER_FILTER_COMPILER,
+    AttributeExpression,
+    AttributePath,
+    Filter,
+    LogicalExpression,
+    NotExpression,
+    parse_filter,
+)
 
 
 class TestSearchFilter(unittest.TestCase):
     def test_lastmodified(self):
         now = datetime.utcnow()
         filter = f'meta.lastModified gt "{now.isoformat()}"'
-        sf = parse_search_filter(filter)
-        self.assertEqual(sf.attr, "meta.lastmodified")
+        sf = parse_filter(filter)
+        assert isinstance(sf, AttributeExpression)
+        self.assertEqual(sf.path, AttributePath(attr="meta.lastModified"))
         self.assertEqual(sf.op, "gt")
-        self.assertEqual(sf.val, now.isoformat())
+        self.assertEqual(sf.value, now.isoformat())
 
     def test_lastmodified_with_tz(self):
         nowstr = "2020-05-05T09:13:43.916000+00:00"
         filter = f'meta.lastModified gt "{nowstr}"'
-        sf = parse_search_filter(filter)
-        self.assertEqual(sf.attr, "meta.lastmodified")
+        sf = parse_filter(filter)
+        assert isinstance(sf, AttributeExpression)
+        self.assertEqual(sf.path.attr, "meta.lastModified")
         self.assertEqual(sf.op, "gt")
-        self.assertEqual(sf.val, nowstr)
+        self.assertEqual(sf.value, nowstr)
 
     def test_str(self):
-        filter = f'foo eq "123"'
-        sf = parse_search_filter(filter)
-        self.assertEqual(sf.attr, "foo")
-        self.assertEqual(sf.op, "eq")
-        self.assertEqual(sf.val, "123")
+        filter = f'foo EQ "123"'
+        sf = parse_filter(filter)
+        self.assertEqual(sf, AttributeExpression(path=AttributePath(attr="foo"), op="eq", value="123"))
 
     def test_int(self):
         filter = f"foo eq 123"
-        sf = parse_search_filter(filter)
-        self.assertEqual(sf.attr, "foo")
-        self.assertEqual(sf.op, "eq")
-        self.assertEqual(sf.val, 123)
+        sf = parse_filter(filter)
+        self.assertEqual(sf, AttributeExpression(path=AttributePath(attr="foo"), op="eq", value=123))
+
+    def test_literals(self):
+        self.assertEqual(parse_filter("foo eq 1.5e3").value, 1500.0)
+        self.assertEqual(parse_filter("foo eq true").value, True)
+        self.assertEqual(parse_filter("foo ne false").value, False)
+        self.assertIsNone(parse_filter("foo eq null").value)
+        self.assertEqual(parse_filter(r'foo eq "a \"quoted\" string"').value, 'a "quoted" string')
+
+    def test_present(self):
+        self.assertEqual(parse_filter("title pr"), AttributeExpression(path=AttributePath(attr="title"), op="pr"))
+
+    def test_schema_prefix(self):
+        sf = parse_filter(f'{SCIMSchema.NUTID_GROUP_V1.value}:data.some_key eq "x"')
+        assert isinstance(sf, AttributeExpression)
+        self.assertEqual(sf.path, AttributePath(attr="data.some_key", schema=SCIMSchema.NUTID_GROUP_V1.value))
+
+    def test_precedence(self):
+        # "and" binds tighter than "or"
+        a, b, c = [AttributeExpression(path=AttributePath(attr=x), op="pr") for x in ["a", "b", "c"]]
+        self.assertEqual(
+            parse_filter("a pr or b pr and c pr"),
+            LogicalExpression(op="or", operands=(a, LogicalExpression(op="and", operands=(b, c)))),
+        )
+        self.assertEqual(
+            parse_filter("(a pr or b pr) and not (c pr)"),
+            LogicalExpression(op="and", operands=(LogicalExpression(op="or", operands=(a, b)), NotExpression(c))),
+        )
 
     def test_not_printable(self):
         filter = f"foo eq 12\u00093"
         with self.assertRaises(BadRequest):
-            parse_search_filter(filter)
+            parse_filter(filter)
+        with self.assertRaises(BadRequest):
+            parse_filter('foo eq "12\\u00093"')
+
+    def test_invalid(self):
+        for filter in [
+            "",
+            "foo",
+            "foo eq",
+            "foo xy 1",
+            "foo eq bar",
+            "(foo pr",
+            "foo pr)",
+            "foo pr and",
+            "not foo pr",
+            "1foo eq 1",
+            'emails[type eq "work"]',
+            "x" * 1025,
+        ]:
+            with self.assertRaises(BadRequest, msg=f"{filter!r} should not parse"):
+                parse_filter(filter)
+
+    def test_too_complex(self):
+        with self.assertRaises(BadRequest) as cm:
+            parse_filter("(" * 11 + "a pr" + ")" * 11)
+        self.assertEqual(cm.exception.error_detail.detail, "Filter too complex")
+        with self.assertRaises(BadRequest) as cm:
+            parse_filter(" or ".join(["a pr"] * 33))
+        self.assertEqual(cm.exception.error_detail.detail, "Filter too complex")
+
+
+class TestFilterCompiler(unittest.TestCase):
+    def test_compile_user_filter(self):
+        spec = USER_FILTER_COMPILER.compile(
+            parse_filter('externalId eq "foo@example.org" or (name.familyName sw "Sv" and not (emails.value pr))')
+        )
+        self.assertEqual(
+            spec,
+            {
+                "$or": [
+                    {"external_id": "foo@example.org"},
+                    {
+                        "$and": [
+                            {"name.family_name": {"$regex": "^Sv"}},
+                            {"$nor": [{"emails.value": {"$exists": True, "$nin": [None, ""]}}]},
+                        ]
+                    },
+                ]
+            },
+        )
+
+    def test_compile_datetime(self):
+        spec = USER_FILTER_COMPILER.compile(parse_filter('meta.lastModified le "2020-05-05T09:13:43Z"'))
+        self.assertEqual(spec, {"last_modified": {"$lte": datetime(2020, 5, 5, 9, 13, 43, tzinfo=timezone.utc)}})
+        with self.assertRaises(BadRequest) as cm:
+            USER_FILTER_COMPILER.compile(parse_filter('meta.lastModified le "yesterday"'))
+        self.assertEqual(cm.exception.error_detail.detail, "Invalid datetime")
+
+    def test_compile_schema_prefix(self):
+        core = SCIMSchema.CORE_20_USER.value
+        self.assertEqual(USER_FILTER_COMPILER.compile(parse_filter(f'{core}:id eq "abc"')), {"scim_id": "abc"})
+        nutid = SCIMSchema.NUTID_USER_V1.value
+        self.assertEqual(
+            USER_FILTER_COMPILER.compile(parse_filter(f'{nutid}:linkedAccounts.value eq "x"')),
+            {"linked_accounts.value": "x"},
+        )
+        with self.assertRaises(BadRequest):
+            # linkedAccounts is not in the core schema
+            USER_FILTER_COMPILER.compile(parse_filter('linkedAccounts.value eq "x"'))
+
+    def test_compile_regex_is_escaped(self):
+        spec = USER_FILTER_COMPILER.compile(parse_filter('emails.value sw "a.b+c@"'))
+        self.assertEqual(spec, {"emails.value": {"$regex": r"^a\.b\+c@"}})
+
+    def test_unindexed_filter(self):
+        for filter in [
+            'externalId ne "foo"',
+            'emails.value co "example"',
+            'emails.value ew "@example.org"',
+            'not (externalId eq "foo")',
+            'externalId eq "foo" or emails.value co "example"',
+            'not (externalId eq "foo" or externalId eq "bar")',
+        ]:
+            with self.assertRaises(BadRequest, msg=f"{filter!r} should not compile") as cm:
+                USER_FILTER_COMPILER.compile(parse_filter(filter))
+            self.assertEqual(cm.exception.error_detail.detail, "Filter needs an indexed expression")
+            self.assertEqual(cm.exception.error_detail.status, 400)
+
+    def test_unindexed_filter_with_indexed_expression(self):
+        self.assertEqual(
+            USER_FILTER_COMPILER.compile(parse_filter('externalId sw "test-" and not (externalId eq "test-id-2")')),
+            {"$and": [{"external_id": {"$regex": "^test\\-"}}, {"$nor": [{"external_id": "test-id-2"}]}]},
+        )
+        self.assertEqual(
+            USER_FILTER_COMPILER.compile(parse_filter('id eq "abc" and emails.value co "example"')),
+            {"$and": [{"scim_id": "abc"}, {"emails.value": {"$regex": "example"}}]},
+        )
+
+    def test_compile_extension_data(self):
+        self.assertEqual(
+            GROUP_FILTER_COMPILER.compile(parse_filter("extensions.data.some_Key gt 3")),
+            {"extensions.data.some_Key": {"$gt": 3}},
+        )
+        self.assertEqual(
+            GROUP_FILTER_COMPILER.compile(parse_filter(f'{SCIMSchema.NUTID_GROUP_V1.value}:data.key eq "x"')),
+            {"extensions.data.key": "x"},
+        )
+        with self.assertRaises(BadRequest) as cm:
+            GROUP_FILTER_COMPILER.compile(parse_filter('extensions.data.some.key eq "x"'))
+        self.assertEqual(cm.exception.error_detail.detail, "Unsupported extension search key")
+
+    def test_unindexed_attribute(self):
+        with self.assertRaises(BadRequest) as cm:
+            USER_FILTER_COMPILER.compile(parse_filter('externalId pr and preferredLanguage eq "sv"'))
+        self.assertEqual(cm.exception.error_detail.detail, "Can't filter on attribute preferredLanguage")
+        self.assertEqual(cm.exception.error_detail.status, 400)
+
+    def test_unsupported_operator_and_value(self):
+        with self.assertRaises(BadRequest) as cm:
+            GROUP_FILTER_COMPILER.compile(parse_filter("displayName lt 1"))
+        self.assertEqual(cm.exception.error_detail.detail, "Unsupported operator")
+        with self.assertRaises(BadRequest) as cm:
+            GROUP_FILTER_COMPILER.compile(parse_filter("displayName eq 1"))
+        self.assertEqual(cm.exception.error_detail.detail, "Invalid displayName")
+
+
+class TestSearchFilterFuzz(unittest.TestCase):
+    """
+    Feed the parser random filters, and make sure it either parses them correctly or raises BadRequest.
+    """
+
+    alphabet = string.ascii_letters + string.digits + ' ()[]"\\.:_-$\t\u00e5'
+
+    def setUp(self) -> None:
+        self.random = random.Random(4711)
+
+    def _random_value(self):
+        choice = self.random.randint(0, 5)
+        if choice == 0:
+            return self.random.randint(-(10**6), 10**6)
+        if choice == 1:
+            return self.random.uniform(-1000, 1000)
+        if choice == 2:
+            return self.random.choice([True, False, None])
+        return "".join(self.random.choice(string.printable[:-5] + "\u00e5\u00e4\u00f6") for _ in range(8))
+
+    def _random_filter(self, depth: int = 0) -> Filter:
+        choice = self.random.randint(0, 5 if depth < 3 else 1)
+        attr = self.random.choice(["id", "externalId", "meta.lastModified", "name.givenName", "x-y_z.$ref"])
+        schema = self.random.choice([None, None, SCIMSchema.CORE_20_USER.value, SCIMSchema.NUTID_USER_V1.value])
+        path = AttributePath(attr=attr, schema=schema)
+        if choice == 0:
+            return AttributeExpression(path=path, op="pr")
+        if choice == 1:
+            return AttributeExpression(
+                path=path, op=self.random.choice(sorted(COMPARISON_OPERATORS)), value=self._random_value()
+            )
+        if choice == 2:
+            return NotExpression(self._random_filter(depth + 1))
+        operands = tuple(self._random_filter(depth + 1) for _ in range(self.random.randint(2, 3)))
+        return LogicalExpression(op=self.random.choice(["and", "or"]), operands=operands)
+
+    def test_round_trip(self):
+        for _ in range(500):
+            filter = self._random_filter()
+            try:
+                parsed = parse_filter(str(filter))
+            except BadRequest as e:
+                # random filters can get too complex
+                self.assertEqual(e.error_detail.detail, "Filter too complex")
+                continue
+            self.assertEqual(filter, parsed, f"Round trip failed for {filter}")
+
+    def test_random_input(self):
+        for _ in range(2000):
+            filter = "".join(self.random.choice(self.alphabet) for _ in range(self.random.randint(0, 40)))
+            try:
+                parsed = parse_filter(filter)
+            except BadRequest:
+                continue
+            # anything that parses should compile to a query or be rejected with BadRequest
+            try:
+                USER_FILTER_COMPILER.compile(parsed)
+            except BadRequest:
+                pass
+
+    def test_mutated_filters(self):
+        for _ in range(1000):
+            filter = list(str(self._random_filter()))
+            for _ in range(self.random.randint(1, 3)):
+                pos = self.random.randrange(len(filter))
+                filter[pos] = self.random.choice(self.alphabet)
+            try:
+                USER_FILTER_COMPILER.compile(parse_filter("".join(filter)))
+            except BadRequest:
+                pass
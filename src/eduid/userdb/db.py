@@ -4,12 +4,17 @@ from typing import Any, Dict, List, Mapping, Optional, Union
 
 import pymongo
 from bson import ObjectId
+from motor import motor_asyncio
 from pymongo.errors import PyMongoError
 from pymongo.uri_parser import parse_uri
 
+from eduid.common.misc.connections import ConnectionKey, ConnectionRegistry, make_connection_key
 from eduid.userdb.exceptions import EduIDUserDBError, MongoConnectionError, MultipleDocumentsReturned
 
 
+mongo_clients: ConnectionRegistry[Any] = ConnectionRegistry("mongodb", close=lambda client: client.close())
+
+
 class MongoDB(object):
     """Simple wrapper to get pymongo real objects from the settings uri"""
 
@@ -49,14 +54,22 @@ class MongoDB(object):
 
         self._db_uri = _format_mongodb_uri(self._parsed_uri)
 
-        try:
-            self._connection = connection_factory(
+        def _connect():
+            return connection_factory(
                 host=self._db_uri,
                 tz_aware=True,
                 # TODO: switch uuidRepresentation to "standard" when we made sure all UUIDs are stored as strings
                 uuidRepresentation="pythonLegacy",
                 **kwargs,
             )
+
+        # Share the client (and with it the connection pool and monitoring threads) with all other
+        # instances in this process using the same URI and options
+        self._registry_key: Optional[ConnectionKey] = make_connection_key(
+            connection_factory, self._db_uri, options=kwargs
+        )
+        try:
+            self._connection = mongo_clients.acquire(self._registry_key, _connect)
         except PyMongoError as e:
             raise MongoConnectionError("Error connecting to mongodb {!r}: {}".format(self, e))
 
@@ -145,7 +158,10 @@ class MongoDB(object):
             return False
 
     def close(self):
-        self._connection.close()
+        """Release the shared client. It is closed when no other instance in this process uses it."""
+        if self._registry_key is not None:
+            mongo_clients.release(self._registry_key)
+            self._registry_key = None
 
 
 def _format_mongodb_uri(parsed_uri: Mapping[str, Any]) -> str:
@@ -368,3 +384,144 @@ class BaseDB(object):
 
     def close(self):
         self._db.close()
+
+
+class AsyncBaseDB(object):
+    """Base class for common db operations using motor, for use in asyncio applications"""
+
+    def __init__(self, db_uri: str, db_name: str, collection: str, safe_writes: bool = False):
+
+        self._db_uri = db_uri
+        self._coll_name = collection
+        self._db = MongoDB(db_uri, db_name=db_name, connection_factory=motor_asyncio.AsyncIOMotorClient)
+        self._coll: motor_asyncio.AsyncIOMotorCollection = self._db.get_collection(collection)
+        if safe_writes:
+            self._coll = self._coll.with_options(write_concern=pymongo.WriteConcern(w="majority"))
+
+    def __repr__(self):
+        return "<eduID {!s}: {!s} {!r}>".format(self.__class__.__name__, self._db.sanitized_uri, self._coll_name)
+
+    __str__ = __repr__
+
+    @property
+    def _sync_coll(self) -> pymongo.collection.Collection:
+        """
+        The pymongo collection wrapped by motor.
+
+        Only meant for things done once at startup, before there is a running event loop (e.g. index setup).
+        """
+        return self._coll.delegate
+
+    def _drop_whole_collection(self):
+        """
+        Drop the whole collection. Should ONLY be used in testing, obviously.
+        :return:
+        """
+        logging.warning("{!s} Dropping collection {!r}".format(self, self._coll_name))
+        return self._sync_coll.drop()
+
+    async def _get_document_by_attr(
+        self, attr: str, value: str, fields: Optional[dict] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the document in the MongoDB matching field=value
+
+        :param attr: The name of a field
+        :param value: The field value
+        :param fields: the fields to return in the document, or None for all fields
+        :return: A document dict
+        """
+        if value is None:
+            raise EduIDUserDBError(f"Missing value to filter users by {attr}")
+
+        # Fetch at most two documents, that is enough to detect duplicates
+        docs = await self._coll.find({attr: value}, fields).to_list(length=2)
+        doc_count = len(docs)
+        if doc_count == 0:
+            return None
+        elif doc_count > 1:
+            raise MultipleDocumentsReturned(f"Multiple matching documents for {attr}={repr(value)}")
+        return docs[0]
+
+    async def _get_documents_by_filter(
+        self,
+        spec: Mapping[str, Any],
+        fields: Optional[dict] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Mapping]:
+        """
+        Locate documents in the db using a custom search filter.
+
+        :param spec: the search filter
+        :param fields: the fields to return in the search result
+        :param skip: Number of documents to skip before returning result
+        :param limit: Limit documents returned to this number
+        :return: A list of documents
+        """
+        if fields is not None:
+            cursor = self._coll.find(spec, fields)
+        else:
+            cursor = self._coll.find(spec)
+
+        if skip is not None:
+            cursor = cursor.skip(skip)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+
+        return await cursor.to_list(length=None)
+
+    async def db_count(self, spec: Optional[Mapping[str, Any]] = None, limit: Optional[int] = None) -> int:
+        """
+        Return number of entries in the collection.
+
+        :return: Document count
+        """
+        args: Dict[str, Any] = {"filter": {}}
+        if spec:
+            args["filter"] = spec
+        if limit:
+            args["limit"] = limit
+        return await self._coll.count_documents(**args)
+
+    async def remove_document(self, spec_or_id: Union[dict, ObjectId]) -> bool:
+        """
+        Remove a document in the db given the _id or dict spec.
+
+        :param spec_or_id: spec or document id (_id)
+        """
+        if isinstance(spec_or_id, ObjectId):
+            spec_or_id = {"_id": spec_or_id}
+        result = await self._coll.delete_one(spec_or_id)
+        return result.acknowledged
+
+    async def is_healthy(self) -> bool:
+        """
+        :return: DB health status
+        """
+        try:
+            await self._db.get_connection().admin.command("ismaster")
+            return True
+        except pymongo.errors.ConnectionFailure as e:
+            logging.error("{} not healthy: {}".format(self, e))
+            return False
+
+    def setup_indexes(self, indexes: Dict[str, Any]):
+        """
+        To update an index add a new item in indexes and remove the previous version.
+
+        This is done synchronously since it is expected to be called from __init__, before serving any requests.
+        """
+        default_indexes = ["_id_"]  # _id_ index can not be deleted from a mongo collection
+        current_indexes = self._sync_coll.index_information()
+        for name in current_indexes:
+            if name not in indexes and name not in default_indexes:
+                self._sync_coll.drop_index(name)
+        for name, params in indexes.items():
+            if name not in current_indexes:
+                key = params.pop("key")
+                params["name"] = name
+                self._sync_coll.create_index(key, **params)
+
+    def close(self):
+        self._db.close()
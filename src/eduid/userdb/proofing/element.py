@@ -146,12 +146,15 @@ class SentLetterElement(Element):
     address
     is_sent
     sent_ts
+    queued_ts
     transaction_id
     created_by
     created_ts
     """
 
     is_sent: bool = False
+    # set when the letter is handed over to the letter queue worker, to be rendered and sent
+    queued_ts: Optional[datetime] = None
     sent_ts: Optional[datetime] = None
     transaction_id: Optional[str] = None
     address: Optional[FullPostalAddress] = None
@@ -9,6 +9,7 @@ from eduid.userdb.scimapi.common import (
     ScimApiProfile,
 )
 from eduid.userdb.scimapi.eventdb import (
+    AsyncScimApiEventDB,
     EventLevel,
     EventStatus,
     ScimApiEvent,
@@ -16,5 +17,5 @@ from eduid.userdb.scimapi.eventdb import (
     ScimApiEventResource,
     ScimApiResourceBase,
 )
-from eduid.userdb.scimapi.groupdb import GroupExtensions, ScimApiGroup, ScimApiGroupDB
-from eduid.userdb.scimapi.userdb import ScimApiUser, ScimApiUserDB
+from eduid.userdb.scimapi.groupdb import AsyncScimApiGroupDB, GroupExtensions, ScimApiGroup, ScimApiGroupDB
+from eduid.userdb.scimapi.userdb import AsyncScimApiUserDB, ScimApiUser, ScimApiUserDB
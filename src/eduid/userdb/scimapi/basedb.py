@@ -1,11 +1,30 @@
 # -*- coding: utf-8 -*-
-from typing import List, Mapping, Optional, Tuple
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
-from eduid.userdb.db import BaseDB
+from eduid.userdb.db import AsyncBaseDB, BaseDB
 
 __author__ = "lundberg"
 
 
+def last_modified_spec(operator: str, value: datetime) -> Dict[str, Any]:
+    # map SCIM filter operators to mongodb filter
+    mongo_operator = {"gt": "$gt", "ge": "$gte"}.get(operator)
+    if not mongo_operator:
+        raise ValueError("Invalid filter operator")
+    return {"last_modified": {mongo_operator: value}}
+
+
+def _correct_total_count(total_count: int, num_docs: int, limit: Optional[int], skip: Optional[int]) -> int:
+    # Correct total_count if it is obviously wrong due to being made before actual data query
+    if limit is None or num_docs < limit:
+        # Either we got all the documents in hand, or we are on the last 'page' of the series
+        total_count = num_docs
+        if skip is not None:
+            total_count += skip
+    return total_count
+
+
 class ScimApiBaseDB(BaseDB):
     def _get_documents_and_count_by_filter(
         self,
@@ -26,11 +45,26 @@ class ScimApiBaseDB(BaseDB):
         """
         total_count = self.db_count(spec=spec)
         docs = self._get_documents_by_filter(spec=spec, fields=fields, limit=limit, skip=skip)
-        # Correct total_count if it is obviously wrong due to being made before actual data query
-        num_docs = len(docs)
-        if limit is None or num_docs < limit:
-            # Either we got all the documents in hand, or we are on the last 'page' of the series
-            total_count = num_docs
-            if skip is not None:
-                total_count += skip
-        return docs, total_count
+        return docs, _correct_total_count(total_count, num_docs=len(docs), limit=limit, skip=skip)
+
+
+class AsyncScimApiBaseDB(AsyncBaseDB):
+    async def _get_documents_and_count_by_filter(
+        self,
+        spec: dict,
+        fields: Optional[dict] = None,
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+    ) -> Tuple[List[Mapping], int]:
+        """
+        Locate and count documents in the db using a custom search filter.
+
+        :param spec: the search filter
+        :param fields: the fields to return in the search response
+        :param skip: Number of documents to skip before returning response
+        :param limit: Limit documents returned to this number
+        :return: A list of documents and total number of documents matching the query
+        """
+        total_count = await self.db_count(spec=spec)
+        docs = await self._get_documents_by_filter(spec=spec, fields=fields, limit=limit, skip=skip)
+        return docs, _correct_total_count(total_count, num_docs=len(docs), limit=limit, skip=skip)
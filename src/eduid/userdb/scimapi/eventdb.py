@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import logging
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
@@ -10,7 +11,7 @@ from uuid import UUID
 from bson import ObjectId
 
 from eduid.common.models.scim_base import SCIMResourceType
-from eduid.userdb.scimapi.basedb import ScimApiBaseDB
+from eduid.userdb.scimapi.basedb import AsyncScimApiBaseDB, ScimApiBaseDB
 from eduid.userdb.scimapi.common import ScimApiResourceBase
 
 logger = logging.getLogger(__name__)
@@ -84,16 +85,33 @@ class ScimApiEvent(ScimApiResourceBase, _ScimApiEventRequired):
         return cls(**_data)
 
 
+EVENT_INDEXES = {
+    # Remove messages older than expires_at datetime
+    "auto-discard": {"key": [("expires_at", 1)], "expireAfterSeconds": 0},
+    # Ensure unique scim_id
+    "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
+    # Find events about a type of resource added after a certain time (get_events_since)
+    "resource-type-timestamp": {"key": [("resource.resource_type", 1), ("timestamp", 1)]},
+}
+
+
+def _events_by_resource_spec(
+    resource_type: SCIMResourceType, scim_id: Optional[UUID] = None, external_id: Optional[str] = None
+) -> Dict[str, str]:
+    filter = {
+        "resource.resource_type": resource_type.value,
+    }
+    if scim_id is not None:
+        filter["resource.scim_id"] = str(scim_id)
+    if external_id is not None:
+        filter["resource.external_id"] = external_id
+    return filter
+
+
 class ScimApiEventDB(ScimApiBaseDB):
     def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi"):
         super().__init__(db_uri, db_name, collection=collection)
-        indexes = {
-            # Remove messages older than expires_at datetime
-            "auto-discard": {"key": [("expires_at", 1)], "expireAfterSeconds": 0},
-            # Ensure unique scim_id
-            "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
-        }
-        self.setup_indexes(indexes)
+        self.setup_indexes(copy.deepcopy(EVENT_INDEXES))
 
     def save(self, event: ScimApiEvent) -> bool:
         """Save a new event to the database. Events are never expected to be modified."""
@@ -111,14 +129,7 @@ class ScimApiEventDB(ScimApiBaseDB):
     def get_events_by_resource(
         self, resource_type: SCIMResourceType, scim_id: Optional[UUID] = None, external_id: Optional[str] = None
     ) -> List[ScimApiEvent]:
-        filter = {
-            "resource.resource_type": resource_type.value,
-        }
-        if scim_id is not None:
-            filter["resource.scim_id"] = str(scim_id)
-        if external_id is not None:
-            filter["resource.external_id"] = external_id
-
+        filter = _events_by_resource_spec(resource_type=resource_type, scim_id=scim_id, external_id=external_id)
         docs = self._get_documents_by_filter(filter)
         if docs:
             return [ScimApiEvent.from_dict(this) for this in docs]
@@ -129,3 +140,39 @@ class ScimApiEventDB(ScimApiBaseDB):
         if not doc:
             return None
         return ScimApiEvent.from_dict(doc)
+
+    def get_events_since(self, resource_type: SCIMResourceType, since: datetime) -> List[ScimApiEvent]:
+        """Get all events about resources of the given type that were added after `since`"""
+        filter: Dict[str, Any] = {
+            **_events_by_resource_spec(resource_type=resource_type),
+            "timestamp": {"$gt": since},
+        }
+        docs = self._get_documents_by_filter(filter)
+        return [ScimApiEvent.from_dict(this) for this in docs]
+
+
+class AsyncScimApiEventDB(AsyncScimApiBaseDB):
+    def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi"):
+        super().__init__(db_uri, db_name, collection=collection)
+        self.setup_indexes(copy.deepcopy(EVENT_INDEXES))
+
+    async def save(self, event: ScimApiEvent) -> bool:
+        """Save a new event to the database. Events are never expected to be modified."""
+        event_dict = event.to_dict()
+
+        result = await self._coll.insert_one(event_dict)
+        logger.debug(f"{self} Inserted event {event} in {self._coll_name}")
+        return result.acknowledged
+
+    async def get_events_by_resource(
+        self, resource_type: SCIMResourceType, scim_id: Optional[UUID] = None, external_id: Optional[str] = None
+    ) -> List[ScimApiEvent]:
+        filter = _events_by_resource_spec(resource_type=resource_type, scim_id=scim_id, external_id=external_id)
+        docs = await self._get_documents_by_filter(filter)
+        return [ScimApiEvent.from_dict(this) for this in docs]
+
+    async def get_event_by_scim_id(self, scim_id: str) -> Optional[ScimApiEvent]:
+        doc = await self._get_document_by_attr("scim_id", scim_id)
+        if not doc:
+            return None
+        return ScimApiEvent.from_dict(doc)
@@ -1,28 +1,34 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import asyncio
 import copy
 import logging
 import pprint
 import uuid
 from dataclasses import asdict, dataclass, field, replace
-from datetime import datetime
-from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Type, Union
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Type, Union
 from uuid import UUID
 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from eduid.graphdb.groupdb import Group as GraphGroup
 from eduid.graphdb.groupdb import GroupDB
 from eduid.graphdb.groupdb import User as GraphUser
 from eduid.scimapi.models.group import GroupCreateRequest, GroupUpdateRequest
-from eduid.userdb.scimapi.basedb import ScimApiBaseDB
+from eduid.userdb.scimapi.basedb import AsyncScimApiBaseDB, ScimApiBaseDB, last_modified_spec
 from eduid.userdb.scimapi.common import ScimApiResourceBase
+from eduid.userdb.util import utc_now
 
 __author__ = "lundberg"
 
 logger = logging.getLogger(__name__)
 
+# Field in the group document used for the graph database mutation that has not been applied yet
+GRAPH_OUTBOX_FIELD = "graph_outbox"
+
 
 @dataclass
 class GroupExtensions(object):
@@ -95,9 +101,190 @@ class ScimApiGroup(ScimApiResourceBase, _ScimApiGroupRequired):
         this["scim_id"] = uuid.UUID(this["scim_id"])
         this["group_id"] = this.pop("_id")
         this["extensions"] = GroupExtensions.from_mapping(this["extensions"])
+        # pending graph database mutation, see AsyncScimApiGroupDB
+        this.pop(GRAPH_OUTBOX_FIELD, None)
         return cls(**this)
 
 
+GROUP_INDEXES = {
+    # Create an index so that scim_id is unique per data owner
+    "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
+    # Indexes for the attributes that can be used in search filters, see eduid.scimapi.search
+    "external-id": {"key": [("external_id", 1)], "sparse": True},
+    "display-name": {"key": [("display_name", 1)]},
+    "last-modified": {"key": [("last_modified", 1)]},
+    "extensions-data": {"key": [("extensions.data.$**", 1)]},
+    # Index for finding groups with pending graph database mutations
+    "graph-outbox": {"key": [(f"{GRAPH_OUTBOX_FIELD}.created_ts", 1)], "sparse": True},
+}
+
+
+def _group_to_db_doc(group: ScimApiGroup) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Prepare a group for saving.
+
+    :return: The document to use to find the current version of the group, and the new group document
+    """
+    group_dict = group.to_dict()
+
+    test_doc = {
+        "_id": group.group_id,
+        "version": group.version,
+    }
+    # update the version number and last_modified timestamp
+    group_dict["version"] = ObjectId()
+    group_dict["last_modified"] = datetime.utcnow()
+    return test_doc, group_dict
+
+
+def _group_from_create_request(create_request: GroupCreateRequest) -> ScimApiGroup:
+    extension_data = dict()
+    if create_request.nutid_group_v1 is not None:
+        extension_data = create_request.nutid_group_v1.data
+    group = ScimApiGroup(
+        external_id=create_request.external_id,
+        extensions=GroupExtensions(data=extension_data),
+        display_name=create_request.display_name,
+    )
+    group.graph = GraphGroup(identifier=str(group.scim_id), display_name=create_request.display_name)
+    return group
+
+
+def _apply_update_request(update_request: GroupUpdateRequest, db_group: ScimApiGroup) -> bool:
+    """
+    Update db_group in place from update_request.
+
+    :return: True if anything was changed
+    """
+    changed = False
+    updated_members = set()
+    logger.info(f"Updating group {str(db_group.scim_id)}")
+    # please mypy
+    _member: Optional[Union[GraphUser, GraphGroup]]
+    _new_member: Optional[Union[GraphUser, GraphGroup]]
+
+    for this in update_request.members:
+        if this.is_user:
+            _member = db_group.graph.get_member_user(identifier=str(this.value))
+            _new_member = None if _member else GraphUser(identifier=str(this.value), display_name=this.display)
+        elif this.is_group:
+            _member = db_group.graph.get_member_group(identifier=str(this.value))
+            _new_member = None if _member else GraphGroup(identifier=str(this.value), display_name=this.display)
+        else:
+            raise ValueError(f"Don't recognise member {this}")
+
+        # Add a new member
+        if _new_member is not None:
+            updated_members.add(_new_member)
+            logger.debug(f"Added new member: {_new_member}")
+        # Update member attributes if they changed
+        elif _member is not None and _member.display_name != this.display:
+            logger.debug(f"Changed display name for existing member: {_member.display_name} -> {this.display}")
+            _member = replace(_member, display_name=this.display)
+            updated_members.add(_member)
+        elif _member is not None:
+            # no change, retain member as-is
+            updated_members.add(_member)
+
+    if db_group.graph.display_name != update_request.display_name:
+        changed = True
+        db_group.graph = replace(db_group.graph, display_name=update_request.display_name)
+        logger.debug(f"Changed display name for group: {db_group.graph.display_name} -> {update_request.display_name}")
+
+    if db_group.external_id != update_request.external_id:
+        changed = True
+        db_group.external_id = update_request.external_id
+        logger.debug(f"Changed external id for group: {db_group.external_id} -> {update_request.external_id}")
+
+    # Check if there where new, changed or removed members
+    if db_group.graph.members != updated_members:
+        changed = True
+        db_group.graph = replace(db_group.graph, members=updated_members)
+        logger.debug(f"Old members: {db_group.graph.members}")
+        logger.debug(f"New members: {updated_members}")
+
+    extension_data = dict()
+    if update_request.nutid_group_v1 is not None:
+        extension_data = update_request.nutid_group_v1.data
+    _sg_ext = GroupExtensions(data=extension_data)
+    if db_group.extensions != _sg_ext:
+        changed = True
+        db_group.extensions = _sg_ext
+        logger.debug(f"Old extensions: {db_group.extensions}")
+        logger.debug(f"New extensions: {_sg_ext}")
+
+    return changed
+
+
+def _graph_to_outbox(graph: GraphGroup) -> Dict[str, Any]:
+    """Serialise the wanted state of a group in the graph database, to be applied later"""
+
+    def _node(node: Union[GraphGroup, GraphUser]) -> Dict[str, Any]:
+        label = "Group" if isinstance(node, GraphGroup) else "User"
+        return {"label": label, "identifier": node.identifier, "display_name": node.display_name}
+
+    return {
+        "mutation_id": ObjectId(),
+        "created_ts": utc_now(),
+        "display_name": graph.display_name,
+        "members": [_node(x) for x in graph.members],
+        "owners": [_node(x) for x in graph.owners],
+    }
+
+
+def _graph_from_outbox(identifier: str, mutation: Mapping[str, Any], version: Optional[ObjectId] = None) -> GraphGroup:
+    def _node(data: Mapping[str, Any]) -> Union[GraphGroup, GraphUser]:
+        if data["label"] == "Group":
+            return GraphGroup(identifier=data["identifier"], display_name=data["display_name"])
+        return GraphUser(identifier=data["identifier"], display_name=data["display_name"])
+
+    return GraphGroup(
+        identifier=identifier,
+        display_name=mutation["display_name"],
+        version=version,
+        members={_node(x) for x in mutation["members"]},
+        owners={_node(x) for x in mutation["owners"]},
+    )
+
+
+def _groups_from_docs(docs: Sequence[Mapping[str, Any]], graph_groups: Sequence[GraphGroup]) -> List[ScimApiGroup]:
+    """
+    Combine group documents from mongodb with the groups loaded from the graph database.
+
+    Groups with a pending graph database mutation get the graph from the mutation instead.
+    """
+    graphs = {graph.identifier: graph for graph in graph_groups}
+    res: List[ScimApiGroup] = []
+    for doc in docs:
+        group = ScimApiGroup.from_dict(doc)
+        if doc.get(GRAPH_OUTBOX_FIELD):
+            group.graph = _graph_from_outbox(str(group.scim_id), doc[GRAPH_OUTBOX_FIELD])
+            res.append(group)
+            continue
+        graph = graphs.get(str(group.scim_id))
+        if graph is None:
+            raise RuntimeError(f"Group {group.scim_id} found in mongodb, but not in graphdb")
+        group.graph = graph
+        res.append(group)
+    return res
+
+
+def _groups_from_graphs(graph_groups: Sequence[GraphGroup], docs: Sequence[Mapping[str, Any]]) -> List[ScimApiGroup]:
+    """Combine groups loaded from the graph database with the group documents from mongodb"""
+    docs_by_scim_id = {doc["scim_id"]: doc for doc in docs}
+    res: List[ScimApiGroup] = []
+    for graph in graph_groups:
+        doc = docs_by_scim_id.get(graph.identifier)
+        if doc is None:
+            raise RuntimeError(f"Group {graph} found in graph database, but not in mongodb")
+        group = ScimApiGroup.from_dict(doc)
+        group.graph = graph
+        if doc.get(GRAPH_OUTBOX_FIELD):
+            group.graph = _graph_from_outbox(graph.identifier, doc[GRAPH_OUTBOX_FIELD], version=graph.version)
+        res.append(group)
+    return res
+
+
 class ScimApiGroupDB(ScimApiBaseDB):
     def __init__(
         self,
@@ -113,12 +300,8 @@ class ScimApiGroupDB(ScimApiBaseDB):
         self.graphdb = GroupDB(db_uri=neo4j_uri, scope=scope, config=neo4j_config)
         logger.info(f"{self} initialised")
 
-        # Create an index so that scim_id is unique per data owner
-        indexes = {
-            "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
-        }
         if setup_indexes:
-            self.setup_indexes(indexes)
+            self.setup_indexes(copy.deepcopy(GROUP_INDEXES))
 
     def _get_graph_group(self, scim_id: str) -> GraphGroup:
         graph_group = self.graphdb.get_group(scim_id)
@@ -127,15 +310,7 @@ class ScimApiGroupDB(ScimApiBaseDB):
         return graph_group
 
     def save(self, group: ScimApiGroup) -> bool:
-        group_dict = group.to_dict()
-
-        test_doc = {
-            "_id": group.group_id,
-            "version": group.version,
-        }
-        # update the version number and last_modified timestamp
-        group_dict["version"] = ObjectId()
-        group_dict["last_modified"] = datetime.utcnow()
+        test_doc, group_dict = _group_to_db_doc(group)
         result = self._coll.replace_one(test_doc, group_dict, upsert=False)
         if result.modified_count == 0:
             db_group = self._coll.find_one({"_id": group.group_id})
@@ -158,80 +333,14 @@ class ScimApiGroupDB(ScimApiBaseDB):
         return result.acknowledged
 
     def create_group(self, create_request: GroupCreateRequest) -> ScimApiGroup:
-        extension_data = dict()
-        if create_request.nutid_group_v1 is not None:
-            extension_data = create_request.nutid_group_v1.data
-        group = ScimApiGroup(
-            external_id=create_request.external_id,
-            extensions=GroupExtensions(data=extension_data),
-            display_name=create_request.display_name,
-        )
-        group.graph = GraphGroup(identifier=str(group.scim_id), display_name=create_request.display_name)
+        group = _group_from_create_request(create_request)
         if not self.save(group):
             logger.error(f"Creating group {group} failed")
             raise RuntimeError("Group creation failed")
         return group
 
     def update_group(self, update_request: GroupUpdateRequest, db_group: ScimApiGroup) -> Tuple[ScimApiGroup, bool]:
-        changed = False
-        updated_members = set()
-        logger.info(f"Updating group {str(db_group.scim_id)}")
-        # please mypy
-        _member: Optional[Union[GraphUser, GraphGroup]]
-        _new_member: Optional[Union[GraphUser, GraphGroup]]
-
-        for this in update_request.members:
-            if this.is_user:
-                _member = db_group.graph.get_member_user(identifier=str(this.value))
-                _new_member = None if _member else GraphUser(identifier=str(this.value), display_name=this.display)
-            elif this.is_group:
-                _member = db_group.graph.get_member_group(identifier=str(this.value))
-                _new_member = None if _member else GraphGroup(identifier=str(this.value), display_name=this.display)
-            else:
-                raise ValueError(f"Don't recognise member {this}")
-
-            # Add a new member
-            if _new_member is not None:
-                updated_members.add(_new_member)
-                logger.debug(f"Added new member: {_new_member}")
-            # Update member attributes if they changed
-            elif _member is not None and _member.display_name != this.display:
-                logger.debug(f"Changed display name for existing member: {_member.display_name} -> {this.display}")
-                _member = replace(_member, display_name=this.display)
-                updated_members.add(_member)
-            elif _member is not None:
-                # no change, retain member as-is
-                updated_members.add(_member)
-
-        if db_group.graph.display_name != update_request.display_name:
-            changed = True
-            db_group.graph = replace(db_group.graph, display_name=update_request.display_name)
-            logger.debug(
-                f"Changed display name for group: {db_group.graph.display_name} -> {update_request.display_name}"
-            )
-
-        if db_group.external_id != update_request.external_id:
-            changed = True
-            db_group.external_id = update_request.external_id
-            logger.debug(f"Changed external id for group: {db_group.external_id} -> {update_request.external_id}")
-
-        # Check if there where new, changed or removed members
-        if db_group.graph.members != updated_members:
-            changed = True
-            db_group.graph = replace(db_group.graph, members=updated_members)
-            logger.debug(f"Old members: {db_group.graph.members}")
-            logger.debug(f"New members: {updated_members}")
-
-        extension_data = dict()
-        if update_request.nutid_group_v1 is not None:
-            extension_data = update_request.nutid_group_v1.data
-        _sg_ext = GroupExtensions(data=extension_data)
-        if db_group.extensions != _sg_ext:
-            changed = True
-            db_group.extensions = _sg_ext
-            logger.debug(f"Old extensions: {db_group.extensions}")
-            logger.debug(f"New extensions: {_sg_ext}")
-
+        changed = _apply_update_request(update_request=update_request, db_group=db_group)
         if changed:
             logger.info(f"Group {str(db_group.scim_id)} changed. Saving.")
             if self.save(db_group):
@@ -241,20 +350,37 @@ class ScimApiGroupDB(ScimApiBaseDB):
 
         return db_group, changed
 
+    def _load_graphs(self, docs: Sequence[Mapping[str, Any]]) -> List[ScimApiGroup]:
+        """Load the graph data for all the groups using a single graph database query"""
+        # groups with a pending mutation get the graph from the mutation
+        identifiers = [doc["scim_id"] for doc in docs if not doc.get(GRAPH_OUTBOX_FIELD)]
+        graph_groups: List[GraphGroup] = []
+        if identifiers:
+            graph_groups = self.graphdb.get_groups_by_identifiers(identifiers)
+        return _groups_from_docs(docs, graph_groups)
+
+    def _load_docs(self, graph_groups: Sequence[GraphGroup]) -> List[ScimApiGroup]:
+        """Load the mongodb documents for all the graph groups using a single query"""
+        docs = self._get_documents_by_filter({"scim_id": {"$in": [graph.identifier for graph in graph_groups]}})
+        return _groups_from_graphs(graph_groups, docs)
+
     def get_groups(self) -> List[ScimApiGroup]:
         docs = self._get_documents_by_filter({})
-        res: List[ScimApiGroup] = []
-        for doc in docs:
-            group = ScimApiGroup.from_dict(doc)
-            group.graph = self._get_graph_group(str(group.scim_id))
-            res += [group]
-        return res
+        return self._load_graphs(docs)
+
+    def get_groups_by_scim_ids(self, scim_ids: Sequence[str]) -> List[ScimApiGroup]:
+        """Load many groups at once. Groups that do not exist are left out of the result."""
+        docs = self._get_documents_by_filter({"scim_id": {"$in": list(scim_ids)}})
+        return self._load_graphs(docs)
 
     def get_group_by_scim_id(self, scim_id: str) -> Optional[ScimApiGroup]:
         doc = self._get_document_by_attr("scim_id", scim_id)
         if doc:
             group = ScimApiGroup.from_dict(doc)
-            group.graph = self._get_graph_group(scim_id)
+            if doc.get(GRAPH_OUTBOX_FIELD):
+                group.graph = _graph_from_outbox(scim_id, doc[GRAPH_OUTBOX_FIELD])
+            else:
+                group.graph = self._get_graph_group(scim_id)
             return group
         return None
 
@@ -264,43 +390,20 @@ class ScimApiGroupDB(ScimApiBaseDB):
         docs, count = self._get_documents_and_count_by_filter({key: value}, skip=skip, limit=limit)
         if not docs:
             return [], 0
-        res: List[ScimApiGroup] = []
-        for this in docs:
-            group = ScimApiGroup.from_dict(this)
-            group.graph = self._get_graph_group(str(group.scim_id))
-            res += [group]
-        return res, count
+        return self._load_graphs(docs), count
 
     def get_groups_for_user_identifer(self, member_identifier: UUID) -> List[ScimApiGroup]:
         groups = self.graphdb.get_groups_for_user_identifer(str(member_identifier))
-        res: List[ScimApiGroup] = []
-        for graph in groups:
-            group = self.get_group_by_scim_id(graph.identifier)
-            if not group:
-                raise RuntimeError(f"Group {graph} found in graph database, but not in mongodb")
-            group.graph = graph
-            res += [group]
-        return res
+        return self._load_docs(groups)
 
     def get_groups_owned_by_user_identifier(self, owner_identifier: UUID) -> List[ScimApiGroup]:
         groups = self.graphdb.get_groups_owned_by_user_identifier(str(owner_identifier))
-        res: List[ScimApiGroup] = []
-        for graph in groups:
-            group = self.get_group_by_scim_id(graph.identifier)
-            if not group:
-                raise RuntimeError(f"Group {graph} found in graph database, but not in mongodb")
-            group.graph = graph
-            res += [group]
-        return res
+        return self._load_docs(groups)
 
     def get_groups_by_last_modified(
         self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
     ) -> Tuple[List[ScimApiGroup], int]:
-        # map SCIM filter operators to mongodb filter
-        mongo_operator = {"gt": "$gt", "ge": "$gte"}.get(operator)
-        if not mongo_operator:
-            raise ValueError("Invalid filter operator")
-        spec = {"last_modified": {mongo_operator: value}}
+        spec = last_modified_spec(operator, value)
         docs, total_count = self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
         groups = [ScimApiGroup.from_dict(x) for x in docs]
         return groups, total_count
@@ -313,3 +416,296 @@ class ScimApiGroupDB(ScimApiBaseDB):
             return False
         self.graphdb.remove_group(str(group.scim_id))
         return True
+
+
+class AsyncScimApiGroupDB(AsyncScimApiBaseDB):
+    """
+    ScimApiGroupDB for use in the SCIM API.
+
+    The mongodb part uses motor. The neo4j calls are still synchronous, so they are run in
+    the default thread pool executor to keep them from blocking the event loop.
+
+    With graph_outbox enabled, save() does not write to the graph database. The wanted graph state is instead
+    stored in the group document (in the same write as the rest of the group), and applied to the graph
+    database later by reconcile_graph_outbox(). Reading a group returns the pending graph state, but queries
+    answered by the graph database (e.g. the groups a user is a member of) are eventually consistent, unless
+    graph_outbox_read_timeout is set. Then such queries first wait (at most that many seconds) for all pending
+    mutations to be applied.
+
+    Mutations can be applied by more than one reconciler at the same time (the background task in every API
+    process, and the read barrier). To keep a reconciler from writing an old mutation to the graph database after
+    another reconciler has applied a newer one, a reconciler takes a lease on the group (in a separate collection,
+    since save() replaces the group document) before reading and applying its mutation. The lease expires after
+    graph_outbox_lease_time, in case the reconciler dies while holding it.
+    """
+
+    def __init__(
+        self,
+        neo4j_uri: str,
+        scope: str,
+        mongo_uri: str,
+        mongo_dbname: str,
+        mongo_collection: str,
+        neo4j_config: Optional[Dict[str, Any]] = None,
+        setup_indexes: bool = True,
+        graph_outbox: bool = False,
+        graph_outbox_read_timeout: Optional[float] = None,
+        graph_outbox_lease_time: timedelta = timedelta(minutes=1),
+    ):
+        super().__init__(mongo_uri, mongo_dbname, collection=mongo_collection)
+        self.graphdb = GroupDB(db_uri=neo4j_uri, scope=scope, config=neo4j_config)
+        self.graph_outbox = graph_outbox
+        self.graph_outbox_read_timeout = graph_outbox_read_timeout
+        self.graph_outbox_lease_time = graph_outbox_lease_time
+        self._graph_leases = self._db.get_collection(f"{mongo_collection}__graph_leases")
+        logger.info(f"{self} initialised")
+
+        if setup_indexes:
+            self.setup_indexes(copy.deepcopy(GROUP_INDEXES))
+            if graph_outbox:
+                # remove expired leases
+                self._graph_leases.delegate.create_index("expires_at", name="expires-at", expireAfterSeconds=0)
+
+    async def _get_graph_group(self, scim_id: str) -> GraphGroup:
+        graph_group = await asyncio.to_thread(self.graphdb.get_group, scim_id)
+        if graph_group is None:
+            raise RuntimeError(f"Group {scim_id} found in mongodb, but not in graphdb")
+        return graph_group
+
+    async def save(self, group: ScimApiGroup) -> bool:
+        test_doc, group_dict = _group_to_db_doc(group)
+        if self.graph_outbox:
+            group_dict[GRAPH_OUTBOX_FIELD] = _graph_to_outbox(group.graph)
+        result = await self._coll.replace_one(test_doc, group_dict, upsert=False)
+        if result.modified_count == 0:
+            db_group = await self._coll.find_one({"_id": group.group_id})
+            if db_group:
+                logger.debug(f"{self} FAILED Updating group {group} in {self._coll_name}")
+                raise RuntimeError("Group out of sync, please retry")
+            await self._coll.insert_one(group_dict)
+        if not self.graph_outbox:
+            # Save graphdb group
+            # TODO: Should we try to roll back mongodb change if the graphdb save fails?
+            group.graph = await asyncio.to_thread(self.graphdb.save, group.graph)
+
+        # put the new version number and last_modified in the group object after a successful update
+        group.version = group_dict["version"]
+        group.last_modified = group_dict["last_modified"]
+        logger.debug(f"{self} Updated group {group} in {self._coll_name}")
+        return result.acknowledged
+
+    async def create_group(self, create_request: GroupCreateRequest) -> ScimApiGroup:
+        group = _group_from_create_request(create_request)
+        if not await self.save(group):
+            logger.error(f"Creating group {group} failed")
+            raise RuntimeError("Group creation failed")
+        return group
+
+    async def update_group(
+        self, update_request: GroupUpdateRequest, db_group: ScimApiGroup
+    ) -> Tuple[ScimApiGroup, bool]:
+        changed = _apply_update_request(update_request=update_request, db_group=db_group)
+        if changed:
+            logger.info(f"Group {str(db_group.scim_id)} changed. Saving.")
+            if await self.save(db_group):
+                logger.info(f"Group {str(db_group.scim_id)} saved.")
+            else:
+                logger.warning(f"Update of group {db_group} probably failed")
+
+        return db_group, changed
+
+    async def _load_graphs(self, docs: Sequence[Mapping[str, Any]]) -> List[ScimApiGroup]:
+        """Load the graph data for all the groups using a single graph database query"""
+        # groups with a pending mutation get the graph from the mutation
+        identifiers = [doc["scim_id"] for doc in docs if not doc.get(GRAPH_OUTBOX_FIELD)]
+        graph_groups: List[GraphGroup] = []
+        if identifiers:
+            graph_groups = await asyncio.to_thread(self.graphdb.get_groups_by_identifiers, identifiers)
+        return _groups_from_docs(docs, graph_groups)
+
+    async def _load_docs(self, graph_groups: Sequence[GraphGroup]) -> List[ScimApiGroup]:
+        """Load the mongodb documents for all the graph groups using a single query"""
+        docs = await self._get_documents_by_filter({"scim_id": {"$in": [graph.identifier for graph in graph_groups]}})
+        return _groups_from_graphs(graph_groups, docs)
+
+    async def get_groups(self) -> List[ScimApiGroup]:
+        docs = await self._get_documents_by_filter({})
+        return await self._load_graphs(docs)
+
+    async def get_groups_by_scim_ids(self, scim_ids: Sequence[str]) -> List[ScimApiGroup]:
+        """Load many groups at once. Groups that do not exist are left out of the result."""
+        docs = await self._get_documents_by_filter({"scim_id": {"$in": list(scim_ids)}})
+        return await self._load_graphs(docs)
+
+    async def get_group_by_scim_id(self, scim_id: str) -> Optional[ScimApiGroup]:
+        doc = await self._get_document_by_attr("scim_id", scim_id)
+        if doc:
+            group = ScimApiGroup.from_dict(doc)
+            if doc.get(GRAPH_OUTBOX_FIELD):
+                group.graph = _graph_from_outbox(scim_id, doc[GRAPH_OUTBOX_FIELD])
+            else:
+                group.graph = await self._get_graph_group(scim_id)
+            return group
+        return None
+
+    async def get_groups_by_property(
+        self, key: str, value: Union[str, int], skip=0, limit=100
+    ) -> Tuple[List[ScimApiGroup], int]:
+        docs, count = await self._get_documents_and_count_by_filter({key: value}, skip=skip, limit=limit)
+        if not docs:
+            return [], 0
+        return await self._load_graphs(docs), count
+
+    async def get_groups_for_user_identifer(self, member_identifier: UUID) -> List[ScimApiGroup]:
+        await self._graph_read_barrier()
+        groups = await asyncio.to_thread(self.graphdb.get_groups_for_user_identifer, str(member_identifier))
+        return await self._load_docs(groups)
+
+    async def get_groups_for_user_identifiers(self, member_identifiers: Sequence[UUID]) -> Dict[UUID, List[GraphGroup]]:
+        """
+        Find the groups that many users are members of, using a single graph database query.
+
+        Only the group nodes are loaded from the graph database (identifier and display name),
+        no members or owners, and nothing from mongodb.
+        """
+        await self._graph_read_barrier()
+        groups = await asyncio.to_thread(
+            self.graphdb.get_groups_for_user_identifiers, [str(x) for x in member_identifiers]
+        )
+        return {UUID(identifier): user_groups for identifier, user_groups in groups.items()}
+
+    async def get_groups_owned_by_user_identifier(self, owner_identifier: UUID) -> List[ScimApiGroup]:
+        await self._graph_read_barrier()
+        groups = await asyncio.to_thread(self.graphdb.get_groups_owned_by_user_identifier, str(owner_identifier))
+        return await self._load_docs(groups)
+
+    async def get_groups_by_last_modified(
+        self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
+    ) -> Tuple[List[ScimApiGroup], int]:
+        spec = last_modified_spec(operator, value)
+        docs, total_count = await self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
+        groups = [ScimApiGroup.from_dict(x) for x in docs]
+        return groups, total_count
+
+    async def search_groups(
+        self, spec: Dict[str, Any], limit: Optional[int] = None, skip: Optional[int] = None
+    ) -> Tuple[List[ScimApiGroup], int]:
+        """
+        Search for groups using a mongodb query compiled from a SCIM search filter.
+
+        Only the mongodb part of the groups is loaded, members and owners are not.
+        """
+        docs, total_count = await self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
+        groups = [ScimApiGroup.from_dict(x) for x in docs]
+        return groups, total_count
+
+    async def group_exists(self, scim_id: str) -> bool:
+        return bool(await self.db_count(spec={"scim_id": scim_id}, limit=1))
+
+    async def remove_group(self, group: ScimApiGroup) -> bool:
+        if not await self.remove_document(group.group_id):
+            return False
+        await asyncio.to_thread(self.graphdb.remove_group, str(group.scim_id))
+        return True
+
+    async def _graph_read_barrier(self) -> None:
+        """Wait for pending graph database mutations before a graph database query, if configured to"""
+        if self.graph_outbox and self.graph_outbox_read_timeout is not None:
+            await self.wait_for_graph_outbox(timeout=self.graph_outbox_read_timeout)
+
+    async def reconcile_graph_outbox(self, limit: int = 100) -> int:
+        """
+        Apply pending graph database mutations, oldest first.
+
+        A mutation is removed from the outbox only after it has been applied, and only if it has not been
+        replaced by a newer mutation in the meantime. Mutations that fail are left in the outbox, and will be
+        retried the next time. Groups leased by another reconciler are skipped.
+
+        :param limit: The maximum number of mutations to apply
+        :return: The number of applied mutations
+        """
+        outbox_spec = {GRAPH_OUTBOX_FIELD: {"$exists": True}}
+        sort_key = f"{GRAPH_OUTBOX_FIELD}.created_ts"
+        cursor = self._coll.find(outbox_spec, projection={"_id": True})
+        candidates = await cursor.sort(sort_key, 1).limit(limit).to_list(length=limit)
+        if not candidates:
+            return 0
+        lease_owner = ObjectId()
+        leased = [doc["_id"] for doc in candidates if await self._acquire_graph_lease(doc["_id"], lease_owner)]
+        if not leased:
+            return 0
+        try:
+            # Read the mutations after taking the leases, so that no other reconciler applies a newer one meanwhile
+            cursor = self._coll.find(
+                {"_id": {"$in": leased}, **outbox_spec}, projection={"scim_id": True, GRAPH_OUTBOX_FIELD: True}
+            )
+            docs = await cursor.sort(sort_key, 1).to_list(length=len(leased))
+            # apply the whole batch in a single worker thread
+            applied = await asyncio.to_thread(self._apply_graph_mutations, docs)
+            count = 0
+            for doc in applied:
+                result = await self._coll.update_one(
+                    {"_id": doc["_id"], f"{GRAPH_OUTBOX_FIELD}.mutation_id": doc[GRAPH_OUTBOX_FIELD]["mutation_id"]},
+                    {"$unset": {GRAPH_OUTBOX_FIELD: ""}},
+                )
+                if result.matched_count:
+                    count += 1
+                elif not await self.db_count(spec={"_id": doc["_id"]}, limit=1):
+                    # The group was removed while the mutation was applied, don't leave it in the graph database
+                    logger.info(f"Group {doc['scim_id']} removed while applying graph mutation, removing it from graph")
+                    await asyncio.to_thread(self.graphdb.remove_group, doc["scim_id"])
+                # else, the group has been saved again, and the newer mutation will be applied next time
+        finally:
+            await self._graph_leases.delete_many({"_id": {"$in": leased}, "owner": lease_owner})
+        logger.debug(f"{self} applied {count} pending graph mutations")
+        return count
+
+    async def _acquire_graph_lease(self, group_id: ObjectId, owner: ObjectId) -> bool:
+        """Take the lease for applying graph mutations for a group, unless someone else holds it"""
+        now = utc_now()
+        try:
+            await self._graph_leases.update_one(
+                {"_id": group_id, "expires_at": {"$lt": now}},
+                {"$set": {"owner": owner, "expires_at": now + self.graph_outbox_lease_time}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # there is a lease for the group that has not expired
+            return False
+        return True
+
+    def _apply_graph_mutations(self, docs: Sequence[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """
+        Apply graph mutations to the graph database. Runs in a worker thread.
+
+        The caller holds the leases for the groups, so no other reconciler writes them until this is done.
+        """
+        applied: List[Mapping[str, Any]] = []
+        for doc in docs:
+            try:
+                current = self.graphdb.get_group(doc["scim_id"])
+                version = current.version if current else None
+                self.graphdb.save(_graph_from_outbox(doc["scim_id"], doc[GRAPH_OUTBOX_FIELD], version=version))
+            except Exception:
+                # leave the mutation in the outbox, and retry it later
+                logger.exception(f"Failed applying graph mutation for group {doc['scim_id']}")
+                continue
+            applied.append(doc)
+        return applied
+
+    async def wait_for_graph_outbox(self, timeout: float) -> bool:
+        """
+        Apply all pending graph database mutations now, and wait for the outbox to be empty.
+
+        :return: False if there were still pending mutations after timeout seconds
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while await self.db_count(spec={GRAPH_OUTBOX_FIELD: {"$exists": True}}, limit=1):
+            if loop.time() >= deadline:
+                logger.warning(f"{self} timed out waiting for pending graph mutations")
+                return False
+            if not await self.reconcile_graph_outbox():
+                # someone else is applying the mutations, or they are failing
+                await asyncio.sleep(0.05)
+        return True
@@ -11,7 +11,7 @@ from uuid import UUID
 from bson import ObjectId
 
 from eduid.scimapi.utils import filter_none
-from eduid.userdb.scimapi.basedb import ScimApiBaseDB
+from eduid.userdb.scimapi.basedb import AsyncScimApiBaseDB, ScimApiBaseDB, last_modified_spec
 from eduid.userdb.scimapi.common import (
     ScimApiEmail,
     ScimApiName,
@@ -67,26 +67,40 @@ class ScimApiInvite(ScimApiResourceBase):
         return cls(**this)
 
 
+INVITE_INDEXES = {
+    # Create an index so that scim_id is unique per data owner
+    "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
+    "unique-external-id": {"key": [("external_id", 1)], "unique": True, "sparse": True},
+    # Indexes for the attributes that can be used in search filters, see eduid.scimapi.search
+    "last-modified": {"key": [("last_modified", 1)]},
+}
+
+
+def _invite_to_db_doc(invite: ScimApiInvite) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Prepare an invite for saving.
+
+    :return: The document to use to find the current version of the invite, and the new invite document
+    """
+    invite_dict = invite.to_dict()
+
+    test_doc = {
+        "_id": invite.invite_id,
+        "version": invite.version,
+    }
+    # update the version number and last_modified timestamp
+    invite_dict["version"] = ObjectId()
+    invite_dict["last_modified"] = datetime.utcnow()
+    return test_doc, invite_dict
+
+
 class ScimApiInviteDB(ScimApiBaseDB):
     def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi"):
         super().__init__(db_uri, db_name, collection=collection)
-        # Create an index so that scim_id is unique per data owner
-        indexes = {
-            "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
-            "unique-external-id": {"key": [("external_id", 1)], "unique": True, "sparse": True},
-        }
-        self.setup_indexes(indexes)
+        self.setup_indexes(copy.deepcopy(INVITE_INDEXES))
 
     def save(self, invite: ScimApiInvite) -> bool:
-        invite_dict = invite.to_dict()
-
-        test_doc = {
-            "_id": invite.invite_id,
-            "version": invite.version,
-        }
-        # update the version number and last_modified timestamp
-        invite_dict["version"] = ObjectId()
-        invite_dict["last_modified"] = datetime.utcnow()
+        test_doc, invite_dict = _invite_to_db_doc(invite)
         result = self._coll.replace_one(test_doc, invite_dict, upsert=False)
         if result.modified_count == 0:
             db_invite = self._coll.find_one({"_id": invite.invite_id})
@@ -117,14 +131,61 @@ class ScimApiInviteDB(ScimApiBaseDB):
     def get_invites_by_last_modified(
         self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
     ) -> Tuple[List[ScimApiInvite], int]:
-        # map SCIM filter operators to mongodb filter
-        mongo_operator = {"gt": "$gt", "ge": "$gte"}.get(operator)
-        if not mongo_operator:
-            raise ValueError("Invalid filter operator")
-        spec = {"last_modified": {mongo_operator: value}}
+        spec = last_modified_spec(operator, value)
         docs, total_count = self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
         invites = [ScimApiInvite.from_dict(x) for x in docs]
         return invites, total_count
 
     def invite_exists(self, scim_id: str) -> bool:
         return bool(self.db_count(spec={"scim_id": scim_id}, limit=1))
+
+
+class AsyncScimApiInviteDB(AsyncScimApiBaseDB):
+    def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi"):
+        super().__init__(db_uri, db_name, collection=collection)
+        self.setup_indexes(copy.deepcopy(INVITE_INDEXES))
+
+    async def save(self, invite: ScimApiInvite) -> bool:
+        test_doc, invite_dict = _invite_to_db_doc(invite)
+        result = await self._coll.replace_one(test_doc, invite_dict, upsert=False)
+        if result.modified_count == 0:
+            db_invite = await self._coll.find_one({"_id": invite.invite_id})
+            if db_invite:
+                logger.debug(f"{self} FAILED Updating invite {invite} in {self._coll_name}")
+                raise RuntimeError("Invite out of sync, please retry")
+            await self._coll.insert_one(invite_dict)
+        # put the new version number and last_modified in the invite object after a successful update
+        invite.version = invite_dict["version"]
+        invite.last_modified = invite_dict["last_modified"]
+        logger.debug(f"{self} Updated invite {invite} in {self._coll_name}")
+        return result.acknowledged
+
+    async def remove(self, invite: ScimApiInvite) -> bool:
+        return await self.remove_document(invite.invite_id)
+
+    async def get_invite_by_scim_id(self, scim_id: str) -> Optional[ScimApiInvite]:
+        doc = await self._get_document_by_attr("scim_id", scim_id)
+        if doc:
+            return ScimApiInvite.from_dict(doc)
+        return None
+
+    async def get_invites_by_last_modified(
+        self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
+    ) -> Tuple[List[ScimApiInvite], int]:
+        spec = last_modified_spec(operator, value)
+        docs, total_count = await self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
+        invites = [ScimApiInvite.from_dict(x) for x in docs]
+        return invites, total_count
+
+    async def search_invites(
+        self, spec: Dict[str, Any], limit: Optional[int] = None, skip: Optional[int] = None
+    ) -> Tuple[List[ScimApiInvite], int]:
+        """
+        Search for invites using a mongodb query compiled from a SCIM search filter.
+        """
+        docs, total_count = await self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
+        invites = [ScimApiInvite.from_dict(x) for x in docs]
+        return invites, total_count
+
+    async def invite_exists(self, scim_id: str) -> bool:
+        return bool(await self.db_count(spec={"scim_id": scim_id}, limit=1))
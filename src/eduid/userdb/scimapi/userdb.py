@@ -10,7 +10,7 @@ from typing import Any, Dict, List, Mapping, Optional, Tuple, Type
 from bson import ObjectId
 
 from eduid.userdb import User, UserDB
-from eduid.userdb.scimapi.basedb import ScimApiBaseDB
+from eduid.userdb.scimapi.basedb import AsyncScimApiBaseDB, ScimApiBaseDB, last_modified_spec
 from eduid.userdb.scimapi.common import (
     ScimApiEmail,
     ScimApiLinkedAccount,
@@ -62,43 +62,62 @@ class ScimApiUser(ScimApiResourceBase):
         # Phone numbers
         this["phone_numbers"] = [ScimApiPhoneNumber.from_dict(number) for number in data.get("phone_numbers", [])]
         # Profiles
-        this["profiles"] = {k: ScimApiProfile.from_dict(v) for k, v in data["profiles"].items()}
+        this["profiles"] = {k: ScimApiProfile.from_dict(v) for k, v in data.get("profiles", {}).items()}
         # Linked accounts
         this["linked_accounts"] = [ScimApiLinkedAccount.from_dict(x) for x in data.get("linked_accounts", [])]
         return cls(**this)
 
 
+def _user_to_db_doc(user: ScimApiUser) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Prepare a user for saving.
+
+    :return: The document to use to find the current version of the user, and the new user document
+    """
+    user_dict = user.to_dict()
+
+    if "profiles" in user_dict:
+        # don't save the special PoC eduid profiles in the database (bson does not allow dots in keys)
+        for eduid_domain in ["eduid.se", "dev.eduid.se"]:
+            if eduid_domain in user_dict["profiles"]:
+                del user_dict["profiles"][eduid_domain]
+
+    test_doc = {
+        "_id": user.user_id,
+        "version": user.version,
+    }
+    # update the version number and last_modified timestamp
+    user_dict["version"] = ObjectId()
+    user_dict["last_modified"] = datetime.utcnow()
+    return test_doc, user_dict
+
+
+USER_INDEXES = {
+    # Create an index so that scim_id and external_id is unique per data owner
+    "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
+    "unique-external-id": {
+        "key": [("external_id", 1)],
+        "unique": True,
+        "partialFilterExpression": {"external_id": {"$type": "string"}},
+    },
+    # Indexes for the attributes that can be used in search filters, see eduid.scimapi.search
+    "last-modified": {"key": [("last_modified", 1)]},
+    "name-family-name": {"key": [("name.family_name", 1)], "sparse": True},
+    "name-given-name": {"key": [("name.given_name", 1)], "sparse": True},
+    "emails-value": {"key": [("emails.value", 1)], "sparse": True},
+    "phone-numbers-value": {"key": [("phone_numbers.value", 1)], "sparse": True},
+    "linked-accounts-value": {"key": [("linked_accounts.value", 1)], "sparse": True},
+}
+
+
 class ScimApiUserDB(ScimApiBaseDB):
     def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi", setup_indexes: bool = True):
         super().__init__(db_uri, db_name, collection=collection)
         if setup_indexes:
-            # Create an index so that scim_id and external_id is unique per data owner
-            indexes = {
-                "unique-scimid": {"key": [("scim_id", 1)], "unique": True},
-                "unique-external-id": {
-                    "key": [("external_id", 1)],
-                    "unique": True,
-                    "partialFilterExpression": {"external_id": {"$type": "string"}},
-                },
-            }
-            self.setup_indexes(indexes)
+            self.setup_indexes(copy.deepcopy(USER_INDEXES))
 
     def save(self, user: ScimApiUser) -> bool:
-        user_dict = user.to_dict()
-
-        if "profiles" in user_dict:
-            # don't save the special PoC eduid profiles in the database (bson does not allow dots in keys)
-            for eduid_domain in ["eduid.se", "dev.eduid.se"]:
-                if eduid_domain in user_dict["profiles"]:
-                    del user_dict["profiles"][eduid_domain]
-
-        test_doc = {
-            "_id": user.user_id,
-            "version": user.version,
-        }
-        # update the version number and last_modified timestamp
-        user_dict["version"] = ObjectId()
-        user_dict["last_modified"] = datetime.utcnow()
+        test_doc, user_dict = _user_to_db_doc(user)
         # Save existing user
         result = self._coll.replace_one(test_doc, user_dict, upsert=False)
         if result.modified_count == 0:
@@ -138,11 +157,7 @@ class ScimApiUserDB(ScimApiBaseDB):
     def get_users_by_last_modified(
         self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
     ) -> Tuple[List[ScimApiUser], int]:
-        # map SCIM filter operators to mongodb filter
-        mongo_operator = {"gt": "$gt", "ge": "$gte"}.get(operator)
-        if not mongo_operator:
-            raise ValueError("Invalid filter operator")
-        spec = {"last_modified": {mongo_operator: value}}
+        spec = last_modified_spec(operator, value)
         docs, total_count = self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
         users = [ScimApiUser.from_dict(x) for x in docs]
         return users, total_count
@@ -151,6 +166,84 @@ class ScimApiUserDB(ScimApiBaseDB):
         return bool(self.db_count(spec={"scim_id": scim_id}, limit=1))
 
 
+class AsyncScimApiUserDB(AsyncScimApiBaseDB):
+    """ScimApiUserDB for use in the SCIM API, where blocking the event loop on database I/O is not an option."""
+
+    def __init__(self, db_uri: str, collection: str, db_name="eduid_scimapi", setup_indexes: bool = True):
+        super().__init__(db_uri, db_name, collection=collection)
+        if setup_indexes:
+            self.setup_indexes(copy.deepcopy(USER_INDEXES))
+
+    async def save(self, user: ScimApiUser) -> bool:
+        test_doc, user_dict = _user_to_db_doc(user)
+        # Save existing user
+        result = await self._coll.replace_one(test_doc, user_dict, upsert=False)
+        if result.modified_count == 0:
+            # Could not replace the user, is it new or is something out out sync
+            db_user = await self._coll.find_one({"_id": user.user_id})
+            if db_user:
+                logger.debug(f"{self} FAILED Updating user {user} in {self._coll_name}")
+                raise RuntimeError("User out of sync, please retry")
+            # Out of sync check did not find any problems, it is a new user - save it.
+            result = await self._coll.insert_one(user_dict)
+        # put the new version number and last_modified in the user object after a successful update
+        user.version = user_dict["version"]
+        user.last_modified = user_dict["last_modified"]
+        logger.debug(f"{self} Updated user {user} in {self._coll_name}")
+        return result.acknowledged
+
+    async def remove(self, user: ScimApiUser) -> bool:
+        return await self.remove_document(user.user_id)
+
+    async def get_user_by_scim_id(
+        self, scim_id: str, fields: Optional[Dict[str, bool]] = None
+    ) -> Optional[ScimApiUser]:
+        """
+        :param fields: A projection to only load some fields. Users loaded like that are incomplete,
+                       and must not be saved.
+        """
+        doc = await self._get_document_by_attr("scim_id", scim_id, fields=fields)
+        if doc:
+            return ScimApiUser.from_dict(doc)
+        return None
+
+    async def get_user_by_external_id(self, external_id: str) -> Optional[ScimApiUser]:
+        doc = await self._get_document_by_attr("external_id", external_id)
+        if doc:
+            return ScimApiUser.from_dict(doc)
+        return None
+
+    async def get_users_by_last_modified(
+        self, operator: str, value: datetime, limit: Optional[int] = None, skip: Optional[int] = None
+    ) -> Tuple[List[ScimApiUser], int]:
+        spec = last_modified_spec(operator, value)
+        docs, total_count = await self._get_documents_and_count_by_filter(spec=spec, limit=limit, skip=skip)
+        users = [ScimApiUser.from_dict(x) for x in docs]
+        return users, total_count
+
+    async def search_users(
+        self,
+        spec: Dict[str, Any],
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+        fields: Optional[Dict[str, bool]] = None,
+    ) -> Tuple[List[ScimApiUser], int]:
+        """
+        Search for users using a mongodb query compiled from a SCIM search filter.
+
+        :param fields: A projection to only load some fields. Users loaded like that are incomplete,
+                       and must not be saved.
+        """
+        docs, total_count = await self._get_documents_and_count_by_filter(
+            spec=spec, fields=fields, limit=limit, skip=skip
+        )
+        users = [ScimApiUser.from_dict(x) for x in docs]
+        return users, total_count
+
+    async def user_exists(self, scim_id: str) -> bool:
+        return bool(await self.db_count(spec={"scim_id": scim_id}, limit=1))
+
+
 class ScimEduidUserDB(UserDB[User]):
     """EduID userdb"""
 
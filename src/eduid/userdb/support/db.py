@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from typing import Any, Dict, List, Mapping, Type, Union
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type, Union
 
 from bson import ObjectId
 
@@ -27,20 +27,32 @@ class SupportUserDB(UserDB[SupportUser]):
     def user_from_dict(cls, data: Mapping[str, Any]) -> SupportUser:
         return SupportUser.from_dict(data)
 
-    def search_users(self, query: str) -> List[SupportUser]:
+    def search_users(self, query: str, skip: int = 0, limit: Optional[int] = None) -> Tuple[List[SupportUser], int]:
         """
+        Find users using a single database query.
+
         :param query: search query, can be a user eppn, nin, mail address or phone number
-        :return: A list of user docs
+        :param skip: The number of matching users to skip, for pagination
+        :param limit: The maximum number of users to return
+        :return: A list of users, and the total number of matching users
         """
-        results = list()
-        # We could do this with a custom filter (and one db call) but it is better to lean on existing methods
-        # if the way we find users change in the future
-        results.append(self.get_user_by_eppn(query))
-        results.append(self.get_user_by_nin(query))
-        results.extend(self.get_users_by_mail(query))
-        results.extend(self.get_users_by_phone(query))
-        users = [user for user in results if user]
-        return users
+        # Use the same filters as the get_user(s)_by_x methods, so that users are found the same way
+        spec = {
+            "$or": [
+                {"eduPersonPrincipalName": query},
+                self._nin_filter(query),
+                *self._mail_filter(query)["$or"],
+                *self._phone_filter(query)["$or"],
+            ]
+        }
+        cursor = self._coll.find(spec).sort("_id", 1).skip(skip)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        users = [self.user_from_dict(data=doc) for doc in cursor]
+        if not skip and (limit is None or len(users) < limit):
+            # all matching users were returned, no need for another query to count them
+            return users, len(users)
+        return users, self.db_count(spec=spec)
 
 
 class SupportSignupUserDB(SignupUserDB):
@@ -179,12 +179,15 @@ class UserDB(BaseDB, Generic[UserVar], ABC):
 
         :return: User instance
         """
+        return self._get_user_by_filter(self._mail_filter(email, include_unconfirmed=include_unconfirmed))
+
+    @staticmethod
+    def _mail_filter(email: str, include_unconfirmed: bool = False) -> Dict[str, Any]:
         email = email.lower()
         elemmatch = {"email": email, "verified": True}
         if include_unconfirmed:
             elemmatch = {"email": email}
-        filter = {"$or": [{"mail": email}, {"mailAliases": {"$elemMatch": elemmatch}}]}
-        return self._get_user_by_filter(filter)
+        return {"$or": [{"mail": email}, {"mailAliases": {"$elemMatch": elemmatch}}]}
 
     def get_user_by_nin(self, nin: str) -> Optional[UserVar]:
         """Locate a user with a (confirmed) NIN"""
@@ -206,12 +209,14 @@ class UserDB(BaseDB, Generic[UserVar], ABC):
 
         :return: List of User instances
         """
+        return self._get_user_by_filter(self._nin_filter(nin, include_unconfirmed=include_unconfirmed))
 
+    @staticmethod
+    def _nin_filter(nin: str, include_unconfirmed: bool = False) -> Dict[str, Any]:
         match = {"identity_type": IdentityType.NIN.value, "number": nin, "verified": True}
         if include_unconfirmed:
             del match["verified"]
-        _filter = {"identities": {"$elemMatch": match}}
-        return self._get_user_by_filter(_filter)
+        return {"identities": {"$elemMatch": match}}
 
     def get_users_by_identity(
         self, identity_type: IdentityType, key: str, value: str, include_unconfirmed: bool = False
@@ -242,6 +247,10 @@ class UserDB(BaseDB, Generic[UserVar], ABC):
 
         :return: List of User instances
         """
+        return self._get_user_by_filter(self._phone_filter(phone, include_unconfirmed=include_unconfirmed))
+
+    @staticmethod
+    def _phone_filter(phone: str, include_unconfirmed: bool = False) -> Dict[str, Any]:
         oldmatch = {"mobile": phone, "verified": True}
         if include_unconfirmed:
             oldmatch = {"mobile": phone}
@@ -250,8 +259,7 @@ class UserDB(BaseDB, Generic[UserVar], ABC):
         if include_unconfirmed:
             newmatch = {"number": phone}
         new_filter = {"phone": {"$elemMatch": newmatch}}
-        filter = {"$or": [old_filter, new_filter]}
-        return self._get_user_by_filter(filter)
+        return {"$or": [old_filter, new_filter]}
 
     def get_user_by_eppn(self, eppn: Optional[str]) -> Optional[UserVar]:
         """
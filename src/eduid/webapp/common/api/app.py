@@ -3,18 +3,22 @@ Define a EduIDApp to create a Flask app and update
 it with all attributes common to all eduID services.
 """
 import os
+import time
 from abc import ABCMeta
+from dataclasses import replace
+from functools import partial
 from sys import stderr
-from typing import Any, Dict, TypeVar
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 from cookies_samesite_compat import CookiesSameSiteCompatMiddleware
-from flask import Flask
+from flask import Flask, current_app, g, request
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from eduid.common.config.base import EduIDBaseAppConfig, FlaskConfig
 from eduid.common.config.exceptions import BadConfiguration
 from eduid.common.logging import init_logging
+from eduid.common.misc.concurrency import FanOut
 from eduid.common.stats import init_app_stats
 from eduid.userdb.userdb import AmDB
 from eduid.webapp.common.api.checks import (
@@ -102,8 +106,14 @@ class EduIDBaseApp(Flask, metaclass=ABCMeta):
         if init_central_userdb:
             self.central_userdb = AmDB(config.mongo_uri)
 
+        # Report the time spent handling every request, per endpoint
+        self.before_request(_start_request_timer)
+        self.teardown_request(_report_request_time)
+
         # Set up generic health check views
         self.failure_info: Dict[str, FailCountItem] = dict()
+        self._health_check_timeout = config.health_check_timeout
+        self._health_check_fan_out = FanOut(name="health-check", max_workers=8)
         init_status_views(self, config)
 
     def run_health_checks(
@@ -117,46 +127,86 @@ class EduIDBaseApp(Flask, metaclass=ABCMeta):
         vccs: bool = True,
     ) -> CheckResult:
         """
-        Used in status health check view to run the apps checks
+        Used in status health check view to run the apps checks.
+
+        The checks are run concurrently, with a timeout. Each check updates its own copy of the failure info,
+        and the changes are applied to failure_info when all the checks are done.
         """
+        enabled = {
+            "mongodb": mongo,
+            "redis": redis,
+            "am": am,
+            "msg": msg,
+            "mail": mail,
+            "lookup_mobile": lookup_mobile,
+            "vccs": vccs,
+        }
+        names = [name for name, check in enabled.items() if check]
+        checks: Dict[str, Callable[[], bool]] = {
+            "mongodb": check_mongo,
+            "redis": check_redis,
+            "am": check_am,
+            "msg": check_msg,
+            "mail": check_mail,
+            "lookup_mobile": check_lookup_mobile,
+            "vccs": check_vccs,
+        }
+        failure_info = dict(self.failure_info)
+        calls = {name: partial(self._run_health_check, checks[name], failure_info) for name in names}
+        results = self._health_check_fan_out.run(calls, timeout=self._health_check_timeout)
+
         res = CheckResult(healthy=True)
-        # MongoDB
-        if mongo and not check_mongo():
-            res.healthy = False
-            res.reason = "mongodb check failed"
-            self.logger.warning("mongodb check failed")
-        # Redis
-        elif redis and not check_redis():
-            res.healthy = False
-            res.reason = "redis check failed"
-            self.logger.warning("redis check failed")
-        # AM
-        elif am and not check_am():
-            res.healthy = False
-            res.reason = "am check failed"
-            self.logger.warning("am check failed")
-        # MSG
-        elif msg and not check_msg():
-            res.healthy = False
-            res.reason = "msg check failed"
-            self.logger.warning("msg check failed")
-        # Mail Relay
-        elif mail and not check_mail():
-            res.healthy = False
-            res.reason = "mail check failed"
-            self.logger.warning("mail check failed")
-        # Lookup Mobile Relay
-        elif lookup_mobile and not check_lookup_mobile():
+        failed = []
+        for name in names:
+            result = results[name]
+            res.latency[name] = round(result.elapsed * 1000, 3)
+            self.stats.timing(f"health_check.{name}", result.elapsed * 1000)
+            if result.timed_out:
+                failed.append(f"{name} check timed out")
+            elif result.value is None:
+                failed.append(f"{name} check failed")
+            else:
+                healthy, check_failure_info = result.value
+                _merge_failure_info(self.failure_info, before=failure_info, after=check_failure_info)
+                if not healthy:
+                    failed.append(f"{name} check failed")
+        if failed:
             res.healthy = False
-            res.reason = "lookup_mobile check failed"
-            self.logger.warning("lookup_mobile check failed")
-        # VCCS
-        elif vccs and not check_vccs():
-            res.healthy = False
-            res.reason = "vccs check failed"
-            self.logger.warning("vccs check failed")
+            res.reason = ", ".join(failed)
+            self.logger.warning(f"health check failed: {res.reason} (latency: {res.latency})")
         return res
 
+    def _run_health_check(
+        self, func: Callable[[], bool], failure_info: Dict[str, FailCountItem]
+    ) -> Tuple[bool, Dict[str, FailCountItem]]:
+        with self.app_context():
+            # the check updates a copy of the failure info, not the one shared by all the checks and requests
+            g.failure_info = {key: replace(info) for key, info in failure_info.items()}
+            return func(), g.failure_info
+
+
+def _merge_failure_info(
+    failure_info: Dict[str, FailCountItem], before: Dict[str, FailCountItem], after: Dict[str, FailCountItem]
+) -> None:
+    """Apply the changes a health check made to its copy of the failure info"""
+    for key in before.keys() - after.keys():
+        failure_info.pop(key, None)
+    for key, info in after.items():
+        if before.get(key) != info:
+            failure_info[key] = info
+
+
+def _start_request_timer() -> None:
+    g.request_start = time.perf_counter()
+
+
+def _report_request_time(exc: Optional[BaseException]) -> None:
+    start = g.pop("request_start", None)
+    if start is not None and request.endpoint is not None:
+        current_app.stats.timing(f"request.{request.endpoint}", (time.perf_counter() - start) * 1000)
+    # send the stats from this request in as few datagrams as possible
+    current_app.stats.flush()
+
 
 def init_status_views(app: EduIDBaseApp, config: EduIDBaseAppConfig) -> None:
     """
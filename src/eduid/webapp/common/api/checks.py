@@ -3,10 +3,10 @@ import sys
 from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
 from os import environ
-from typing import Optional
+from typing import Dict, Optional
 
 import redis
-from flask import current_app
+from flask import current_app, g
 
 from eduid.common.config.base import VCCSConfigMixin
 from eduid.common.rpc.am_relay import AmRelay
@@ -22,6 +22,8 @@ class CheckResult:
     status: Optional[str] = None
     hostname: str = field(default_factory=lambda: environ.get("HOSTNAME", "UNKNOWN"))
     reason: Optional[str] = None
+    # milliseconds per checked dependency
+    latency: Dict[str, float] = field(default_factory=dict)
 
 
 @dataclass
@@ -36,23 +38,31 @@ class FailCountItem:
         return f"(first_failure: {self.first_failure.isoformat()}, fail count: {self.count})"
 
 
+def _get_failure_info() -> Dict[str, FailCountItem]:
+    # run_health_checks gives each check its own copy of the failure info
+    return g.get("failure_info", current_app.failure_info)
+
+
 def log_failure_info(key: str, msg: str, exc: Optional[Exception] = None) -> None:
-    if key not in current_app.failure_info:
-        current_app.failure_info[key] = FailCountItem(first_failure=datetime.utcnow())
-    current_app.failure_info[key].count += 1
-    current_app.logger.warning(f"{msg} {current_app.failure_info[key]}: {exc}")
+    failure_info = _get_failure_info()
+    if key not in failure_info:
+        failure_info[key] = FailCountItem(first_failure=datetime.utcnow())
+    failure_info[key].count += 1
+    current_app.logger.warning(f"{msg} {failure_info[key]}: {exc}")
 
 
 def reset_failure_info(key: str) -> None:
-    if key not in current_app.failure_info:
+    failure_info = _get_failure_info()
+    if key not in failure_info:
         return None
-    info = current_app.failure_info.pop(key)
+    info = failure_info.pop(key)
     current_app.logger.info(f"Check {key} back to normal. Resetting info {info}")
 
 
 def check_restart(key: str, restart: int, terminate: int) -> bool:
     res = False  # default to no restart
-    info = current_app.failure_info.get(key)
+    failure_info = _get_failure_info()
+    info = failure_info.get(key)
     if not info:
         return res
     if restart and not info.restart_at:
@@ -67,7 +77,7 @@ def check_restart(key: str, restart: int, terminate: int) -> bool:
         info = replace(info, restart_at=datetime.utcnow() + timedelta(seconds=restart))
         # Try to restart/reinitialize the failing functionality
         res = True
-    current_app.failure_info[key] = info
+    failure_info[key] = info
     return res
 
 
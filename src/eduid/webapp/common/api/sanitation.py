@@ -30,6 +30,8 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 import logging
+import re
+from functools import lru_cache
 from typing import Optional
 from urllib.parse import quote, unquote
 
@@ -38,6 +40,23 @@ from flask import request
 
 module_logger = logging.getLogger(__name__)
 
+# Characters that bleach escapes (&, <, >) or that might be part of percent encoding (%).
+# Printable text without any of these is returned unchanged by bleach, so it doesn't need to be cleaned.
+_NEEDS_CLEANING = re.compile(r"[&<>%]")
+
+# Only short values are memoised, repeated values are typically tokens and cookies
+_MAX_CACHED_LENGTH = 256
+
+
+def is_plain_safe(text: str) -> bool:
+    """Check if text is known to be unchanged by sanitation"""
+    return text.isprintable() and _NEEDS_CLEANING.search(text) is None
+
+
+@lru_cache(maxsize=1024)
+def _cached_clean(text: str, strip: bool) -> str:
+    return clean(text, strip=strip)
+
 
 class SanitationProblem(Exception):
     pass
@@ -74,6 +93,8 @@ class Sanitizer(object):
             # before running bleach.
             if isinstance(untrusted_text, bytes):
                 untrusted_text = untrusted_text.decode("utf-8")
+            if isinstance(untrusted_text, str) and is_plain_safe(untrusted_text):
+                return untrusted_text
             if unquote(untrusted_text) != untrusted_text:
                 use_percent_encoding = True
             else:
@@ -183,6 +204,8 @@ class Sanitizer(object):
         :rtype: str | unicode
         """
         try:
+            if len(untrusted_text) <= _MAX_CACHED_LENGTH:
+                return _cached_clean(untrusted_text, strip_characters)
             return clean(untrusted_text, strip=strip_characters)
         except KeyError:
             logger.warning(
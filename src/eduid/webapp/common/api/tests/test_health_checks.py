@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Dict, Mapping
+from unittest.mock import patch
+
+from eduid.common.config.base import EduIDBaseAppConfig
+from eduid.common.config.parsers import load_config
+from eduid.webapp.common.api.app import EduIDBaseApp
+from eduid.webapp.common.api.checks import log_failure_info, reset_failure_info
+from eduid.webapp.common.api.testing import EduidAPITestCase
+from eduid.webapp.common.api.views.status import SIMPLE_CACHE
+
+
+class HealthCheckTestApp(EduIDBaseApp):
+    def __init__(self, config: EduIDBaseAppConfig):
+        super().__init__(config)
+
+        self.conf = config
+
+
+def _slow_check(seconds: float) -> bool:
+    time.sleep(seconds)
+    return True
+
+
+@patch("eduid.webapp.common.api.app.check_vccs", return_value=True)
+@patch("eduid.webapp.common.api.app.check_lookup_mobile", return_value=True)
+@patch("eduid.webapp.common.api.app.check_mail", return_value=True)
+@patch("eduid.webapp.common.api.app.check_msg", return_value=True)
+@patch("eduid.webapp.common.api.app.check_am", return_value=True)
+@patch("eduid.webapp.common.api.app.check_redis", return_value=True)
+class HealthCheckTests(EduidAPITestCase):
+    app: HealthCheckTestApp
+
+    def setUp(self, *args: Any, **kwargs: Any) -> None:
+        super().setUp(*args, **kwargs)
+        SIMPLE_CACHE.clear()
+
+    def update_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        config.update({"health_check_timeout": 0.5, "status_cache_seconds": 10})
+        return config
+
+    def load_app(self, test_config: Mapping[str, Any]) -> HealthCheckTestApp:
+        config = load_config(typ=EduIDBaseAppConfig, app_name="testing", ns="webapp", test_config=test_config)
+        return HealthCheckTestApp(config)
+
+    def test_healthy(self, *mocks):
+        response = self.browser.get("/status/healthy")
+        self.assertEqual(response.status_code, 200)
+        assert response.json is not None
+        self.assertEqual(response.json["status"], "STATUS_OK_testing_")
+        self.assertEqual(
+            set(response.json["latency"].keys()),
+            {"mongodb", "redis", "am", "msg", "mail", "lookup_mobile", "vccs"},
+        )
+
+    def test_concurrent_with_timeout(self, redis_mock, am_mock, msg_mock, *mocks):
+        # two slow checks run at the same time, and a hanging one is reported as timed out
+        am_mock.side_effect = lambda: _slow_check(0.3)
+        msg_mock.side_effect = lambda: _slow_check(0.3)
+        redis_mock.side_effect = lambda: _slow_check(5)
+        start = time.monotonic()
+        with self.app.app_context():
+            res = self.app.run_health_checks()
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertFalse(res.healthy)
+        self.assertEqual(res.reason, "redis check timed out")
+        self.assertGreaterEqual(res.latency["am"], 300)
+
+    def test_failed(self, redis_mock, am_mock, *mocks):
+        am_mock.return_value = False
+        with self.app.app_context():
+            res = self.app.run_health_checks()
+        self.assertFalse(res.healthy)
+        self.assertEqual(res.reason, "am check failed")
+
+    def test_cached_single_flight(self, redis_mock, *mocks):
+        redis_mock.side_effect = lambda: _slow_check(0.2)
+        results = []
+
+        def _probe() -> None:
+            response = self.app.test_client().get("/status/healthy")
+            assert response.json is not None
+            results.append(response.json["status"])
+
+        threads = [threading.Thread(target=_probe) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ["STATUS_OK_testing_"] * 10)
+        # all probes shared one run of the checks
+        self.assertEqual(redis_mock.call_count, 1)
+
+    def test_failure_info(self, redis_mock, *mocks):
+        shared_counts = []
+
+        def _failing_check() -> bool:
+            log_failure_info("check_redis", msg="Redis health check failed")
+            # the failure info shared by all the checks is updated when all the checks are done
+            shared = self.app.failure_info.get("check_redis")
+            shared_counts.append(shared.count if shared else 0)
+            return False
+
+        def _ok_check() -> bool:
+            reset_failure_info("check_redis")
+            return True
+
+        redis_mock.side_effect = _failing_check
+        with self.app.app_context():
+            self.assertFalse(self.app.run_health_checks().healthy)
+            self.assertEqual(self.app.failure_info["check_redis"].count, 1)
+            self.assertFalse(self.app.run_health_checks().healthy)
+            self.assertEqual(self.app.failure_info["check_redis"].count, 2)
+            self.assertEqual(shared_counts, [0, 1])
+            redis_mock.side_effect = _ok_check
+            self.assertTrue(self.app.run_health_checks().healthy)
+            self.assertNotIn("check_redis", self.app.failure_info)
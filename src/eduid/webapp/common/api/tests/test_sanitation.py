@@ -0,0 +1,55 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from eduid.webapp.common.api import sanitation
+from eduid.webapp.common.api.sanitation import Sanitizer, is_plain_safe
+
+
+class SanitizerTests(TestCase):
+    def setUp(self) -> None:
+        self.sanitizer = Sanitizer()
+        sanitation._cached_clean.cache_clear()
+
+    def test_is_plain_safe(self):
+        for text in ["", "hubba-bubba", "user@example.com", "+46701234567", "Åsa Öberg", '{"a": [1, "b"]}']:
+            self.assertTrue(is_plain_safe(text), f"{text!r} should be plain safe")
+        for text in ["<script>", "a&b", "a%20b", "a\nb", "a\x00b"]:
+            self.assertFalse(is_plain_safe(text), f"{text!r} should not be plain safe")
+
+    def test_fast_path(self):
+        body = json.dumps(
+            {
+                "csrf_token": "3f5e1c0a9b2d4e6f8a7c5b3d1e9f0a2c4b6d8e0f",
+                "email": "johnsmith@example.com",
+                "given_name": "John",
+                "surname": "Smith",
+                "phone": "+46701234567",
+                "verified": True,
+            }
+        )
+        with patch.object(sanitation, "clean", wraps=sanitation.clean) as clean:
+            self.assertEqual(self.sanitizer.sanitize_input(body, content_type="application/json"), body)
+            self.assertEqual(self.sanitizer.sanitize_input(body.encode(), content_type="application/json"), body)
+            self.assertEqual(clean.call_count, 0)
+
+    def test_markup_is_still_cleaned(self):
+        self.assertEqual(
+            self.sanitizer.sanitize_input("<script>alert(42)</script>", content_type="text/plain"),
+            "&lt;script&gt;alert(42)&lt;/script&gt;",
+        )
+        self.assertEqual(
+            self.sanitizer.sanitize_input("%3Cscript%3E", content_type="application/x-www-form-urlencoded"),
+            "&lt%3Bscript&gt%3B",
+        )
+
+    def test_cached(self):
+        with patch.object(sanitation, "clean", wraps=sanitation.clean) as clean:
+            for _ in range(10):
+                self.assertEqual(self.sanitizer.sanitize_input("a&b", content_type="text/plain"), "a&amp;b")
+            self.assertEqual(clean.call_count, 1)
+            # long values are not cached
+            long_value = "a&b" * 100
+            for _ in range(2):
+                self.sanitizer.sanitize_input(long_value, content_type="text/plain")
+            self.assertEqual(clean.call_count, 3)
@@ -109,7 +109,8 @@ def save_and_sync_user(
     if private_userdb is None:
         private_userdb = current_app.private_userdb
     private_userdb.save(user)
-    return current_app.am_relay.request_user_sync(user, app_name_override=app_name_override)
+    with current_app.stats.timer("am.sync"):
+        return current_app.am_relay.request_user_sync(user, app_name_override=app_name_override)
 
 
 def get_flux_type(req: Request, suffix: str) -> str:
@@ -30,6 +30,7 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 #
+import threading
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from typing import Dict, Mapping, Optional
@@ -48,6 +49,8 @@ class SimpleCacheItem:
 
 
 SIMPLE_CACHE: Dict[str, SimpleCacheItem] = dict()
+# Requests arriving while the health checks are running wait for their result, instead of running them again
+HEALTH_CHECK_LOCK = threading.Lock()
 
 
 def cached_json_response(key: str, data: Optional[dict] = None) -> Optional[Response]:
@@ -85,15 +88,21 @@ def health_check():
     if response:
         return response
 
-    res: CheckResult = current_app.run_health_checks()
-    # Value of status crafted for grepabilty, trailing underscore intentional
-    if res.healthy is True:
-        res.status = f"STATUS_OK_{current_app.name}_"
-        res.reason = "Databases and task queues tested OK"
-    else:
-        res.status = f"STATUS_FAIL_{current_app.name}_"
+    with HEALTH_CHECK_LOCK:
+        # the checks might have been run by another request while we waited for the lock
+        response = cached_json_response("health_check")
+        if response:
+            return response
+
+        res: CheckResult = current_app.run_health_checks()
+        # Value of status crafted for grepabilty, trailing underscore intentional
+        if res.healthy is True:
+            res.status = f"STATUS_OK_{current_app.name}_"
+            res.reason = "Databases and task queues tested OK"
+        else:
+            res.status = f"STATUS_FAIL_{current_app.name}_"
 
-    return cached_json_response("health_check", asdict(res))
+        return cached_json_response("health_check", asdict(res))
 
 
 @status_views.route("/sanity-check", methods=["GET"])
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Loading of the SAML metadata used by a pysaml2 Server (the IdP), in deployments with many worker processes.
+
+Parsing (and verifying) a federation metadata aggregate takes a lot of time and memory, and every gunicorn
+worker does it on its own when it creates the app. To do better:
+
+  - preload_pysaml2() loads the pysaml2 Server, with the metadata, once in the gunicorn master before it forks
+    the workers. init_pysaml2() in the workers then returns the preloaded Server, and the memory pages holding
+    the parsed metadata are shared (copy-on-write) by the workers instead of every worker having its own copy.
+    Call it from the gunicorn on_starting hook, e.g. using eduid.webapp.idp.app.preload_idp_metadata.
+
+  - A metadata snapshot is a pickle of the parsed metadata, written when the metadata has been loaded. Workers
+    started without a preloaded master (or restarted) load the snapshot instead of parsing the metadata, if the
+    snapshot is recent enough. Pickles can execute code when loaded, so the snapshot must only be writable by
+    the IdP.
+
+  - MetadataRefresher loads the metadata again in a background thread, and swaps it in when it is completely
+    loaded. Unlike pysaml2's reload_metadata, requests keep seeing the old metadata (and not an empty one) while
+    the new metadata is loaded. Metadata loaded after the fork is of course not shared between the workers.
+"""
+
+import copy
+import gc
+import importlib
+import logging
+import os
+import pickle
+import sys
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from saml2 import server
+from saml2.config import IdPConfig
+from saml2.mdstore import InMemoryMetaData, MetadataStore
+
+from eduid.common.misc.timeutil import utc_now
+
+__author__ = "lundberg"
+
+logger = logging.getLogger(__name__)
+
+# The metadata of every source (file, URL etc.) in a MetadataStore, by source
+MetadataSources = Dict[Any, InMemoryMetaData]
+
+_preloaded: Dict[str, server.Server] = {}
+
+
+def read_pysaml2_config(cfgfile: str) -> Dict[str, Any]:
+    """
+    Read the CONFIG dict from a pysaml2 config module, given as a file name or a module name.
+    """
+    old_path = sys.path
+    cfgdir = os.path.dirname(cfgfile)
+    if cfgdir:
+        # add directory part to sys.path, since pysaml2 'import's it's config
+        sys.path = [cfgdir] + sys.path
+        cfgfile = os.path.basename(cfgfile)
+    if cfgfile.endswith(".py"):
+        cfgfile = cfgfile[:-3]
+
+    try:
+        module = importlib.import_module(cfgfile)
+    finally:
+        # restore path
+        sys.path = old_path
+    return copy.deepcopy(module.CONFIG)  # type: ignore[attr-defined]
+
+
+def save_metadata_snapshot(mds: MetadataStore, path: str) -> None:
+    """Save the parsed metadata in a MetadataStore to a file, replacing the previous snapshot atomically"""
+    snapshot = {key: dict(_md.items()) for key, _md in mds.metadata.items()}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fd:
+        pickle.dump(snapshot, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved metadata snapshot with {sum(len(x) for x in snapshot.values())} entities to {path}")
+
+
+def load_metadata_snapshot(path: str, attrc: Any, max_age: Optional[timedelta] = None) -> Optional[MetadataSources]:
+    """
+    Load metadata saved using save_metadata_snapshot.
+
+    :param path: The snapshot file
+    :param attrc: The attribute converters of the pysaml2 config
+    :param max_age: Don't use snapshots older than this
+
+    :return: The metadata, or None if there is no (recent enough) snapshot
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        logger.info(f"No metadata snapshot found at {path}")
+        return None
+    age = timedelta(seconds=utc_now().timestamp() - mtime)
+    if max_age is not None and age > max_age:
+        logger.info(f"Not using metadata snapshot {path}, it is too old ({age})")
+        return None
+
+    with open(path, "rb") as fd:
+        snapshot = pickle.load(fd)
+
+    res: MetadataSources = {}
+    for key, entities in snapshot.items():
+        _md = InMemoryMetaData(attrc)
+        _md.entity = entities
+        res[key] = _md
+    logger.info(f"Loaded metadata snapshot with {sum(len(x) for x in snapshot.values())} entities from {path}")
+    return res
+
+
+def swap_metadata(idp: server.Server, metadata: MetadataSources) -> None:
+    """
+    Make idp use other metadata.
+
+    The metadata is replaced with a single assignment in the MetadataStore, which is also referenced from the
+    config and the policies, so every user of the metadata sees either the old or the new metadata.
+    """
+    idp.metadata.metadata = metadata
+    idp.sourceid = idp.metadata.construct_source_id()
+
+
+def load_pysaml2_server(
+    cfgfile: str, metadata_snapshot: Optional[str] = None, snapshot_max_age: Optional[timedelta] = None
+) -> server.Server:
+    """
+    Load a pysaml2 Server, using the metadata snapshot if there is a recent enough one.
+
+    :param cfgfile: The pysaml2 config module
+    :param metadata_snapshot: The metadata snapshot file (loaded if it exists, written otherwise)
+    :param snapshot_max_age: Don't use snapshots older than this
+    """
+    cnf = read_pysaml2_config(cfgfile)
+    if not metadata_snapshot:
+        return server.Server(config=IdPConfig().load(cnf))
+
+    metadata_conf = cnf.get("metadata", {})
+    # load the config without the metadata, but with an (empty) MetadataStore for the snapshot to be swapped into
+    cnf["metadata"] = {}
+    idp = server.Server(config=IdPConfig().load(cnf))
+    try:
+        snapshot = load_metadata_snapshot(
+            metadata_snapshot, attrc=idp.config.attribute_converters, max_age=snapshot_max_age
+        )
+    except Exception:
+        logger.exception(f"Failed loading metadata snapshot {metadata_snapshot}")
+        snapshot = None
+
+    if snapshot is not None:
+        swap_metadata(idp, snapshot)
+        return idp
+
+    mds = idp.config.load_metadata(metadata_conf)
+    swap_metadata(idp, mds.metadata)
+    try:
+        save_metadata_snapshot(idp.metadata, metadata_snapshot)
+    except Exception:
+        logger.exception(f"Failed saving metadata snapshot {metadata_snapshot}")
+    return idp
+
+
+def preload_pysaml2(
+    cfgfile: str, metadata_snapshot: Optional[str] = None, snapshot_max_age: Optional[timedelta] = None
+) -> server.Server:
+    """
+    Load a pysaml2 Server (and the metadata) in this process, to be used by init_pysaml2 for cfgfile in this
+    process and in processes forked from it.
+    """
+    idp = load_pysaml2_server(cfgfile, metadata_snapshot=metadata_snapshot, snapshot_max_age=snapshot_max_age)
+    _preloaded[cfgfile] = idp
+    # Keep the garbage collector from touching (and thereby copying) the shared pages in the forked processes
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded pysaml2 server using cfgfile {cfgfile}")
+    return idp
+
+
+def get_preloaded_pysaml2(cfgfile: str) -> Optional[server.Server]:
+    return _preloaded.get(cfgfile)
+
+
+class MetadataRefresher:
+    """
+    Load the metadata of a pysaml2 Server again every interval, in a background thread.
+
+    If loading the metadata fails, the current metadata is kept. Threads don't survive fork, so the thread
+    is started again in processes forked after start() was called.
+
+    :param idp: The pysaml2 Server
+    :param cfgfile: The pysaml2 config module, with the metadata configuration
+    :param interval: How often to load the metadata
+    :param metadata_snapshot: Save a metadata snapshot to this file after loading the metadata
+    """
+
+    def __init__(self, idp: server.Server, cfgfile: str, interval: timedelta, metadata_snapshot: Optional[str] = None):
+        self.idp = idp
+        self.interval = interval
+        self.metadata_snapshot = metadata_snapshot
+        self._metadata_conf = read_pysaml2_config(cfgfile).get("metadata", {})
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fork_hook_registered = False
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: interval={self.interval}, running={self.is_running}>"
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def refresh(self) -> bool:
+        """Load the metadata, and swap it in if successful"""
+        try:
+            mds = self.idp.config.load_metadata(self._metadata_conf)
+        except Exception:
+            logger.exception("Failed loading metadata, keeping the current metadata")
+            return False
+        swap_metadata(self.idp, mds.metadata)
+        logger.info(f"Loaded new metadata with {len(self.idp.metadata.keys())} entities")
+
+        if self.metadata_snapshot:
+            try:
+                save_metadata_snapshot(self.idp.metadata, self.metadata_snapshot)
+            except Exception:
+                logger.exception(f"Failed saving metadata snapshot {self.metadata_snapshot}")
+        return True
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._start_thread()
+        if not self._fork_hook_registered:
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook_registered = True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _start_thread(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="metadata-refresher", daemon=True)
+        self._thread.start()
+
+    def _restart_after_fork(self) -> None:
+        if self._thread is not None and not self._stop.is_set():
+            self._stop = threading.Event()
+            self._start_thread()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval.total_seconds()):
+            self.refresh()
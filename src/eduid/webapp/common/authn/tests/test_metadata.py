@@ -0,0 +1,251 @@
+import gc
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from saml2 import BINDING_HTTP_POST
+
+from eduid.webapp.common.authn import metadata as authn_metadata
+from eduid.webapp.common.authn.metadata import (
+    MetadataRefresher,
+    load_metadata_snapshot,
+    load_pysaml2_server,
+    preload_pysaml2,
+    save_metadata_snapshot,
+)
+from eduid.webapp.common.authn.utils import init_pysaml2
+
+# Looks like a certificate, but is never used as one
+FAKE_CERT = ("MIIDvDCCAqQCCQDXVjecpE8ibTANBgkqhkiG9w0BAQUFADCBnzELMAkGA1UEBhMC" * 20).strip()
+
+ENTITY = """
+  <md:EntityDescriptor entityID="https://sp{i}.example.org/sp">
+    <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+      <md:KeyDescriptor use="signing">
+        <ds:KeyInfo><ds:X509Data><ds:X509Certificate>{cert}</ds:X509Certificate></ds:X509Data></ds:KeyInfo>
+      </md:KeyDescriptor>
+      <md:AssertionConsumerService Binding="urn:oasis:names:tc:SAML:2.0:bindings:HTTP-POST"
+          Location="https://sp{i}.example.org/acs" index="1"/>
+    </md:SPSSODescriptor>
+    <md:Organization>
+      <md:OrganizationName xml:lang="en">Service provider {i}</md:OrganizationName>
+      <md:OrganizationDisplayName xml:lang="en">SP {i}</md:OrganizationDisplayName>
+      <md:OrganizationURL xml:lang="en">https://sp{i}.example.org/</md:OrganizationURL>
+    </md:Organization>
+  </md:EntityDescriptor>
+"""
+
+CONFIG_MODULE = """
+CONFIG = {{
+    "entityid": "https://idp.example.org/idp.xml",
+    "service": {{
+        "idp": {{
+            "endpoints": {{
+                "single_sign_on_service": [("https://idp.example.org/sso/post", "{binding}")],
+            }},
+        }},
+    }},
+    "metadata": {{"local": ["{metadata}"]}},
+}}
+"""
+
+
+def write_aggregate(path: Path, entities: int) -> None:
+    """Write a synthetic metadata aggregate with SPs numbered 0..entities-1"""
+    with open(path, "w") as fd:
+        fd.write('<?xml version="1.0"?>\n')
+        fd.write(
+            '<md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata" '
+            'xmlns:ds="http://www.w3.org/2000/09/xmldsig#">\n'
+        )
+        for i in range(entities):
+            fd.write(ENTITY.format(i=i, cert=FAKE_CERT))
+        fd.write("</md:EntitiesDescriptor>\n")
+
+
+def private_kb() -> Optional[int]:
+    """The size of the memory pages of this process that are not shared with any other process (Linux only)"""
+    try:
+        with open("/proc/self/smaps_rollup") as fd:
+            for line in fd:
+                if line.startswith("Private_Dirty:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+    return None
+
+
+class MetadataTestCase(unittest.TestCase):
+    entities = 200
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.addCleanup(authn_metadata._preloaded.clear)
+        self.addCleanup(gc.unfreeze)
+        path = Path(self.tmpdir.name)
+        self.metadata_path = path / "metadata.xml"
+        write_aggregate(self.metadata_path, self.entities)
+        # pysaml2 imports its config, so every test gets a config module with a new name
+        self.cfgfile = str(path / f"pysaml2_conf_{uuid4().hex}.py")
+        with open(self.cfgfile, "w") as fd:
+            fd.write(CONFIG_MODULE.format(binding=BINDING_HTTP_POST, metadata=self.metadata_path))
+        self.snapshot_path = str(path / "metadata.pickle")
+
+    def _acs(self, idp, i: int) -> List[str]:
+        return [x["location"] for x in idp.metadata.assertion_consumer_service(f"https://sp{i}.example.org/sp")]
+
+
+class TestMetadataSnapshot(MetadataTestCase):
+    def test_snapshot_roundtrip(self):
+        idp = init_pysaml2(self.cfgfile)
+        save_metadata_snapshot(idp.metadata, self.snapshot_path)
+
+        loaded = load_metadata_snapshot(self.snapshot_path, attrc=idp.config.attribute_converters)
+        assert loaded is not None
+        assert list(loaded.keys()) == list(idp.metadata.metadata.keys())
+        for key, _md in loaded.items():
+            assert dict(_md.items()) == dict(idp.metadata.metadata[key].items())
+
+    def test_snapshot_max_age(self):
+        idp = init_pysaml2(self.cfgfile)
+        save_metadata_snapshot(idp.metadata, self.snapshot_path)
+        old = time.time() - 7200
+        os.utime(self.snapshot_path, (old, old))
+        attrc = idp.config.attribute_converters
+        assert load_metadata_snapshot(self.snapshot_path, attrc=attrc, max_age=timedelta(hours=1)) is None
+        assert load_metadata_snapshot(self.snapshot_path, attrc=attrc, max_age=timedelta(hours=3)) is not None
+        assert load_metadata_snapshot(self.snapshot_path + ".missing", attrc=attrc) is None
+
+    def test_init_using_snapshot(self):
+        # no snapshot yet, the metadata is loaded and a snapshot is written
+        first = init_pysaml2(self.cfgfile, metadata_snapshot=self.snapshot_path)
+        assert os.path.exists(self.snapshot_path)
+        # the metadata is not parsed again when there is a snapshot
+        os.unlink(self.metadata_path)
+        second = init_pysaml2(self.cfgfile, metadata_snapshot=self.snapshot_path)
+        assert len(second.metadata.keys()) == self.entities
+        assert self._acs(second, 42) == self._acs(first, 42) == ["https://sp42.example.org/acs"]
+        assert second.sourceid == first.sourceid
+
+    def test_preloaded(self):
+        idp = preload_pysaml2(self.cfgfile)
+        assert init_pysaml2(self.cfgfile) is idp
+
+
+class TestMetadataRefresher(MetadataTestCase):
+    def test_refresh(self):
+        idp = init_pysaml2(self.cfgfile)
+        refresher = MetadataRefresher(idp, self.cfgfile, interval=timedelta(hours=1))
+        write_aggregate(self.metadata_path, self.entities + 1)
+        assert refresher.refresh() is True
+        assert len(idp.metadata.keys()) == self.entities + 1
+        assert self._acs(idp, self.entities) == [f"https://sp{self.entities}.example.org/acs"]
+
+    def test_failed_refresh_keeps_metadata(self):
+        idp = init_pysaml2(self.cfgfile)
+        refresher = MetadataRefresher(idp, self.cfgfile, interval=timedelta(hours=1))
+        with open(self.metadata_path, "w") as fd:
+            fd.write("not metadata")
+        assert refresher.refresh() is False
+        assert len(idp.metadata.keys()) == self.entities
+
+    def test_refresh_is_atomic(self):
+        """Lookups made while the metadata is refreshed always find the entity"""
+        idp = init_pysaml2(self.cfgfile)
+        refresher = MetadataRefresher(idp, self.cfgfile, interval=timedelta(hours=1))
+        stop = threading.Event()
+        failures: List[Exception] = []
+
+        def _lookup() -> None:
+            while not stop.is_set():
+                try:
+                    assert self._acs(idp, 7) == ["https://sp7.example.org/acs"]
+                except Exception as e:
+                    failures.append(e)
+
+        thread = threading.Thread(target=_lookup)
+        thread.start()
+        for _ in range(5):
+            assert refresher.refresh() is True
+        stop.set()
+        thread.join()
+        assert failures == []
+
+    def test_thread(self):
+        idp = init_pysaml2(self.cfgfile)
+        refresher = MetadataRefresher(idp, self.cfgfile, interval=timedelta(seconds=0.1))
+        write_aggregate(self.metadata_path, self.entities + 1)
+        refresher.start()
+        try:
+            deadline = time.monotonic() + 10
+            while len(idp.metadata.keys()) != self.entities + 1 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            refresher.stop()
+        assert len(idp.metadata.keys()) == self.entities + 1
+        assert not refresher.is_running
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+class TestMetadataBenchmark(MetadataTestCase):
+    entities = 5000
+
+    def _child(self, load: bool) -> Tuple[int, Optional[int]]:
+        """
+        Fork a "worker", that loads the metadata itself (or uses the preloaded metadata) and makes a lookup.
+
+        :return: The number of kB of memory the worker allocated, and the size of the memory pages not shared
+                 with the parent process (Linux only)
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                tracemalloc.start()
+                idp = init_pysaml2(self.cfgfile) if load else authn_metadata.get_preloaded_pysaml2(self.cfgfile)
+                assert idp is not None
+                assert self._acs(idp, 4711) == ["https://sp4711.example.org/acs"]
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                os.write(write_fd, f"{peak // 1024} {private_kb()}".encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as fd:
+            allocated, private = fd.read().split()
+        os.waitpid(pid, 0)
+        return int(allocated), None if private == "None" else int(private)
+
+    def test_startup_and_memory(self):
+        start = time.monotonic()
+        load_pysaml2_server(self.cfgfile, metadata_snapshot=self.snapshot_path)
+        parse_time = time.monotonic() - start
+
+        start = time.monotonic()
+        idp = load_pysaml2_server(self.cfgfile, metadata_snapshot=self.snapshot_path)
+        snapshot_time = time.monotonic() - start
+        assert len(idp.metadata.keys()) == self.entities
+
+        # workers loading the metadata themselves, vs. using the metadata preloaded in the "master"
+        loading = self._child(load=True)
+        preload_pysaml2(self.cfgfile)
+        preloaded = self._child(load=False)
+
+        print(
+            f"Metadata with {self.entities} entities ({os.stat(self.metadata_path).st_size // 1024} kB):\n"
+            f"  startup: parsing {parse_time:.2f} s, snapshot {snapshot_time:.2f} s\n"
+            f"  memory per worker (allocated kB, not shared kB): loading {loading}, preloaded {preloaded}"
+        )
+        assert snapshot_time < parse_time / 2
+        assert preloaded[0] * 10 < loading[0]
+        if loading[1] is not None and preloaded[1] is not None:
+            assert preloaded[1] < loading[1]
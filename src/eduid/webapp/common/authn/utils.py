@@ -35,8 +35,6 @@ from __future__ import absolute_import
 
 import importlib.util
 import logging
-import os.path
-import sys
 from datetime import timedelta
 from typing import TYPE_CHECKING, Any, List, Mapping, Optional, Sequence
 
@@ -50,6 +48,7 @@ from saml2.config import SPConfig
 from eduid.common.config.base import EduIDBaseAppConfig
 from eduid.common.misc.timeutil import utc_now
 from eduid.common.utils import urlappend
+from eduid.webapp.common.authn.metadata import get_preloaded_pysaml2, load_pysaml2_server
 from eduid.webapp.common.authn.session_info import SessionInfo
 from eduid.webapp.common.session.namespaces import TimestampedNS
 
@@ -159,21 +158,23 @@ def check_previous_identification(session_ns: TimestampedNS) -> Optional[str]:
     return eppn
 
 
-def init_pysaml2(cfgfile: str) -> server.Server:
+def init_pysaml2(
+    cfgfile: str, metadata_snapshot: Optional[str] = None, snapshot_max_age: Optional[timedelta] = None
+) -> server.Server:
     """
     Initialization of PySAML2.
 
-    :return:
+    If the pysaml2 Server for cfgfile was preloaded in this process (or in the process this one was forked from,
+    e.g. the gunicorn master) using preload_pysaml2, that Server is returned.
+
+    :param cfgfile: The pysaml2 config module
+    :param metadata_snapshot: Load the metadata from this snapshot if it is recent enough (see authn.metadata)
+    :param snapshot_max_age: Don't use metadata snapshots older than this
+    :return: The pysaml2 Server
     """
-    old_path = sys.path
-    cfgdir = os.path.dirname(cfgfile)
-    if cfgdir:
-        # add directory part to sys.path, since pysaml2 'import's it's config
-        sys.path = [cfgdir] + sys.path
-        cfgfile = os.path.basename(cfgfile)
-
-    try:
-        return server.Server(cfgfile)
-    finally:
-        # restore path
-        sys.path = old_path
+    preloaded = get_preloaded_pysaml2(cfgfile)
+    if preloaded is not None:
+        logger.debug(f"Using preloaded PySAML2 server for cfgfile {cfgfile}")
+        return preloaded
+
+    return load_pysaml2_server(cfgfile, metadata_snapshot=metadata_snapshot, snapshot_max_age=snapshot_max_age)
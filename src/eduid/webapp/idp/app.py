@@ -43,6 +43,7 @@ from eduid.userdb.actions.tou.userdb import ToUUserDB
 from eduid.userdb.idp import IdPUserDb
 from eduid.webapp.common.api import translation
 from eduid.webapp.common.api.app import EduIDBaseApp
+from eduid.webapp.common.authn.metadata import MetadataRefresher, preload_pysaml2
 from eduid.webapp.common.authn.utils import init_pysaml2
 from eduid.webapp.idp import idp_authn
 from eduid.webapp.idp.known_device import KnownDeviceDB
@@ -70,7 +71,20 @@ class IdPApp(EduIDBaseApp):
         self.logger.info("eduid-IdP server starting")
 
         self.logger.debug(f"Loading PySAML2 server using cfgfile {config.pysaml2_config}")
-        self.IDP = init_pysaml2(config.pysaml2_config)
+        self.IDP = init_pysaml2(
+            config.pysaml2_config,
+            metadata_snapshot=config.pysaml2_metadata_snapshot,
+            snapshot_max_age=config.pysaml2_metadata_snapshot_max_age,
+        )
+        self.metadata_refresher: Optional[MetadataRefresher] = None
+        if config.pysaml2_metadata_refresh_interval:
+            self.metadata_refresher = MetadataRefresher(
+                self.IDP,
+                config.pysaml2_config,
+                interval=config.pysaml2_metadata_refresh_interval,
+                metadata_snapshot=config.pysaml2_metadata_snapshot,
+            )
+            self.metadata_refresher.start()
 
         if config.mongo_uri is None:
             raise RuntimeError("Mongo URI is not optional for the IdP")
@@ -79,7 +93,7 @@ class IdPApp(EduIDBaseApp):
         self.authn_info_db = None
 
         self.userdb = IdPUserDb(db_uri=config.mongo_uri)
-        self.authn = idp_authn.IdPAuthn(config=config, userdb=self.userdb)
+        self.authn = idp_authn.IdPAuthn(config=config, userdb=self.userdb, stats=self.stats)
         self.tou_db = ToUUserDB(config.mongo_uri)
         self.other_device_db = OtherDeviceDB(config.mongo_uri)
         self.known_device_db = KnownDeviceDB(
@@ -107,6 +121,25 @@ class IdPApp(EduIDBaseApp):
 current_idp_app = cast(IdPApp, current_app)
 
 
+def preload_idp_metadata(name: str = "idp") -> None:
+    """
+    Load the pysaml2 config and metadata once, before gunicorn forks the workers. Use it in the gunicorn config:
+
+        def on_starting(server):
+            from eduid.webapp.idp.app import preload_idp_metadata
+
+            preload_idp_metadata()
+
+    :param name: The name of the instance, it will affect the configuration loaded.
+    """
+    config = load_config(typ=IdPConfig, app_name=name, ns="webapp")
+    preload_pysaml2(
+        config.pysaml2_config,
+        metadata_snapshot=config.pysaml2_metadata_snapshot,
+        snapshot_max_age=config.pysaml2_metadata_snapshot_max_age,
+    )
+
+
 def init_idp_app(name: str = "idp", test_config: Optional[Mapping[str, Any]] = None) -> IdPApp:
     """
     :param name: The name of the instance, it will affect the configuration loaded.
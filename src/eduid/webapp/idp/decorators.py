@@ -7,7 +7,6 @@ from eduid.webapp.common.api.schemas.models import FluxFailResponse
 from eduid.webapp.common.session import session
 from eduid.webapp.idp.app import current_idp_app as current_app
 from eduid.webapp.idp.helpers import IdPMsg
-from eduid.webapp.idp.known_device import BrowserDeviceInfo
 from eduid.webapp.idp.login import get_ticket
 from eduid.webapp.idp.service import SAMLQueryParams
 from eduid.webapp.idp.sso_session import get_sso_session
@@ -40,9 +39,7 @@ def require_ticket(f):
         if this_device:
             kwargs.pop("this_device")
             try:
-                ticket.known_device_info = BrowserDeviceInfo.from_public(
-                    this_device, current_app.known_device_db.app_secret_box
-                )
+                ticket.known_device_info = current_app.known_device_db.browser_info_from_public(this_device)
             except:
                 logger.exception("Couldn't parse the this_device supplied")
                 logger.debug(f"Extra debug: Known device: {this_device}")
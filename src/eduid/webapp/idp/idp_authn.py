@@ -48,6 +48,7 @@ from pydantic import BaseModel, Field
 from pymongo import ReturnDocument
 
 from eduid.common.misc.timeutil import utc_now
+from eduid.common.stats import AppStats, NoOpStats
 from eduid.userdb import MongoDB
 from eduid.userdb.credentials import Password
 from eduid.userdb.element import ElementKey
@@ -107,15 +108,20 @@ class PasswordAuthnResponse:
 class IdPAuthn(object):
     """
     :param config: IdP configuration data
+    :param stats: Where to report the time spent authenticating passwords
     """
 
     def __init__(
         self,
         config: IdPConfig,
         userdb: IdPUserDb,
+        stats: Optional[AppStats] = None,
     ):
         self.config = config
         self.userdb = userdb
+        if stats is None:
+            stats = NoOpStats()
+        self.stats = stats
         self.auth_client = get_vccs_client(config.vccs_url)
         # already checked with isinstance in app init
         assert config.mongo_uri is not None
@@ -190,7 +196,9 @@ class IdPAuthn(object):
             logger.debug(f"Password-authenticating {user}/{cred.credential_id} with VCCS: {factor}")
             user_id = str(user.user_id)
             try:
-                if self.auth_client.authenticate(user_id, [factor]):
+                with self.stats.timer("vccs.authenticate"):
+                    authenticated = self.auth_client.authenticate(user_id, [factor])
+                if authenticated:
                     logger.debug(f"VCCS authenticated user {user}")
                     # Verify that the credential had been successfully used in the last 18 months
                     # (Kantara AL2_CM_CSM#050).
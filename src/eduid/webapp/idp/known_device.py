@@ -11,6 +11,7 @@ import nacl.encoding
 import nacl.secret
 import nacl.utils
 from bson import ObjectId
+from flask import g, has_app_context
 from nacl.secret import SecretBox
 from pydantic import BaseModel, Field
 
@@ -74,10 +75,13 @@ class KnownDevice(BaseModel):
     data: KnownDeviceData = Field(default_factory=KnownDeviceData)
     expires_at: datetime = Field(default_factory=utc_now)
     last_used: datetime = Field(default_factory=utc_now)
+    # data.to_json() as it is in the database, to know if data has to be encrypted and written when saving
+    _stored_data_json: Optional[str] = None
 
     class Config:
         # Don't reject ObjectId and SecretBox
         arbitrary_types_allowed = True
+        underscore_attrs_are_private = True
 
     def to_dict(self, from_browser: BrowserDeviceInfo) -> Dict[str, Any]:
         res = self.dict()
@@ -89,7 +93,9 @@ class KnownDevice(BaseModel):
     def from_dict(cls: Type[KnownDevice], data: Mapping[str, Any], from_browser: BrowserDeviceInfo) -> KnownDevice:
         _data = dict(data)  # don't modify callers data
         _data["data"] = json.loads(from_browser.secret_box.decrypt(_data["data"], encoder=nacl.encoding.Base64Encoder))
-        return cls(**_data)
+        res = cls(**_data)
+        res._stored_data_json = res.data.to_json()
+        return res
 
 
 class KnownDeviceDB(BaseDB):
@@ -122,13 +128,46 @@ class KnownDeviceDB(BaseDB):
         if ttl is not None:
             state.expires_at = utc_now() + ttl
 
+        if state._stored_data_json is not None:
+            # Only update the fields that changed, and only encrypt data if it changed
+            _update: Dict[str, Any] = {"expires_at": state.expires_at, "last_used": state.last_used}
+            _data_json = state.data.to_json()
+            if _data_json != state._stored_data_json:
+                _encrypted = from_browser.secret_box.encrypt(_data_json.encode(), encoder=nacl.encoding.Base64Encoder)
+                _update["data"] = _encrypted
+            result = self._coll.update_one({"_id": state.obj_id}, {"$set": _update})
+            logger.debug(
+                f"Updated KnownDevice {state} fields {list(_update.keys())} in the db: "
+                f"matched={result.matched_count}, modified={result.modified_count}"
+            )
+            if result.matched_count:
+                state._stored_data_json = _data_json
+                return result.acknowledged
+            # removed from the database since it was loaded (expired), write it all again below
+
         result = self._coll.replace_one({"_id": state.obj_id}, state.to_dict(from_browser=from_browser), upsert=True)
         logger.debug(
             f"Saved KnownDevice {state} in the db: "
             f"matched={result.matched_count}, modified={result.modified_count}, upserted_id={result.upserted_id}"
         )
+        if result.acknowledged:
+            state._stored_data_json = state.data.to_json()
         return result.acknowledged
 
+    def browser_info_from_public(self, shared: str) -> BrowserDeviceInfo:
+        """
+        Parse the device info from the browser (this_device).
+
+        The result is remembered until the end of the request, but not longer, since it holds the key to the
+        device's data in the database.
+        """
+        parsed = _request_browser_info()
+        browser_info = parsed.get(shared)
+        if browser_info is None:
+            browser_info = BrowserDeviceInfo.from_public(shared, app_secret_box=self.app_secret_box)
+            parsed[shared] = browser_info
+        return browser_info
+
     def get_state_by_browser_info(self, from_browser: BrowserDeviceInfo) -> Optional[KnownDevice]:
         state = self._get_document_by_attr("state_id", from_browser.state_id)
         if not state:
@@ -141,4 +180,14 @@ class KnownDeviceDB(BaseDB):
         state = KnownDevice(state_id=browser_info.state_id)
         if not self.save(state, from_browser=browser_info, ttl=self._new_ttl):
             raise RuntimeError("Failed saving known device to database")
+        _request_browser_info()[browser_info.shared] = browser_info
         return browser_info
+
+
+def _request_browser_info() -> Dict[str, BrowserDeviceInfo]:
+    """The browser device info parsed during the current request (none outside of a request)"""
+    if not has_app_context():
+        return {}
+    if "known_device_browser_info" not in g:
+        g.known_device_browser_info = {}
+    return g.known_device_browser_info
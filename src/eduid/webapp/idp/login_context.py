@@ -35,6 +35,7 @@ class LoginContext(ABC, BaseModel):
     known_device_info: Optional[BrowserDeviceInfo] = None
     remember_me: Optional[bool] = None  # if the user wants to be remembered or not (on this device)
     _known_device: Optional[KnownDevice] = None
+    _known_device_loaded: bool = False  # don't look for a known device that wasn't found again
     _pending_request: Optional[IdP_PendingRequest] = None
 
     class Config:
@@ -105,11 +106,12 @@ class LoginContext(ABC, BaseModel):
 
     @property
     def known_device(self) -> Optional[KnownDevice]:
-        if not self._known_device:
+        if not self._known_device and not self._known_device_loaded:
             if self.known_device_info:
                 from eduid.webapp.idp.app import current_idp_app as current_app
 
                 self._known_device = current_app.known_device_db.get_state_by_browser_info(self.known_device_info)
+                self._known_device_loaded = True
         return self._known_device
 
     def forget_known_device(self) -> None:
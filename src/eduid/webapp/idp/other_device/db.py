@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import json
 import logging
+import threading
+import time
 import typing
 import uuid
 from datetime import datetime, timedelta
@@ -15,6 +17,7 @@ from eduid.common.misc.encoders import EduidJSONEncoder
 from eduid.common.misc.timeutil import utc_now
 from eduid.userdb import User
 from eduid.userdb.db import BaseDB
+from eduid.webapp.common.api.exceptions import EduidTooManyRequests
 from eduid.webapp.common.api.utils import make_short_code
 from eduid.webapp.idp.assurance_data import EduidAuthnContextClass, UsedCredential
 from eduid.webapp.idp.idp_saml import ServiceInfo
@@ -125,6 +128,17 @@ class OtherDeviceDB(BaseDB):
         }
         self.setup_indexes(indexes)
 
+        # Requests waiting for a state change (wait_for_state_change) are woken up by writes made by this process
+        self._changed = threading.Condition()
+        self._generation = 0
+        self._waiting: Dict[OtherDeviceId, int] = {}
+
+    def _notify_change(self, state: OtherDevice) -> None:
+        with self._changed:
+            if state.state_id in self._waiting:
+                self._generation += 1
+                self._changed.notify_all()
+
     def save(self, state: OtherDevice) -> bool:
         """
         Add a new OtherDevice to the database, or update an existing one.
@@ -134,6 +148,7 @@ class OtherDeviceDB(BaseDB):
             f"Saved OtherDevice {state} in the db: "
             f"matched={result.matched_count}, modified={result.modified_count}, upserted_id={result.upserted_id}"
         )
+        self._notify_change(state)
         return result.acknowledged
 
     def get_state_by_id(self, state_id: OtherDeviceId) -> Optional[OtherDevice]:
@@ -143,6 +158,51 @@ class OtherDeviceDB(BaseDB):
             return None
         return OtherDevice.from_dict(state)
 
+    def wait_for_state_change(
+        self,
+        state_id: OtherDeviceId,
+        state: OtherDeviceState,
+        timeout: float,
+        poll_interval: float,
+        max_waiters: Optional[int] = None,
+    ) -> bool:
+        """
+        Wait (at most timeout seconds) for an OtherDevice to leave the state `state`.
+
+        Changes made by this process are noticed right away. Changes made by other processes (other IdP workers)
+        are noticed by reading just the state from the database every poll_interval seconds.
+
+        Every waiting request holds a worker thread, so at most max_waiters requests in this process may wait
+        at the same time.
+
+        :return: True if the state has changed (or the OtherDevice is gone), False on timeout
+        :raises EduidTooManyRequests: If max_waiters requests are already waiting
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            if max_waiters is not None and sum(self._waiting.values()) >= max_waiters:
+                raise EduidTooManyRequests("Too many requests waiting for state changes")
+            self._waiting[state_id] = self._waiting.get(state_id, 0) + 1
+        try:
+            while True:
+                with self._changed:
+                    generation = self._generation
+                doc = self._coll.find_one({"state_id": str(state_id)}, projection={"_id": False, "state": True})
+                if doc is None or doc["state"] != state.value:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                with self._changed:
+                    self._changed.wait_for(
+                        lambda: self._generation != generation, timeout=min(poll_interval, remaining)
+                    )
+        finally:
+            with self._changed:
+                self._waiting[state_id] -= 1
+                if not self._waiting[state_id]:
+                    del self._waiting[state_id]
+
     def add_new_state(self, ticket: "LoginContext", user: Optional[User], ttl: timedelta) -> OtherDevice:
         user_agent = None
         ua = get_user_agent()
@@ -181,6 +241,7 @@ class OtherDeviceDB(BaseDB):
             f"Aborted OtherDevice {state} in the db: "
             f"matched={result.matched_count}, modified={result.modified_count}, upserted_id={result.upserted_id}"
         )
+        self._notify_change(state)
         if not result.acknowledged:
             return None
         return state
@@ -206,6 +267,7 @@ class OtherDeviceDB(BaseDB):
             f"Grabbed OtherDevice {state} in the db: "
             f"matched={result.matched_count}, modified={result.modified_count}, upserted_id={result.upserted_id}"
         )
+        self._notify_change(state)
         if not result.acknowledged:
             return None
         return state
@@ -235,6 +297,7 @@ class OtherDeviceDB(BaseDB):
             f"Finished OtherDevice {state} in the db: "
             f"matched={result.matched_count}, modified={result.modified_count}, upserted_id={result.upserted_id}"
         )
+        self._notify_change(state)
         if not result.acknowledged:
             return None
         return state
@@ -137,6 +137,10 @@ class UseOther1RequestSchema(IdPRequest):
     response_code = fields.Str(required=False)  # optional response code, if action == 'SUBMIT_CODE'
 
 
+class UseOther1WaitRequestSchema(IdPRequest):
+    state = fields.Str(required=True)  # the state the frontend has, an OtherDeviceState (NEW, IN_PROGRESS etc.)
+
+
 class UseOther1ResponseSchema(FluxStandardAction):
     class UseOther1ResponsePayload(EduidSchema, CSRFResponseMixin):
         bad_attempts = fields.Int(required=True)  # number of incorrect response_code attempts
@@ -56,6 +56,13 @@ class IdPConfig(EduIDBaseAppConfig, TouConfigMixin, WebauthnConfigMixin2, AmConf
     app_name: str = "idp"
     # pysaml2 configuration file. Separate config file with SAML related parameters.
     pysaml2_config: str = "eduid.webapp.common.authn.idp_conf"
+    # Snapshot of the parsed metadata. Loaded instead of the metadata when it is newer than
+    # pysaml2_metadata_snapshot_max_age, and written when the metadata has been loaded.
+    # Must only be writable by the IdP.
+    pysaml2_metadata_snapshot: Optional[str] = None
+    pysaml2_metadata_snapshot_max_age: timedelta = Field(default=timedelta(hours=1))
+    # Load the metadata again this often, in the background. None to only load it at startup.
+    pysaml2_metadata_refresh_interval: Optional[timedelta] = None
     # SAML F-TICKS user anonymization key. If this is set, the IdP will log F-TICKS data
     # on every login.
     fticks_secret_key: Optional[str] = None
@@ -123,6 +130,13 @@ class IdPConfig(EduIDBaseAppConfig, TouConfigMixin, WebauthnConfigMixin2, AmConf
     enable_legacy_template_mode: bool = False
     other_device_logins_ttl: timedelta = Field(default=timedelta(minutes=2))
     other_device_max_code_attempts: int = 3
+    # Device #1 can wait for the other-device state to change (use_other_1/wait) instead of polling use_other_1.
+    # Changes made by other IdP processes are noticed within other_device_wait_poll_interval.
+    other_device_wait_timeout: timedelta = Field(default=timedelta(seconds=20))
+    other_device_wait_poll_interval: timedelta = Field(default=timedelta(seconds=1))
+    # Every waiting request holds a worker thread. Keep this well below the number of worker threads per process,
+    # requests above the limit get 429 Too Many Requests and the frontend should poll use_other_1 instead.
+    other_device_max_waiters: int = 4
     other_device_secret_key: str  # secretbox key for protecting the login-with-other-device shared ID
     # SPs that are allowed to request a login for a particular user (idpproxy for stepup, dashboard for chpass, ...)
     request_subject_allowed_entity_ids: List[str] = Field(default=[])
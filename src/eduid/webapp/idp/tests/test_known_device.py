@@ -1,5 +1,8 @@
 import unittest
+from contextlib import ExitStack
 from datetime import timedelta
+from typing import Callable, Dict
+from unittest.mock import patch
 from uuid import UUID
 
 import nacl.encoding
@@ -129,3 +132,108 @@ class TestIdPUserDb(IdPTests):
 
         second = self.app.known_device_db.get_state_by_browser_info(from_browser=browser_info)
         assert second.data.eppn == "hubba-bubba"
+
+    def _raw(self, browser_info: BrowserDeviceInfo) -> Dict:
+        doc = self.app.known_device_db._coll.find_one({"state_id": browser_info.state_id})
+        assert doc is not None
+        return doc
+
+    def test_save_only_changed_fields(self):
+        db = self.app.known_device_db
+        browser_info = db.create_new_state()
+        state = db.get_state_by_browser_info(from_browser=browser_info)
+        before = self._raw(browser_info)
+
+        # only the TTL changed, the encrypted data is left as it is
+        db.save(state, from_browser=browser_info, ttl=timedelta(hours=1))
+        after = self._raw(browser_info)
+        assert after["data"] == before["data"]
+        assert after["expires_at"] > before["expires_at"]
+
+        state.data.login_counter = 1
+        db.save(state, from_browser=browser_info, ttl=timedelta(hours=1))
+        assert self._raw(browser_info)["data"] != before["data"]
+        assert db.get_state_by_browser_info(from_browser=browser_info).data.login_counter == 1
+
+    def test_save_removed_state(self):
+        """If the state expires after it was loaded, it is written again in full"""
+        db = self.app.known_device_db
+        browser_info = db.create_new_state()
+        state = db.get_state_by_browser_info(from_browser=browser_info)
+        db._coll.delete_one({"state_id": browser_info.state_id})
+
+        db.save(state, from_browser=browser_info, ttl=timedelta(hours=1))
+        again = db.get_state_by_browser_info(from_browser=browser_info)
+        assert again is not None
+        assert again.data == state.data
+
+    def test_browser_info_per_request(self):
+        db = self.app.known_device_db
+        shared = BrowserDeviceInfo.new(app_secret_box=db.app_secret_box).shared
+        with patch.object(db.app_secret_box, "decrypt", wraps=db.app_secret_box.decrypt) as decrypt:
+            with self.app.test_request_context():
+                first = db.browser_info_from_public(shared)
+                second = db.browser_info_from_public(shared)
+            assert first is second
+            assert decrypt.call_count == 1
+            # not remembered after the request
+            with self.app.test_request_context():
+                third = db.browser_info_from_public(shared)
+            assert third is not first
+            assert third.state_id == first.state_id
+            assert decrypt.call_count == 2
+            # nor outside a request
+            assert db.browser_info_from_public(shared) is not db.browser_info_from_public(shared)
+            assert decrypt.call_count == 4
+
+    def test_ops_per_login(self):
+        """
+        Count the database writes and crypto operations for a known device during a login.
+
+        A login is a number of requests (next, pw_auth, next, ...) that all send the device info from the browser
+        and load the known device, and the known device is updated when the login is finished.
+        """
+        db = self.app.known_device_db
+        shared = db.create_new_state().shared
+        requests = 4
+
+        def _login(parse_browser_info: Callable[[str], BrowserDeviceInfo], save: Callable) -> Dict[str, int]:
+            with ExitStack() as stack:
+                mocks = {
+                    name: stack.enter_context(patch.object(target, attr, autospec=True, side_effect=func))
+                    for name, target, attr, func in [
+                        ("encrypt", SecretBox, "encrypt", SecretBox.encrypt),
+                        ("decrypt", SecretBox, "decrypt", SecretBox.decrypt),
+                        ("replace_one", type(db._coll), "replace_one", type(db._coll).replace_one),
+                        ("update_one", type(db._coll), "update_one", type(db._coll).update_one),
+                    ]
+                }
+                for i in range(requests):
+                    with self.app.test_request_context():
+                        browser_info = parse_browser_info(shared)
+                        state = db.get_state_by_browser_info(from_browser=browser_info)
+                        assert state is not None
+                        if i == requests - 1:
+                            state.data.login_counter = (state.data.login_counter or 0) + 1
+                            state.data.last_login = utc_now()
+                            save(state, browser_info)
+            return {name: mock.call_count for name, mock in mocks.items()}
+
+        def _save_before(state: KnownDevice, browser_info: BrowserDeviceInfo) -> None:
+            db._coll.replace_one({"_id": state.obj_id}, state.to_dict(from_browser=browser_info), upsert=True)
+
+        before = _login(
+            lambda _shared: BrowserDeviceInfo.from_public(_shared, app_secret_box=db.app_secret_box), _save_before
+        )
+        after = _login(
+            db.browser_info_from_public,
+            lambda state, browser_info: db.save(state, from_browser=browser_info, ttl=timedelta(hours=1)),
+        )
+        print(f"Known device operations per login ({requests} requests): before {before}, after {after}")
+
+        # the browser info and the known device data are decrypted once per request
+        assert before["decrypt"] == after["decrypt"] == 2 * requests
+        assert before["encrypt"] == after["encrypt"] == 1
+        # one field level update instead of replacing the whole document
+        assert before["replace_one"] == 1 and before["update_one"] == 0
+        assert after["replace_one"] == 0 and after["update_one"] == 1
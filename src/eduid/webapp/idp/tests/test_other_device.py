@@ -0,0 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Iterator, List
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from eduid.userdb.util import utc_now
+from eduid.webapp.common.api.exceptions import EduidTooManyRequests
+from eduid.webapp.idp.other_device.data import OtherDeviceId, OtherDeviceState
+from eduid.webapp.idp.other_device.db import Device1Data, Device2Data, OtherDevice
+from eduid.webapp.idp.tests.test_app import IdPTests
+
+
+class ReadCounter:
+    def __init__(self, find: MagicMock, find_one: MagicMock):
+        self.find = find
+        self.find_one = find_one
+
+    @property
+    def count(self) -> int:
+        return self.find.call_count + self.find_one.call_count
+
+
+class TestOtherDeviceWait(IdPTests):
+    def setUp(self, *args, **kwargs):
+        super().setUp(*args, **kwargs)
+        self.db = self.app.other_device_db
+        now = utc_now()
+        self.state = OtherDevice(
+            state_id=OtherDeviceId(str(uuid4())),
+            state=OtherDeviceState.NEW,
+            display_id="123456",
+            eppn=self.test_user.eppn,
+            device1=Device1Data(
+                ref="device1-ref",
+                authn_context=None,
+                request_id=None,
+                ip_address="127.0.0.1",
+                user_agent=None,
+                reauthn_required=False,
+                service_info=None,
+                is_known_device=False,
+            ),
+            device2=Device2Data(),
+            created_at=now,
+            expires_at=now + timedelta(minutes=2),
+        )
+        self.db.save(self.state)
+
+    def _in_thread(self, delay: float, func: Callable[[], None]) -> threading.Thread:
+        def _run() -> None:
+            time.sleep(delay)
+            func()
+
+        thread = threading.Thread(target=_run)
+        thread.start()
+        return thread
+
+    @contextmanager
+    def _count_reads(self) -> Iterator[ReadCounter]:
+        coll = self.db._coll
+        with patch.object(coll, "find", wraps=coll.find) as find, patch.object(
+            coll, "find_one", wraps=coll.find_one
+        ) as find_one:
+            yield ReadCounter(find=find, find_one=find_one)
+
+    def test_already_changed(self):
+        with self._count_reads() as reads:
+            assert self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.IN_PROGRESS, 10, 10) is True
+        assert reads.count == 1
+
+    def test_timeout(self):
+        start = time.monotonic()
+        assert self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 0.3, 0.1) is False
+        assert 0.3 <= time.monotonic() - start < 1
+
+    def test_change_in_this_process(self):
+        """A change made by this process wakes up the waiting request right away, without polling"""
+        with self._count_reads() as reads:
+            thread = self._in_thread(0.2, lambda: self.db.grab(self.state, device2_ref="device2-ref"))
+            start = time.monotonic()
+            assert self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 10, 10) is True
+            assert time.monotonic() - start < 1
+            thread.join()
+        assert reads.count == 2
+        assert self.db._waiting == {}
+
+    def test_change_in_other_process(self):
+        """A change made by another process (not notifying this one) is noticed by polling"""
+
+        def _grab_elsewhere() -> None:
+            _update = {"$set": {"state": OtherDeviceState.IN_PROGRESS.value}}
+            self.db._coll.update_one({"_id": self.state.obj_id}, _update)
+
+        thread = self._in_thread(0.2, _grab_elsewhere)
+        start = time.monotonic()
+        assert self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 10, 0.1) is True
+        assert time.monotonic() - start < 1
+        thread.join()
+
+    def test_max_waiters(self):
+        thread = self._in_thread(
+            0, lambda: self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 10, 10, max_waiters=1)
+        )
+        deadline = time.monotonic() + 5
+        while not self.db._waiting and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert self.db._waiting == {self.state.state_id: 1}
+        with self.assertRaises(EduidTooManyRequests):
+            self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 10, 10, max_waiters=1)
+        # the waiting request is still waiting, and is woken up by the state change
+        assert self.db._waiting == {self.state.state_id: 1}
+        self.db.grab(self.state, device2_ref="device2-ref")
+        thread.join()
+        assert self.db._waiting == {}
+
+    def test_state_removed(self):
+        self.db._coll.delete_one({"_id": self.state.obj_id})
+        assert self.db.wait_for_state_change(self.state.state_id, OtherDeviceState.NEW, 10, 10) is True
+
+    def test_reads_per_login(self):
+        """
+        Count the requests and database reads made by device #1 while the user logs in on device #2.
+
+        Polling use_other_1 every poll_interval seconds makes a request (and a full state read, plus the session
+        and login context) per interval, regardless of what happens. Waiting makes one request per state change.
+        """
+        poll_interval = 0.1
+        # device #2 grabs the state after 0.5 seconds, and logs in 0.5 seconds later
+        grab_at, login_at = 0.5, 1.0
+
+        def _device2() -> None:
+            grabbed = self.db.grab(self.state, device2_ref="device2-ref")
+            assert grabbed is not None
+            time.sleep(login_at - grab_at)
+            self.db.logged_in(grabbed, eppn=self.test_user.eppn, credentials_used=[])
+
+        # before: polling
+        polled_states: List[OtherDeviceState] = []
+        thread = self._in_thread(grab_at, _device2)
+        with self._count_reads() as reads:
+            while True:
+                _state = self.db.get_state_by_id(self.state.state_id)
+                assert _state is not None
+                polled_states.append(_state.state)
+                if _state.state == OtherDeviceState.AUTHENTICATED:
+                    break
+                time.sleep(poll_interval)
+        thread.join()
+        polling_requests = len(polled_states)
+        polling_reads = reads.count
+
+        # after: waiting
+        self.db._coll.delete_one({"_id": self.state.obj_id})
+        self.state.state = OtherDeviceState.NEW
+        self.state.device2 = Device2Data()
+        self.db.save(self.state)
+
+        waited_states: List[OtherDeviceState] = []
+        thread = self._in_thread(grab_at, _device2)
+        with self._count_reads() as reads:
+            _state = self.db.get_state_by_id(self.state.state_id)
+            assert _state is not None
+            while _state.state != OtherDeviceState.AUTHENTICATED:
+                self.db.wait_for_state_change(_state.state_id, _state.state, timeout=20, poll_interval=10)
+                _state = self.db.get_state_by_id(self.state.state_id)
+                assert _state is not None
+                waited_states.append(_state.state)
+        thread.join()
+        waiting_requests = len(waited_states)
+        waiting_reads = reads.count
+
+        print(
+            f"Requests per login: polling every {poll_interval}s: {polling_requests}, waiting: {waiting_requests}. "
+            f"Database reads: polling {polling_reads}, waiting {waiting_reads}"
+        )
+        assert waited_states == [OtherDeviceState.IN_PROGRESS, OtherDeviceState.AUTHENTICATED]
+        assert polling_requests >= login_at / poll_interval
+        assert waiting_requests < polling_requests / 3
+        assert waiting_reads < polling_reads
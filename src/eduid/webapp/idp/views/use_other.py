@@ -7,10 +7,12 @@ import nacl.secret
 import nacl.utils
 from flask import Blueprint, jsonify, request
 from nacl.secret import SecretBox
+from werkzeug.exceptions import TooManyRequests
 from werkzeug.wrappers import Response as WerkzeugResponse
 
 from eduid.common.misc.timeutil import utc_now
 from eduid.webapp.common.api.decorators import MarshalWith, UnmarshalWith
+from eduid.webapp.common.api.exceptions import EduidTooManyRequests
 from eduid.webapp.common.api.messages import FluxData, error_response, success_response
 from eduid.webapp.common.api.schemas.models import FluxSuccessResponse
 from eduid.webapp.common.session import session
@@ -27,6 +29,7 @@ from eduid.webapp.idp.other_device.helpers import _get_other_device_state_using_
 from eduid.webapp.idp.schemas import (
     UseOther1RequestSchema,
     UseOther1ResponseSchema,
+    UseOther1WaitRequestSchema,
     UseOther2RequestSchema,
     UseOther2ResponseSchema,
 )
@@ -147,6 +150,63 @@ def use_other_1(
     return success_response(payload=payload)
 
 
+@other_device_views.route("/use_other_1/wait", methods=["POST"])
+@UnmarshalWith(UseOther1WaitRequestSchema)
+@MarshalWith(UseOther1ResponseSchema)
+@require_ticket
+def use_other_1_wait(ticket: LoginContext, state: str) -> FluxData:
+    """
+    Wait for the "Login using another device" state to change, on device #1.
+
+    The frontend passes the state it currently has, and gets a response (the same as from use_other_1) as soon as
+    the state in the backend is different, or when other_device_wait_timeout has passed. This replaces polling
+    use_other_1 while waiting for the user to use device #2.
+
+    If other_device_max_waiters requests are already waiting, the response is 429 Too Many Requests and the
+    frontend should poll use_other_1 instead.
+    """
+    current_app.logger.debug("\n\n")
+    current_app.logger.debug(f"--- Use Other Device #1 wait ({ticket.request_ref}, state {state}) ---")
+
+    if not current_app.conf.allow_other_device_logins or not current_app.conf.other_device_url:
+        return error_response(message=IdPMsg.not_available)
+
+    _lookup_result = _get_other_device_state_using_ref(ticket.request_ref, device=1)
+    if _lookup_result.response:
+        return _lookup_result.response
+
+    other_device = _lookup_result.state
+    if not other_device:
+        current_app.logger.info("Login using other device: State not found")
+        return error_response(message=IdPMsg.state_not_found)
+
+    now = utc_now()
+    if other_device.state.value == state and other_device.expires_at > now:
+        timeout = min(current_app.conf.other_device_wait_timeout, other_device.expires_at - now)
+        try:
+            changed = current_app.other_device_db.wait_for_state_change(
+                state_id=other_device.state_id,
+                state=other_device.state,
+                timeout=timeout.total_seconds(),
+                poll_interval=current_app.conf.other_device_wait_poll_interval.total_seconds(),
+                max_waiters=current_app.conf.other_device_max_waiters,
+            )
+        except EduidTooManyRequests as e:
+            current_app.logger.info(f"Login using other device: Not waiting for state change: {e}")
+            current_app.stats.count("login_using_other_device_wait_too_many")
+            raise TooManyRequests(e.args[0])
+        if changed:
+            other_device = current_app.other_device_db.get_state_by_id(other_device.state_id)
+            if not other_device:
+                current_app.logger.info("Login using other device: State not found")
+                return error_response(message=IdPMsg.state_not_found)
+            current_app.logger.info(f"Other device state changed to {other_device.state}")
+        now = utc_now()
+
+    payload = device1_state_to_flux_payload(other_device, now)
+    return success_response(payload=payload)
+
+
 @other_device_views.route("/use_other_2", methods=["POST"])
 @UnmarshalWith(UseOther2RequestSchema)
 @MarshalWith(UseOther2ResponseSchema)
@@ -37,6 +37,7 @@ from flask import current_app
 from eduid.common.config.parsers import load_config
 from eduid.common.rpc.am_relay import AmRelay
 from eduid.common.rpc.msg_relay import MsgRelay
+from eduid.queue.db.message import MessageDB
 from eduid.userdb.logs import ProofingLog
 from eduid.userdb.proofing import LetterProofingStateDB, LetterProofingUserDB
 from eduid.webapp.common.api import translation
@@ -57,6 +58,9 @@ class LetterProofingApp(AuthnBaseApp):
         self.private_userdb = LetterProofingUserDB(config.mongo_uri)
         self.proofing_statedb = LetterProofingStateDB(config.mongo_uri)
         self.proofing_log = ProofingLog(config.mongo_uri)
+        self.messagedb: Optional[MessageDB] = None
+        if config.letter_queue:
+            self.messagedb = MessageDB(config.mongo_uri)
 
         # Init celery
         self.msg_relay = MsgRelay(config)
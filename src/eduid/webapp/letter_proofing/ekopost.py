@@ -7,7 +7,7 @@ from datetime import datetime
 
 from hammock import Hammock
 
-from eduid.webapp.letter_proofing.settings.common import LetterProofingConfig
+from eduid.common.config.base import EkopostConfigMixin
 
 __author__ = "john"
 
@@ -17,7 +17,7 @@ class EkopostException(Exception):
 
 
 class Ekopost:
-    def __init__(self, config: LetterProofingConfig):
+    def __init__(self, config: EkopostConfigMixin):
         self.config = config
 
         auth = None
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
+import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import unique
+from typing import Optional
 
 from eduid.common.misc.timeutil import utc_now
 from eduid.common.rpc.msg_relay import FullPostalAddress
+from eduid.queue.db import QueueItem, SenderInfo
+from eduid.queue.db.message import EduidLetterProofingLetter
 from eduid.userdb import User
 from eduid.userdb.proofing import LetterProofingState, NinProofingElement
 from eduid.userdb.proofing.element import SentLetterElement
@@ -38,6 +42,8 @@ class LetterMsg(TranslatableMsg):
     bad_address = "letter.bad-postal-address"
     # letter sent and state saved w/o errors
     letter_sent = "letter.saved-unconfirmed"
+    # letter queued to be sent, the state should be fetched again until it has been sent
+    letter_pending = "letter.pending"
     # wrong verification code received
     wrong_code = "letter.wrong-code"
     # success verifying the code
@@ -46,8 +52,9 @@ class LetterMsg(TranslatableMsg):
 
 @dataclass
 class StateExpireInfo(object):
-    sent: datetime
-    expires: datetime
+    # not set for pending letters and errors
+    sent: Optional[datetime]
+    expires: Optional[datetime]
     is_expired: bool
     error: bool
     message: TranslatableMsg
@@ -56,6 +63,10 @@ class StateExpireInfo(object):
         """Create a response with information about the users current proofing state (or an error)."""
         if self.error:
             return error_response(message=self.message)
+        if self.message == LetterMsg.letter_pending:
+            return success_response({"letter_pending": True}, message=self.message)
+        if self.sent is None:
+            raise ValueError("StateExpireInfo must have a sent datetime for sent letters")
         res = {
             "letter_sent": self.sent,
             "letter_expires": self.expires,
@@ -84,12 +95,13 @@ def check_state(state: LetterProofingState) -> StateExpireInfo:
              such as when it was created, when it expires etc.
     """
     current_app.logger.info("Checking state for user with eppn {!s}".format(state.eppn))
+    if is_pending(state):
+        current_app.logger.info("Letter is queued for user with eppn {!s}".format(state.eppn))
+        return StateExpireInfo(sent=None, expires=None, is_expired=False, error=False, message=LetterMsg.letter_pending)
     if not state.proofing_letter.is_sent:
         current_app.logger.info("Unfinished state for user with eppn {!s}".format(state.eppn))
         current_app.logger.debug("Proofing state: {}".format(state.to_dict()))
-        # need a datetime for typing, but sent/expires/is_expired are not included in error responses
-        _fake_dt = datetime.fromtimestamp(0)
-        return StateExpireInfo(sent=_fake_dt, expires=_fake_dt, is_expired=True, error=True, message=LetterMsg.not_sent)
+        return StateExpireInfo(sent=None, expires=None, is_expired=True, error=True, message=LetterMsg.not_sent)
 
     current_app.logger.info("Letter is sent for user with eppn {!s}".format(state.eppn))
     # Check how long ago the letter was sent
@@ -116,6 +128,11 @@ def check_state(state: LetterProofingState) -> StateExpireInfo:
         )
 
 
+def is_pending(state: LetterProofingState) -> bool:
+    """A letter has been put on the letter queue, but the letter worker has not sent it yet"""
+    return state.proofing_letter.queued_ts is not None and not state.proofing_letter.is_sent
+
+
 def create_proofing_state(eppn: str, nin: str) -> LetterProofingState:
     _nin = NinProofingElement(
         number=nin,
@@ -181,6 +198,7 @@ def send_letter(user: User, proofing_state: LetterProofingState) -> str:
         created_timestamp=proofing_state.nin.created_ts,
         primary_mail_address=user.mail_addresses.primary.email,
         letter_wait_time_hours=current_app.conf.letter_wait_time_hours,
+        language=get_letter_language(),
     )
     if current_app.conf.ekopost_debug_pdf_path is not None:
         # Write PDF to file instead of actually sending it if ekopost_debug_pdf_path is set
@@ -189,3 +207,54 @@ def send_letter(user: User, proofing_state: LetterProofingState) -> str:
         return "debug mode transaction id"
     campaign_id = current_app.ekopost.send(user.eppn, pdf_letter)
     return campaign_id
+
+
+def get_letter_language() -> str:
+    return current_app.babel.locale_selector_func() or pdf.DEFAULT_LANGUAGE
+
+
+def create_letter_queue_item(user: User, proofing_state: LetterProofingState) -> QueueItem:
+    """
+    Create the queue item for the letter worker to render and send the letter.
+
+    The letter worker updates the proofing state when the letter has been sent, so save the proofing state
+    before saving the queue item.
+
+    :param user: User object
+    :param proofing_state: Users proofing state
+    """
+    if not proofing_state.proofing_letter.address:
+        raise ValueError("No address in proofing_state")
+    if not proofing_state.nin.verification_code:
+        raise ValueError("No verification_code in proofing_state")
+    if not user.mail_addresses.primary:
+        raise RuntimeError("User has no primary e-mail address")
+    if current_app.messagedb is None:
+        raise RuntimeError("Letter queue not configured")
+    # Fail here, and not in the worker, if the letter can't be addressed
+    pdf.format_address(proofing_state.proofing_letter.address.dict(exclude_none=True, by_alias=True))
+
+    payload = EduidLetterProofingLetter(
+        eppn=user.eppn,
+        address=proofing_state.proofing_letter.address.dict(exclude_none=True, by_alias=True),
+        verification_code=proofing_state.nin.verification_code,
+        verification_created_ts=proofing_state.nin.created_ts,
+        primary_mail_address=user.mail_addresses.primary.email,
+        letter_wait_time_hours=current_app.conf.letter_wait_time_hours,
+        language=get_letter_language(),
+        reference=str(proofing_state.id),
+    )
+    app_name = current_app.conf.app_name
+    system_hostname = os.environ.get("SYSTEM_HOSTNAME", "")  # Underlying hosts name for containers
+    hostname = os.environ.get("HOSTNAME", "")  # Actual hostname or container id
+    sender_info = SenderInfo(hostname=hostname, node_id=f"{app_name}@{system_hostname}")
+    expires_at = utc_now() + current_app.conf.letter_queue_timeout
+    discard_at = expires_at + timedelta(days=7)
+    return QueueItem(
+        version=1,
+        expires_at=expires_at,
+        discard_at=discard_at,
+        sender_info=sender_info,
+        payload_type=payload.get_type(),
+        payload=payload,
+    )
@@ -1,17 +1,26 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import threading
+from base64 import b64encode
 from datetime import datetime, timedelta
+from functools import lru_cache
 from io import BytesIO, StringIO
 from pathlib import Path
-from typing import Mapping, OrderedDict
+from typing import Any, Dict, Mapping, Optional, OrderedDict
 
-from xhtml2pdf import pisa
+import pkg_resources
+from babel.support import Translations
+from jinja2 import Environment, FileSystemLoader
 
 from eduid.common.rpc.msg_relay import FullPostalAddress
 
 logger = logging.getLogger(__name__)
 
+TEMPLATES_PATH = Path(__file__).with_name("templates")
+TRANSLATIONS_PATH = Path(pkg_resources.resource_filename("eduid.webapp", "translations"))
+DEFAULT_LANGUAGE = "en"
+
 
 class AddressFormatException(Exception):
     pass
@@ -44,13 +53,122 @@ def format_address(recipient: Mapping):
         raise AddressFormatException(e)
 
 
+@lru_cache(maxsize=None)
+def _get_pisa() -> Any:
+    # xhtml2pdf is slow to import, and only needed when a letter is rendered
+    from xhtml2pdf import pisa
+
+    pisa.showLogging()
+    return pisa
+
+
+class LetterRenderer:
+    """
+    Render letters as PDF documents.
+
+    The renderer does not need a Flask app, so that it can be used by the letter queue worker too. Everything
+    that doesn't change between letters is prepared once and kept for the following renders: the parsed
+    template and translations (one jinja2 environment per language) and the logo, converted from EPS (which
+    requires running ghostscript) to PNG.
+    """
+
+    def __init__(self, templates_path: Path = TEMPLATES_PATH, translations_path: Path = TRANSLATIONS_PATH):
+        self.templates_path = templates_path
+        self.translations_path = translations_path
+        self._envs: Dict[str, Environment] = {}
+        self._logo_uri: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get_env(self, language: str) -> Environment:
+        with self._lock:
+            if language not in self._envs:
+                env = Environment(
+                    loader=FileSystemLoader(searchpath=self.templates_path),
+                    extensions=["jinja2.ext.i18n"],
+                    auto_reload=False,
+                )
+                translations = Translations.load(self.translations_path, [language])
+                env.install_gettext_translations(translations, newstyle=True)
+                self._envs[language] = env
+            return self._envs[language]
+
+    @property
+    def logo_uri(self) -> str:
+        if self._logo_uri is None:
+            self._logo_uri = self._load_logo()
+        return self._logo_uri
+
+    def _load_logo(self) -> str:
+        eps_path = self.templates_path / "sunet_logo.eps"
+        try:
+            from PIL import Image
+
+            with Image.open(eps_path) as image:
+                # render at 288 dpi to keep the print quality
+                image.load(scale=4)
+                with BytesIO() as f:
+                    image.save(f, format="PNG")
+                    return f"data:image/png;base64,{b64encode(f.getvalue()).decode('ascii')}"
+        except Exception:
+            logger.exception(f"Failed converting {eps_path} to PNG, using the EPS file")
+            return f"file://{eps_path}"
+
+    def render_html(self, language: str, **context: Any) -> str:
+        return self.get_env(language).get_template("letter.jinja2").render(sunet_logo=self.logo_uri, **context)
+
+    def create_pdf(
+        self,
+        recipient: FullPostalAddress,
+        verification_code: str,
+        created_timestamp: datetime,
+        primary_mail_address: str,
+        letter_wait_time_hours: int,
+        language: str,
+    ) -> BytesIO:
+        try:
+            name, care_of, address, misc_address, postal_code, city = format_address(
+                recipient.dict(exclude_none=True, by_alias=True)
+            )
+        except AddressFormatException as e:
+            logger.error("Postal address formatting failed: {!r}".format(e))
+            raise e
+
+        # Calculate the validity period of the verification
+        # code that is to be shown in the letter.
+        max_wait = timedelta(hours=letter_wait_time_hours)
+        validity_period = (created_timestamp + max_wait).strftime("%Y-%m-%d")
+
+        letter_template = self.render_html(
+            language,
+            recipient_name=name,
+            recipient_care_of=care_of,
+            recipient_address=address,
+            recipient_misc_address=misc_address,
+            recipient_postal_code=postal_code,
+            recipient_city=city,
+            recipient_verification_code=verification_code,
+            recipient_validity_period=validity_period,
+            recipient_primary_mail_address=primary_mail_address,
+        )
+
+        pdf_document = BytesIO()
+        _get_pisa().CreatePDF(StringIO(letter_template), pdf_document)
+        return pdf_document
+
+
+@lru_cache(maxsize=None)
+def get_letter_renderer() -> LetterRenderer:
+    return LetterRenderer()
+
+
 def create_pdf(
     recipient: FullPostalAddress,
     verification_code: str,
     created_timestamp: datetime,
     primary_mail_address: str,
     letter_wait_time_hours: int,
-):
+    language: str = DEFAULT_LANGUAGE,
+) -> BytesIO:
     """
     Create a letter in the form of a PDF-document,
     containing a verification code to be sent to a user.
@@ -60,41 +178,13 @@ def create_pdf(
     :param created_timestamp: Timestamp for when the proofing was initiated
     :param primary_mail_address: The users primary mail address
     :param letter_wait_time_hours: The expire time for the code
+    :param language: The language to write the letter in
     """
-    # Imported here to avoid exposing
-    # render_template to the calling function.
-    from flask import render_template
-
-    pisa.showLogging()
-
-    try:
-        name, care_of, address, misc_address, postal_code, city = format_address(
-            recipient.dict(exclude_none=True, by_alias=True)
-        )
-    except AddressFormatException as e:
-        logger.error("Postal address formatting failed: {!r}".format(e))
-        raise e
-
-    # Calculate the validity period of the verification
-    # code that is to be shown in the letter.
-    max_wait = timedelta(hours=letter_wait_time_hours)
-    validity_period = (created_timestamp + max_wait).strftime("%Y-%m-%d")
-    templates_path = Path(__file__).with_name("templates")
-
-    letter_template = render_template(
-        "letter.jinja2",
-        sunet_logo=f"file://{templates_path}/sunet_logo.eps",
-        recipient_name=name,
-        recipient_care_of=care_of,
-        recipient_address=address,
-        recipient_misc_address=misc_address,
-        recipient_postal_code=postal_code,
-        recipient_city=city,
-        recipient_verification_code=verification_code,
-        recipient_validity_period=validity_period,
-        recipient_primary_mail_address=primary_mail_address,
+    return get_letter_renderer().create_pdf(
+        recipient=recipient,
+        verification_code=verification_code,
+        created_timestamp=created_timestamp,
+        primary_mail_address=primary_mail_address,
+        letter_wait_time_hours=letter_wait_time_hours,
+        language=language,
     )
-
-    pdf_document = BytesIO()
-    pisa.CreatePDF(StringIO(letter_template), pdf_document)
-    return pdf_document
@@ -30,6 +30,7 @@ class LetterProofingResponseSchema(FluxStandardAction):
         letter_expired = fields.Boolean()
         letter_expires_in_days = fields.Int(required=False)
         letter_sent_days_ago = fields.Int(required=False)
+        letter_pending = fields.Boolean(required=False)
 
     payload = fields.Nested(LetterProofingPayload)
 
@@ -9,6 +9,7 @@ from typing import Any, Optional
 from flask import Response
 from mock import Mock, patch
 
+from eduid.queue.db.message import MessageDB
 from eduid.userdb import NinIdentity
 from eduid.userdb.identity import IdentityType
 from eduid.webapp.common.api.testing import EduidAPITestCase
@@ -553,3 +554,80 @@ class LetterProofingTests(EduidAPITestCase):
 
         proofing_state = self.app.proofing_statedb.get_state_by_eppn(user.eppn)
         assert proofing_state is None
+
+    def _enable_letter_queue(self) -> None:
+        self.app.conf.letter_queue = True
+        self.app.messagedb = MessageDB(self.app.conf.mongo_uri)
+        self.app.messagedb._drop_whole_collection()
+
+    def test_queue_letter(self):
+        self._enable_letter_queue()
+        response = self.send_letter(self.test_user_nin, validate_response=False)
+        self._check_success_response(
+            response,
+            type_="POST_LETTER_PROOFING_PROOFING_SUCCESS",
+            msg=LetterMsg.letter_pending,
+            payload={"letter_pending": True},
+        )
+        state = self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn)
+        self.assertIsNotNone(state.proofing_letter.queued_ts)
+        self.assertFalse(state.proofing_letter.is_sent)
+        items = list(self.app.messagedb._coll.find({}))
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["payload"]["verification_code"], state.nin.verification_code)
+
+        # the frontend polls the state until the letter has been sent
+        json_data = self.get_state()
+        self.assertEqual(json_data["payload"]["message"], LetterMsg.letter_pending.value)
+        self.assertTrue(json_data["payload"]["letter_pending"])
+
+        # requesting a letter again does not queue another one
+        response = self.send_letter(self.test_user_nin, validate_response=False)
+        self._check_success_response(
+            response, type_="POST_LETTER_PROOFING_PROOFING_SUCCESS", msg=LetterMsg.letter_pending
+        )
+        self.assertEqual(self.app.messagedb._coll.count_documents({}), 1)
+
+    def test_queue_letter_saves_state_first(self):
+        """The letter worker updates the state when the letter is sent, so the state is saved before queueing it"""
+        self._enable_letter_queue()
+        saved_states = []
+        save = self.app.messagedb.save
+
+        def _save(item):
+            saved_states.append(self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn))
+            return save(item)
+
+        with patch.object(self.app.messagedb, "save", side_effect=_save):
+            self.send_letter(self.test_user_nin, validate_response=False)
+        self.assertEqual(len(saved_states), 1)
+        self.assertIsNotNone(saved_states[0].proofing_letter.queued_ts)
+        # the request doesn't save the state again after queueing the letter, when the worker might have updated it
+        state = self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn)
+        self.assertEqual(state.modified_ts, saved_states[0].modified_ts)
+
+    def test_queue_letter_failed(self):
+        self._enable_letter_queue()
+        with patch.object(self.app.messagedb, "save", side_effect=RuntimeError("queue unavailable")):
+            with self.assertRaises(RuntimeError):
+                self.send_letter(self.test_user_nin, validate_response=False)
+        # the state isn't left waiting for a letter that wasn't queued
+        state = self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn)
+        self.assertIsNone(state.proofing_letter.queued_ts)
+
+    def test_verify_queued_letter(self):
+        self._enable_letter_queue()
+        self.send_letter(self.test_user_nin, validate_response=False)
+        state = self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn)
+        response = self.verify_code(state.nin.verification_code, validate_response=False)
+        self._check_error_response(
+            response, type_="POST_LETTER_PROOFING_VERIFY_CODE_FAIL", msg=LetterMsg.letter_pending
+        )
+
+    def test_queue_letter_bad_address(self):
+        self._enable_letter_queue()
+        self.mock_address = OrderedDict([("Name", OrderedDict([("GivenName", "Testaren Test")]))])
+        response = self.send_letter(self.test_user_nin, validate_response=False)
+        self._check_error_response(response, type_="POST_LETTER_PROOFING_PROOFING_FAIL", msg=LetterMsg.bad_address)
+        self.assertIsNone(self.app.proofing_statedb.get_state_by_eppn(self.test_user_eppn))
+        self.assertEqual(self.app.messagedb._coll.count_documents({}), 0)
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
 
+import time
 import unittest
 from collections import OrderedDict
 from datetime import datetime
 from io import BytesIO, StringIO
+from unittest.mock import patch
 
 from eduid.common.rpc.msg_relay import FullPostalAddress
 from eduid.webapp.common.api.testing import EduidAPITestCase
@@ -191,3 +193,62 @@ class CreatePDFTest(EduidAPITestCase):
                     letter_wait_time_hours=336,
                 )
         self.assertIsInstance(pdf_document, (StringIO, BytesIO))
+
+
+class LetterRendererTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.recipient = FullPostalAddress.parse_obj(
+            {
+                "Name": {"GivenNameMarking": "20", "GivenName": "Testaren Test", "Surname": "Testsson"},
+                "OfficialAddress": {"Address2": "\xd6RGATAN 79 LGH 10", "PostalCode": "12345", "City": "LANDET"},
+            }
+        )
+        self.context = {
+            "recipient_name": "Testaren Test Testsson",
+            "recipient_verification_code": "bogus code",
+            "recipient_validity_period": "2021-01-01",
+        }
+
+    def test_create_pdf(self):
+        renderer = pdf.LetterRenderer()
+        pdf_document = renderer.create_pdf(
+            self.recipient,
+            verification_code="bogus code",
+            created_timestamp=datetime.utcnow(),
+            primary_mail_address="test@example.org",
+            letter_wait_time_hours=336,
+            language="sv",
+        )
+        self.assertTrue(pdf_document.getvalue().startswith(b"%PDF"))
+
+    def test_cached_between_renders(self):
+        renderer = pdf.LetterRenderer()
+        with patch.object(renderer, "_load_logo", return_value="data:image/png;base64,") as load_logo:
+            for language in ["en", "sv", "en", "sv"]:
+                html = renderer.render_html(language, **self.context)
+                self.assertIn("bogus code", html)
+            self.assertEqual(load_logo.call_count, 1)
+        self.assertIs(renderer.get_env("en"), renderer.get_env("en"))
+        self.assertIsNot(renderer.get_env("en"), renderer.get_env("sv"))
+        self.assertIs(pdf.get_letter_renderer(), pdf.get_letter_renderer())
+
+    def test_render_throughput(self):
+        letters = 50
+
+        def _render(renderer: pdf.LetterRenderer) -> None:
+            with patch.object(renderer, "_load_logo", return_value="data:image/png;base64,"):
+                renderer.render_html("sv", **self.context)
+
+        # parsing the template and loading the translations for every letter, like before
+        start = time.monotonic()
+        for _ in range(letters):
+            _render(pdf.LetterRenderer())
+        uncached = time.monotonic() - start
+
+        renderer = pdf.LetterRenderer()
+        start = time.monotonic()
+        for _ in range(letters):
+            _render(renderer)
+        cached = time.monotonic() - start
+
+        self.assertLess(cached * 2, uncached)
@@ -15,7 +15,15 @@ from eduid.webapp.common.api.messages import CommonMsg, FluxData, error_response
 from eduid.webapp.letter_proofing import pdf, schemas
 from eduid.webapp.letter_proofing.app import current_letterp_app as current_app
 from eduid.webapp.letter_proofing.ekopost import EkopostException
-from eduid.webapp.letter_proofing.helpers import LetterMsg, check_state, create_proofing_state, get_address, send_letter
+from eduid.webapp.letter_proofing.helpers import (
+    LetterMsg,
+    check_state,
+    create_letter_queue_item,
+    create_proofing_state,
+    get_address,
+    is_pending,
+    send_letter,
+)
 
 __author__ = "lundberg"
 
@@ -65,6 +73,10 @@ def proofing(user: User, nin: str) -> FluxData:
     # NOOP if the user already have the nin
     add_nin_to_user(user, proofing_state)
 
+    if is_pending(proofing_state):
+        current_app.logger.info("A letter is already queued to be sent to the user.")
+        return check_state(proofing_state).to_response()
+
     if proofing_state.proofing_letter.is_sent:
         current_app.logger.info("A letter has already been sent to the user.")
         current_app.logger.debug("Proofing state: {}".format(proofing_state.to_dict()))
@@ -96,6 +108,29 @@ def proofing(user: User, nin: str) -> FluxData:
     proofing_state.proofing_letter.address = address
     current_app.proofing_statedb.save(proofing_state)
 
+    if current_app.conf.letter_queue:
+        # Let the letter worker render and send the letter, the frontend polls the state until it has been sent
+        try:
+            queue_item = create_letter_queue_item(user, proofing_state)
+        except pdf.AddressFormatException:
+            current_app.logger.exception("Failed formatting address")
+            current_app.stats.count("address_format_error")
+            current_app.proofing_statedb.remove_state(proofing_state)
+            return error_response(message=LetterMsg.bad_address)
+        # Save the state before queueing the letter, the letter worker might update the state as soon as it is queued
+        proofing_state.proofing_letter.queued_ts = utc_now()
+        current_app.proofing_statedb.save(proofing_state)
+        assert current_app.messagedb is not None  # please mypy, checked in create_letter_queue_item
+        try:
+            current_app.messagedb.save(queue_item)
+        except Exception:
+            proofing_state.proofing_letter.queued_ts = None
+            current_app.proofing_statedb.save(proofing_state)
+            raise
+        current_app.logger.info(f"Saved letter queue item in queue collection {current_app.messagedb._coll_name}")
+        current_app.stats.count("letter_queued")
+        return check_state(proofing_state).to_response()
+
     try:
         campaign_id = send_letter(user, proofing_state)
         current_app.stats.count("letter_sent")
@@ -135,6 +170,9 @@ def verify_code(user: User, code: str) -> FluxData:
     if not proofing_state:
         return error_response(message=LetterMsg.no_state)
 
+    if is_pending(proofing_state):
+        return error_response(message=LetterMsg.letter_pending)
+
     # Check if provided code matches the one in the letter
     if not code == proofing_state.nin.verification_code:
         current_app.logger.error("Verification code for user {} does not match".format(user))
@@ -32,6 +32,7 @@
 # POSSIBILITY OF SUCH DAMAGE.
 #
 
+import threading
 from typing import Any, Mapping, Optional, cast
 
 from fido_mds import FidoMetadataStore
@@ -60,7 +61,8 @@ class SecurityApp(AuthnBaseApp):
         self.msg_relay = MsgRelay(config)
         self.mail_relay = MailRelay(config)
 
-        self.fido_mds = FidoMetadataStore()
+        self._fido_mds: Optional[FidoMetadataStore] = None
+        self._fido_mds_lock = threading.Lock()
 
         self.private_userdb = SecurityUserDB(config.mongo_uri)
         self.authninfo_db = AuthnInfoDB(config.mongo_uri)
@@ -70,6 +72,15 @@ class SecurityApp(AuthnBaseApp):
 
         self.babel = translation.init_babel(self)
 
+    @property
+    def fido_mds(self) -> FidoMetadataStore:
+        # Loading the FIDO metadata takes a while and is only needed when registering security keys
+        if self._fido_mds is None:
+            with self._fido_mds_lock:
+                if self._fido_mds is None:
+                    self._fido_mds = FidoMetadataStore()
+        return self._fido_mds
+
 
 current_security_app: SecurityApp = cast(SecurityApp, current_app)
 
@@ -31,9 +31,8 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 #
-from typing import Any, Dict, Mapping, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, cast
 
-from captcha.image import ImageCaptcha
 from flask import current_app
 
 from eduid.common.clients import SCIMClient
@@ -46,8 +45,12 @@ from eduid.userdb.logs import ProofingLog
 from eduid.userdb.signup import SignupInviteDB, SignupUserDB
 from eduid.webapp.common.api import translation
 from eduid.webapp.common.api.app import EduIDBaseApp
+from eduid.webapp.signup.captcha import CaptchaPool
 from eduid.webapp.signup.settings.common import SignupConfig
 
+if TYPE_CHECKING:
+    from captcha.image import ImageCaptcha
+
 
 class SignupApp(EduIDBaseApp):
     def __init__(self, config: SignupConfig, **kwargs):
@@ -58,11 +61,11 @@ class SignupApp(EduIDBaseApp):
         self.am_relay = AmRelay(config)
         self.mail_relay = MailRelay(config)
 
-        self.captcha_image_generator = ImageCaptcha(
-            height=self.conf.captcha_height,
-            width=self.conf.captcha_width,
-            fonts=self.conf.captcha_fonts,
-            font_sizes=self.conf.captcha_font_size,
+        self.captcha_pool = CaptchaPool(
+            image_generator=self._create_captcha_image_generator,
+            code_length=self.conf.captcha_code_length,
+            size=self.conf.captcha_pool_size,
+            stats=self.stats,
         )
 
         self.scim_clients: Dict[str, SCIMClient] = {}
@@ -74,6 +77,17 @@ class SignupApp(EduIDBaseApp):
 
         self.babel = translation.init_babel(self)
 
+    def _create_captcha_image_generator(self) -> "ImageCaptcha":
+        # only import captcha (and PIL) when the first captcha is rendered
+        from captcha.image import ImageCaptcha
+
+        return ImageCaptcha(
+            height=self.conf.captcha_height,
+            width=self.conf.captcha_width,
+            fonts=self.conf.captcha_fonts,
+            font_sizes=self.conf.captcha_font_size,
+        )
+
     def get_scim_client_for(self, data_owner: str) -> SCIMClient:
         if self.conf.gnap_auth_data is None or self.conf.scim_api_url is None:
             raise BadConfiguration("No auth server configuration available")
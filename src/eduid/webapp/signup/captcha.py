@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Optional
+
+from eduid.common.stats import AppStats, NoOpStats
+from eduid.webapp.common.api.utils import make_short_code
+
+if TYPE_CHECKING:
+    from captcha.image import ImageCaptcha
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Captcha:
+    answer: str
+    png: bytes
+
+
+class CaptchaPool:
+    """
+    A bounded pool of pre-rendered captcha images.
+
+    Rendering a captcha image takes tens of milliseconds of CPU, so a background thread keeps the pool
+    filled and requests just take an image from it. If the pool is empty, the image is rendered in the
+    request as before.
+
+    The background thread is started when the pool is first used, so that it runs in the process handling
+    requests (and not in e.g. a gunicorn master process that forks workers).
+
+    The image generator (which loads fonts, and imports PIL) is created on first use too.
+
+    :param image_generator: Factory for the generator of captcha images
+    :param code_length: The number of digits in the captcha codes
+    :param size: The maximum number of pre-rendered images to keep, 0 to disable the pool
+    :param stats: Where to report pool depth, refills and misses
+    """
+
+    def __init__(
+        self,
+        image_generator: Callable[[], "ImageCaptcha"],
+        code_length: int,
+        size: int,
+        stats: Optional[AppStats] = None,
+    ):
+        self._image_generator_factory = image_generator
+        self._image_generator: Optional["ImageCaptcha"] = None
+        self.code_length = code_length
+        self.size = size
+        if stats is None:
+            stats = NoOpStats()
+        self.stats = stats
+        self._queue: "queue.Queue[Captcha]" = queue.Queue(maxsize=max(size, 1))
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}: {self.depth}/{self.size} images>"
+
+    @property
+    def image_generator(self) -> "ImageCaptcha":
+        if self._image_generator is None:
+            self._image_generator = self._image_generator_factory()
+        return self._image_generator
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def generate(self) -> Captcha:
+        """Render a new captcha image"""
+        answer = make_short_code(digits=self.code_length)
+        image = self.image_generator.generate_image(chars=answer)
+        with BytesIO() as f:
+            image.save(fp=f, format="PNG", optimize=True)
+            return Captcha(answer=answer, png=f.getvalue())
+
+    def get(self) -> Captcha:
+        """Get a pre-rendered captcha, or render one if there are none available"""
+        if self.size < 1:
+            return self.generate()
+        self.start()
+        try:
+            captcha = self._queue.get_nowait()
+            self.stats.count("captcha_pool_hit")
+        except queue.Empty:
+            self.stats.count("captcha_pool_empty")
+            captcha = self.generate()
+        self.stats.gauge("captcha_pool_depth", self.depth)
+        return captcha
+
+    def start(self) -> None:
+        """Start the background thread filling the pool, unless it is already running in this process"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return None
+            if self._pid != os.getpid():
+                # Forked since the pool was filled. The queue might have been in use by a thread
+                # that doesn't exist in this process, so start over with a new one.
+                self._queue = queue.Queue(maxsize=max(self.size, 1))
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._fill, name="captcha-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _fill(self) -> None:
+        stop = self._stop
+        _queue = self._queue
+        while not stop.is_set():
+            try:
+                captcha = self.generate()
+            except Exception:
+                logger.exception(f"{self} failed rendering a captcha image")
+                stop.wait(1)
+                continue
+            # wait for room in the pool
+            while not stop.is_set():
+                try:
+                    _queue.put(captcha, timeout=1)
+                    self.stats.count("captcha_pool_refill")
+                    break
+                except queue.Full:
+                    continue
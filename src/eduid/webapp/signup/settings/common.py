@@ -83,6 +83,8 @@ class SignupConfig(EduIDBaseAppConfig, MagicCookieMixin, AmConfigMixin, MailConf
     )
     captcha_font_size: List[int] = [42, 50, 56]
     captcha_max_bad_attempts: int = 100
+    # number of pre-rendered captcha images to keep, 0 to render them in the request
+    captcha_pool_size: int = 20
     captcha_backdoor_code: str = "123456"
     scim_api_url: Optional[AnyUrl] = None
     gnap_auth_data: Optional[GNAPClientAuthData] = None
@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from captcha.image import ImageCaptcha
+
+from eduid.common.stats import TestStats
+from eduid.webapp.signup.captcha import CaptchaPool
+
+
+class CaptchaPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stats = TestStats()
+        self.pool = CaptchaPool(image_generator=ImageCaptcha, code_length=6, size=5, stats=self.stats)
+
+    def tearDown(self) -> None:
+        self.pool.stop()
+
+    def _wait_until_full(self) -> None:
+        deadline = time.monotonic() + 10
+        while self.pool.depth < self.pool.size:
+            self.assertLess(time.monotonic(), deadline, "captcha pool was not filled")
+            time.sleep(0.01)
+
+    def test_generate(self):
+        captcha = self.pool.generate()
+        self.assertEqual(len(captcha.answer), 6)
+        self.assertTrue(captcha.png.startswith(b"\x89PNG"))
+
+    def test_get_from_pool(self):
+        self.pool.start()
+        self._wait_until_full()
+        with patch.object(self.pool, "generate", wraps=self.pool.generate) as generate:
+            captchas = [self.pool.get() for _ in range(3)]
+            # the images were taken from the pool, not rendered in the request
+            self.assertEqual(generate.call_count, 0)
+        self.assertEqual(len({captcha.answer for captcha in captchas}), 3)
+        self.assertEqual(self.stats.counts["captcha_pool_hit"], 3)
+        self.assertIn("captcha_pool_depth", self.stats.gauges)
+        # the pool is refilled
+        self._wait_until_full()
+        self.assertGreaterEqual(self.stats.counts["captcha_pool_refill"], 8)
+
+    def test_throughput(self):
+        # rendering in the request
+        start = time.monotonic()
+        for _ in range(self.pool.size):
+            self.pool.generate()
+        inline = time.monotonic() - start
+        # taking pre-rendered images from a full pool
+        self.pool.start()
+        self._wait_until_full()
+        start = time.monotonic()
+        for _ in range(self.pool.size):
+            self.pool.get()
+        pooled = time.monotonic() - start
+        self.assertLess(pooled * 10, inline)
+
+    def test_fallback_when_empty(self):
+        pool = CaptchaPool(image_generator=ImageCaptcha, code_length=6, size=1, stats=self.stats)
+        with patch.object(pool, "start"):
+            captcha = pool.get()
+        self.assertTrue(captcha.png.startswith(b"\x89PNG"))
+        self.assertEqual(self.stats.counts["captcha_pool_empty"], 1)
+
+    def test_lazy_image_generator(self):
+        pool = CaptchaPool(image_generator=ImageCaptcha, code_length=6, size=0, stats=self.stats)
+        self.assertIsNone(pool._image_generator)
+        pool.get()
+        self.assertIsInstance(pool._image_generator, ImageCaptcha)
+
+    def test_disabled(self):
+        pool = CaptchaPool(image_generator=ImageCaptcha, code_length=6, size=0, stats=self.stats)
+        pool.get()
+        self.assertIsNone(pool._thread)
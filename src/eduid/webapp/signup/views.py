@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from base64 import b64encode
-from io import BytesIO
 from re import findall
 from typing import Optional
 from uuid import uuid4
@@ -178,14 +177,12 @@ def captcha_request() -> FluxData:
     if session.signup.captcha.completed:
         return error_response(message=SignupMsg.captcha_already_completed)
 
-    session.signup.captcha.internal_answer = make_short_code(digits=current_app.conf.captcha_code_length)
+    captcha = current_app.captcha_pool.get()
+    session.signup.captcha.internal_answer = captcha.answer
     session.signup.captcha.bad_attempts = 0
-    data = current_app.captcha_image_generator.generate_image(chars=session.signup.captcha.internal_answer)
-    with BytesIO() as f:
-        data.save(fp=f, format="PNG", optimize=True)
-        return success_response(
-            payload={"captcha_img": f"data:image/png;base64,{b64encode(f.getvalue()).decode('utf-8')}"},
-        )
+    return success_response(
+        payload={"captcha_img": f"data:image/png;base64,{b64encode(captcha.png).decode('utf-8')}"},
+    )
 
 
 @signup_views.route("/captcha", methods=["POST"])
@@ -37,6 +37,7 @@ from flask import current_app
 from jinja2.exceptions import UndefinedError
 
 from eduid.common.config.parsers import load_config
+from eduid.common.misc.concurrency import FanOut
 from eduid.common.utils import urlappend
 from eduid.userdb.support import db
 from eduid.webapp.common.authn.middleware import AuthnBaseApp
@@ -58,6 +59,8 @@ class SupportApp(AuthnBaseApp):
         self.support_email_proofing_db = db.SupportEmailProofingDB(config.mongo_uri)
         self.support_phone_proofing_db = db.SupportPhoneProofingDB(config.mongo_uri)
 
+        self.lookup_fan_out = FanOut(name="support-lookup", max_workers=config.lookup_max_workers)
+
 
 current_support_app: SupportApp = cast(SupportApp, current_app)
 
@@ -1,27 +1,30 @@
 # -*- coding: utf-8 -*-
-from functools import wraps
-from typing import Any, Dict, List
+from functools import partial, wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-from flask import abort
+import pymongo
+from flask import Flask, abort
 
 from eduid.userdb import User
+from eduid.userdb.exceptions import UserDoesNotExist
+from eduid.userdb.support.db import SupportAuthnInfoDB, SupportSignupUserDB
+from eduid.userdb.support.models import SupportSignupUserFilter, SupportUserFilter
 from eduid.webapp.common.api.utils import get_user
 from eduid.webapp.support.app import current_support_app as current_app
 
 __author__ = "lundberg"
 
 
-def get_credentials_aux_data(user: User) -> List[Dict[str, Any]]:
+def get_credentials_aux_data(user: User, authn_db: SupportAuthnInfoDB) -> List[Dict[str, Any]]:
     """
     :param user: User object
-    :type user: eduid.userdb.user.User
+    :param authn_db: The database with information about credential use
     :return: Augmented credentials list
-    :rtype: list
     """
     credentials = []
     for credential in user.credentials.to_list():
         credential_dict = credential.to_dict()
-        credential_info = current_app.support_authn_db.get_credential_info(credential.key)
+        credential_info = authn_db.get_credential_info(credential.key)
         if credential_info:
             # Add success_ts
             credential_dict["success_ts"] = credential_info["success_ts"]
@@ -44,3 +47,74 @@ def require_support_personnel(f):
         abort(403)
 
     return require_support_decorator
+
+
+def _get_signup_user(signup_db: SupportSignupUserDB, user: User) -> Optional[SupportSignupUserFilter]:
+    try:
+        signup_user = signup_db.get_user_by_id(user_id=user.user_id)
+    except (UserDoesNotExist, TypeError):
+        # The user is in an old format
+        return None
+    if signup_user:
+        return SupportSignupUserFilter(signup_user.to_dict())
+    return None
+
+
+def get_users_aux_data(users: Sequence[User]) -> List[Dict[str, Any]]:
+    """
+    Look up everything support personnel needs to know about the users.
+
+    The lookups are independent of each other, so they are run concurrently (for all users at once). The database
+    queries of every lookup have lookup_timeout seconds to finish, counted from when the lookup starts running.
+    A lookup that fails, or does not finish in time, is replaced with an empty value and listed in lookup_errors.
+    """
+    # (default value, function) for every lookup, by key in the user data
+    lookups: Dict[str, Tuple[Any, Callable[[User], Any]]] = {
+        "passwords": (None, lambda user: get_credentials_aux_data(user, current_app.support_authn_db)),
+        "signup_user": (None, partial(_get_signup_user, current_app.support_signup_db)),
+        "authn": (dict(), lambda user: current_app.support_authn_db.get_authn_info(user_id=user.user_id)),
+        "proofing_log": ([], lambda user: current_app.support_proofing_log_db.get_entries(eppn=user.eppn)),
+        "letter_proofing": (
+            dict(),
+            lambda user: current_app.support_letter_proofing_db.get_proofing_state(eppn=user.eppn),
+        ),
+        "oidc_proofing": (dict(), lambda user: current_app.support_oidc_proofing_db.get_proofing_state(eppn=user.eppn)),
+        "email_proofings": (
+            [],
+            lambda user: current_app.support_email_proofing_db.get_proofing_states(eppn=user.eppn),
+        ),
+        "phone_proofings": (
+            [],
+            lambda user: current_app.support_phone_proofing_db.get_proofing_states(eppn=user.eppn),
+        ),
+    }
+    # current_app is a proxy that only works in this thread, so bind the lookups to the real app here
+    app = current_app._get_current_object()  # type: ignore
+    calls: Dict[Tuple[int, str], Callable[[], Any]] = {}
+    for i, user in enumerate(users):
+        for key, (_default, func) in lookups.items():
+            calls[(i, key)] = partial(_in_app_context, app, func, user, current_app.conf.lookup_timeout)
+    results = current_app.lookup_fan_out.run(calls)
+
+    res: List[Dict[str, Any]] = []
+    for i, user in enumerate(users):
+        user_data: Dict[str, Any] = {"lookup_errors": []}
+        for key, (default, _func) in lookups.items():
+            result = results[(i, key)]
+            user_data[key] = result.value if result.ok else default
+            if not result.ok:
+                user_data["lookup_errors"].append(key)
+        user_dict = user.to_dict()
+        if user_data["passwords"] is not None:
+            # Extend credentials with last used timestamp
+            user_dict["passwords"] = user_data["passwords"]
+        del user_data["passwords"]
+        # Filter out unwanted data from user object
+        user_data["user"] = SupportUserFilter(user_dict)
+        res.append(user_data)
+    return res
+
+
+def _in_app_context(app: Flask, func: Callable[[User], Any], user: User, timeout: float) -> Any:
+    with app.app_context(), pymongo.timeout(timeout):
+        return func(user)
@@ -51,3 +51,10 @@ class SupportConfig(EduIDBaseAppConfig):
     app_name = "support"
 
     support_personnel: List[str] = Field(default=[])
+    # Number of users shown per page of search results
+    search_page_size: int = 25
+    # Maximum number of concurrent database queries when looking up information about the found users
+    lookup_max_workers: int = 16
+    # Seconds the database queries of each lookup of information about a found user may take. Counted from when
+    # the lookup starts, so lookups waiting for one of the lookup_max_workers threads don't time out.
+    lookup_timeout: float = 5.0
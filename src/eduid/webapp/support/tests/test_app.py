@@ -31,7 +31,12 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 from typing import Any, Dict, Mapping
+from unittest.mock import patch
 
+from bson import ObjectId
+from pymongo.errors import ExecutionTimeout
+
+from eduid.userdb import User
 from eduid.webapp.common.api.testing import EduidAPITestCase
 from eduid.webapp.support.app import SupportApp, support_init_app
 
@@ -62,6 +67,7 @@ class SupportAppTests(EduidAPITestCase):
                 "support_personnel": ["hubba-bubba"],
                 "token_service_url_logout": "https://localhost/logout",
                 "eduid_static_url": "https://testing.eduid.se/static/",
+                "search_page_size": 2,
             }
         )
         return config
@@ -84,3 +90,37 @@ class SupportAppTests(EduidAPITestCase):
         with self.session_cookie(self.client, self.test_user_eppn) as client:
             response = client.post("/", data={"query": non_existing_mail_address})
         assert b"<h3>No users matched the search query</h3>" in response.data
+
+    def test_search_paginated(self):
+        # Three more users with the same verified phone number as the test user
+        for i in range(3):
+            user_dict = self.test_user.to_dict()
+            user_dict["_id"] = ObjectId()
+            user_dict["eduPersonPrincipalName"] = f"hubba-{i}"
+            self.app.central_userdb.save(User.from_dict(user_dict), check_sync=False)
+        phone = self.test_user.phone_numbers.primary
+        assert phone is not None
+        with self.session_cookie(self.client, self.test_user_eppn) as client:
+            response = client.post("/", data={"query": phone.number})
+            assert b"4 users were found" in response.data
+            assert b"Showing 1-2 of 4" in response.data
+            assert response.data.count(b"Central DB") == 2
+            assert b"Next" in response.data
+
+            response = client.post("/", data={"query": phone.number, "page": "2"})
+            assert b"4 users were found" in response.data
+            assert b"Showing 3-4 of 4" in response.data
+            assert response.data.count(b"Central DB") == 2
+            assert b"Next" not in response.data
+
+    def test_search_lookup_timeout(self):
+        existing_mail_address = self.test_user.mail_addresses.to_list()[0]
+        with patch.object(
+            self.app.support_proofing_log_db,
+            "get_entries",
+            side_effect=ExecutionTimeout("operation exceeded time limit"),
+        ):
+            with self.session_cookie(self.client, self.test_user_eppn) as client:
+                response = client.post("/", data={"query": f"{existing_mail_address.email}"})
+        assert b'<h3>1 user was found using query "johnsmith@example.com":</h3>' in response.data
+        assert b"Could not look up: proofing_log" in response.data
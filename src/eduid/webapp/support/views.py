@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Dict, Sequence
+import time
+from typing import Sequence
 
 from flask import Blueprint, render_template, request
 
 from eduid.userdb import User
-from eduid.userdb.exceptions import UserDoesNotExist, UserHasNotCompletedSignup
-from eduid.userdb.support.models import SupportSignupUserFilter, SupportUserFilter
+from eduid.userdb.exceptions import UserHasNotCompletedSignup
 from eduid.webapp.support.app import current_support_app as current_app
-from eduid.webapp.support.helpers import get_credentials_aux_data, require_support_personnel
+from eduid.webapp.support.helpers import get_users_aux_data, require_support_personnel
 
 support_views = Blueprint("support", __name__, url_prefix="", template_folder="templates")
 
@@ -22,16 +22,26 @@ def index(support_user):
             "index.html", support_user=support_user, logout_url=current_app.conf.token_service_url_logout
         )
 
+    page_size = current_app.conf.search_page_size
+    try:
+        page = max(1, int(request.form.get("page", 1)))
+    except ValueError:
+        page = 1
+
+    started = time.monotonic()
     lookup_users: Sequence[User] = []
+    total = 0
     try:
-        lookup_users = current_app.support_user_db.search_users(search_query)
+        lookup_users, total = current_app.support_user_db.search_users(
+            search_query, skip=(page - 1) * page_size, limit=page_size
+        )
     except UserHasNotCompletedSignup:
         # Old bug where incomplete signup users where written to central db
         pass
-    users = list()
 
-    if len(lookup_users) == 0:
+    if total == 0:
         # If no users where found in the central database look in signup database
+        page = 1
         lookup_users = current_app.support_signup_db.get_users_by_mail(search_query, include_unconfirmed=True)
         if len(lookup_users) == 0:
             _user = current_app.support_signup_db.get_user_by_pending_mail_address(search_query)
@@ -47,32 +57,13 @@ def index(support_user):
                 logout_url=current_app.conf.token_service_url_logout,
                 error="No users matched the search query",
             )
+        total = len(lookup_users)
 
-    current_app.logger.info(f"Support personnel {support_user.eppn} searched for {repr(search_query)}")
-    for user in lookup_users:
-        user_data: Dict[str, Any] = dict()
-        user_dict = user.to_dict()
-        # Extend credentials with last used timestamp
-        user_dict["passwords"] = get_credentials_aux_data(user)
-        # Filter out unwanted data from user object
-        user_data["user"] = SupportUserFilter(user_dict)
-        user_data["signup_user"] = None
-        try:
-            signup_user = current_app.support_signup_db.get_user_by_id(user_id=user.user_id)
-            if signup_user:
-                user_data["signup_user"] = SupportSignupUserFilter(signup_user.to_dict())
-        except (UserDoesNotExist, TypeError):
-            # The user is in an old format
-            pass
-
-        # Aux data
-        user_data["authn"] = current_app.support_authn_db.get_authn_info(user_id=user.user_id)
-        user_data["proofing_log"] = current_app.support_proofing_log_db.get_entries(eppn=user.eppn)
-        user_data["letter_proofing"] = current_app.support_letter_proofing_db.get_proofing_state(eppn=user.eppn)
-        user_data["oidc_proofing"] = current_app.support_oidc_proofing_db.get_proofing_state(eppn=user.eppn)
-        user_data["email_proofings"] = current_app.support_email_proofing_db.get_proofing_states(eppn=user.eppn)
-        user_data["phone_proofings"] = current_app.support_phone_proofing_db.get_proofing_states(eppn=user.eppn)
-        users.append(user_data)
+    users = get_users_aux_data(lookup_users)
+    current_app.logger.info(
+        f"Support personnel {support_user.eppn} searched for {repr(search_query)}, "
+        f"found {total} users (page {page}) in {time.monotonic() - started:.3f} seconds"
+    )
 
     return render_template(
         "index.html",
@@ -80,4 +71,7 @@ def index(support_user):
         logout_url=current_app.conf.token_service_url_logout,
         users=users,
         search_query=search_query,
+        total=total,
+        page=page,
+        page_size=page_size,
     )
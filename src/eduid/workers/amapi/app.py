@@ -12,6 +12,7 @@ from eduid.common.fastapi.exceptions import (
     validation_exception_handler,
 )
 from eduid.common.logging import init_logging
+from eduid.common.misc.concurrency import AsyncThreadPool
 from eduid.userdb import AmDB
 from eduid.userdb.logs.db import UserChangeLog
 from eduid.workers.amapi.config import AMApiConfig
@@ -34,6 +35,9 @@ class AMAPI(FastAPI):
         init_logging(config=self.config)
         self.logger.info(f"Starting {name} app")
         self.audit_logger = UserChangeLog(self.config.mongo_uri)
+        self.threadpool = AsyncThreadPool(
+            name="amapi", max_workers=self.config.threadpool_max_workers, limits=self.config.endpoint_concurrency
+        )
 
         self.jwks = load_jwks(self.config)
 
@@ -54,5 +58,7 @@ def init_api(name: str = "am_api", test_config: Optional[Dict] = None) -> AMAPI:
     app.add_exception_handler(HTTPErrorDetail, http_error_detail_handler)
     app.add_exception_handler(Exception, unexpected_error_handler)
 
+    app.router.add_event_handler("shutdown", app.threadpool.shutdown)
+
     app.logger.info("app running...")
     return app
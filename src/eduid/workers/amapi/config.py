@@ -49,3 +49,7 @@ class AMApiConfig(RootConfig, LoggingConfigMixin):
     status_cache_seconds: int = 10
     requested_access_type: Optional[str] = "am_api"
     user_restriction: Dict[ServiceName, List[EndpointRestriction]]
+    # Blocking database calls are made in a thread pool, to not block the event loop
+    threadpool_max_workers: int = 16
+    # Max number of concurrent calls per endpoint, keyed like the user_restriction endpoints, e.g. "put:/users/*/name"
+    endpoint_concurrency: Dict[str, int] = Field(default_factory=dict)
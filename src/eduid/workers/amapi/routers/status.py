@@ -8,6 +8,7 @@ from eduid.common.fastapi.api_router import APIRouter
 from eduid.workers.amapi.context_request import ContextRequest, ContextRequestRoute
 from eduid.workers.amapi.models.status import StatusResponse
 from eduid.workers.amapi.routers.utils.status import check_mongo, get_cached_response, set_cached_response
+from eduid.workers.amapi.utils import run_in_threadpool
 
 __author__ = "masv"
 
@@ -23,7 +24,7 @@ async def healthy(req: ContextRequest, resp: Response) -> Mapping:
             "status": f"STATUS_FAIL_{req.app.name}_",
             "hostname": environ.get("HOSTNAME", "UNKNOWN"),
         }
-        if not check_mongo(req):
+        if not await run_in_threadpool(req, check_mongo, req):
             res["reason"] = "mongodb check failed"
             req.app.logger.warning("mongodb check failed")
         else:
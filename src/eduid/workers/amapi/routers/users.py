@@ -11,6 +11,7 @@ from eduid.common.models.amapi_user import (
     UserUpdateTerminateRequest,
 )
 from eduid.workers.amapi.routers.utils.users import update_user
+from eduid.workers.amapi.utils import run_in_threadpool
 
 __author__ = "masv"
 
@@ -28,34 +29,34 @@ users_router = APIRouter(
 @users_router.put("/{eppn}/name", response_model=UserUpdateResponse)
 async def on_put_name(req: ContextRequest, data: UserUpdateNameRequest, eppn: str):
     req.app.logger.info(f"Update user {eppn} name")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
 
 
 @users_router.put("/{eppn}/email", response_model=UserUpdateResponse)
 async def on_put_email(req: ContextRequest, data: UserUpdateEmailRequest, eppn: str):
     req.app.logger.info(f"Update user {eppn} email")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
 
 
 @users_router.put("/{eppn}/language", response_model=UserUpdateResponse)
 async def on_put_language(req: ContextRequest, data: UserUpdateLanguageRequest, eppn: str):
     req.app.logger.info(f"Update user {eppn} language")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
 
 
 @users_router.put("/{eppn}/phone", response_model=UserUpdateResponse)
 async def on_put_phone(req: ContextRequest, data: UserUpdatePhoneRequest, eppn: str):
     req.app.logger.info(f"Update user {eppn} phone")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
 
 
 @users_router.put("/{eppn}/meta/cleaned", response_model=UserUpdateResponse)
 async def on_put_meta_cleaned(req: ContextRequest, data: UserUpdateMetaCleanedRequest, eppn: str):
     req.app.logger.info(f"Update user {eppn} meta/cleaned")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
 
 
 @users_router.put("/{eppn}/terminate", response_model=UserUpdateResponse)
 async def on_terminate_user(req: ContextRequest, data: UserUpdateTerminateRequest, eppn: str):
     req.app.logger.info(f"Terminate user {eppn} email")
-    return update_user(req=req, eppn=eppn, data=data)
+    return await run_in_threadpool(req, update_user, req=req, eppn=eppn, data=data)
@@ -1,9 +1,13 @@
-from typing import Union
+from copy import deepcopy
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, Type, Union
 
 from deepdiff import DeepDiff
+from pydantic import BaseModel
 
 from eduid.common.fastapi.exceptions import BadRequest
 from eduid.common.misc.timeutil import utc_now
+from eduid.userdb import User
+from eduid.userdb.element import ElementList
 from eduid.userdb.logs.element import UserChangeLogElement
 from eduid.userdb.mail import MailAddressList
 from eduid.userdb.phone import PhoneNumberList
@@ -18,6 +22,84 @@ from eduid.common.models.amapi_user import (
     UserUpdateTerminateRequest,
 )
 
+# A path to a User field, e.g. ("meta", "cleaned") for user.meta.cleaned
+FieldPath = Tuple[str, ...]
+
+# The User fields each kind of update can change. Only these are compared for the change log.
+UPDATED_FIELDS: Dict[Type[BaseModel], List[FieldPath]] = {
+    UserUpdateNameRequest: [("given_name",), ("display_name",), ("surname",)],
+    UserUpdateEmailRequest: [("mail_addresses",)],
+    UserUpdateLanguageRequest: [("language",)],
+    UserUpdatePhoneRequest: [("phone_numbers",)],
+    UserUpdateMetaCleanedRequest: [("meta", "cleaned")],
+    UserUpdateTerminateRequest: [("terminated",)],
+}
+
+
+def _get_field(user: User, path: FieldPath) -> Any:
+    value: Any = user
+    for name in path:
+        value = getattr(value, name)
+    return value
+
+
+def _field_aliases(path: FieldPath) -> List[str]:
+    """The keys of a field in User.to_dict(), e.g. ["meta", "cleaned"] or ["mailAliases"] for mail_addresses"""
+    res = []
+    model: Type[BaseModel] = User
+    for name in path:
+        field = model.__fields__[name]
+        res.append(field.alias)
+        model = field.type_
+    return res
+
+
+def get_fields(user: User, fields: Sequence[FieldPath]) -> Dict[FieldPath, Any]:
+    """Copy the values of some fields of a user, to compare them with the values after an update"""
+    return {path: deepcopy(_get_field(user, path)) for path in fields}
+
+
+def fields_to_dict(values: Mapping[FieldPath, Any]) -> Dict[str, Any]:
+    """
+    Serialise field values the way User.to_dict() does, e.g. {"mailAliases": [...]} for mail_addresses.
+    """
+    res: Dict[str, Any] = {}
+    for path, value in values.items():
+        *parents, key = _field_aliases(path)
+        parent = res
+        for alias in parents:
+            parent = parent.setdefault(alias, {})
+        if isinstance(value, ElementList):
+            value = value.to_list_of_dicts()
+        elif isinstance(value, BaseModel):
+            value = value.dict(by_alias=True, exclude_none=True)
+        # to_dict() leaves out None, empty strings and empty lists
+        if value is None or (isinstance(value, (str, list)) and not value):
+            continue
+        parent[key] = value
+    return res
+
+
+def diff_user(before: Mapping[FieldPath, Any], after: User) -> str:
+    """
+    Get the change log diff for an update of a user.
+
+    Only the fields that the update could change are compared, and only the ones that did change (by pydantic
+    equality) are diffed. The result is the same as a DeepDiff of the whole user documents (ignoring the order
+    of lists) would have been.
+
+    :param before: The values of the updated fields before the update (from get_fields)
+    :param after: The updated user
+    """
+    old_values: Dict[FieldPath, Any] = {}
+    new_values: Dict[FieldPath, Any] = {}
+    for path, old_value in before.items():
+        new_value = _get_field(after, path)
+        if new_value != old_value:
+            old_values[path] = old_value
+            new_values[path] = new_value
+    return DeepDiff(fields_to_dict(old_values), fields_to_dict(new_values), ignore_order=True).to_json()
+
 
 def update_user(
     req: ContextRequest,
@@ -36,7 +118,7 @@ def update_user(
     if user_obj is None:
         raise BadRequest(detail=f"Can't find {eppn} in database")
 
-    old_user_dict = user_obj.to_dict()
+    fields_before = get_fields(user_obj, UPDATED_FIELDS[type(data)])
 
     if isinstance(data, UserUpdateNameRequest):
         user_obj.surname = data.surname
@@ -69,12 +151,7 @@ def update_user(
     user_save_result = req.app.db.save(user=user_obj)
     if user_save_result.success:
         assert user_save_result.user is not None
-        diff = DeepDiff(
-            old_user_dict,
-            user_save_result.user.to_dict(),
-            ignore_order=True,
-            exclude_paths=["root['meta']['modified_ts']", "root['modified_ts']"],  # we do not care about these entries.
-        ).to_json()
+        diff = diff_user(before=fields_before, after=user_save_result.user)
         audit_msg = UserChangeLogElement(
             created_by="amapi",
             eppn=eppn,
@@ -1,10 +1,14 @@
+import datetime
 from eduid.common.models.amapi_user import Reason, Source
 from eduid.common.testing_base import CommonTestCase
 from eduid.workers.amapi.config import EndpointRestriction
+from eduid.workers.amapi.utils import AuthnBearerToken
 from typing import Dict, Any
 import pkg_resources
 from eduid.workers.amapi.app import init_api
 from fastapi.testclient import TestClient
+from httpx import Headers
+from jwcrypto import jwt
 import json
 
 
@@ -43,3 +47,18 @@ class TestAMBase(CommonTestCase):
     @staticmethod
     def as_json(data: dict) -> str:
         return json.dumps(data)
+
+    def _auth_header(self, service_name: str) -> Headers:
+        expire = datetime.timedelta(seconds=3600)
+        signing_key = self.api.jwks.get_key(self.test_singing_key)
+        claims = AuthnBearerToken(
+            iss="test-issuer",
+            sub="test-subject",
+            aud="test-Audience",
+            exp=expire,
+            service_name=service_name,
+        )
+        token = jwt.JWT(header={"alg": "ES256"}, claims=claims.to_rfc7519())
+        token.make_signed_token(signing_key)
+        bearer_token = f"Bearer {token.serialize()}"
+        return Headers({"Authorization": bearer_token})
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+from deepdiff import DeepDiff
+
+from eduid.common.models.amapi_user import (
+    UserUpdateEmailRequest,
+    UserUpdateLanguageRequest,
+    UserUpdateMetaCleanedRequest,
+    UserUpdateNameRequest,
+    UserUpdatePhoneRequest,
+    UserUpdateTerminateRequest,
+)
+from eduid.userdb import MailAddress, PhoneNumber, User
+from eduid.userdb.fixtures.users import new_user_example
+from eduid.userdb.mail import MailAddressList
+from eduid.userdb.meta import CleanerType
+from eduid.userdb.phone import PhoneNumberList
+from eduid.workers.amapi.routers.utils.users import UPDATED_FIELDS, diff_user, get_fields
+
+__author__ = "lundberg"
+
+
+def _full_diff(before: Dict[str, Any], after: User) -> str:
+    """How the change log diff was made before: a DeepDiff of the whole user documents"""
+    return DeepDiff(
+        before,
+        after.to_dict(),
+        ignore_order=True,
+        exclude_paths=["root['meta']['modified_ts']", "root['modified_ts']"],
+    ).to_json()
+
+
+class TestChangeLogDiff(unittest.TestCase):
+    def setUp(self) -> None:
+        self.user = User.from_dict(new_user_example.to_dict())
+        self.ts = datetime(2013, 9, 2, 10, 23, 25, tzinfo=timezone.utc)
+
+    def _check(self, request_type: type, update: Callable[[User], None]) -> str:
+        before_doc = self.user.to_dict()
+        before = get_fields(self.user, UPDATED_FIELDS[request_type])
+        update(self.user)
+        diff = diff_user(before=before, after=self.user)
+        self.assertEqual(diff, _full_diff(before_doc, self.user))
+        return diff
+
+    def test_name(self):
+        def update(user: User) -> None:
+            user.given_name = None
+            user.display_name = "test_display_name"
+
+        diff = self._check(UserUpdateNameRequest, update)
+        self.assertIn("root['givenName']", diff)
+        self.assertIn("root['displayName']", diff)
+        self.assertNotIn("root['surname']", diff)
+
+    def test_language(self):
+        def update(user: User) -> None:
+            user.language = "sv"
+
+        self._check(UserUpdateLanguageRequest, update)
+
+    def test_unchanged(self):
+        def update(user: User) -> None:
+            user.language = user.language
+
+        self.assertEqual(self._check(UserUpdateLanguageRequest, update), "{}")
+
+    def test_email(self):
+        def update(user: User) -> None:
+            mail = MailAddress(
+                email="test@example.com",
+                created_by="signup",
+                created_ts=self.ts,
+                is_verified=True,
+                verified_by="signup",
+                verified_ts=self.ts,
+                is_primary=True,
+            )
+            user.mail_addresses = MailAddressList(elements=[mail])
+
+        self._check(UserUpdateEmailRequest, update)
+
+    def test_phone(self):
+        def update(user: User) -> None:
+            phone = PhoneNumber(
+                number="+46700011336",
+                created_by="signup",
+                created_ts=self.ts,
+                is_verified=True,
+                verified_by="signup",
+                verified_ts=self.ts,
+                is_primary=False,
+            )
+            user.phone_numbers = PhoneNumberList(elements=user.phone_numbers.to_list() + [phone])
+
+        self._check(UserUpdatePhoneRequest, update)
+
+    def test_meta_cleaned(self):
+        def update(user: User) -> None:
+            assert user.meta.cleaned is not None
+            user.meta.cleaned.update({CleanerType.SKV: self.ts})
+
+        diff = self._check(UserUpdateMetaCleanedRequest, update)
+        self.assertIn("root['meta']['cleaned']['skatteverket']", diff)
+
+    def test_meta_cleaned_added(self):
+        self.user.meta.cleaned = None
+
+        def update(user: User) -> None:
+            user.meta.cleaned = {CleanerType.TELE: self.ts}
+
+        self._check(UserUpdateMetaCleanedRequest, update)
+
+    def test_terminate(self):
+        def update(user: User) -> None:
+            user.terminated = self.ts
+
+        self.assertEqual(
+            self._check(UserUpdateTerminateRequest, update), '{"dictionary_item_added": ["root[\'terminated\']"]}'
+        )
+
+    def test_benchmark(self):
+        updates = 10000
+        fields = UPDATED_FIELDS[UserUpdateNameRequest] + UPDATED_FIELDS[UserUpdateLanguageRequest]
+
+        def _update(i: int) -> None:
+            self.user.display_name = f"Display Name {i}"
+            self.user.language = ["sv", "en"][i % 2]
+
+        start = time.monotonic()
+        for i in range(updates):
+            before = get_fields(self.user, fields)
+            _update(i)
+            diff_user(before=before, after=self.user)
+        targeted = (time.monotonic() - start) / updates
+
+        # the whole documents are a lot slower to diff, don't do 10k of those
+        full_updates = 200
+        start = time.monotonic()
+        for i in range(full_updates):
+            before_doc = self.user.to_dict()
+            _update(i)
+            _full_diff(before_doc, self.user)
+        full = (time.monotonic() - start) / full_updates
+
+        self.assertLess(targeted * 5, full)
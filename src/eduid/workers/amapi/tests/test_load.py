@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from unittest.mock import patch
+
+from bson import ObjectId
+from fastapi import status
+from httpx import AsyncClient
+
+from eduid.userdb import User
+from eduid.userdb.fixtures.users import new_user_example
+from eduid.workers.amapi.routers.utils.users import update_user
+from eduid.workers.amapi.testing import TestAMBase
+
+__author__ = "lundberg"
+
+logger = logging.getLogger(__name__)
+
+
+def _make_users(count: int) -> List[User]:
+    users = []
+    for i in range(count):
+        data = new_user_example.to_dict()
+        data["_id"] = ObjectId()
+        data["eduPersonPrincipalName"] = f"load-{i:04d}"
+        users.append(User.from_dict(data))
+    return users
+
+
+class TestConcurrentUpdates(TestAMBase):
+    concurrency = 32
+
+    def setUp(self, *args, **kwargs):
+        self.users = _make_users(self.concurrency)
+        super().setUp(am_users=self.users)
+
+    def _get_config(self) -> Dict[str, Any]:
+        config = super()._get_config()
+        config["endpoint_concurrency"] = {"put:/users/*/name": 8}
+        return config
+
+    async def _update_names(self) -> Tuple[List[float], float]:
+        """Update the name of every user concurrently, return the latencies and the longest event loop stall"""
+        headers = self._auth_header("test-service_name")
+        stall = 0.0
+        done = False
+
+        async def _watch_event_loop() -> None:
+            nonlocal stall
+            while not done:
+                start = time.monotonic()
+                await asyncio.sleep(0.005)
+                stall = max(stall, time.monotonic() - start - 0.005)
+
+        async def _update(client: AsyncClient, user: User) -> float:
+            req = {"reason": self.reason, "source": self.source, "display_name": f"Load {user.eppn}"}
+            start = time.monotonic()
+            response = await client.put(f"/users/{user.eppn}/name", json=req, headers=headers)
+            assert response.status_code == status.HTTP_200_OK, response.text
+            return time.monotonic() - start
+
+        async with AsyncClient(app=self.api, base_url="http://testserver") as client:
+            watcher = asyncio.create_task(_watch_event_loop())
+            latencies = await asyncio.gather(*[_update(client, user) for user in self.users])
+            done = True
+            await watcher
+        return sorted(latencies), stall
+
+    def test_concurrent_updates(self):
+        running = 0
+        max_running = 0
+        lock = threading.Lock()
+
+        def _counting_update_user(*args, **kwargs):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            try:
+                return update_user(*args, **kwargs)
+            finally:
+                with lock:
+                    running -= 1
+
+        with patch("eduid.workers.amapi.routers.users.update_user", _counting_update_user):
+            latencies, stall = asyncio.run(self._update_names())
+
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        logger.info(f"{self.concurrency} concurrent updates: p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+        logger.info(f"Longest event loop stall: {stall * 1000:.1f} ms")
+
+        for user in self.users:
+            user_after = self.amdb.get_user_by_eppn(user.eppn)
+            assert user_after.display_name == f"Load {user.eppn}"
+        # the endpoint concurrency limit is respected
+        assert 1 < max_running <= 8
+        # the database calls don't block the event loop
+        assert stall < 0.25
+        assert p99 < 5
+        self.assertEqual(len(self.api.audit_logger.get_by_eppn(self.users[0].eppn)), 1)
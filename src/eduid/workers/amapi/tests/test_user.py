@@ -2,19 +2,16 @@
 
 __author__ = "masv"
 
-import datetime
 from typing import Any, Dict, Optional
 
 from bson import ObjectId
 from fastapi import status
 from httpx import Headers
-from jwcrypto import jwt
 from pydantic import BaseModel
 from requests import Response
 
 from eduid.common.clients.gnap_client.base import GNAPBearerTokenMixin
 from eduid.userdb.fixtures.users import new_user_example
-from eduid.workers.amapi.utils import AuthnBearerToken
 from eduid.workers.amapi.testing import TestAMBase
 from eduid.userdb.meta import CleanerType
 
@@ -44,21 +41,6 @@ class TestUsers(TestAMBase, GNAPBearerTokenMixin):
         )
         return response
 
-    def _auth_header(self, service_name: str) -> Headers:
-        expire = datetime.timedelta(seconds=3600)
-        signing_key = self.api.jwks.get_key(self.test_singing_key)
-        claims = AuthnBearerToken(
-            iss="test-issuer",
-            sub="test-subject",
-            aud="test-Audience",
-            exp=expire,
-            service_name=service_name,
-        )
-        token = jwt.JWT(header={"alg": "ES256"}, claims=claims.to_rfc7519())
-        token.make_signed_token(signing_key)
-        bearer_token = f"Bearer {token.serialize()}"
-        return Headers({"Authorization": bearer_token})
-
     def test_update_name_allowed(self):
         req = {
             "reason": self.reason,
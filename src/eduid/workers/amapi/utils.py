@@ -1,13 +1,18 @@
+import fnmatch
 import logging
+from typing import Any, Callable, Optional, TypeVar
 
 from jwcrypto import jwk
 
 from eduid.common.config.exceptions import BadConfiguration
 from eduid.common.models.jose_models import RegisteredClaims
 from eduid.workers.amapi.config import AMApiConfig
+from eduid.workers.amapi.context_request import ContextRequest
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class AuthnBearerToken(RegisteredClaims):
     """
@@ -24,3 +29,21 @@ def load_jwks(config: AMApiConfig) -> jwk.JWKSet:
         jwks = jwk.JWKSet.from_json(f.read())
         logger.info(f"jwks loaded from {config.keystore_path}")
     return jwks
+
+
+def get_endpoint_group(req: ContextRequest) -> Optional[str]:
+    """Find the endpoint_concurrency limit (e.g. put:/users/*/name) matching the request, if any"""
+    path = req.url.path.lstrip(req.app.config.application_root)
+    method_path = f"{req.method.lower()}:{path}"
+    for endpoint in req.app.config.endpoint_concurrency:
+        if fnmatch.fnmatch(method_path, endpoint):
+            return endpoint
+    return None
+
+
+async def run_in_threadpool(req: ContextRequest, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Make a blocking call (e.g. to the database) in the app thread pool, to not block the event loop. The number of
+    concurrent calls is limited per endpoint according to config.endpoint_concurrency.
+    """
+    return await req.app.threadpool.run(func, *args, group=get_endpoint_group(req), **kwargs)
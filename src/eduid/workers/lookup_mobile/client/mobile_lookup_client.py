@@ -1,15 +1,33 @@
+import copy
 from typing import List, Optional
 
+from suds.cache import ObjectCache
 from suds.client import Client
+from suds.sudsobject import Object
 
 from eduid.common.config.base import EduidEnvironment
 from eduid.common.config.workers import MobConfig
 from eduid.common.decorators import deprecated
+from eduid.workers.lookup_mobile.client.transport import KeepAliveTransport
 from eduid.workers.lookup_mobile.decorators import TransactionAudit
 from eduid.workers.lookup_mobile.development.development_search_result import _get_devel_search_result
 from eduid.workers.lookup_mobile.utilities import format_mobile_number, format_NIN
 
 
+def _clone_suds_object(obj: Object) -> Object:
+    """
+    Copy a suds object, and the suds objects it contains. The (read only) type metadata is shared with the
+    original, which makes this a lot faster than both copy.deepcopy and creating the object using the client factory.
+    """
+    res = copy.copy(obj)
+    res.__keylist__ = list(obj.__keylist__)
+    for key in obj.__keylist__:
+        value = getattr(obj, key)
+        if isinstance(value, Object):
+            setattr(res, key, _clone_suds_object(value))
+    return res
+
+
 class MobileLookupClient(object):
     def __init__(self, logger, config: MobConfig) -> None:
         self.conf = config
@@ -18,19 +36,35 @@ class MobileLookupClient(object):
         self.transaction_audit = self.conf.transaction_audit and self.conf.mongo_uri
 
         self._client: Optional[Client] = None
+        self._find_person_template: Optional[Object] = None
         self.logger = logger
 
     @property
     def client(self) -> Client:
         if not self._client:
-            self._client = Client(self.conf.teleadress_client_url, port=self.conf.teleadress_client_port)
+            # The parsed WSDL is cached on disk, and the connection to the service is kept alive between searches
+            self._client = Client(
+                self.conf.teleadress_client_url,
+                port=self.conf.teleadress_client_port,
+                cache=ObjectCache(
+                    location=self.conf.teleadress_wsdl_cache_dir, days=self.conf.teleadress_wsdl_cache_days
+                ),
+                transport=KeepAliveTransport(),
+                timeout=self.conf.teleadress_client_timeout,
+            )
         return self._client
 
-    def _get_find_person(self):
-        find_person = self.client.factory.create("ns7:FindPersonClass")
-        find_person.QueryParams = self.client.factory.create("ns7:QueryParamsClass")
-        find_person.QueryColumns = self.client.factory.create("ns7:QueryColumnsClass")
-        return find_person
+    def _get_find_person(self) -> Object:
+        # Creating the query objects from the WSDL types is slow, so they are created once and copied for every search
+        if self._find_person_template is None:
+            find_person = self.client.factory.create("ns7:FindPersonClass")
+            find_person.QueryParams = self.client.factory.create("ns7:QueryParamsClass")
+            find_person.QueryColumns = self.client.factory.create("ns7:QueryColumnsClass")
+            # Set the eduid user id and password
+            find_person._Password = self.conf.teleadress_client_password
+            find_person._UserId = self.conf.teleadress_client_user
+            self._find_person_template = find_person
+        return _clone_suds_object(self._find_person_template)
 
     @TransactionAudit()
     @deprecated("This task seems unused")
@@ -83,10 +117,6 @@ class MobileLookupClient(object):
     def _search_by_SSNo(self, national_identity_number: str) -> List[str]:
         person_search = self._get_find_person()
 
-        # Set the eduid user id and password
-        person_search._Password = self.conf.teleadress_client_password
-        person_search._UserId = self.conf.teleadress_client_user
-
         # Set what parameter to search with
         person_search.QueryParams.FindSSNo = national_identity_number
 
@@ -106,10 +136,6 @@ class MobileLookupClient(object):
     def _search_by_mobile(self, mobile_number: str) -> Optional[str]:
         person_search = self._get_find_person()
 
-        # Set the eduid user id and password
-        person_search._Password = self.conf.teleadress_client_password
-        person_search._UserId = self.conf.teleadress_client_user
-
         # Set what parameter to search with
         person_search.QueryParams.FindTelephone = mobile_number
 
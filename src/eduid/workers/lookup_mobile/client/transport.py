@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import logging
+from http import HTTPStatus
+from io import BytesIO
+from typing import Optional
+
+import requests
+from suds.transport import Reply, Request, Transport, TransportError
+
+__author__ = "lundberg"
+
+logger = logging.getLogger(__name__)
+
+
+class KeepAliveTransport(Transport):
+    """
+    A suds transport using a requests Session, so that the HTTP connection to the SOAP service is kept alive and
+    reused between requests. The default suds transport (urllib) opens a new connection for every request.
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        super().__init__()
+        self.session = session or requests.Session()
+
+    def __repr__(self) -> str:
+        return f"<eduID {self.__class__.__name__}>"
+
+    def _timeout(self, request: Request) -> Optional[float]:
+        # Like the default suds transport, use the client timeout option unless the request has its own timeout
+        return request.timeout or self.options.timeout
+
+    def open(self, request: Request) -> BytesIO:
+        logger.debug(f"Fetching {request.url}")
+        try:
+            response = self.session.get(request.url, headers=request.headers, timeout=self._timeout(request))
+            response.raise_for_status()
+        except requests.HTTPError as e:
+            raise TransportError(str(e), e.response.status_code, BytesIO(e.response.content))
+        except requests.RequestException as e:
+            raise TransportError(str(e), None)
+        return BytesIO(response.content)
+
+    def send(self, request: Request) -> Optional[Reply]:
+        try:
+            response = self.session.post(
+                request.url, data=request.message, headers=request.headers, timeout=self._timeout(request)
+            )
+        except requests.RequestException as e:
+            raise TransportError(str(e), None)
+        if response.status_code in (HTTPStatus.ACCEPTED, HTTPStatus.NO_CONTENT):
+            return None
+        if response.status_code >= HTTPStatus.BAD_REQUEST:
+            # suds parses SOAP faults from the error response
+            raise TransportError(response.reason, response.status_code, BytesIO(response.content))
+        return Reply(response.status_code, response.headers, response.content)
+
+    def close(self) -> None:
+        self.session.close()
@@ -6,20 +6,42 @@ __author__ = "lundberg"
 #  logging module at a later stage.
 #
 
+import atexit
+import logging
+import threading
 from datetime import datetime
 from inspect import isclass
+from typing import Any, ClassVar, Dict, List, Optional
+from weakref import WeakSet
 
 from eduid.userdb.db import MongoDB
 
+logger = logging.getLogger(__name__)
+
 
 class TransactionAudit(object):
+    """
+    Log calls to the decorated function in the transaction audit collection.
+
+    If the config of the decorated methods class has transaction_audit_batch_size > 1, the log entries are
+    buffered and written in batches, when the batch is full or after transaction_audit_flush_interval.
+    Buffered entries are also written at exit, and by flush_all() which the worker calls when a pool process
+    shuts down (atexit handlers are not run in Celery prefork pool processes).
+    """
+
     enabled = True
     db_uri = None
+    _batching: ClassVar["WeakSet[TransactionAudit]"] = WeakSet()
 
     def __init__(self, db_name="eduid_lookup_mobile", collection_name="transaction_audit"):
         self.db_name = db_name
         self.collection_name = collection_name
         self.collection = None
+        self.batch_size = 1
+        self.flush_interval = 5.0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
 
     def __call__(self, f):
 
@@ -38,6 +60,14 @@ class TransactionAudit(object):
                     # Do not initialize the db connection before we know the decorator is actually enabled
                     db = MongoDB(db_uri=self.db_uri, db_name=self.db_name)
                     self.collection = db.get_collection(self.collection_name)
+                    conf = args[0].conf
+                    self.batch_size = getattr(conf, "transaction_audit_batch_size", 1)
+                    flush_interval = getattr(conf, "transaction_audit_flush_interval", None)
+                    if flush_interval is not None:
+                        self.flush_interval = flush_interval.total_seconds()
+                    if self.batch_size > 1:
+                        TransactionAudit._batching.add(self)
+                        atexit.register(self.flush)
                 if not isclass(ret):  # we can't save class objects in mongodb
                     date = datetime.utcnow()
                     doc = {
@@ -45,11 +75,60 @@ class TransactionAudit(object):
                         "data": self._filter(f.__name__, ret, *args, **kwargs),
                         "created_at": date,
                     }
-                    self.collection.insert_one(doc)
+                    self._write(doc)
             return ret
 
         return audit
 
+    def _write(self, doc: Dict[str, Any]) -> None:
+        with self._lock:
+            self._buffer.append(doc)
+            if len(self._buffer) < self.batch_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self._flush_in_background)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            docs = self._take_buffer()
+        self._insert(docs)
+
+    def _take_buffer(self) -> List[Dict[str, Any]]:
+        """Must be called with self._lock held"""
+        docs, self._buffer = self._buffer, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return docs
+
+    def _insert(self, docs: List[Dict[str, Any]]) -> None:
+        if not docs or self.collection is None:
+            return
+        if len(docs) == 1:
+            self.collection.insert_one(docs[0])
+        else:
+            self.collection.insert_many(docs, ordered=False)
+
+    def flush(self) -> None:
+        """Write the buffered log entries"""
+        with self._lock:
+            docs = self._take_buffer()
+        self._insert(docs)
+
+    @classmethod
+    def flush_all(cls) -> None:
+        """Write the buffered log entries of all batching instances"""
+        for audit in list(cls._batching):
+            try:
+                audit.flush()
+            except Exception:
+                logger.exception("Failed writing transaction audit log entries")
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed writing transaction audit log entries")
+
     @classmethod
     def enable(cls):
         cls.enabled = True
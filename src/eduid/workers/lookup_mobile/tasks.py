@@ -1,11 +1,13 @@
 from typing import List, Optional
 
 from celery import Task
+from celery.signals import worker_process_shutdown
 from celery.utils.log import get_task_logger
 
 from eduid.common.decorators import deprecated
 from eduid.workers.lookup_mobile.client.mobile_lookup_client import MobileLookupClient
 from eduid.workers.lookup_mobile.common import MobCelerySingleton
+from eduid.workers.lookup_mobile.decorators import TransactionAudit
 
 logger = get_task_logger(__name__)
 
@@ -27,6 +29,12 @@ class MobWorker(Task):
         return self._lookup_client
 
 
+@worker_process_shutdown.connect
+def flush_transaction_audit(**kwargs) -> None:
+    # Prefork pool processes exit using os._exit, without running atexit handlers
+    TransactionAudit.flush_all()
+
+
 @app.task(bind=True, base=MobWorker)
 @deprecated("This task seems unused")
 def find_mobiles_by_NIN(self: MobWorker, national_identity_number: str, number_region=None) -> List[str]:
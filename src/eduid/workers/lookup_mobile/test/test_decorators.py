@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 __author__ = "lundberg"
 
-from eduid.common.config.workers import MsgConfig
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from eduid.common.config.workers import MobConfig, MsgConfig
 from eduid.workers.lookup_mobile.decorators import TransactionAudit
 from eduid.workers.lookup_mobile.testing import LookupMobileMongoTestCase
 
@@ -88,3 +92,68 @@ class TestTransactionAudit(LookupMobileMongoTestCase):
         no_name2(self)
         result = c.find()
         self.assertEqual(c.count_documents({}), 1)
+
+    def test_batched_transaction_audit(self):
+        c = self.db["transaction_audit"]
+        c.delete_many({})  # Clear database
+        self.conf = MobConfig(
+            app_name="testing",
+            mongo_uri=self.tmp_db.uri,
+            transaction_audit_batch_size=10,
+            transaction_audit_flush_interval=timedelta(seconds=0.2),
+        )
+        audit = TransactionAudit()
+
+        @audit
+        def find_NIN_by_mobile(self, mobile_number):
+            return "200202025678"
+
+        # the collection is created on the first call
+        find_NIN_by_mobile(self, "+46701740699")
+        coll = audit.collection
+        with patch.object(coll, "insert_one", wraps=coll.insert_one) as insert_one, patch.object(
+            coll, "insert_many", wraps=coll.insert_many
+        ) as insert_many:
+            for _ in range(24):
+                find_NIN_by_mobile(self, "+46701740699")
+            # two full batches written, five entries buffered
+            self.assertEqual(c.count_documents({}), 20)
+            self.assertEqual(insert_many.call_count, 2)
+            self.assertEqual(insert_one.call_count, 0)
+
+            # the rest is written after the flush interval
+            deadline = time.monotonic() + 5
+            while c.count_documents({}) < 25 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(c.count_documents({}), 25)
+            self.assertEqual(insert_many.call_count, 3)
+
+        find_NIN_by_mobile(self, "+46701740699")
+        audit.flush()
+        self.assertEqual(c.count_documents({}), 26)
+        self.assertEqual(c.count_documents({"data.mobile_number": "+46701740699"}), 26)
+
+    def test_flush_all(self):
+        """The worker flushes all buffered log entries when a pool process shuts down"""
+        c = self.db["transaction_audit"]
+        c.delete_many({})  # Clear database
+        self.conf = MobConfig(
+            app_name="testing",
+            mongo_uri=self.tmp_db.uri,
+            transaction_audit_batch_size=10,
+            transaction_audit_flush_interval=timedelta(minutes=5),
+        )
+
+        @TransactionAudit()
+        def find_NIN_by_mobile(self, mobile_number):
+            return "200202025678"
+
+        @TransactionAudit()
+        def find_mobiles_by_NIN(self, national_identity_number, number_region=None):
+            return ["list", "of", "mobile_numbers"]
+
+        find_NIN_by_mobile(self, "+46701740699")
+        find_mobiles_by_NIN(self, "200202025678")
+        self.assertEqual(c.count_documents({}), 0)
+        TransactionAudit.flush_all()
+        self.assertEqual(c.count_documents({}), 2)
@@ -0,0 +1,273 @@
+import logging
+import re
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from unittest.mock import patch
+
+import requests
+from suds.cache import NoCache
+from suds.client import Client
+
+from eduid.common.config.workers import MobConfig
+from eduid.workers.lookup_mobile.client.mobile_lookup_client import MobileLookupClient, _clone_suds_object
+from eduid.workers.lookup_mobile.development import nin_mobile_db
+
+logger = logging.getLogger(__name__)
+
+WSDL = """<?xml version="1.0" encoding="utf-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:ns7="urn:eduid:test:nnapi"
+    targetNamespace="urn:eduid:test:nnapi">
+  <types>
+    <xsd:schema targetNamespace="urn:eduid:test:nnapi" elementFormDefault="qualified">
+      <xsd:complexType name="QueryParamsClass">
+        <xsd:sequence>
+          <xsd:element name="FindTelephone" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="FindSSNo" type="xsd:string" minOccurs="0"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="QueryColumnsClass">
+        <xsd:attribute name="SSNo" type="xsd:string"/>
+        <xsd:attribute name="Mobiles" type="xsd:string"/>
+      </xsd:complexType>
+      <xsd:complexType name="FindPersonClass">
+        <xsd:sequence>
+          <xsd:element name="QueryParams" type="ns7:QueryParamsClass"/>
+          <xsd:element name="QueryColumns" type="ns7:QueryColumnsClass"/>
+        </xsd:sequence>
+        <xsd:attribute name="UserId" type="xsd:string"/>
+        <xsd:attribute name="Password" type="xsd:string"/>
+      </xsd:complexType>
+      <xsd:complexType name="RecordClass">
+        <xsd:sequence>
+          <xsd:element name="SSNo" type="xsd:string" minOccurs="0"/>
+          <xsd:element name="Mobiles" type="xsd:string" minOccurs="0"/>
+        </xsd:sequence>
+      </xsd:complexType>
+      <xsd:complexType name="RecordListClass">
+        <xsd:sequence>
+          <xsd:element name="record" type="ns7:RecordClass" minOccurs="0" maxOccurs="unbounded"/>
+        </xsd:sequence>
+        <xsd:attribute name="num_records" type="xsd:int"/>
+      </xsd:complexType>
+      <xsd:complexType name="FindResultClass">
+        <xsd:sequence>
+          <xsd:element name="record_list" type="ns7:RecordListClass" maxOccurs="unbounded"/>
+        </xsd:sequence>
+        <xsd:attribute name="error_code" type="xsd:int"/>
+        <xsd:attribute name="error_text" type="xsd:string"/>
+      </xsd:complexType>
+    </xsd:schema>
+  </types>
+  <message name="FindRequest"><part name="param" type="ns7:FindPersonClass"/></message>
+  <message name="FindResponse"><part name="result" type="ns7:FindResultClass"/></message>
+  <portType name="NNAPIWebServiceSoapType">
+    <operation name="Find"><input message="ns7:FindRequest"/><output message="ns7:FindResponse"/></operation>
+  </portType>
+  <binding name="NNAPIWebServiceSoap" type="ns7:NNAPIWebServiceSoapType">
+    <soap:binding style="rpc" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="Find">
+      <soap:operation soapAction="urn:eduid:test:nnapi#Find"/>
+      <input><soap:body use="literal" namespace="urn:eduid:test:nnapi"/></input>
+      <output><soap:body use="literal" namespace="urn:eduid:test:nnapi"/></output>
+    </operation>
+  </binding>
+  <service name="NNAPIWebService">
+    <port name="NNAPIWebServiceSoap" binding="ns7:NNAPIWebServiceSoap">
+      <soap:address location="{location}"/>
+    </port>
+  </service>
+</definitions>
+"""
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ns7="urn:eduid:test:nnapi">
+  <soap:Body>
+    <ns7:FindResponse>
+      <result error_code="0" error_text="">
+        <ns7:record_list num_records="{num_records}">{records}</ns7:record_list>
+      </result>
+    </ns7:FindResponse>
+  </soap:Body>
+</soap:Envelope>
+"""
+
+RECORD = "<ns7:record><ns7:SSNo>{nin}</ns7:SSNo><ns7:Mobiles>{mobile}</ns7:Mobiles></ns7:record>"
+
+
+class StubSOAPService(ThreadingHTTPServer):
+    """
+    A local SOAP service answering Find requests from the development database, counting WSDL fetches,
+    SOAP requests and TCP connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubSOAPHandler)
+        self.wsdl_fetches = 0
+        self.soap_requests = 0
+        self.connections = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class StubSOAPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and the body are written separately, don't wait for the ACK of the headers on kept alive connections
+    disable_nagle_algorithm = True
+    server: StubSOAPService
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format % args)
+
+    def _respond(self, body: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self.server.wsdl_fetches += 1
+        self._respond(WSDL.format(location=f"{self.server.url}/soap"))
+
+    def do_POST(self) -> None:
+        self.server.soap_requests += 1
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        records: List[str] = []
+        mobile = re.search(r"FindTelephone>([^<]+)<", body)
+        nin = re.search(r"FindSSNo>([^<]+)<", body)
+        if mobile:
+            found_nin = nin_mobile_db.get_nin(mobile.group(1))
+            if found_nin:
+                records.append(RECORD.format(nin=found_nin, mobile=mobile.group(1)))
+        elif nin:
+            records = [RECORD.format(nin=nin.group(1), mobile=x) for x in nin_mobile_db.get_mobile(nin.group(1))]
+        self._respond(RESPONSE.format(num_records=len(records), records="".join(records)))
+
+
+class TestMobileLookupSOAPClient(unittest.TestCase):
+    lookups = 50
+
+    def setUp(self) -> None:
+        self.service = StubSOAPService()
+        self.addCleanup(self.service.stop)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.conf = MobConfig(
+            app_name="testing",
+            teleadress_client_url=f"{self.service.url}/nnapiwebservice.wsdl",
+            teleadress_client_user="user",
+            teleadress_client_password="secret",
+            teleadress_wsdl_cache_dir=self.cache_dir.name,
+        )
+
+    def _lookup_client(self) -> MobileLookupClient:
+        return MobileLookupClient(logger, self.conf)
+
+    def test_lookups(self):
+        client = self._lookup_client()
+        assert client.find_NIN_by_mobile("+46701740610") == "200202027140"
+        assert client.find_NIN_by_mobile("+46701740608") == "197512126371"
+        assert client.find_NIN_by_mobile("+46701740699") is None
+        assert client.find_mobiles_by_NIN("197512126371") == ["+46701740608", "+46701740609"]
+
+    def test_find_person_template(self):
+        client = self._lookup_client()
+        first = client._get_find_person()
+        first.QueryParams.FindTelephone = "+46701740610"
+        first.QueryColumns._SSNo = "1"
+        second = client._get_find_person()
+        assert second._UserId == "user"
+        assert second._Password == "secret"
+        assert second.QueryParams.FindTelephone is None
+        assert second.QueryColumns._SSNo == ""
+
+    def test_timeout(self):
+        """The configured timeout is used both when fetching the WSDL and for the lookups"""
+        conf = self.conf.copy(update={"teleadress_client_timeout": 7})
+        client = MobileLookupClient(logger, conf)
+        request = requests.Session.request
+        with patch.object(requests.Session, "request", autospec=True, side_effect=request) as mock_request:
+            assert client.find_NIN_by_mobile("+46701740610") == "200202027140"
+        assert [x.args[1] for x in mock_request.call_args_list] == ["GET", "POST"]
+        assert [x.kwargs["timeout"] for x in mock_request.call_args_list] == [7, 7]
+
+    def test_wsdl_cache(self):
+        """The WSDL is fetched and parsed once, and then loaded from the cache by new clients (e.g. new workers)"""
+        start = time.perf_counter()
+        assert self._lookup_client().client is not None
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert self._lookup_client().client is not None
+        cached = time.perf_counter() - start
+
+        print(f"Creating the SOAP client: fetching the WSDL {uncached * 1000:.1f} ms, cached {cached * 1000:.1f} ms")
+        assert self.service.wsdl_fetches == 1
+
+    def test_connections_per_lookup(self):
+        # before: the default suds transport and a factory created query for every lookup
+        suds_client = Client(self.conf.teleadress_client_url, port=self.conf.teleadress_client_port, cache=NoCache())
+        connections = self.service.connections
+        start = time.perf_counter()
+        for _ in range(self.lookups):
+            find_person = suds_client.factory.create("ns7:FindPersonClass")
+            find_person.QueryParams = suds_client.factory.create("ns7:QueryParamsClass")
+            find_person.QueryColumns = suds_client.factory.create("ns7:QueryColumnsClass")
+            find_person.QueryParams.FindTelephone = "+46701740610"
+            find_person.QueryColumns._SSNo = "1"
+            assert suds_client.service.Find(find_person).record_list[0].record[0].SSNo == "200202027140"
+        before_time = time.perf_counter() - start
+        before_connections = self.service.connections - connections
+
+        # after, the WSDL is fetched using the same connection as the lookups
+        connections = self.service.connections
+        client = self._lookup_client()
+        start = time.perf_counter()
+        for _ in range(self.lookups):
+            assert client.find_NIN_by_mobile("+46701740610") == "200202027140"
+        after_time = time.perf_counter() - start
+        after_connections = self.service.connections - connections
+
+        print(
+            f"{self.lookups} lookups: default transport {before_time * 1000:.1f} ms, {before_connections} connections. "
+            f"Keep-alive transport and query template {after_time * 1000:.1f} ms, {after_connections} connections"
+        )
+        assert before_connections == self.lookups
+        assert after_connections == 1
+
+    def test_query_template(self):
+        suds_client = self._lookup_client().client
+        start = time.perf_counter()
+        for _ in range(self.lookups):
+            find_person = suds_client.factory.create("ns7:FindPersonClass")
+            find_person.QueryParams = suds_client.factory.create("ns7:QueryParamsClass")
+            find_person.QueryColumns = suds_client.factory.create("ns7:QueryColumnsClass")
+        create_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(self.lookups):
+            _clone_suds_object(find_person)
+        copy_time = time.perf_counter() - start
+
+        print(f"{self.lookups} queries: factory.create {create_time * 1000:.1f} ms, copy {copy_time * 1000:.1f} ms")
+        assert copy_time < create_time